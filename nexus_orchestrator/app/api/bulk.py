@@ -0,0 +1,125 @@
+"""
+Reading bulk request bodies: a JSON array, or NDJSON with one item per line.
+
+NDJSON bodies are read as they stream in, so the first chunk can be written
+while the rest is still arriving. Every item is parsed and validated once,
+and items that fail are reported by index rather than failing the request.
+"""
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from app.db.bulk import Chunk
+from app.utils.serialization import loads
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+def _is_ndjson(request: Request) -> bool:
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return media_type in NDJSON_MEDIA_TYPES
+
+
+async def _ndjson_items(request: Request) -> AsyncIterator[Any]:
+    """Items of an NDJSON body; a line that is not JSON is yielded as the ValueError."""
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield loads(line)
+                except ValueError as e:
+                    yield e
+    if buffer.strip():
+        try:
+            yield loads(buffer)
+        except ValueError as e:
+            yield e
+
+
+async def read_bulk_items(request: Request) -> AsyncIterator[Any]:
+    """
+    Items of a bulk request body.
+
+    Raises:
+        HTTPException: 400 if a JSON body is not an array
+    """
+    if _is_ndjson(request):
+        async for item in _ndjson_items(request):
+            yield item
+        return
+    try:
+        items = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array, or NDJSON with one item per line")
+    for item in items:
+        yield item
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'item'}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+async def bulk_chunks(request: Request, parse: Callable[[Any], Any], chunk_size: int,
+                      max_items: int) -> AsyncIterator[Chunk]:
+    """
+    Validate the items of a bulk request and group them into chunks.
+
+    Args:
+        request: The request whose body holds the items
+        parse: Turns an item into a row for the bulk writer; raises
+            ValidationError or ValueError for an invalid item
+        chunk_size: Valid rows per chunk
+        max_items: Items accepted; any beyond are reported as one failure
+
+    Yields:
+        Lists of (index, row) for valid items and (index, id, error) for invalid ones
+    """
+    rows: List[Tuple[int, Any]] = []
+    errors: List[Tuple[int, Optional[int], str]] = []
+    async for index, item in _enumerate(read_bulk_items(request)):
+        if index >= max_items:
+            errors.append((index, None, f"Only {max_items} items are accepted per request"))
+            break
+        if isinstance(item, ValueError):
+            errors.append((index, None, f"Invalid JSON: {item}"))
+            continue
+        try:
+            rows.append((index, parse(item)))
+        except ValidationError as e:
+            errors.append((index, _item_id(item), _validation_message(e)))
+        except ValueError as e:
+            errors.append((index, _item_id(item), str(e)))
+        if len(rows) >= chunk_size:
+            yield rows, errors
+            rows, errors = [], []
+    if rows or errors:
+        yield rows, errors
+
+
+async def _enumerate(items: AsyncIterator[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    index = 0
+    async for item in items:
+        yield index, item
+        index += 1
+
+
+def _item_id(item: Any) -> Optional[int]:
+    """The id an invalid item refers to, if it names one."""
+    row_id = item.get("id") if isinstance(item, dict) else item
+    return row_id if isinstance(row_id, int) and not isinstance(row_id, bool) else None
+
+
+def parse_id(item: Any) -> int:
+    """An id given as a number or as an object with an id field."""
+    row_id = _item_id(item)
+    if row_id is None:
+        raise ValueError("Expected an ID, or an object with an id")
+    return row_id
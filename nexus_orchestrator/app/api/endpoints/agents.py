@@ -1,53 +1,155 @@
 """
 API endpoints for agent management.
 """
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.agent import AgentCreate, AgentResponse, AgentUpdate
+from app.api.bulk import bulk_chunks, parse_id
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.schemas.bulk import BulkResult
+from app.schemas.agent import AgentBulkUpdate, AgentCreate, AgentPage, AgentResponse, AgentUpdate
 from app.orchestration.agents import agent_service
+from app.orchestration.agents.memory import agent_memory_store
+from app.services.entity_cache import agent_cache, crew_cache
+from app.utils.pagination import decode_cursor, keyset_page
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[AgentResponse])
-async def get_all_agents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all agents."""
-    return agent_service.get_all_agents(db, skip=skip, limit=limit)
+@router.get("/", response_model=AgentPage)
+async def get_all_agents(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    provider: Optional[str] = None,
+    model_name: Optional[str] = None,
+    role: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get agents a page at a time, optionally filtered.
+    
+    Pass the returned next_cursor as cursor to get the following page.
+    """
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    agents = await agent_service.get_all_agents_async(
+        db, limit=limit + 1, after_id=after_id, provider=provider, model_name=model_name, role=role
+    )
+    return keyset_page(agents, limit)
+
+
+@router.get("/memory/stats")
+async def get_memory_stats():
+    """Get agent memory recall latency statistics."""
+    return agent_memory_store.latency_stats()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get agent and crew cache hit rates and sizes."""
+    return {"agents": agent_cache.stats(), "crews": crew_cache.stats()}
+
+
+@router.get("/skills/search", response_model=AgentPage)
+async def find_agents_by_skills(
+    skills: List[str] = Query([]),
+    match: str = Query("any", pattern="^(any|all)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get agents with any, or all, of the given skills, a page at a time.
+    
+    Repeat the skills parameter for each skill, e.g. ?skills=python&skills=sql&match=all.
+    """
+    if not skills:
+        raise HTTPException(status_code=422, detail="At least one skill is required")
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    agents = await agent_service.find_agents_by_skills_async(
+        db, skills, match=match, limit=limit + 1, after_id=after_id
+    )
+    return keyset_page(agents, limit)
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_agents(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Create agents from a JSON array of agents, or NDJSON (Content-Type: application/x-ndjson).
+    
+    Rows are inserted a chunk at a time, each chunk committed on its own; failed
+    items are listed by index. With atomic=true everything is written in one
+    transaction, and nothing if any item fails (422).
+    """
+    chunks = bulk_chunks(request, AgentCreate.model_validate, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await agent_service.bulk_create_agents_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_agents(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Update agents from a JSON array or NDJSON of partial agents, each with its id.
+    
+    An item with a version is only applied if the agent is still at that version.
+    """
+    chunks = bulk_chunks(request, AgentBulkUpdate.model_validate, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await agent_service.bulk_update_agents_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete_agents(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Delete agents given a JSON array or NDJSON of ids."""
+    chunks = bulk_chunks(request, parse_id, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await agent_service.bulk_delete_agents_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
-async def get_agent(agent_id: int, db: Session = Depends(get_db)):
+async def get_agent(agent_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get agent by ID."""
-    agent = agent_service.get_agent(db, agent_id=agent_id)
+    agent = await agent_service.get_agent_async(db, agent_id=agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     return agent
 
 
 @router.post("/", response_model=AgentResponse)
-async def create_agent(agent: AgentCreate, db: Session = Depends(get_db)):
+async def create_agent(agent: AgentCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new agent."""
-    return agent_service.create_agent(db, agent=agent)
+    return await agent_service.create_agent_async(db, agent=agent)
 
 
 @router.put("/{agent_id}", response_model=AgentResponse)
-async def update_agent(agent_id: int, agent: AgentUpdate, db: Session = Depends(get_db)):
+async def update_agent(agent_id: int, agent: AgentUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update agent by ID."""
-    existing_agent = agent_service.get_agent(db, agent_id=agent_id)
-    if not existing_agent:
+    updated_agent = await agent_service.update_agent_async(db, agent_id=agent_id, agent_update=agent)
+    if not updated_agent:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return agent_service.update_agent(db, agent_id=agent_id, agent_update=agent)
+    return updated_agent
 
 
 @router.delete("/{agent_id}")
-async def delete_agent(agent_id: int, db: Session = Depends(get_db)):
+async def delete_agent(agent_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete agent by ID."""
-    existing_agent = agent_service.get_agent(db, agent_id=agent_id)
-    if not existing_agent:
+    if not await agent_service.delete_agent_async(db, agent_id=agent_id):
         raise HTTPException(status_code=404, detail="Agent not found")
-    agent_service.delete_agent(db, agent_id=agent_id)
     return {"message": "Agent deleted successfully"}
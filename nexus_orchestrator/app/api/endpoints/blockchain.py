@@ -0,0 +1,75 @@
+"""
+API endpoints for decision record verification.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.blockchain import blockchain_service
+
+
+router = APIRouter()
+
+
+class RecordVerification(BaseModel):
+    """A record to verify."""
+    task_id: str
+    data: Dict[str, Any]
+
+
+class BulkVerificationRequest(BaseModel):
+    """Request model for bulk verification."""
+    records: List[RecordVerification]
+    executor: str = "thread"  # "thread" or "process"
+
+
+@router.post("/verify")
+async def verify_records(request: BulkVerificationRequest):
+    """
+    Verify many records in one call.
+    """
+    if len(request.records) > settings.VERIFICATION_MAX_BULK_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.VERIFICATION_MAX_BULK_RECORDS} records can be verified per call"
+        )
+    if request.executor not in ("thread", "process"):
+        raise HTTPException(status_code=400, detail=f"Unknown executor: {request.executor}")
+    
+    records = [(record.task_id, record.data) for record in request.records]
+    return await asyncio.to_thread(blockchain_service.verify_records, records, request.executor)
+
+
+@router.post("/records/{task_id}/verify")
+async def verify_record(task_id: str, data: Dict[str, Any]):
+    """
+    Verify a record and get its Merkle inclusion proof.
+    """
+    return await asyncio.to_thread(blockchain_service.verify_record_proof, task_id, data)
+
+
+@router.get("/anchoring/stats")
+async def get_anchoring_stats():
+    """
+    Get Merkle batching and anchoring throughput.
+    """
+    return blockchain_service.anchoring_stats()
+
+
+@router.get("/status")
+async def get_status():
+    """
+    Get the current blockchain mode and provider probe state.
+    """
+    return blockchain_service.status()
+
+
+@router.get("/retention/stats")
+async def get_retention_stats():
+    """
+    Get decision log tier sizes and the result of the last retention pass.
+    """
+    return await asyncio.to_thread(blockchain_service.retention.stats)
@@ -1,65 +1,176 @@
 """
 API endpoints for crew management.
 """
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.crew import CrewCreate, CrewResponse, CrewUpdate
+from app.api.bulk import bulk_chunks, parse_id
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.schemas.bulk import BulkResult
+from app.schemas.crew import (
+    CrewBulkUpdate, CrewCreate, CrewJobResult, CrewJobStatus, CrewPage, CrewResponse, CrewUpdate,
+)
 from app.orchestration.crews import crew_service
+from app.orchestration.crews.job_pool import FINISHED, QueueFullError
+from app.utils.pagination import decode_cursor, keyset_page
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[CrewResponse])
-async def get_all_crews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all crews."""
-    return crew_service.get_all_crews(db, skip=skip, limit=limit)
+@router.get("/", response_model=CrewPage)
+async def get_all_crews(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    agent_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get crews a page at a time, optionally only those with a given member agent or task.
+    
+    Pass the returned next_cursor as cursor to get the following page.
+    """
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    crews = await crew_service.get_all_crews_async(
+        db, limit=limit + 1, after_id=after_id, agent_id=agent_id, task_id=task_id
+    )
+    return keyset_page(crews, limit)
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_crews(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Create crews from a JSON array of crews, or NDJSON (Content-Type: application/x-ndjson).
+    
+    Rows are inserted a chunk at a time, each chunk committed on its own; failed
+    items are listed by index. With atomic=true everything is written in one
+    transaction, and nothing if any item fails (422).
+    """
+    chunks = bulk_chunks(request, CrewCreate.model_validate, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await crew_service.bulk_create_crews_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_crews(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Update crews from a JSON array or NDJSON of partial crews, each with its id.
+    
+    An item with a version is only applied if the crew is still at that version.
+    """
+    chunks = bulk_chunks(request, CrewBulkUpdate.model_validate, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await crew_service.bulk_update_crews_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete_crews(request: Request, response: Response, atomic: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Delete crews given a JSON array or NDJSON of ids."""
+    chunks = bulk_chunks(request, parse_id, settings.BULK_CHUNK_SIZE, settings.BULK_MAX_ITEMS)
+    result = await crew_service.bulk_delete_crews_async(db, chunks, atomic=atomic)
+    if atomic and result["failed"]:
+        response.status_code = 422
+    return result
+
+
+@router.get("/jobs/stats")
+async def get_crew_job_stats():
+    """Crew job pool counters and the runs waiting and executing now."""
+    return crew_service.crew_job_pool.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=CrewJobStatus)
+async def get_crew_job(job_id: str):
+    """Get the status of a crew run."""
+    job = crew_service.crew_job_pool.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/result", response_model=CrewJobResult)
+async def get_crew_job_result(job_id: str):
+    """Get the result of a finished crew run; 409 while it is still queued or running."""
+    job = crew_service.crew_job_pool.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {**job.to_dict(), "result": job.result}
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=CrewJobStatus)
+async def cancel_crew_job(job_id: str):
+    """
+    Cancel a crew run.
+    
+    A queued run never starts; a running one finishes in its worker and its result is discarded.
+    """
+    job = crew_service.crew_job_pool.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @router.get("/{crew_id}", response_model=CrewResponse)
-async def get_crew(crew_id: int, db: Session = Depends(get_db)):
+async def get_crew(crew_id: int):
     """Get crew by ID."""
-    crew = crew_service.get_crew(db, crew_id=crew_id)
+    crew = await crew_service.get_cached_crew_async(crew_id)
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
     return crew
 
 
 @router.post("/", response_model=CrewResponse)
-async def create_crew(crew: CrewCreate, db: Session = Depends(get_db)):
+async def create_crew(crew: CrewCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new crew."""
-    return crew_service.create_crew(db, crew=crew)
+    return await crew_service.create_crew_async(db, crew=crew)
 
 
 @router.put("/{crew_id}", response_model=CrewResponse)
-async def update_crew(crew_id: int, crew: CrewUpdate, db: Session = Depends(get_db)):
+async def update_crew(crew_id: int, crew: CrewUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update crew by ID."""
-    existing_crew = crew_service.get_crew(db, crew_id=crew_id)
-    if not existing_crew:
+    updated_crew = await crew_service.update_crew_async(db, crew_id=crew_id, crew_update=crew)
+    if not updated_crew:
         raise HTTPException(status_code=404, detail="Crew not found")
-    return crew_service.update_crew(db, crew_id=crew_id, crew_update=crew)
+    return updated_crew
 
 
 @router.delete("/{crew_id}")
-async def delete_crew(crew_id: int, db: Session = Depends(get_db)):
+async def delete_crew(crew_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete crew by ID."""
-    existing_crew = crew_service.get_crew(db, crew_id=crew_id)
-    if not existing_crew:
+    if not await crew_service.delete_crew_async(db, crew_id=crew_id):
         raise HTTPException(status_code=404, detail="Crew not found")
-    crew_service.delete_crew(db, crew_id=crew_id)
     return {"message": "Crew deleted successfully"}
 
 
-@router.post("/{crew_id}/run", response_model=dict)
-async def run_crew(crew_id: int, task_data: dict, db: Session = Depends(get_db)):
-    """Run a crew with specified task data."""
-    crew = crew_service.get_crew(db, crew_id=crew_id)
+@router.post("/{crew_id}/run", response_model=CrewJobStatus, status_code=202)
+async def run_crew(crew_id: int, task_data: dict):
+    """
+    Queue a crew run with specified task data.
+    
+    Returns the job at once; poll /crews/jobs/{job_id} for its status and
+    /crews/jobs/{job_id}/result for its output.
+    """
+    crew = await crew_service.get_cached_crew_async(crew_id)
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
     
-    # Execute the crew's task
-    result = crew_service.execute_crew_task(db, crew_id=crew_id, task_data=task_data)
-    return {"status": "success", "result": result}
+    try:
+        job = crew_service.submit_crew_task(crew_id=crew_id, task_data=task_data)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.to_dict()
@@ -4,9 +4,9 @@ API endpoints for task management.
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate
 from app.orchestration.tasks import task_service
 
@@ -14,40 +14,38 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[TaskResponse])
-async def get_all_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_tasks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """Get all tasks."""
-    return task_service.get_all_tasks(db, skip=skip, limit=limit)
+    return await task_service.get_all_tasks_async(db, skip=skip, limit=limit)
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get task by ID."""
-    task = task_service.get_task(db, task_id=task_id)
+    task = await task_service.get_task_async(db, task_id=task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
 @router.post("/", response_model=TaskResponse)
-async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new task."""
-    return task_service.create_task(db, task=task)
+    return await task_service.create_task_async(db, task=task)
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
+async def update_task(task_id: int, task: TaskUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update task by ID."""
-    existing_task = task_service.get_task(db, task_id=task_id)
-    if not existing_task:
+    updated_task = await task_service.update_task_async(db, task_id=task_id, task_update=task)
+    if not updated_task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task_service.update_task(db, task_id=task_id, task_update=task)
+    return updated_task
 
 
 @router.delete("/{task_id}")
-async def delete_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete task by ID."""
-    existing_task = task_service.get_task(db, task_id=task_id)
-    if not existing_task:
+    if not await task_service.delete_task_async(db, task_id=task_id):
         raise HTTPException(status_code=404, detail="Task not found")
-    task_service.delete_task(db, task_id=task_id)
     return {"message": "Task deleted successfully"}
@@ -1,15 +1,31 @@
 """
 API endpoints for AI orchestration workflows.
 """
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.db.session import get_async_db
 from app.orchestration.workflows.orchestrator import (
     AIOrchestrator, OrchestrationTask, AgentRole
 )
 from app.orchestration.workflows.cross_thought import cross_thought_engine
+from app.orchestration.workflows.thought_events import (
+    ThoughtEvent, ThoughtSubscription, thought_event_broker
+)
+from app.orchestration.workflows.thought_search import thought_search_index
+from app.orchestration.workflows.thought_export import (
+    iter_arrow_stream, iter_ndjson_chunks, iter_thought_batches
+)
+from app.schemas.run import RunDetail, RunPage, RunStepResponse, RunSummary
+from app.services.run_store import get_run_async, list_runs_async, run_store
+from app.utils.pagination import decode_time_cursor, encode_time_cursor
+from app.utils.serialization import dumps_str
 
 
 router = APIRouter()
@@ -22,6 +38,7 @@ class OrchestrationRequest(BaseModel):
     workflow_type: str = "parallel"  # "parallel", "sequential", or "consensus"
     max_iterations: int = 3
     consensus_threshold: float = 0.7  # For consensus workflows
+    context_top_k: Optional[int] = None  # Pass only the top-k relevant prior thoughts between agents
     metadata: Dict[str, Any] = {}
 
 
@@ -41,7 +58,8 @@ async def orchestrate(request: OrchestrationRequest):
                 prompt_template=role_data.get("prompt_template", "{prompt}"),
                 response_format=role_data.get("response_format"),
                 model_name=role_data.get("model_name"),
-                provider=role_data.get("provider")
+                provider=role_data.get("provider"),
+                skills=role_data.get("skills", [])
             )
         )
     
@@ -53,6 +71,7 @@ async def orchestrate(request: OrchestrationRequest):
         workflow_type=request.workflow_type,
         max_iterations=request.max_iterations,
         consensus_threshold=request.consensus_threshold,
+        context_top_k=request.context_top_k,
         metadata=request.metadata
     )
     
@@ -63,6 +82,91 @@ async def orchestrate(request: OrchestrationRequest):
     return results
 
 
+@router.get("/runs", response_model=RunPage)
+async def list_runs(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    task_hash: Optional[str] = None,
+    workflow_type: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get recorded orchestration runs, newest first, a page at a time.
+    
+    Runs are written shortly after they finish. Filter by task_hash to find
+    earlier runs of the same task; since/until bound the runs' start times.
+    """
+    try:
+        before = decode_time_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    runs = await list_runs_async(
+        db, limit=limit + 1, before=before, task_hash=task_hash, workflow_type=workflow_type,
+        status=status, since=since, until=until
+    )
+    items = runs[:limit]
+    next_cursor = encode_time_cursor(items[-1].started_at, items[-1].id) if len(runs) > limit else None
+    return {
+        "items": [RunSummary.model_validate(run, from_attributes=True) for run in items],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/runs/stats")
+async def get_run_store_stats():
+    """Get run store write counters and the runs waiting to be written."""
+    return run_store.stats()
+
+
+@router.get("/runs/{run_id}", response_model=RunDetail)
+async def get_run(run_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get a recorded run with its result and agent calls."""
+    found = await get_run_async(db, run_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    run, steps = found
+    detail = RunDetail.model_validate(run, from_attributes=True)
+    detail.steps = [RunStepResponse.model_validate(step, from_attributes=True) for step in steps]
+    return detail
+
+
+@router.get("/thought-chains/export")
+async def export_thought_chains(
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$"),
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    workflow_type: Optional[str] = None,
+):
+    """
+    Stream closed thought chains for analytics, one row per thought.
+    
+    `ndjson` starts with a schema header line; `arrow` is the Arrow IPC
+    streaming format and requires pyarrow on the server.
+    """
+    batches = iter_thought_batches(
+        cross_thought_engine.list_thought_chains(),
+        since=since, until=until, workflow_type=workflow_type
+    )
+    
+    if format == "arrow":
+        try:
+            chunks = iter_arrow_stream(batches)
+            first = next(chunks)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        
+        def arrow_stream():
+            yield first
+            yield from chunks
+        
+        return StreamingResponse(arrow_stream(), media_type="application/vnd.apache.arrow.stream")
+    
+    return StreamingResponse(iter_ndjson_chunks(batches), media_type="application/x-ndjson")
+
+
 @router.get("/thought-chains/{chain_id}")
 async def get_thought_chain(chain_id: str):
     """
@@ -75,6 +179,17 @@ async def get_thought_chain(chain_id: str):
         raise HTTPException(status_code=404, detail="Thought chain not found")
 
 
+@router.get("/thought-chains/{chain_id}/verify")
+async def verify_thought_chain(chain_id: str):
+    """
+    Verify the hash links of a thought chain.
+    """
+    try:
+        return await cross_thought_engine.verify_thought_chain_async(chain_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Thought chain not found")
+
+
 @router.get("/thought-chains/{chain_id}/thoughts")
 async def get_thoughts(chain_id: str, agent_id: Optional[int] = None, limit: int = 10):
     """
@@ -88,3 +203,146 @@ async def get_thoughts(chain_id: str, agent_id: Optional[int] = None, limit: int
         return thoughts
     except ValueError:
         raise HTTPException(status_code=404, detail="Thought chain not found")
+
+
+@router.get("/thoughts/search")
+async def search_thoughts(
+    q: str,
+    chain_id: Optional[str] = None,
+    agent_id: Optional[int] = None,
+    role: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Search thoughts across all thought chains.
+    """
+    page = thought_search_index.search(
+        q, chain_id=chain_id, agent_id=agent_id, role=role, offset=offset, limit=limit
+    )
+    
+    results = []
+    for hit in page.hits:
+        result = hit.dict()
+        try:
+            result["content"] = cross_thought_engine.get_thought(hit.chain_id, hit.thought_id).content
+        except ValueError:
+            result["content"] = None
+        results.append(result)
+    
+    return {"query": page.query, "total": page.total, "offset": offset, "limit": limit, "results": results}
+
+
+async def _follow_thought_chain(
+    chain_id: str, subscription: ThoughtSubscription, cursor: Optional[str]
+) -> AsyncIterator[Optional[ThoughtEvent]]:
+    """
+    Yield the backlog after a cursor, then live events, for one chain.
+    
+    Yields None when no event arrived within the keepalive interval. The
+    stream ends when the chain closes or the subscriber is dropped.
+    """
+    seen = set()
+    closed = False
+    try:
+        backlog = cross_thought_engine.get_thoughts_since(chain_id, cursor)
+        closed = cross_thought_engine.get_thought_chain(chain_id).status == "closed"
+    except ValueError:
+        # Chain lives on another worker; only live events are available
+        backlog = []
+    
+    for thought in backlog:
+        seen.add(thought.id)
+        yield ThoughtEvent(type="thought", chain_id=chain_id, thought_id=thought.id, data=thought.dict())
+    
+    if closed:
+        yield ThoughtEvent(type="chain_closed", chain_id=chain_id)
+        return
+    
+    while True:
+        try:
+            event = await subscription.get(timeout=settings.THOUGHT_EVENTS_KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        if event is None:
+            return
+        if event.thought_id in seen:
+            continue
+        yield event
+
+
+def _check_chain_exists(chain_id: str) -> None:
+    """Raise a 404 unless the chain is known here or may arrive via fan-out."""
+    if settings.THOUGHT_EVENTS_REDIS_ENABLED:
+        return
+    try:
+        cross_thought_engine.get_thought_chain(chain_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Thought chain not found")
+
+
+@router.get("/thought-chains/{chain_id}/stream")
+async def stream_thoughts(
+    chain_id: str,
+    cursor: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream thoughts from a thought chain as Server-Sent Events.
+    
+    Resumes after `cursor` (or the `Last-Event-ID` header sent by
+    reconnecting EventSource clients).
+    """
+    _check_chain_exists(chain_id)
+    
+    async def event_stream():
+        subscription = thought_event_broker.subscribe(chain_id)
+        try:
+            async for event in _follow_thought_chain(chain_id, subscription, cursor or last_event_id):
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event.type == "thought":
+                    yield f"id: {event.thought_id}\nevent: thought\ndata: {dumps_str(event.data)}\n\n"
+                else:
+                    yield f"event: {event.type}\ndata: {dumps_str(event.data)}\n\n"
+        finally:
+            thought_event_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/thought-chains/{chain_id}/ws")
+async def websocket_thoughts(websocket: WebSocket, chain_id: str, cursor: Optional[str] = None):
+    """
+    Stream thoughts from a thought chain over a WebSocket.
+    
+    Resumes after `cursor`, the ID of the last thought the client has seen.
+    """
+    try:
+        _check_chain_exists(chain_id)
+    except HTTPException:
+        await websocket.close(code=4404)
+        return
+    
+    await websocket.accept()
+    subscription = thought_event_broker.subscribe(chain_id)
+    try:
+        async for event in _follow_thought_chain(chain_id, subscription, cursor):
+            if event is None:
+                await websocket.send_json({"event": "keepalive"})
+                continue
+            await websocket.send_text(dumps_str({
+                "event": event.type,
+                "id": event.thought_id,
+                "data": event.data,
+            }))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        thought_event_broker.unsubscribe(subscription)
@@ -0,0 +1,15 @@
+"""
+Default response class for the API.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.utils.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when installed, like ORJSONResponse without requiring it."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -3,7 +3,7 @@ API router configuration.
 """
 from fastapi import APIRouter
 
-from app.api.endpoints import agents, crews, tasks, workflows, auth
+from app.api.endpoints import agents, crews, tasks, workflows, auth, blockchain
 
 # Create API router
 api_router = APIRouter()
@@ -14,3 +14,4 @@ api_router.include_router(agents.router, prefix="/agents", tags=["Agents"])
 api_router.include_router(crews.router, prefix="/crews", tags=["Crews"])
 api_router.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
 api_router.include_router(workflows.router, prefix="/workflows", tags=["Workflows"])
+api_router.include_router(blockchain.router, prefix="/blockchain", tags=["Blockchain"])
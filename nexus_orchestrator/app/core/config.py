@@ -1,7 +1,7 @@
 """
 Configuration settings for the Nexus AI Orchestrator.
 """
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
@@ -22,14 +22,81 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "nexus_ai"
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    ASYNC_DATABASE_URI: Optional[str] = None  # Defaults to SQLALCHEMY_DATABASE_URI with asyncpg/aiosqlite
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500  # Compiled SQL cached per engine
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # Server-side, per asyncpg connection
     
+    # Crew execution
+    CREW_INSTANCE_POOL_MAX_CREWS: int = 256  # Crews whose built CrewAI objects are kept for reuse
+    CREW_INSTANCE_POOL_IDLE_PER_CREW: int = 4
+    CREW_JOB_EXECUTOR: str = "thread"  # "thread" or "process"; runs are dispatched here
+    CREW_JOB_MAX_WORKERS: int = 4  # Crew runs executing at once per API worker
+    CREW_JOB_MAX_QUEUE_DEPTH: int = 32  # Runs waiting for a worker before new ones are refused
+    CREW_JOB_RETENTION_SECONDS: float = 3600.0  # How long finished runs' results can be fetched
+    CREW_JOB_MAX_RETAINED: int = 1000
+    CREW_TASK_MAX_CONCURRENCY: int = 4  # Independent tasks of one crew run at once; crew config max_concurrency overrides
+    
+    # Orchestration run store
+    RUN_STORE_ENABLED: bool = True
+    RUN_STORE_BATCH_SIZE: int = 200  # Runs per multi-row insert
+    RUN_STORE_FLUSH_INTERVAL_SECONDS: float = 0.5  # Longest a finished run waits to be written
+    RUN_STORE_QUEUE_SIZE: int = 10_000  # Runs waiting to be written before new ones are dropped
+    RUN_STORE_RETENTION_DAYS: Optional[float] = 30  # None keeps runs forever
+    RUN_STORE_PARTITIONS_AHEAD_DAYS: int = 3  # PostgreSQL daily partitions created in advance
+    RUN_STORE_MAINTENANCE_INTERVAL_SECONDS: float = 3600.0  # Partition creation and retention passes
+
+    # Bulk writes
+    BULK_CHUNK_SIZE: int = 500  # Rows per multi-row statement, and per commit unless atomic
+    BULK_MAX_ITEMS: int = 10_000  # Items accepted per bulk request
+
     # Vector Database
     QDRANT_URL: Optional[str] = "http://localhost:6333"
     
+    # Thought retrieval
+    THOUGHT_RETRIEVAL_BACKEND: str = "local"  # "local" or "qdrant" (uses QDRANT_URL)
+    THOUGHT_EMBEDDING_DIM: int = 384
+    THOUGHT_RETRIEVAL_MAX_THOUGHTS: int = 200_000  # Local index size before the oldest chains are evicted
+    
+    # Agent long-term memory
+    AGENT_MEMORY_ENABLED: bool = True
+    AGENT_MEMORY_DIR: Optional[str] = None  # Defaults to ./agent_memory
+    AGENT_MEMORY_BACKEND: str = "local"  # "local" or "qdrant" (uses QDRANT_URL)
+    AGENT_MEMORY_CAPACITY: int = 500  # Items kept per agent
+    AGENT_MEMORY_HALF_LIFE_HOURS: float = 72.0
+    AGENT_MEMORY_TOP_K: int = 8
+    AGENT_MEMORY_TOKEN_BUDGET: int = 400
+    AGENT_MEMORY_OUTPUT_CHARS: int = 1000  # Length of remembered output summaries
+    AGENT_MEMORY_RECALL_TIMEOUT_MS: int = 50
+    
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     
+    # Live thought-chain events
+    THOUGHT_EVENTS_QUEUE_SIZE: int = 256  # Per-subscriber buffer before it is dropped
+    THOUGHT_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    THOUGHT_EVENTS_REDIS_ENABLED: bool = False  # Fan out events to other workers
+    THOUGHT_EVENTS_REDIS_CHANNEL: str = "nexus:thought-events"
+    
+    # Agent and crew read-through cache
+    ENTITY_CACHE_ENABLED: bool = True
+    ENTITY_CACHE_TTL_SECONDS: float = 300.0  # Upper bound on staleness if an invalidation is lost
+    ENTITY_CACHE_NEGATIVE_TTL_SECONDS: float = 30.0  # How long a missing id is remembered
+    ENTITY_CACHE_MAX_ENTRIES: int = 10_000  # Per entity type, least recently used evicted
+    ENTITY_CACHE_REDIS_ENABLED: bool = False  # Invalidate other workers' caches
+    ENTITY_CACHE_REDIS_CHANNEL: str = "nexus:entity-invalidations"
+    
+    # Thought search index
+    THOUGHT_SEARCH_INDEX_DIR: Optional[str] = None  # Persist the index here across restarts
+    THOUGHT_SEARCH_MAX_BUFFER_DOCS: int = 1000
+    THOUGHT_SEARCH_MAX_SEGMENTS: int = 8
+    THOUGHT_SEARCH_MAX_DOCUMENTS: int = 200_000
+    
     # AI API Keys
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
@@ -41,6 +108,45 @@ class Settings(BaseSettings):
     
     # Web3 (optional)
     WEB3_PROVIDER_URI: Optional[str] = "http://localhost:8545"
+    WEB3_PROBE_INTERVAL_SECONDS: float = 30.0
+    WEB3_PROBE_TIMEOUT_SECONDS: float = 2.0
+    
+    # Decision journal (simulation mode storage)
+    DECISION_JOURNAL_FSYNC: str = "batch"  # "always", "batch", "interval" or "never"
+    DECISION_JOURNAL_FSYNC_INTERVAL_SECONDS: float = 1.0
+    DECISION_JOURNAL_BATCH_SIZE: int = 256
+    DECISION_JOURNAL_FLUSH_INTERVAL_MS: int = 50
+    DECISION_JOURNAL_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    DECISION_JOURNAL_COMPACT_INTERVAL_SECONDS: float = 300.0
+
+    # Merkle anchoring
+    ANCHOR_BATCH_WINDOW_SECONDS: float = 5.0
+    ANCHOR_CHAIN_MAX_AGE_SECONDS: float = 300.0
+    ANCHOR_MAX_BATCH_SIZE: int = 4096
+    ANCHOR_CACHED_BATCHES: int = 256  # Anchored batches kept in memory; others are read from the journal
+    ANCHOR_RETRY_BASE_SECONDS: float = 1.0  # First retry of a failed anchor, doubling up to the max
+    ANCHOR_RETRY_MAX_SECONDS: float = 300.0
+    ANCHOR_PRIVATE_KEY: Optional[str] = None  # Defaults to the node's first unlocked account
+    ANCHOR_MAX_IN_FLIGHT: int = 64
+    ANCHOR_RECEIPT_POLL_SECONDS: float = 0.5
+    ANCHOR_RECEIPT_BATCH_SIZE: int = 32
+    ANCHOR_GAS_PRICE_MULTIPLIER: float = 1.25
+    ANCHOR_MAX_PRIORITY_FEE_GWEI: float = 2.0
+    
+    # Record verification
+    VERIFICATION_MAX_WORKERS: Optional[int] = None  # Defaults to the CPU count
+    VERIFICATION_MAX_BULK_RECORDS: int = 100_000
+    
+    # Decision log retention
+    RETENTION_ENABLED: bool = True
+    RETENTION_BUCKET_SECONDS: float = 3600.0  # Journal segments rotate per bucket
+    RETENTION_HOT_SECONDS: float = 86400.0  # Closed buckets older than this are compressed
+    RETENTION_ARCHIVE_AFTER_SECONDS: Optional[float] = 30 * 86400.0  # None keeps segments out of the archive
+    RETENTION_ARCHIVE_DIR: Optional[str] = None  # Defaults to blockchain_sim/archive
+    RETENTION_TTL_SECONDS: Dict[str, Optional[float]] = {}  # Task ID prefix -> TTL; None keeps forever
+    RETENTION_DEFAULT_TTL_SECONDS: Optional[float] = None
+    RETENTION_MAX_IO_BYTES_PER_SECOND: Optional[float] = 8 * 1024 * 1024
+    RETENTION_INTERVAL_SECONDS: float = 60.0
     
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: dict) -> str:
@@ -49,6 +155,17 @@ class Settings(BaseSettings):
             return v
         return f"postgresql://{values.get('POSTGRES_USER')}:{values.get('POSTGRES_PASSWORD')}@{values.get('POSTGRES_SERVER')}/{values.get('POSTGRES_DB')}"
     
+    @validator("ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(cls, v: Optional[str], values: dict) -> str:
+        """Derive the async driver URL from the database URL."""
+        if v:
+            return v
+        url = values.get("SQLALCHEMY_DATABASE_URI") or ""
+        scheme, _, rest = url.partition("://")
+        driver = {"postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg",
+                  "postgresql+psycopg2": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+        return f"{driver.get(scheme, scheme)}://{rest}"
+    
     @validator("CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> List[str]:
         """Parse CORS origins from string to list."""
@@ -0,0 +1,167 @@
+"""
+Batched, write-behind inserts into a single table.
+
+Callers submit rows to a bounded queue and get a Future for the new row's
+primary key. A background thread drains the queue and inserts each batch
+with one multi-row INSERT ... RETURNING in one transaction, flushing when
+the batch is full or the flush interval passes. A full queue blocks
+callers, which applies backpressure instead of growing without bound;
+async callers wait for room in a worker thread, not on the event loop.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.engine import Engine
+
+
+class BatchWriter:
+    """Write-behind batch inserter for one table."""
+
+    def __init__(self, engine: Engine, table: Table, batch_size: int = 500,
+                 flush_interval: float = 0.05, max_queue_size: int = 10_000,
+                 on_batch: Optional[Callable[[List[Dict[str, Any]], List[Any]], None]] = None):
+        """
+        Initialize the writer. The writer thread starts on first submit.
+
+        Args:
+            engine: Engine to write through
+            table: Table to insert into; must have a single primary key column
+            batch_size: Maximum rows per INSERT
+            flush_interval: Seconds to wait for a batch to fill
+            max_queue_size: Queued rows before submit() blocks
+            on_batch: Called on the writer thread with each committed batch
+                of rows and their primary keys
+        """
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_batch = on_batch
+        self._key = list(table.primary_key.columns)[0]
+
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future]]]" = queue.Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+        self.rows_written = 0
+        self.batches_written = 0
+
+    def submit(self, row: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """
+        Queue a row for insertion.
+
+        Blocks while the queue is full.
+
+        Args:
+            row: Column values for the new row
+            timeout: Maximum seconds to block; raises queue.Full after it
+
+        Returns:
+            Future resolving to the new row's primary key
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((row, future), timeout=timeout)
+        return future
+
+    async def submit_async(self, row: Dict[str, Any]) -> Future:
+        """
+        Queue a row for insertion from async code.
+
+        Never blocks the event loop: while the queue is full, the put waits
+        in a worker thread.
+
+        Args:
+            row: Column values for the new row
+
+        Returns:
+            Future resolving to the new row's primary key; await it with
+            asyncio.wrap_future
+        """
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((row, future))
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, (row, future))
+        return future
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name=f"batch-writer-{self.table.name}", daemon=True
+                )
+                self._writer.start()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every row queued so far has been written."""
+        if self._writer is None:
+            return
+        marker: Future = Future()
+        self._queue.put(({}, marker), timeout=timeout)
+        marker.result(timeout)
+
+    def close(self) -> None:
+        """Write everything queued and stop the writer thread."""
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join()
+
+    def _run(self) -> None:
+        """Drain the queue in batches until closed."""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch: List[Tuple[Dict[str, Any], Future]] = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if item is None:
+                stopping = True
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        """Insert a batch and resolve its futures."""
+        # Empty rows are flush markers
+        entries = [(row, future) for row, future in batch if row]
+        markers = [future for row, future in batch if not row]
+        if entries:
+            rows = [row for row, _ in entries]
+            try:
+                with self.engine.begin() as conn:
+                    result = conn.execute(
+                        insert(self.table).returning(self._key, sort_by_parameter_order=True),
+                        rows,
+                    )
+                    keys = [r[0] for r in result]
+            except Exception as e:
+                for _, future in entries:
+                    future.set_exception(e)
+            else:
+                self.rows_written += len(rows)
+                self.batches_written += 1
+                if self.on_batch is not None:
+                    try:
+                        self.on_batch(rows, keys)
+                    except Exception as e:
+                        print(f"Batch callback failed for {self.table.name}: {e}")
+                for (_, future), key in zip(entries, keys):
+                    future.set_result(key)
+        for future in markers:
+            future.set_result(None)
@@ -0,0 +1,220 @@
+"""
+Chunked bulk writes for versioned tables.
+
+Rows are written a chunk at a time with one multi-row statement: inserts
+return the new ids and versions with RETURNING, so nothing is refreshed
+row by row. In atomic mode every chunk shares one transaction and the first
+failure rolls all of them back. Otherwise each chunk is committed on its
+own, and a chunk that fails is retried row by row, so only the offending
+rows are reported as failed.
+"""
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# A chunk as read from the request: valid rows as (index, row), and (index, id, error) for invalid ones
+Chunk = Tuple[List[Tuple[int, Any]], List[Tuple[int, Optional[int], str]]]
+
+# Called after a commit with (id, version, values) for every row it wrote
+AfterCommit = Callable[[List[Tuple[int, Optional[int], Dict[str, Any]]]], None]
+
+
+async def map_rows(chunks: AsyncIterable[Chunk], convert: Callable[[Any], Any]) -> AsyncIterator[Chunk]:
+    """Chunks with every valid row passed through convert."""
+    async for rows, errors in chunks:
+        yield [(index, convert(row)) for index, row in rows], errors
+
+
+def _error_message(error: Exception) -> str:
+    """The database's own message, without SQLAlchemy's statement dump."""
+    return str(getattr(error, "orig", None) or error).splitlines()[0]
+
+
+class _BulkRun:
+    """Collects outcomes by request index and runs the commit hooks."""
+
+    def __init__(self, db: AsyncSession, atomic: bool, after_commit: Optional[AfterCommit]):
+        self.db = db
+        self.atomic = atomic
+        self.after_commit = after_commit
+        self.succeeded: List[Dict[str, Any]] = []
+        self.failed: List[Dict[str, Any]] = []
+        # Written but, in atomic mode, not yet committed
+        self._pending: List[Tuple[int, int, Optional[int], Dict[str, Any]]] = []
+
+    def fail(self, index: int, row_id: Optional[int], error: str) -> None:
+        self.failed.append({"index": index, "id": row_id, "error": error})
+
+    def wrote(self, index: int, row_id: int, version: Optional[int], values: Dict[str, Any]) -> None:
+        self._pending.append((index, row_id, version, values))
+
+    @property
+    def aborted(self) -> bool:
+        return self.atomic and bool(self.failed)
+
+    async def commit(self) -> None:
+        await self.db.commit()
+        pending, self._pending = self._pending, []
+        self.succeeded.extend({"index": index, "id": row_id, "version": version}
+                              for index, row_id, version, _ in pending)
+        if self.after_commit is not None and pending:
+            self.after_commit([(row_id, version, values) for _, row_id, version, values in pending])
+
+    async def rollback(self) -> None:
+        await self.db.rollback()
+        self._pending = []
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "succeeded": sorted(self.succeeded, key=lambda item: item["index"]),
+            "failed": sorted(self.failed, key=lambda item: item["index"]),
+        }
+
+
+async def _run(db: AsyncSession, chunks: AsyncIterable[Chunk], atomic: bool,
+               after_commit: Optional[AfterCommit], write_chunk, write_row) -> Dict[str, Any]:
+    run = _BulkRun(db, atomic, after_commit)
+    async for rows, errors in chunks:
+        for index, row_id, error in errors:
+            run.fail(index, row_id, error)
+        if run.aborted:
+            break
+        if not rows:
+            continue
+        failed_before = len(run.failed)
+        try:
+            await write_chunk(run, rows)
+            if not atomic:
+                await run.commit()
+        except SQLAlchemyError as e:
+            if atomic:
+                run.fail(rows[0][0], None, f"Chunk starting at item {rows[0][0]} failed: {_error_message(e)}")
+                break
+            await run.rollback()
+            del run.failed[failed_before:]
+            # Find the rows at fault, committing the rest one by one
+            for row in rows:
+                try:
+                    await write_row(run, row)
+                    await run.commit()
+                except SQLAlchemyError as row_error:
+                    await run.rollback()
+                    run.fail(row[0], None, _error_message(row_error))
+        if run.aborted:
+            break
+    if run.aborted:
+        await run.rollback()
+    elif atomic:
+        await run.commit()
+    return run.result()
+
+
+async def bulk_insert_async(db: AsyncSession, model, chunks: AsyncIterable[Chunk], atomic: bool = False,
+                            after_commit: Optional[AfterCommit] = None) -> Dict[str, Any]:
+    """
+    Insert rows a chunk at a time.
+
+    Args:
+        db: Async session
+        model: Mapped class with id and version columns
+        chunks: Rows as column-value dicts by request index, with items that failed validation
+        atomic: Write everything in one transaction, or nothing if any row fails
+        after_commit: Called with the committed rows, e.g. to update caches
+
+    Returns:
+        succeeded, with index, id and version per row, and failed, with index and error
+    """
+    table = model.__table__
+    statement = insert(table).returning(table.c.id, table.c.version, sort_by_parameter_order=True)
+
+    async def write_chunk(run: _BulkRun, rows: List[Tuple[int, Dict[str, Any]]]) -> None:
+        result = await db.execute(statement, [values for _, values in rows])
+        for (index, values), (row_id, version) in zip(rows, result.all()):
+            run.wrote(index, row_id, version, values)
+
+    async def write_row(run: _BulkRun, row: Tuple[int, Dict[str, Any]]) -> None:
+        await write_chunk(run, [row])
+
+    return await _run(db, chunks, atomic, after_commit, write_chunk, write_row)
+
+
+async def bulk_update_async(db: AsyncSession, model, chunks: AsyncIterable[Chunk], atomic: bool = False,
+                            after_commit: Optional[AfterCommit] = None) -> Dict[str, Any]:
+    """
+    Update rows by id a chunk at a time, bumping each row's version.
+
+    Each row is a (id, expected_version, values) tuple. With an expected
+    version the row is only updated if it still has that version, like the
+    ORM's optimistic check on single updates.
+
+    Args:
+        db: Async session
+        model: Mapped class with id and version columns
+        chunks: (id, expected_version or None, values) by request index, with invalid items
+        atomic: Write everything in one transaction, or nothing if any row fails
+        after_commit: Called with the committed rows, e.g. to update caches
+
+    Returns:
+        succeeded, with index, id and new version per row, and failed, with index, id and error
+    """
+    table = model.__table__
+
+    async def write_row(run: _BulkRun, row: Tuple[int, Tuple[int, Optional[int], Dict[str, Any]]]) -> None:
+        index, (row_id, expected_version, values) = row
+        statement = update(table).where(table.c.id == row_id)
+        if expected_version is not None:
+            statement = statement.where(table.c.version == expected_version)
+        statement = statement.values(**values, version=table.c.version + 1).returning(table.c.version)
+        version = (await db.execute(statement)).scalar()
+        if version is None:
+            error = f"{model.__name__} {row_id} not found"
+            if expected_version is not None:
+                error += f" or no longer at version {expected_version}"
+            run.fail(index, row_id, error)
+        else:
+            run.wrote(index, row_id, version, values)
+
+    async def write_chunk(run: _BulkRun, rows) -> None:
+        # One statement per row, since each may set different columns, but no reads and one commit
+        for row in rows:
+            await write_row(run, row)
+            if run.aborted:
+                return
+
+    return await _run(db, chunks, atomic, after_commit, write_chunk, write_row)
+
+
+async def bulk_delete_async(db: AsyncSession, model, chunks: AsyncIterable[Chunk], atomic: bool = False,
+                            after_commit: Optional[AfterCommit] = None) -> Dict[str, Any]:
+    """
+    Delete rows by id a chunk at a time.
+
+    Args:
+        db: Async session
+        model: Mapped class with an id column
+        chunks: Row ids by request index, with invalid items
+        atomic: Delete everything in one transaction, or nothing if any id is missing
+        after_commit: Called with the deleted rows, e.g. to update caches
+
+    Returns:
+        succeeded, with index and id per deleted row, and failed, with index, id and error
+    """
+    table = model.__table__
+
+    async def write_chunk(run: _BulkRun, rows: List[Tuple[int, int]]) -> None:
+        result = await db.execute(delete(table).where(table.c.id.in_([row_id for _, row_id in rows]))
+                                  .returning(table.c.id))
+        deleted = set(result.scalars())
+        for index, row_id in rows:
+            if row_id in deleted:
+                deleted.discard(row_id)
+                run.wrote(index, row_id, None, {})
+            else:
+                run.fail(index, row_id, f"{model.__name__} {row_id} not found")
+
+    async def write_row(run: _BulkRun, row: Tuple[int, int]) -> None:
+        await write_chunk(run, [row])
+
+    return await _run(db, chunks, atomic, after_commit, write_chunk, write_row)
@@ -0,0 +1,184 @@
+"""
+One shared engine, and connection pool, per database URL.
+
+Every entry point gets its engines here instead of calling create_engine()
+itself, so a process holds one tuned pool per database no matter how many
+services or requests use it. Pools time how long checkouts wait, which
+stats() reports alongside the pool's current occupancy.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+
+class PoolMetrics:
+    """Checkout counters shared by a pool and the pools that replace it on dispose."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": self.wait_seconds_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "wait_ms_max": self.wait_seconds_max * 1000,
+            }
+
+
+class _TimedPoolMixin:
+    """Times every checkout, including connecting when the pool has to grow."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class EngineRegistry:
+    """Process-wide engines keyed by URL and driver flavour."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: Dict[Tuple[str, bool], Any] = {}
+        self._metrics: Dict[Tuple[str, bool], PoolMetrics] = {}
+
+    @staticmethod
+    def _options(url: str, is_async: bool) -> Dict[str, Any]:
+        """Engine options from settings; SQLite keeps its own pooling."""
+        options: Dict[str, Any] = {"query_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        if url.startswith("sqlite"):
+            return options
+        options.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        if is_async and "asyncpg" in url:
+            # Server-side prepared statements, reused per connection
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            }
+        return options
+
+    def _get(self, url: str, is_async: bool):
+        key = (url, is_async)
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                create = create_async_engine if is_async else create_engine
+                engine = create(url, **self._options(url, is_async))
+                pool = (engine.sync_engine if is_async else engine).pool
+                if isinstance(pool, _TimedPoolMixin):
+                    pool.metrics = self._metrics.setdefault(key, PoolMetrics())
+                self._engines[key] = engine
+        return engine
+
+    def engine(self, url: Optional[str] = None) -> Engine:
+        """
+        Get the shared engine for a database, creating it on first use.
+
+        Args:
+            url: Database URL (default: SQLALCHEMY_DATABASE_URI)
+
+        Returns:
+            The engine for that URL
+        """
+        return self._get(url or settings.SQLALCHEMY_DATABASE_URI, False)
+
+    def async_engine(self, url: Optional[str] = None) -> AsyncEngine:
+        """
+        Get the shared async engine for a database, creating it on first use.
+
+        Args:
+            url: Async database URL (default: ASYNC_DATABASE_URI)
+
+        Returns:
+            The async engine for that URL
+        """
+        return self._get(url or settings.ASYNC_DATABASE_URI, True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Pool occupancy and checkout wait times per engine, passwords hidden."""
+        stats = {}
+        for (url, is_async), engine in list(self._engines.items()):
+            pool = (engine.sync_engine if is_async else engine).pool
+            entry: Dict[str, Any] = {"async": is_async, "pool": type(pool).__name__}
+            if isinstance(pool, QueuePool):
+                entry.update(
+                    size=pool.size(),
+                    checked_in=pool.checkedin(),
+                    checked_out=pool.checkedout(),
+                    overflow=max(pool.overflow(), 0),
+                )
+            metrics = self._metrics.get((url, is_async))
+            if metrics is not None:
+                entry.update(metrics.snapshot())
+            stats[make_url(url).render_as_string(hide_password=True)] = entry
+        return stats
+
+    def dispose(self) -> None:
+        """Close pooled connections of the sync engines."""
+        for (_, is_async), engine in list(self._engines.items()):
+            if not is_async:
+                engine.dispose()
+
+    async def dispose_async(self) -> None:
+        """Close pooled connections of the async engines."""
+        for (_, is_async), engine in list(self._engines.items()):
+            if is_async:
+                await engine.dispose()
+
+
+# Global engine registry
+engine_registry = EngineRegistry()
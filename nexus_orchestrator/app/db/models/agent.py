@@ -1,7 +1,7 @@
 """
 Database models for agents.
 """
-from sqlalchemy import Boolean, Column, Integer, String, JSON
+from sqlalchemy import Boolean, Column, Index, Integer, String, JSON
 from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.db.session import Base
@@ -11,6 +11,14 @@ class Agent(Base):
     """Database model for agents."""
     
     __tablename__ = "agents"
+    # Filtered listings page by id within each filter value
+    __table_args__ = (
+        Index("ix_agents_provider_id", "provider", "id"),
+        Index("ix_agents_model_name_id", "model_name", "id"),
+        Index("ix_agents_role_id", "role", "id"),
+        # Skill queries use array containment and overlap
+        Index("ix_agents_skills", "skills", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -24,4 +32,8 @@ class Agent(Base):
     memory_enabled = Column(Boolean, default=True)
     verbose = Column(Boolean, default=False)
     config = Column(JSON, default={})
-    skills = Column(ARRAY(String), default=[])
+    skills = Column(ARRAY(String).with_variant(JSON(), "sqlite"), default=[])
+    # Incremented on every update; caches compare it to spot stale entries
+    version = Column(Integer, nullable=False, default=1)
+    
+    __mapper_args__ = {"version_id_col": version}
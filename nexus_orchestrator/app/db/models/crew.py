@@ -1,7 +1,7 @@
 """
 Database models for crews.
 """
-from sqlalchemy import Boolean, Column, Integer, String, JSON
+from sqlalchemy import Boolean, Column, Index, Integer, String, JSON
 from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.db.session import Base
@@ -11,6 +11,11 @@ class Crew(Base):
     """Database model for crews."""
     
     __tablename__ = "crews"
+    # Membership filters use array containment, which GIN indexes serve
+    __table_args__ = (
+        Index("ix_crews_agent_ids", "agent_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_crews_task_ids", "task_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -19,5 +24,9 @@ class Crew(Base):
     tasks_sequential = Column(Boolean, default=True)
     verbose = Column(Boolean, default=False)
     config = Column(JSON, default={})
-    agent_ids = Column(ARRAY(Integer), nullable=False)
-    task_ids = Column(ARRAY(Integer), default=[])
+    agent_ids = Column(ARRAY(Integer).with_variant(JSON(), "sqlite"), nullable=False)
+    task_ids = Column(ARRAY(Integer).with_variant(JSON(), "sqlite"), default=[])
+    # Incremented on every update; caches compare it to spot stale entries
+    version = Column(Integer, nullable=False, default=1)
+    
+    __mapper_args__ = {"version_id_col": version}
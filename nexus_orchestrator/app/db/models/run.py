@@ -0,0 +1,57 @@
+"""
+Database models for orchestration runs and their steps.
+"""
+from sqlalchemy import Column, Float, Index, Integer, String, JSON
+
+from app.db.session import Base
+
+
+class OrchestrationRun(Base):
+    """Database model for a finished orchestration run."""
+    
+    __tablename__ = "orchestration_runs"
+    # On PostgreSQL the table is partitioned by day of started_at, so the
+    # primary key includes it; retention drops whole partitions
+    __table_args__ = (
+        Index("ix_orchestration_runs_started_at", "started_at"),
+        Index("ix_orchestration_runs_task_hash", "task_hash", "started_at"),
+        Index("ix_orchestration_runs_workflow_type", "workflow_type", "started_at"),
+        Index("ix_orchestration_runs_status", "status", "started_at"),
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
+    
+    id = Column(String(32), primary_key=True)
+    started_at = Column(Float, primary_key=True)
+    finished_at = Column(Float)
+    duration_ms = Column(Float)
+    task_id = Column(String)
+    task_hash = Column(String(64))
+    workflow_type = Column(String)
+    status = Column(String)
+    prompt = Column(String)
+    agent_ids = Column(JSON, default=[])
+    thought_chain_id = Column(String, nullable=True)
+    contract_id = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    run_metadata = Column("metadata", JSON, default={})
+
+
+class RunStep(Base):
+    """Database model for one agent call within an orchestration run."""
+    
+    __tablename__ = "run_steps"
+    # Partitioned like its run, by the run's start, so both drop together
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (run_started_at)"},
+    )
+    
+    run_id = Column(String(32), primary_key=True)
+    run_started_at = Column(Float, primary_key=True)
+    step_index = Column(Integer, primary_key=True)
+    role_name = Column(String)
+    agent_id = Column(Integer)
+    started_at = Column(Float)
+    duration_ms = Column(Float)
+    output = Column(String, nullable=True)
+    error = Column(String, nullable=True)
@@ -0,0 +1,26 @@
+"""
+Database models for tasks.
+"""
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, JSON
+
+from app.db.session import Base
+
+
+class Task(Base):
+    """Database model for tasks."""
+    
+    __tablename__ = "tasks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    description = Column(String)
+    expected_output = Column(String)
+    agent_id = Column(Integer, ForeignKey("agents.id"), index=True)
+    context = Column(String, nullable=True)
+    async_execution = Column(Boolean, default=False)
+    # IDs of tasks in the same crew that must finish first
+    depends_on = Column(JSON, default=[])
+    config = Column(JSON, default={})
+    # Incremented on every update; built crews compare it to spot stale tasks
+    version = Column(Integer, nullable=False, default=1)
+    
+    __mapper_args__ = {"version_id_col": version}
@@ -1,18 +1,29 @@
 """
 Database session management.
+
+Synchronous sessions serve background threads and scripts; request
+handlers use async sessions, so queries don't block the event loop.
 """
-from sqlalchemy import create_engine
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import inspect, literal
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from app.core.config import settings
+from app.db.engine_registry import engine_registry
 
-# Create SQLAlchemy engine
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+# Shared SQLAlchemy engine
+engine = engine_registry.engine()
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions, created on first use so the async driver is only
+# imported by processes that need it
+_async_sessionmaker: Optional[async_sessionmaker] = None
+
 # Create Base class
 Base = declarative_base()
 
@@ -25,6 +36,75 @@ def get_db():
     finally:
         db.close()
 
+def get_async_engine() -> AsyncEngine:
+    """Get the shared async engine."""
+    return engine_registry.async_engine()
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Create an async database session."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        # Objects stay usable after commit without another round trip
+        _async_sessionmaker = async_sessionmaker(get_async_engine(), expire_on_commit=False, autoflush=False)
+    return _async_sessionmaker()
+
+# Async dependency
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    """Close the async engines' pooled connections."""
+    await engine_registry.dispose_async()
+
 def create_tables():
-    """Create database tables."""
+    """Create database tables, and upgrade existing ones to the models."""
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+def _add_column_ddl(bind: Engine, table: str, column) -> str:
+    preparer = bind.dialect.identifier_preparer
+    ddl = (f"ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(column.name)} "
+           f"{column.type.compile(dialect=bind.dialect)}")
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if isinstance(default, (bool, int, float, str)):
+        value = literal(default, column.type).compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+def upgrade_schema(bind: Optional[Engine] = None) -> List[str]:
+    """
+    Bring existing tables up to the models.
+    
+    create_all() only creates missing tables, so columns and indexes added
+    to a model since its table was created are added here. A new column
+    with a scalar default (such as version) is added NOT NULL with that
+    default, filling existing rows; any other new column is nullable.
+    
+    Args:
+        bind: Engine to upgrade (default: the shared engine)
+        
+    Returns:
+        The ALTER TABLE statements run
+    """
+    bind = bind or engine
+    existing = inspect(bind)
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if not existing.has_table(table.name):
+            continue
+        columns = {column["name"] for column in existing.get_columns(table.name)}
+        statements.extend(_add_column_ddl(bind, table.name, column)
+                          for column in table.columns if column.name not in columns)
+    with bind.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+    # Indexes added to existing tables, honouring their dialect conditions
+    for table in Base.metadata.sorted_tables:
+        if existing.has_table(table.name):
+            for index in table.indexes:
+                index.create(bind, checkfirst=True)
+    return statements
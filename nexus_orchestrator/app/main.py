@@ -5,15 +5,26 @@ import uvicorn
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.responses import FastJSONResponse
 from app.api.routes import api_router
 from app.core.config import settings
-from app.db.session import create_tables
+from app.db.engine_registry import engine_registry
+from app.db.session import create_tables, dispose_async_engine
+from app.orchestration.crews.crew_service import crew_job_pool
+from app.orchestration.workflows.cross_thought import cross_thought_engine
+from app.orchestration.workflows.thought_events import thought_event_broker
+from app.orchestration.workflows.thought_search import thought_search_index
+from app.services.blockchain import blockchain_service
+from app.services.entity_cache import invalidation_bus
+from app.services.run_store import run_store
+from blockchain_integration import blockchain_integration
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Multi-agent AI orchestration system",
     version="0.1.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
 )
 
 # Set up CORS middleware
@@ -33,6 +44,41 @@ async def startup_event():
     """Initialize components on startup."""
     # Create database tables
     create_tables()
+    
+    # Connect to the Web3 provider in the background
+    blockchain_service.start()
+    
+    # Tier and expire the integration's record journal in the background
+    blockchain_integration.start()
+    
+    # Start cross-worker fan-out of thought events
+    await thought_event_broker.start()
+    
+    # Receive agent/crew cache invalidations from other workers
+    invalidation_bus.start()
+    
+    # Write finished orchestration runs in the background
+    await run_store.start()
+    
+    # Load the thought search index, or rebuild it from the thought store
+    index_dir = settings.THOUGHT_SEARCH_INDEX_DIR
+    if not (index_dir and thought_search_index.load(index_dir)):
+        thought_search_index.rebuild(cross_thought_engine.list_thought_chains())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release components on shutdown."""
+    await thought_event_broker.stop()
+    invalidation_bus.stop()
+    blockchain_service.stop()
+    blockchain_integration.stop()
+    crew_job_pool.shutdown()
+    await run_store.stop()
+    await dispose_async_engine()
+    engine_registry.dispose()
+    
+    if settings.THOUGHT_SEARCH_INDEX_DIR:
+        thought_search_index.save(settings.THOUGHT_SEARCH_INDEX_DIR)
 
 @app.get("/")
 async def root():
@@ -42,5 +88,10 @@ async def root():
         "docs": "/docs",
     }
 
+@app.get("/db/pool/stats")
+async def get_pool_stats():
+    """Get connection pool occupancy and checkout wait times."""
+    return engine_registry.stats()
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,12 +1,17 @@
 """
 Service for agent operations.
 """
-from typing import List, Optional
+from typing import Any, AsyncIterable, Dict, Iterable, List, Optional, Tuple
 
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.bulk import Chunk, bulk_delete_async, bulk_insert_async, bulk_update_async, map_rows
 from app.db.models.agent import Agent
-from app.schemas.agent import AgentCreate, AgentUpdate
+from app.orchestration.agents.skill_index import normalize_skills, skill_index
+from app.schemas.agent import AgentBulkUpdate, AgentCreate, AgentUpdate
+from app.services.entity_cache import agent_cache
 
 
 def get_agent(db: Session, agent_id: int) -> Optional[Agent]:
@@ -14,14 +19,78 @@ def get_agent(db: Session, agent_id: int) -> Optional[Agent]:
     return db.query(Agent).filter(Agent.id == agent_id).first()
 
 
-def get_all_agents(db: Session, skip: int = 0, limit: int = 100) -> List[Agent]:
-    """Get all agents."""
-    return db.query(Agent).offset(skip).limit(limit).all()
+def _list_agents_query(limit: int, after_id: Optional[int], provider: Optional[str],
+                       model_name: Optional[str], role: Optional[str]):
+    query = select(Agent)
+    if after_id is not None:
+        query = query.where(Agent.id > after_id)
+    if provider is not None:
+        query = query.where(Agent.provider == provider)
+    if model_name is not None:
+        query = query.where(Agent.model_name == model_name)
+    if role is not None:
+        query = query.where(Agent.role == role)
+    return query.order_by(Agent.id).limit(limit)
 
 
-def create_agent(db: Session, agent: AgentCreate) -> Agent:
-    """Create a new agent."""
-    db_agent = Agent(
+def get_all_agents(db: Session, limit: int = 100, after_id: Optional[int] = None,
+                   provider: Optional[str] = None, model_name: Optional[str] = None,
+                   role: Optional[str] = None) -> List[Agent]:
+    """
+    Get agents in id order, after a given id and matching optional filters.
+    
+    Args:
+        db: Database session
+        limit: Maximum number of agents
+        after_id: Return only agents with a greater id (keyset pagination)
+        provider: Only agents of this provider
+        model_name: Only agents using this model
+        role: Only agents with this role
+        
+    Returns:
+        Matching agents ordered by id
+    """
+    return list(db.scalars(_list_agents_query(limit, after_id, provider, model_name, role)))
+
+
+def _has_skills(skills: List[str], match: str, dialect: str):
+    """Whether an agent has all, or any, of the skills: ARRAY on PostgreSQL, JSON elsewhere."""
+    if dialect == "postgresql":
+        # @> and && are both served by the GIN index on skills
+        return Agent.skills.contains(skills) if match == "all" else Agent.skills.overlap(skills)
+    values = func.json_each(Agent.skills).table_valued("value")
+    matched = select(func.count(func.distinct(values.c.value))).select_from(values) \
+        .where(values.c.value.in_(skills)).scalar_subquery()
+    return matched == len(skills) if match == "all" else matched > 0
+
+
+def find_agents_by_skills(db: Session, skills: List[str], match: str = "any", limit: int = 100,
+                          after_id: Optional[int] = None) -> List[Agent]:
+    """
+    Get agents with all, or any, of the given skills, in id order.
+    
+    Args:
+        db: Database session
+        skills: Skills to match, compared exactly
+        match: "all" for agents with every skill, "any" for at least one
+        limit: Maximum number of agents
+        after_id: Return only agents with a greater id (keyset pagination)
+        
+    Returns:
+        Matching agents ordered by id
+    """
+    return list(db.scalars(_skills_query(db.get_bind().dialect.name, skills, match, limit, after_id)))
+
+
+def _skills_query(dialect: str, skills: List[str], match: str, limit: int, after_id: Optional[int]):
+    query = select(Agent).where(_has_skills(normalize_skills(skills), match, dialect))
+    if after_id is not None:
+        query = query.where(Agent.id > after_id)
+    return query.order_by(Agent.id).limit(limit)
+
+
+def _new_agent(agent: AgentCreate) -> Agent:
+    return Agent(
         name=agent.name,
         description=agent.description,
         model_name=agent.model_name,
@@ -35,9 +104,16 @@ def create_agent(db: Session, agent: AgentCreate) -> Agent:
         config=agent.config,
         skills=agent.skills
     )
+
+
+def create_agent(db: Session, agent: AgentCreate) -> Agent:
+    """Create a new agent."""
+    db_agent = _new_agent(agent)
     db.add(db_agent)
     db.commit()
     db.refresh(db_agent)
+    skill_index.put(db_agent.id, db_agent.skills, db_agent.version)
+    agent_cache.invalidate(db_agent.id, db_agent.version)
     return db_agent
 
 
@@ -52,6 +128,8 @@ def update_agent(db: Session, agent_id: int, agent_update: AgentUpdate) -> Agent
     
     db.commit()
     db.refresh(db_agent)
+    skill_index.put(db_agent.id, db_agent.skills, db_agent.version)
+    agent_cache.invalidate(db_agent.id, db_agent.version)
     return db_agent
 
 
@@ -60,19 +138,167 @@ def delete_agent(db: Session, agent_id: int) -> None:
     db_agent = get_agent(db, agent_id=agent_id)
     db.delete(db_agent)
     db.commit()
+    skill_index.remove(agent_id)
+    agent_cache.invalidate(agent_id)
+
+
+# Async versions for request handlers
+
+async def get_agent_async(db: AsyncSession, agent_id: int) -> Optional[Agent]:
+    """Get an agent by ID."""
+    return await db.get(Agent, agent_id)
+
+
+async def get_all_agents_async(db: AsyncSession, limit: int = 100, after_id: Optional[int] = None,
+                               provider: Optional[str] = None, model_name: Optional[str] = None,
+                               role: Optional[str] = None) -> List[Agent]:
+    """Get agents in id order; see get_all_agents()."""
+    result = await db.execute(_list_agents_query(limit, after_id, provider, model_name, role))
+    return list(result.scalars())
+
+
+async def find_agents_by_skills_async(db: AsyncSession, skills: List[str], match: str = "any",
+                                      limit: int = 100, after_id: Optional[int] = None) -> List[Agent]:
+    """Get agents with all, or any, of the given skills; see find_agents_by_skills()."""
+    result = await db.execute(_skills_query(db.get_bind().dialect.name, skills, match, limit, after_id))
+    return list(result.scalars())
+
+
+async def create_agent_async(db: AsyncSession, agent: AgentCreate) -> Agent:
+    """Create a new agent."""
+    db_agent = _new_agent(agent)
+    db.add(db_agent)
+    await db.commit()
+    await db.refresh(db_agent)
+    skill_index.put(db_agent.id, db_agent.skills, db_agent.version)
+    agent_cache.invalidate(db_agent.id, db_agent.version)
+    return db_agent
+
+
+async def update_agent_async(db: AsyncSession, agent_id: int, agent_update: AgentUpdate) -> Optional[Agent]:
+    """Update an agent; returns None if it does not exist."""
+    db_agent = await get_agent_async(db, agent_id=agent_id)
+    if db_agent is None:
+        return None
+    
+    # Update fields
+    update_data = agent_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_agent, field, value)
+    
+    await db.commit()
+    await db.refresh(db_agent)
+    skill_index.put(db_agent.id, db_agent.skills, db_agent.version)
+    agent_cache.invalidate(db_agent.id, db_agent.version)
+    return db_agent
+
+
+async def delete_agent_async(db: AsyncSession, agent_id: int) -> bool:
+    """Delete an agent; returns whether it existed."""
+    db_agent = await get_agent_async(db, agent_id=agent_id)
+    if db_agent is None:
+        return False
+    await db.delete(db_agent)
+    await db.commit()
+    skill_index.remove(agent_id)
+    agent_cache.invalidate(agent_id)
+    return True
+
+
+# Bulk writes
+
+def _agents_written(rows: List[Tuple[int, Optional[int], Dict[str, Any]]]) -> None:
+    for agent_id, version, values in rows:
+        if "skills" in values:
+            skill_index.put(agent_id, values["skills"], version)
+        else:
+            skill_index.mark_current(agent_id, version)
+        agent_cache.invalidate(agent_id, version)
+
+
+def _agents_deleted(rows: List[Tuple[int, Optional[int], Dict[str, Any]]]) -> None:
+    for agent_id, _, _ in rows:
+        skill_index.remove(agent_id)
+        agent_cache.invalidate(agent_id)
+
+
+async def bulk_create_agents_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                   atomic: bool = False) -> Dict[str, Any]:
+    """
+    Create agents with multi-row inserts, a chunk at a time.
+    
+    Args:
+        db: Async session
+        chunks: Validated AgentCreate items by request index, with invalid items
+        atomic: All agents in one transaction, or none if any fails
+        
+    Returns:
+        The ids and versions created and the items that failed, by request index
+    """
+    rows = map_rows(chunks, lambda agent: agent.dict())
+    return await bulk_insert_async(db, Agent, rows, atomic=atomic, after_commit=_agents_written)
+
+
+async def bulk_update_agents_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                   atomic: bool = False) -> Dict[str, Any]:
+    """
+    Update agents by id, a chunk at a time, without reading them first.
+    
+    Args:
+        db: Async session
+        chunks: Validated AgentBulkUpdate items by request index, with invalid items
+        atomic: All updates in one transaction, or none if any fails
+        
+    Returns:
+        The ids and new versions updated and the items that failed, by request index
+    """
+    def convert(agent: AgentBulkUpdate):
+        return agent.id, agent.version, agent.dict(exclude_unset=True, exclude={"id", "version"})
+    
+    return await bulk_update_async(db, Agent, map_rows(chunks, convert), atomic=atomic,
+                                   after_commit=_agents_written)
+
+
+async def bulk_delete_agents_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                   atomic: bool = False) -> Dict[str, Any]:
+    """
+    Delete agents by id, a chunk at a time.
+    
+    Args:
+        db: Async session
+        chunks: Agent ids by request index, with invalid items
+        atomic: All deletes in one transaction, or none if any id is missing
+        
+    Returns:
+        The ids deleted and the items that failed, by request index
+    """
+    return await bulk_delete_async(db, Agent, chunks, atomic=atomic, after_commit=_agents_deleted)
+
+
+def get_agents_by_ids(db: Session, agent_ids: Iterable[int]) -> Dict[int, Agent]:
+    """Get agents by ID with a single query, keyed by ID; missing IDs are left out."""
+    ids = set(agent_ids)
+    if not ids:
+        return {}
+    return {agent.id: agent for agent in db.scalars(select(Agent).where(Agent.id.in_(ids)))}
 
 
 def create_agent_instance(db: Session, agent_id: int):
     """Create a CrewAI agent instance from database model."""
-    from crewai import Agent
-    
     db_agent = get_agent(db, agent_id=agent_id)
     
     if not db_agent:
         raise ValueError(f"Agent with ID {agent_id} not found")
     
+    return build_agent_instance(db_agent)
+
+
+def build_agent_instance(db_agent: Agent):
+    """Create a CrewAI agent instance from a loaded agent row."""
+    from crewai import Agent as CrewAIAgent
+    
     # Create CrewAI agent
-    agent = Agent(
+    agent = CrewAIAgent(
         role=db_agent.role,
         goal=db_agent.goal,
         backstory=db_agent.backstory or "",
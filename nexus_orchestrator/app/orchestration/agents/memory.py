@@ -0,0 +1,383 @@
+"""
+Long-term memory for agents with memory enabled.
+
+Each agent accumulates distilled facts and summaries of its past outputs.
+Items are embedded into a per-agent vector index, ranked by similarity
+weighted by importance and recency, and evicted once an agent exceeds its
+capacity. Eviction trims an agent to 90% of its capacity, so its file is only
+rewritten once in a while rather than on every new memory. Recalls append
+the items' access times to the same file, so recency survives a restart.
+Recall sits on the critical path of every agent call, so it runs
+off the event loop with a hard latency cap.
+"""
+import asyncio
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.orchestration.workflows.thought_retrieval import HashingEmbedder, MatrixIndex, QdrantIndex
+
+# Lines that look like conclusions worth remembering
+_FACT_LINE_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.{12,300})$")
+_FACT_SENTENCE_RE = re.compile(
+    r"[^.!?\n]{0,300}\b(?:should|must|recommend|decided|will use|prefer)\b[^.!?\n]*[.!?]",
+    re.IGNORECASE,
+)
+
+
+class MemoryItem(BaseModel):
+    """Something an agent remembers."""
+    id: str
+    agent_id: int
+    kind: str  # "fact" or "output"
+    content: str
+    importance: float = 0.5  # 0.0 to 1.0
+    created_at: float
+    last_accessed_at: float
+    access_count: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of model tokens in a text."""
+    return len(text) // 4 + 1
+
+
+def distill_facts(text: str, max_facts: int = 5) -> List[str]:
+    """
+    Pull short, self-contained statements out of an agent response.
+
+    Args:
+        text: The response text
+        max_facts: Maximum number of facts to return
+
+    Returns:
+        List of facts in order of appearance
+    """
+    facts: List[str] = []
+    for line in text.splitlines():
+        match = _FACT_LINE_RE.match(line)
+        if match:
+            facts.append(match.group(1).strip())
+    facts.extend(match.group(0).strip() for match in _FACT_SENTENCE_RE.finditer(text))
+
+    unique = list(dict.fromkeys(facts))
+    return unique[:max_facts]
+
+
+class AgentMemoryStore:
+    """
+    Per-agent memory persisted as one JSON-lines file per agent.
+
+    Each line is either a memory item or a {"touch": {id: [last_accessed_at,
+    access_count]}} record of a recall. The file is compacted to one line per
+    item when it grows past twice the capacity, or when items are evicted.
+    Agents are loaded lazily on first use. All methods are thread-safe.
+    """
+
+    def __init__(self, storage_dir: str, capacity: int = 500, half_life_hours: float = 72.0,
+                 qdrant_url: Optional[str] = None):
+        """
+        Initialize the memory store.
+
+        Args:
+            storage_dir: Directory holding the memory files
+            capacity: Maximum number of items kept per agent
+            half_life_hours: Age at which an item's recency weight halves
+            qdrant_url: If set, index memories in Qdrant at this URL
+        """
+        self.storage_dir = storage_dir
+        self.capacity = capacity
+        self.half_life = half_life_hours * 3600
+        self.embedder = HashingEmbedder(dim=settings.THOUGHT_EMBEDDING_DIM)
+        self._lock = threading.RLock()
+        self._items: Dict[int, Dict[str, MemoryItem]] = {}
+        self._local_indexes: Dict[int, MatrixIndex] = {}
+        # Lines in each agent's file, to know when to compact it
+        self._file_lines: Dict[int, int] = {}
+        self._qdrant: Optional[QdrantIndex] = None
+        if qdrant_url:
+            try:
+                self._qdrant = QdrantIndex(
+                    qdrant_url, self.embedder.dim, collection="agent_memory", group_field="agent_id"
+                )
+            except Exception as e:
+                print(f"Failed to connect to Qdrant: {e}")
+                print("Falling back to local memory index")
+
+        # Recall latency samples in milliseconds, and recalls that hit the cap
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._timeouts = 0
+
+    def _path(self, agent_id: int) -> str:
+        return os.path.join(self.storage_dir, f"agent_{agent_id}.jsonl")
+
+    def _load(self, agent_id: int) -> Dict[str, MemoryItem]:
+        """Load an agent's memories from disk if not already loaded."""
+        if agent_id in self._items:
+            return self._items[agent_id]
+
+        items: Dict[str, MemoryItem] = {}
+        lines = 0
+        path = self._path(agent_id)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    lines += 1
+                    record = json.loads(line)
+                    if "touch" in record:
+                        for item_id, (accessed_at, access_count) in record["touch"].items():
+                            if item_id in items:
+                                items[item_id].last_accessed_at = accessed_at
+                                items[item_id].access_count = access_count
+                        continue
+                    item = MemoryItem(**record)
+                    items[item.id] = item
+
+        index = MatrixIndex(self.embedder.dim)
+        for item in items.values():
+            index.add((str(agent_id), item.id), self.embedder.embed(item.content))
+        self._items[agent_id] = items
+        self._local_indexes[agent_id] = index
+        self._file_lines[agent_id] = lines
+        return items
+
+    def _append(self, agent_id: int, lines: List[str]) -> None:
+        """Append lines to an agent's file, compacting it once it has grown too long."""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        with open(self._path(agent_id), "a") as f:
+            f.write("".join(line + "\n" for line in lines))
+        self._file_lines[agent_id] = self._file_lines.get(agent_id, 0) + len(lines)
+        if self._file_lines[agent_id] > 2 * self.capacity:
+            self._compact(agent_id)
+
+    def _compact(self, agent_id: int) -> None:
+        """Rewrite an agent's file with one line per item."""
+        items = self._items[agent_id]
+        path = self._path(agent_id)
+        with open(path + ".tmp", "w") as f:
+            for item in items.values():
+                f.write(item.json() + "\n")
+        os.replace(path + ".tmp", path)
+        self._file_lines[agent_id] = len(items)
+
+    def _recency(self, timestamp: float, now: float) -> float:
+        """Weight that halves every half-life since the timestamp."""
+        return 0.5 ** (max(now - timestamp, 0.0) / self.half_life)
+
+    def remember(self, agent_id: int, content: str, kind: str = "fact", importance: float = 0.5) -> MemoryItem:
+        """
+        Store a memory for an agent.
+
+        Args:
+            agent_id: The ID of the agent
+            content: What to remember
+            kind: "fact" or "output"
+            importance: How important the memory is, from 0.0 to 1.0
+
+        Returns:
+            The stored memory item
+        """
+        return self._remember_many(agent_id, [(content, kind, importance)])[0]
+
+    def _remember_many(self, agent_id: int, entries: List[Tuple[str, str, float]]) -> List[MemoryItem]:
+        """Store (content, kind, importance) entries with one append to the agent's file."""
+        now = time.time()
+        new_items = [
+            MemoryItem(
+                id=str(uuid.uuid4()),
+                agent_id=agent_id,
+                kind=kind,
+                content=content,
+                importance=min(max(importance, 0.0), 1.0),
+                created_at=now,
+                last_accessed_at=now,
+            )
+            for content, kind, importance in entries
+        ]
+        vectors = [self.embedder.embed(item.content) for item in new_items]
+
+        with self._lock:
+            items = self._load(agent_id)
+            for item, vector in zip(new_items, vectors):
+                key = (str(agent_id), item.id)
+                items[item.id] = item
+                self._local_indexes[agent_id].add(key, vector)
+                if self._qdrant is not None:
+                    self._qdrant.add(key, vector)
+
+            if len(items) > self.capacity:
+                # The eviction rewrites the file, new items included
+                self._evict(agent_id, now)
+            else:
+                self._append(agent_id, [item.json() for item in new_items])
+
+        return new_items
+
+    def record_interaction(self, agent_id: int, response: str) -> None:
+        """
+        Remember the distilled facts and a summary of an agent response.
+
+        Args:
+            agent_id: The ID of the agent
+            response: The agent's response
+        """
+        entries = [(fact, "fact", 0.7) for fact in distill_facts(response)]
+        summary = response.strip()[:settings.AGENT_MEMORY_OUTPUT_CHARS]
+        if summary:
+            entries.append((summary, "output", 0.3))
+        if entries:
+            self._remember_many(agent_id, entries)
+
+    def _evict(self, agent_id: int, now: float) -> None:
+        """Drop the least valuable memories down to 90% of capacity and rewrite the agent's file."""
+        items = self._items[agent_id]
+        ranked = sorted(
+            items.values(),
+            key=lambda item: item.importance * self._recency(item.last_accessed_at, now),
+        )
+        doomed = ranked[:len(items) - max(int(self.capacity * 0.9), 1)]
+        keys = [(str(agent_id), item.id) for item in doomed]
+        for item in doomed:
+            del items[item.id]
+        self._local_indexes[agent_id].remove(keys)
+        if self._qdrant is not None:
+            self._qdrant.remove(keys)
+        self._compact(agent_id)
+
+    def recall(self, agent_id: int, query: str, k: int = 8) -> List[Tuple[MemoryItem, float]]:
+        """
+        Find an agent's memories most relevant to a query.
+
+        Args:
+            agent_id: The ID of the agent
+            query: The query text
+            k: Maximum number of memories to return
+
+        Returns:
+            List of (memory item, score), best first
+        """
+        query_vector = self.embedder.embed(query)
+        now = time.time()
+        with self._lock:
+            items = self._load(agent_id)
+            if not items:
+                return []
+
+            # Over-fetch by similarity, then re-rank with importance and recency
+            if self._qdrant is not None:
+                candidates = self._qdrant.search(query_vector, k * 4, group=str(agent_id))
+            else:
+                candidates = self._local_indexes[agent_id].search(query_vector, k * 4)
+
+            scored = []
+            for (_, item_id), similarity in candidates:
+                item = items.get(item_id)
+                if item is None or similarity <= 0:
+                    continue
+                weight = (0.5 + 0.5 * item.importance) * self._recency(item.created_at, now)
+                scored.append((item, similarity * weight))
+
+            scored.sort(key=lambda pair: pair[1], reverse=True)
+            scored = scored[:k]
+            for item, _ in scored:
+                item.last_accessed_at = now
+                item.access_count += 1
+            if scored:
+                touch = {item.id: [item.last_accessed_at, item.access_count] for item, _ in scored}
+                self._append(agent_id, [json.dumps({"touch": touch})])
+            return scored
+
+    def build_memory_block(self, agent_id: int, query: str, token_budget: int, k: int = 8) -> str:
+        """
+        Format an agent's most relevant memories within a token budget.
+
+        Args:
+            agent_id: The ID of the agent
+            query: The query text
+            token_budget: Maximum estimated tokens for the block
+            k: Maximum number of memories to consider
+
+        Returns:
+            The memory block, or an empty string if nothing fits
+        """
+        header = "Relevant memories from your previous work:"
+        used = estimate_tokens(header)
+        lines = []
+        for item, _ in self.recall(agent_id, query, k):
+            line = "- " + " ".join(item.content.split())
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                continue
+            lines.append(line)
+            used += cost
+
+        if not lines:
+            return ""
+        return "\n".join([header] + lines)
+
+    async def recall_block(self, agent_id: int, query: str) -> str:
+        """
+        Build a memory block off the event loop, giving up at the latency cap.
+
+        Args:
+            agent_id: The ID of the agent
+            query: The query text
+
+        Returns:
+            The memory block, or an empty string on timeout or failure
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.build_memory_block, agent_id, query,
+                    settings.AGENT_MEMORY_TOKEN_BUDGET, settings.AGENT_MEMORY_TOP_K,
+                ),
+                timeout=settings.AGENT_MEMORY_RECALL_TIMEOUT_MS / 1000,
+            )
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            return ""
+        except Exception as e:
+            print(f"Failed to recall memories for agent {agent_id}: {e}")
+            return ""
+        finally:
+            self._latencies.append((time.perf_counter() - start) * 1000)
+
+    def latency_stats(self) -> Dict[str, float]:
+        """
+        Summarize recent recall latency.
+
+        Returns:
+            Sample count, p50/p95/max latency in milliseconds and timeout count
+        """
+        samples = sorted(self._latencies)
+        if not samples:
+            return {"samples": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "timeouts": self._timeouts}
+        return {
+            "samples": len(samples),
+            "p50_ms": statistics.median(samples),
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "max_ms": samples[-1],
+            "timeouts": self._timeouts,
+        }
+
+
+# Create singleton instance
+agent_memory_store = AgentMemoryStore(
+    storage_dir=settings.AGENT_MEMORY_DIR or os.path.join(os.getcwd(), "agent_memory"),
+    capacity=settings.AGENT_MEMORY_CAPACITY,
+    half_life_hours=settings.AGENT_MEMORY_HALF_LIFE_HOURS,
+    qdrant_url=settings.QDRANT_URL if settings.AGENT_MEMORY_BACKEND == "qdrant" else None,
+)
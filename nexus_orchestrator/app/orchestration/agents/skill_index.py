@@ -0,0 +1,232 @@
+"""
+In-process inverted index from skills to agent ids.
+
+The orchestrator resolves roles to agents by the skills they need on every
+orchestration, so lookups are set intersections in memory rather than
+database queries. The index loads all agents' skills once, on first use,
+and agent_service keeps it current on every create, update and delete.
+Writes in other workers arrive as agent cache invalidations; the index
+re-reads an agent whose version is newer than the one it holds.
+"""
+import threading
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.db.models.agent import Agent
+from app.db.session import SessionLocal
+from app.services.entity_cache import LocalInvalidationBus, invalidation_bus
+
+
+def normalize_skills(skills: Optional[Iterable[str]]) -> List[str]:
+    """Trimmed, de-duplicated skills, in first-seen order."""
+    seen: Dict[str, None] = {}
+    for skill in skills or ():
+        skill = skill.strip()
+        if skill:
+            seen[skill] = None
+    return list(seen)
+
+
+class SkillIndex:
+    """Skill -> agent-id sets, loaded lazily and updated in place."""
+
+    def __init__(self, bus: Optional[LocalInvalidationBus] = None):
+        """
+        Initialize the index.
+
+        Args:
+            bus: Invalidation bus carrying agent writes from other workers
+        """
+        self._lock = threading.Lock()
+        self._by_skill: Dict[str, Set[int]] = {}
+        self._skills_of: Dict[int, List[str]] = {}
+        # Version of each agent the index reflects
+        self._versions: Dict[int, int] = {}
+        self._loaded = False
+        self._loading = False
+        # Changes committed while a load is reading the table, replayed after it
+        self._pending: Dict[int, Tuple[Optional[List[str]], Optional[int]]] = {}
+        # Resolutions since the last change; roles repeat across orchestrations
+        self._resolved: Dict[FrozenSet[str], Optional[int]] = {}
+        if bus is not None:
+            bus.subscribe(self._on_message)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db=None) -> None:
+        """
+        Build the index from the agents table, replacing what it held.
+
+        Args:
+            db: Sync session to read with (default: a new SessionLocal)
+        """
+        with self._lock:
+            self._loading = True
+            self._pending.clear()
+        by_skill: Dict[str, Set[int]] = {}
+        skills_of: Dict[int, List[str]] = {}
+        versions: Dict[int, int] = {}
+        session = db or SessionLocal()
+        try:
+            for agent_id, skills, version in session.execute(select(Agent.id, Agent.skills, Agent.version)):
+                skills_of[agent_id] = normalize_skills(skills)
+                versions[agent_id] = version
+                for skill in skills_of[agent_id]:
+                    by_skill.setdefault(skill, set()).add(agent_id)
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        finally:
+            if db is None:
+                session.close()
+        with self._lock:
+            self._by_skill, self._skills_of, self._versions = by_skill, skills_of, versions
+            self._resolved.clear()
+            self._loading = False
+            self._loaded = True
+            for agent_id, (skills, version) in self._pending.items():
+                self._apply(agent_id, skills, version)
+            self._pending.clear()
+
+    def ensure_loaded(self) -> None:
+        """Load the index if it has not been loaded yet."""
+        if not self._loaded:
+            self.load()
+
+    def invalidate(self) -> None:
+        """Drop the index; the next lookup reloads it."""
+        with self._lock:
+            self._by_skill, self._skills_of, self._versions = {}, {}, {}
+            self._resolved.clear()
+            self._loaded = False
+
+    def _apply(self, agent_id: int, skills: Optional[List[str]], version: Optional[int]) -> None:
+        if skills is None:
+            self._versions.pop(agent_id, None)
+        elif version is not None:
+            self._versions[agent_id] = max(version, self._versions.get(agent_id, 0))
+        self._resolved.clear()
+        for skill in self._skills_of.pop(agent_id, ()):
+            ids = self._by_skill.get(skill)
+            if ids is not None:
+                ids.discard(agent_id)
+                if not ids:
+                    del self._by_skill[skill]
+        if skills is not None:
+            self._skills_of[agent_id] = skills
+            for skill in skills:
+                self._by_skill.setdefault(skill, set()).add(agent_id)
+
+    def put(self, agent_id: int, skills: Optional[Iterable[str]], version: Optional[int] = None) -> None:
+        """Record an agent's current skills, at a version, after it is created or updated."""
+        self._change(agent_id, normalize_skills(skills), version)
+
+    def remove(self, agent_id: int) -> None:
+        """Forget an agent after it is deleted."""
+        self._change(agent_id, None, None)
+
+    def mark_current(self, agent_id: int, version: int) -> None:
+        """Record that an update leaving an agent's skills alone brought it to a version."""
+        with self._lock:
+            if agent_id in self._versions:
+                self._versions[agent_id] = max(version, self._versions[agent_id])
+
+    def _change(self, agent_id: int, skills: Optional[List[str]], version: Optional[int]) -> None:
+        with self._lock:
+            if self._loading:
+                self._pending[agent_id] = (skills, version)
+            if self._loaded:
+                self._apply(agent_id, skills, version)
+
+    def refresh(self, agent_id: int) -> None:
+        """
+        Re-read one agent's skills, e.g. after another worker changed it.
+
+        Args:
+            agent_id: The ID of the agent
+        """
+        with SessionLocal() as db:
+            row = db.execute(select(Agent.skills, Agent.version).where(Agent.id == agent_id)).first()
+        if row is None:
+            self.remove(agent_id)
+        else:
+            self.put(agent_id, row.skills, row.version)
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        """Apply an agent invalidation: drop deleted agents, re-read ones at a newer version."""
+        if message.get("cache") != "agent" or not self._loaded:
+            return
+        agent_id, version = message.get("key"), message.get("version")
+        if version is None:
+            self.remove(agent_id)
+            return
+        with self._lock:
+            if self._versions.get(agent_id, 0) >= version:
+                # This worker made the change, or has already seen it
+                return
+        try:
+            self.refresh(agent_id)
+        except Exception as e:
+            print(f"Failed to refresh skills of agent {agent_id}: {e}")
+            # Reload everything on the next lookup rather than serve stale skills
+            self.invalidate()
+
+    def agents_with(self, skills: Iterable[str], match: str = "all") -> Set[int]:
+        """
+        Ids of agents having all, or any, of the given skills.
+
+        Args:
+            skills: Skills to look up
+            match: "all" or "any"
+
+        Returns:
+            Matching agent ids
+        """
+        wanted = normalize_skills(skills)
+        if not wanted:
+            return set()
+        with self._lock:
+            sets = [self._by_skill.get(skill, set()) for skill in wanted]
+            if match == "any":
+                return set().union(*sets)
+            sets.sort(key=len)
+            return sets[0].intersection(*sets[1:])
+
+    def resolve(self, skills: Iterable[str]) -> Optional[int]:
+        """
+        Pick the agent best suited to a role needing the given skills.
+
+        Agents with every skill win; otherwise the one with the most of
+        them. Ties go to the lowest id, so resolution is stable.
+
+        Args:
+            skills: Skills the role needs
+
+        Returns:
+            Agent id, or None if no agent has any of the skills
+        """
+        wanted = frozenset(normalize_skills(skills))
+        if not wanted:
+            return None
+        with self._lock:
+            if wanted in self._resolved:
+                return self._resolved[wanted]
+            sets = sorted((self._by_skill.get(skill, set()) for skill in wanted), key=len)
+            matching = sets[0].intersection(*sets[1:])
+            if matching:
+                agent_id = min(matching)
+            else:
+                counts = Counter(chain.from_iterable(sets))
+                agent_id = min(counts, key=lambda i: (-counts[i], i)) if counts else None
+            self._resolved[wanted] = agent_id
+            return agent_id
+
+
+# Global skill index
+skill_index = SkillIndex(invalidation_bus)
@@ -1,16 +1,42 @@
 """
 Service for crew operations.
 """
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, AsyncIterable, Tuple
 
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from crewai import Crew as CrewAIInstance
+from crewai import Process
 from crewai import Task as CrewAITask
 
+from app.db.bulk import Chunk, bulk_delete_async, bulk_insert_async, bulk_update_async, map_rows
 from app.db.models.crew import Crew
-from app.schemas.crew import CrewCreate, CrewUpdate
-from app.orchestration.agents.agent_service import create_agent_instance
-from app.orchestration.tasks.task_service import get_task, create_task_instance
+from app.db.session import SessionLocal
+from app.schemas.crew import CrewBulkUpdate, CrewCreate, CrewInDB, CrewUpdate
+from app.core.config import settings
+from app.services.entity_cache import crew_cache
+from app.orchestration.agents.agent_service import build_agent_instance, get_agents_by_ids
+from app.orchestration.crews.instance_pool import CrewInstancePool
+from app.orchestration.crews.job_pool import CrewJob, CrewJobPool
+from app.orchestration.crews.scheduler import plan_crew_tasks, run_crew_tasks
+from app.orchestration.tasks.task_service import build_task_instance, get_tasks_by_ids
+
+# Built CrewAI crews, reused across runs while their rows are unchanged
+crew_instance_pool = CrewInstancePool(
+    max_crews=settings.CREW_INSTANCE_POOL_MAX_CREWS,
+    max_idle_per_crew=settings.CREW_INSTANCE_POOL_IDLE_PER_CREW,
+)
+
+# Workers that crew runs are dispatched to
+crew_job_pool = CrewJobPool(
+    executor=settings.CREW_JOB_EXECUTOR,
+    max_workers=settings.CREW_JOB_MAX_WORKERS,
+    max_queue_depth=settings.CREW_JOB_MAX_QUEUE_DEPTH,
+    retention_seconds=settings.CREW_JOB_RETENTION_SECONDS,
+    max_retained=settings.CREW_JOB_MAX_RETAINED,
+)
 
 
 def get_crew(db: Session, crew_id: int) -> Optional[Crew]:
@@ -18,14 +44,47 @@ def get_crew(db: Session, crew_id: int) -> Optional[Crew]:
     return db.query(Crew).filter(Crew.id == crew_id).first()
 
 
-def get_all_crews(db: Session, skip: int = 0, limit: int = 100) -> List[Crew]:
-    """Get all crews."""
-    return db.query(Crew).offset(skip).limit(limit).all()
+def _has_member(column, member_id: int, dialect: str):
+    """Whether an id-list column contains an id: ARRAY on PostgreSQL, JSON elsewhere."""
+    if dialect == "postgresql":
+        return column.contains([member_id])
+    members = func.json_each(column).table_valued("value")
+    return exists(select(1).select_from(members).where(members.c.value == member_id))
 
 
-def create_crew(db: Session, crew: CrewCreate) -> Crew:
-    """Create a new crew."""
-    db_crew = Crew(
+def _list_crews_query(dialect: str, limit: int, after_id: Optional[int],
+                      agent_id: Optional[int], task_id: Optional[int]):
+    query = select(Crew)
+    if after_id is not None:
+        query = query.where(Crew.id > after_id)
+    if agent_id is not None:
+        query = query.where(_has_member(Crew.agent_ids, agent_id, dialect))
+    if task_id is not None:
+        query = query.where(_has_member(Crew.task_ids, task_id, dialect))
+    return query.order_by(Crew.id).limit(limit)
+
+
+def get_all_crews(db: Session, limit: int = 100, after_id: Optional[int] = None,
+                  agent_id: Optional[int] = None, task_id: Optional[int] = None) -> List[Crew]:
+    """
+    Get crews in id order, after a given id and matching optional filters.
+    
+    Args:
+        db: Database session
+        limit: Maximum number of crews
+        after_id: Return only crews with a greater id (keyset pagination)
+        agent_id: Only crews with this agent as a member
+        task_id: Only crews assigned this task
+        
+    Returns:
+        Matching crews ordered by id
+    """
+    dialect = db.get_bind().dialect.name
+    return list(db.scalars(_list_crews_query(dialect, limit, after_id, agent_id, task_id)))
+
+
+def _new_crew(crew: CrewCreate) -> Crew:
+    return Crew(
         name=crew.name,
         description=crew.description,
         goal=crew.goal,
@@ -35,9 +94,15 @@ def create_crew(db: Session, crew: CrewCreate) -> Crew:
         agent_ids=crew.agent_ids,
         task_ids=crew.task_ids
     )
+
+
+def create_crew(db: Session, crew: CrewCreate) -> Crew:
+    """Create a new crew."""
+    db_crew = _new_crew(crew)
     db.add(db_crew)
     db.commit()
     db.refresh(db_crew)
+    crew_cache.invalidate(db_crew.id, db_crew.version)
     return db_crew
 
 
@@ -52,6 +117,7 @@ def update_crew(db: Session, crew_id: int, crew_update: CrewUpdate) -> Crew:
     
     db.commit()
     db.refresh(db_crew)
+    crew_cache.invalidate(db_crew.id, db_crew.version)
     return db_crew
 
 
@@ -60,50 +126,284 @@ def delete_crew(db: Session, crew_id: int) -> None:
     db_crew = get_crew(db, crew_id=crew_id)
     db.delete(db_crew)
     db.commit()
+    crew_cache.invalidate(crew_id)
+    crew_instance_pool.discard(crew_id)
 
 
-def create_crew_instance(db: Session, crew_id: int):
-    """Create a CrewAI crew instance from database model."""
-    db_crew = get_crew(db, crew_id=crew_id)
+# Async versions for request handlers
+
+async def get_crew_async(db: AsyncSession, crew_id: int) -> Optional[Crew]:
+    """Get a crew by ID."""
+    return await db.get(Crew, crew_id)
+
+
+async def get_cached_crew_async(crew_id: int) -> Optional[CrewInDB]:
+    """Get a crew by ID through the crew cache, as a read-only snapshot."""
+    return await crew_cache.get_async(crew_id)
+
+
+async def get_all_crews_async(db: AsyncSession, limit: int = 100, after_id: Optional[int] = None,
+                              agent_id: Optional[int] = None, task_id: Optional[int] = None) -> List[Crew]:
+    """Get crews in id order; see get_all_crews()."""
+    dialect = db.get_bind().dialect.name
+    result = await db.execute(_list_crews_query(dialect, limit, after_id, agent_id, task_id))
+    return list(result.scalars())
+
+
+async def create_crew_async(db: AsyncSession, crew: CrewCreate) -> Crew:
+    """Create a new crew."""
+    db_crew = _new_crew(crew)
+    db.add(db_crew)
+    await db.commit()
+    await db.refresh(db_crew)
+    crew_cache.invalidate(db_crew.id, db_crew.version)
+    return db_crew
+
+
+async def update_crew_async(db: AsyncSession, crew_id: int, crew_update: CrewUpdate) -> Optional[Crew]:
+    """Update a crew; returns None if it does not exist."""
+    db_crew = await get_crew_async(db, crew_id=crew_id)
+    if db_crew is None:
+        return None
+    
+    # Update fields
+    update_data = crew_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_crew, field, value)
+    
+    await db.commit()
+    await db.refresh(db_crew)
+    crew_cache.invalidate(db_crew.id, db_crew.version)
+    return db_crew
+
+
+async def delete_crew_async(db: AsyncSession, crew_id: int) -> bool:
+    """Delete a crew; returns whether it existed."""
+    db_crew = await get_crew_async(db, crew_id=crew_id)
+    if db_crew is None:
+        return False
+    await db.delete(db_crew)
+    await db.commit()
+    crew_cache.invalidate(crew_id)
+    crew_instance_pool.discard(crew_id)
+    return True
+
+
+# Bulk writes
+
+def _crews_written(rows: List[Tuple[int, Optional[int], Dict[str, Any]]]) -> None:
+    for crew_id, version, _ in rows:
+        crew_cache.invalidate(crew_id, version)
+
+
+def _crews_deleted(rows: List[Tuple[int, Optional[int], Dict[str, Any]]]) -> None:
+    for crew_id, _, _ in rows:
+        crew_cache.invalidate(crew_id)
+        crew_instance_pool.discard(crew_id)
+
+
+async def bulk_create_crews_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                  atomic: bool = False) -> Dict[str, Any]:
+    """
+    Create crews with multi-row inserts, a chunk at a time.
+    
+    Args:
+        db: Async session
+        chunks: Validated CrewCreate items by request index, with invalid items
+        atomic: All crews in one transaction, or none if any fails
+        
+    Returns:
+        The ids and versions created and the items that failed, by request index
+    """
+    rows = map_rows(chunks, lambda crew: crew.dict())
+    return await bulk_insert_async(db, Crew, rows, atomic=atomic, after_commit=_crews_written)
+
+
+async def bulk_update_crews_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                  atomic: bool = False) -> Dict[str, Any]:
+    """
+    Update crews by id, a chunk at a time, without reading them first.
+    
+    Args:
+        db: Async session
+        chunks: Validated CrewBulkUpdate items by request index, with invalid items
+        atomic: All updates in one transaction, or none if any fails
+        
+    Returns:
+        The ids and new versions updated and the items that failed, by request index
+    """
+    def convert(crew: CrewBulkUpdate):
+        return crew.id, crew.version, crew.dict(exclude_unset=True, exclude={"id", "version"})
+    
+    return await bulk_update_async(db, Crew, map_rows(chunks, convert), atomic=atomic,
+                                   after_commit=_crews_written)
+
+
+async def bulk_delete_crews_async(db: AsyncSession, chunks: AsyncIterable[Chunk],
+                                  atomic: bool = False) -> Dict[str, Any]:
+    """
+    Delete crews by id, a chunk at a time.
+    
+    Args:
+        db: Async session
+        chunks: Crew ids by request index, with invalid items
+        atomic: All deletes in one transaction, or none if any id is missing
+        
+    Returns:
+        The ids deleted and the items that failed, by request index
+    """
+    return await bulk_delete_async(db, Crew, chunks, atomic=atomic, after_commit=_crews_deleted)
+
+
+def _load_crew_rows(db: Session, crew_id: int) -> Tuple[CrewInDB, Dict[int, Any], Dict[int, Any]]:
+    """
+    Load a crew with its agents and tasks: one query each, however large the crew.
+    
+    The crew itself comes from the crew cache; its version still keys the
+    instance pool, so a cached snapshot never reuses a crew built from older rows.
+    
+    Returns:
+        The crew snapshot and its agents and tasks by ID; agents include those assigned tasks
+    """
+    db_crew = crew_cache.get(crew_id)
     
     if not db_crew:
         raise ValueError(f"Crew with ID {crew_id} not found")
     
-    # Create agent instances
-    agents = [create_agent_instance(db, agent_id) for agent_id in db_crew.agent_ids]
+    tasks = get_tasks_by_ids(db, db_crew.task_ids or [])
+    for task_id in db_crew.task_ids or []:
+        if task_id not in tasks:
+            raise ValueError(f"Task with ID {task_id} not found")
+    
+    agents = get_agents_by_ids(db, [*db_crew.agent_ids, *(task.agent_id for task in tasks.values())])
+    for agent_id in [*db_crew.agent_ids, *(task.agent_id for task in tasks.values())]:
+        if agent_id not in agents:
+            raise ValueError(f"Agent with ID {agent_id} not found")
     
-    # Create task instances if there are any
-    tasks = []
-    if db_crew.task_ids:
-        tasks = [create_task_instance(db, task_id) for task_id in db_crew.task_ids]
+    return db_crew, agents, tasks
+
+
+def _build_key(db_crew: CrewInDB, agents: Dict[int, Any], tasks: Dict[int, Any]) -> Tuple:
+    """The row versions a built crew depends on."""
+    return (
+        db_crew.version,
+        tuple(sorted((agent.id, agent.version) for agent in agents.values())),
+        tuple(sorted((task.id, task.version) for task in tasks.values())),
+    )
+
+
+def _build_crew_instance(db_crew: CrewInDB, agents: Dict[int, Any], tasks: Dict[int, Any]):
+    """Create a CrewAI crew from loaded rows, with one CrewAI agent per agent row."""
+    agent_instances = {agent_id: build_agent_instance(agent) for agent_id, agent in agents.items()}
     
     # Create CrewAI crew
     crew = CrewAIInstance(
-        agents=agents,
-        tasks=tasks,
+        agents=[agent_instances[agent_id] for agent_id in db_crew.agent_ids],
+        tasks=[
+            build_task_instance(tasks[task_id], agent_instances[tasks[task_id].agent_id])
+            for task_id in db_crew.task_ids or []
+        ],
         verbose=db_crew.verbose,
-        process=db_crew.tasks_sequential
+        # Task order and concurrency come from the crew scheduler, which runs the tasks one by one
+        process=Process.sequential
     )
     
     return crew
 
 
-def execute_crew_task(db: Session, crew_id: int, task_data: Dict[str, Any]):
-    """Execute a task with the crew."""
-    # Create crew instance
-    crew_instance = create_crew_instance(db, crew_id)
-    
-    # If we have a specific task to run that's not in the crew's task list
-    if "task_description" in task_data:
-        # Create a one-off task
-        task = CrewAITask(
-            description=task_data["task_description"],
-            expected_output=task_data.get("expected_output", "Detailed analysis and results"),
-            agent=crew_instance.agents[0]  # Assign to first agent as default
-        )
-        result = crew_instance.execute_task(task)
-    else:
-        # Run the crew with its predefined tasks
-        result = crew_instance.kickoff()
-    
-    return result
+def create_crew_instance(db: Session, crew_id: int):
+    """Create a CrewAI crew instance from database model."""
+    return _build_crew_instance(*_load_crew_rows(db, crew_id))
+
+
+def _task_context(outputs: List[Any]) -> Optional[str]:
+    """Dependency outputs joined into a task's context."""
+    return "\n\n".join(str(output) for output in outputs) or None
+
+
+def execute_crew_task(db: Session, crew_id: int, task_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute a task with the crew.
+    
+    The crew's own tasks are run by the crew scheduler: independent ones
+    concurrently, up to the crew's max_concurrency config (default
+    CREW_TASK_MAX_CONCURRENCY), and dependent ones after what they need.
+    
+    Args:
+        db: Database session
+        crew_id: Crew ID
+        task_data: Either task_description (and expected_output) for a one-off
+            task, or nothing to run the crew's tasks
+    
+    Returns:
+        result, the output of the last task; tasks, a record with the status,
+        timings and output of each task; and duration_ms for the whole run
+    
+    Raises:
+        CrewRunError: If a task fails
+    """
+    db_crew, agents, tasks = _load_crew_rows(db, crew_id)
+    started_at = time.time()
+    
+    # Reuse a crew built from the same rows if one is idle
+    with crew_instance_pool.checkout(
+        crew_id, _build_key(db_crew, agents, tasks), lambda: _build_crew_instance(db_crew, agents, tasks)
+    ) as crew_instance:
+        # If we have a specific task to run that's not in the crew's task list
+        if "task_description" in task_data:
+            # Create a one-off task
+            task = CrewAITask(
+                description=task_data["task_description"],
+                expected_output=task_data.get("expected_output", "Detailed analysis and results"),
+                agent=crew_instance.agents[0]  # Assign to first agent as default
+            )
+            records = run_crew_tasks(
+                [None], [set()], lambda position, context: str(task.execute()), 1
+            )
+        else:
+            # Run the crew's predefined tasks, independent ones side by side
+            task_ids = db_crew.task_ids or []
+            deps = plan_crew_tasks(task_ids, tasks, db_crew.tasks_sequential)
+            max_concurrency = (db_crew.config or {}).get("max_concurrency", settings.CREW_TASK_MAX_CONCURRENCY)
+            records = run_crew_tasks(
+                task_ids, deps,
+                lambda position, context: str(crew_instance.tasks[position].execute(context=_task_context(context))),
+                max_concurrency,
+            )
+    
+    return {
+        "result": records[-1]["output"] if records else None,
+        "tasks": records,
+        "duration_ms": round((time.time() - started_at) * 1000, 3),
+    }
+
+
+def run_crew_job(crew_id: int, task_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute a task with the crew in a pool worker, with its own session.
+    
+    Returns:
+        The run result of execute_crew_task, plain data that can cross a process boundary
+    """
+    db = SessionLocal()
+    try:
+        return execute_crew_task(db, crew_id, task_data)
+    finally:
+        db.close()
+
+
+def submit_crew_task(crew_id: int, task_data: Dict[str, Any]) -> CrewJob:
+    """
+    Queue a task for the crew on the crew job pool.
+    
+    Args:
+        crew_id: Crew ID
+        task_data: Task data as for execute_crew_task
+    
+    Returns:
+        The queued job
+    
+    Raises:
+        QueueFullError: If the pool has no room for another waiting job
+    """
+    return crew_job_pool.submit(crew_id, run_crew_job, crew_id, task_data)
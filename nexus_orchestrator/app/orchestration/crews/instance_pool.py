@@ -0,0 +1,97 @@
+"""
+Pool of built CrewAI crews for reuse across runs.
+
+Building a crew constructs a CrewAI agent per member and a task per
+assignment, which costs far more than the run bookkeeping around it. Built
+crews are kept per crew id together with the key they were built from, the
+row versions of the crew, its agents and its tasks, and handed out again
+while that key still matches. A crew object carries state during a run,
+so each one is checked out exclusively and returned afterwards.
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple
+
+
+class CrewInstancePool:
+    """Idle built crews per crew id, valid while their build key matches."""
+
+    def __init__(self, max_crews: int = 256, max_idle_per_crew: int = 4):
+        """
+        Initialize the pool.
+
+        Args:
+            max_crews: Crew ids kept before the least recently used is dropped
+            max_idle_per_crew: Idle instances kept per crew id
+        """
+        self.max_crews = max_crews
+        self.max_idle_per_crew = max_idle_per_crew
+        self._lock = threading.Lock()
+        self._idle: "OrderedDict[int, Tuple[Hashable, List[Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "builds": 0, "stale": 0}
+
+    def acquire(self, crew_id: int, key: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        Take an idle crew built from key, or build a new one.
+
+        Args:
+            crew_id: Crew ID
+            key: Versions the crew must have been built from
+            build: Builds a crew when none is idle
+
+        Returns:
+            A crew for the caller's exclusive use until release()
+        """
+        with self._lock:
+            entry = self._idle.get(crew_id)
+            if entry is not None and entry[0] != key:
+                del self._idle[crew_id]
+                self._stats["stale"] += 1
+                entry = None
+            if entry is not None and entry[1]:
+                self._idle.move_to_end(crew_id)
+                self._stats["hits"] += 1
+                return entry[1].pop()
+            self._stats["builds"] += 1
+        return build()
+
+    def release(self, crew_id: int, key: Hashable, crew: Any) -> None:
+        """Return a crew after a successful run, unless its key is out of date."""
+        with self._lock:
+            entry = self._idle.get(crew_id)
+            if entry is None:
+                entry = (key, [])
+                self._idle[crew_id] = entry
+            elif entry[0] != key:
+                # Built from other versions than those now pooled; acquire() settles which is current
+                return
+            if len(entry[1]) < self.max_idle_per_crew:
+                entry[1].append(crew)
+            self._idle.move_to_end(crew_id)
+            while len(self._idle) > self.max_crews:
+                self._idle.popitem(last=False)
+
+    @contextmanager
+    def checkout(self, crew_id: int, key: Hashable, build: Callable[[], Any]) -> Iterator[Any]:
+        """
+        Use a crew for one run; it is returned to the pool only if the run succeeds.
+
+        Args:
+            crew_id: Crew ID
+            key: Versions the crew must have been built from
+            build: Builds a crew when none is idle
+        """
+        crew = self.acquire(crew_id, key, build)
+        yield crew
+        self.release(crew_id, key, crew)
+
+    def discard(self, crew_id: int) -> None:
+        """Drop idle instances of a crew."""
+        with self._lock:
+            self._idle.pop(crew_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Reuse counters and the number of idle instances."""
+        with self._lock:
+            return {**self._stats, "idle": sum(len(entry[1]) for entry in self._idle.values())}
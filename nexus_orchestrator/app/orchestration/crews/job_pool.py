@@ -0,0 +1,238 @@
+"""
+Bounded worker pool for crew runs, tracked by job id.
+
+CrewAI runs synchronously for as long as its model calls take, so crew runs
+are submitted to a thread or process pool and the request returns a job id
+straight away; callers poll the job for its status and result. Jobs waiting
+for a worker are capped per pool, so a burst of runs is turned away rather
+than queued without bound. Jobs live in the memory of the worker process
+that accepted them.
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a pool already has its maximum number of jobs waiting."""
+
+
+class CrewJob:
+    """A crew run submitted to a pool."""
+
+    def __init__(self, crew_id: int):
+        self.id = uuid.uuid4().hex
+        self.crew_id = crew_id
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status fields of the job, without its result."""
+        return {
+            "job_id": self.id,
+            "crew_id": self.crew_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+def _started(run: Callable[..., Any], *args) -> Any:
+    """Runs in the worker; the start time travels back with the result."""
+    return time.time(), run(*args)
+
+
+class CrewJobPool:
+    """Runs crew jobs on a bounded executor and keeps their outcome for a while."""
+
+    def __init__(self, executor: str = "thread", max_workers: int = 4, max_queue_depth: int = 32,
+                 retention_seconds: float = 3600.0, max_retained: int = 1000):
+        """
+        Initialize the pool.
+
+        Args:
+            executor: "thread" or "process"
+            max_workers: Crew runs executing at once
+            max_queue_depth: Jobs allowed to wait for a worker
+            retention_seconds: How long a finished job's result is kept
+            max_retained: Finished jobs kept before the oldest are dropped
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown crew job executor: {executor}")
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._active: Dict[str, CrewJob] = {}
+        self._finished: "OrderedDict[str, CrewJob]" = OrderedDict()
+        self._stats = {"submitted": 0, "rejected": 0, SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    def _get_pool(self) -> Executor:
+        """Create the executor on first use; caller holds the lock."""
+        if self._pool is None:
+            if self.executor == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-job")
+            else:
+                # Forking would copy the server's threads and open connections into the workers
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    @staticmethod
+    def _refresh(job: CrewJob) -> None:
+        """Move a queued job to running once a worker has taken it; caller holds the lock."""
+        if job.status == QUEUED and job.future is not None and job.future.running():
+            job.status = RUNNING
+            job.started_at = time.time()
+
+    def _waiting(self) -> int:
+        """Jobs beyond what the workers can run at once; caller holds the lock."""
+        return max(0, len(self._active) - self.max_workers)
+
+    def submit(self, crew_id: int, run: Callable[..., Any], *args) -> CrewJob:
+        """
+        Queue a crew run.
+
+        Args:
+            crew_id: Crew ID, recorded on the job
+            run: Function doing the run; must be picklable for a process pool
+            *args: Arguments for run
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullError: If max_queue_depth jobs are already waiting
+        """
+        job = CrewJob(crew_id)
+        with self._lock:
+            self._prune()
+            queued = self._waiting()
+            if queued >= self.max_queue_depth:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"{queued} crew jobs are already waiting for a worker")
+            try:
+                job.future = self._get_pool().submit(_started, run, *args)
+            except BrokenProcessPool:
+                # A worker process died; replace the pool once
+                self._pool.shutdown(wait=False)
+                self._pool = None
+                job.future = self._get_pool().submit(_started, run, *args)
+            self._active[job.id] = job
+            self._stats["submitted"] += 1
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job: CrewJob, future: Future) -> None:
+        started_at, result, error = None, None, None
+        if future.cancelled():
+            error = "Cancelled before it started"
+        else:
+            try:
+                started_at, result = future.result()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        with self._lock:
+            job.started_at = started_at or job.started_at
+            job.finished_at = time.time()
+            if future.cancelled() or job.status == CANCELLING:
+                # Running crews cannot be interrupted; their outcome is dropped instead
+                job.status, job.error = CANCELLED, error if future.cancelled() else "Cancelled while running"
+            elif error is None:
+                job.status, job.result = SUCCEEDED, result
+            else:
+                job.status, job.error = FAILED, error
+            job.future = None
+            self._stats[job.status] += 1
+            self._active.pop(job.id, None)
+            self._finished[job.id] = job
+
+    def get(self, job_id: str) -> Optional[CrewJob]:
+        """Get a job by ID, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._active.get(job_id) or self._finished.get(job_id)
+            if job is not None:
+                self._refresh(job)
+            return job
+
+    def cancel(self, job_id: str) -> Optional[CrewJob]:
+        """
+        Cancel a job.
+
+        A waiting job never runs. A running crew cannot be interrupted, so the
+        job is marked cancelling, its worker finishes the run and the result
+        is discarded.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The job, or None if it is unknown or expired
+        """
+        with self._lock:
+            job = self._active.get(job_id)
+            if job is None:
+                return self._finished.get(job_id)
+            future = job.future
+        # Outside the lock: a successful cancel runs the done callback right away
+        if future is not None and future.cancel():
+            return job
+        with self._lock:
+            if job.status not in FINISHED:
+                job.started_at = job.started_at or time.time()
+                job.status = CANCELLING
+        return job
+
+    def _prune(self) -> None:
+        """Drop expired finished jobs, oldest first; caller holds the lock."""
+        cutoff = time.time() - self.retention_seconds
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if len(self._finished) <= self.max_retained and job.finished_at >= cutoff:
+                break
+            self._finished.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counters, and the jobs waiting and running now."""
+        with self._lock:
+            queued = self._waiting()
+            return {
+                **self._stats,
+                "executor": self.executor,
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "queued": queued,
+                "running": len(self._active) - queued,
+                "retained": len(self._finished),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the workers, dropping jobs that have not started."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
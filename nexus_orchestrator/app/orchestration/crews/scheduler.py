@@ -0,0 +1,168 @@
+"""
+Scheduling of a crew's tasks by their dependencies.
+
+A task depends on the tasks listed in its depends_on. In a sequential crew
+it also waits for the previous synchronous task, and a synchronous task
+waits for every asynchronous task started since then, as CrewAI orders
+them; asynchronous tasks do not hold up the tasks after them. Tasks whose
+dependencies are done run concurrently, up to a per-crew cap, and each one
+is given its dependencies' outputs as context.
+"""
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+
+class CrewRunError(RuntimeError):
+    """Raised when a crew task fails; carries the records of every task in the run."""
+
+    def __init__(self, message: str, tasks: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.tasks = tasks
+
+    def __reduce__(self):
+        # Keep the records when the error crosses from a process pool worker
+        return type(self), (str(self), self.tasks)
+
+
+def plan_crew_tasks(task_ids: Sequence[int], tasks: Dict[int, Any], sequential: bool) -> List[Set[int]]:
+    """
+    Work out which tasks each task of a crew waits for.
+
+    Args:
+        task_ids: The crew's task IDs, in crew order
+        tasks: Task rows by ID, with depends_on and async_execution
+        sequential: Whether the crew runs its tasks in order
+
+    Returns:
+        For each position in task_ids, the positions it depends on
+
+    Raises:
+        ValueError: If a task depends on one outside the crew, or dependencies form a cycle
+    """
+    position_of: Dict[int, int] = {}
+    for position, task_id in enumerate(task_ids):
+        position_of.setdefault(task_id, position)
+
+    deps: List[Set[int]] = []
+    last_sync: Optional[int] = None
+    pending_async: Set[int] = set()
+    for position, task_id in enumerate(task_ids):
+        task = tasks[task_id]
+        needs = set()
+        for dep_id in task.depends_on or []:
+            if dep_id not in position_of:
+                raise ValueError(f"Task {task_id} depends on task {dep_id}, which is not in the crew")
+            needs.add(position_of[dep_id])
+        if sequential:
+            if last_sync is not None:
+                needs.add(last_sync)
+            if task.async_execution:
+                pending_async.add(position)
+            else:
+                needs |= pending_async
+                pending_async = set()
+                last_sync = position
+        needs.discard(position)
+        deps.append(needs)
+
+    # Kahn's algorithm; whatever is left over is on a cycle
+    remaining = [len(needs) for needs in deps]
+    dependents: List[List[int]] = [[] for _ in deps]
+    for position, needs in enumerate(deps):
+        for dep in needs:
+            dependents[dep].append(position)
+    ready = [position for position, count in enumerate(remaining) if count == 0]
+    for position in ready:
+        for dependent in dependents[position]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if len(ready) < len(deps):
+        cycle = sorted({task_ids[position] for position, count in enumerate(remaining) if count})
+        raise ValueError(f"Tasks {cycle} depend on each other")
+    return deps
+
+
+def _timed(run_task: Callable[[int, List[Any]], Any], position: int,
+           context: List[Any]) -> Tuple[float, float, Any, Optional[BaseException]]:
+    started_at = time.time()
+    try:
+        output, error = run_task(position, context), None
+    except Exception as e:
+        output, error = None, e
+    return started_at, time.time(), output, error
+
+
+def run_crew_tasks(task_ids: Sequence[Optional[int]], deps: List[Set[int]],
+                   run_task: Callable[[int, List[Any]], Any], max_concurrency: int) -> List[Dict[str, Any]]:
+    """
+    Run tasks as soon as their dependencies are done, at most max_concurrency at once.
+
+    After a failure no further tasks start; those already running finish and
+    the rest are recorded as skipped.
+
+    Args:
+        task_ids: Task IDs for the records, by position
+        deps: Positions each position depends on, from plan_crew_tasks
+        run_task: Runs a position given its dependencies' outputs, in crew order
+        max_concurrency: Tasks running at once
+
+    Returns:
+        A record per task in crew order: task_id, status, started_at,
+        finished_at, duration_ms, output and error
+
+    Raises:
+        CrewRunError: If a task fails
+    """
+    records = [
+        {"task_id": task_id, "status": "skipped", "started_at": None, "finished_at": None,
+         "duration_ms": None, "output": None, "error": None}
+        for task_id in task_ids
+    ]
+    if not deps:
+        return records
+
+    remaining = [len(needs) for needs in deps]
+    dependents: List[List[int]] = [[] for _ in deps]
+    for position, needs in enumerate(deps):
+        for dep in needs:
+            dependents[dep].append(position)
+    # Earlier tasks go first when more are ready than can run
+    ready = [position for position, count in enumerate(remaining) if count == 0]
+    heapq.heapify(ready)
+    outputs: Dict[int, Any] = {}
+    failure: Optional[str] = None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(deps))),
+                            thread_name_prefix="crew-task") as pool:
+        running = {}
+        while ready or running:
+            while ready and failure is None and len(running) < max(1, max_concurrency):
+                position = heapq.heappop(ready)
+                context = [outputs[dep] for dep in sorted(deps[position])]
+                running[pool.submit(_timed, run_task, position, context)] = position
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = running.pop(future)
+                started_at, finished_at, output, error = future.result()
+                record = records[position]
+                record.update(started_at=started_at, finished_at=finished_at,
+                              duration_ms=round((finished_at - started_at) * 1000, 3))
+                if error is not None:
+                    record.update(status="failed", error=f"{type(error).__name__}: {error}")
+                    failure = failure or f"Task {task_ids[position]} failed: {record['error']}"
+                    continue
+                record.update(status="succeeded", output=output)
+                outputs[position] = output
+                for dependent in dependents[position]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        heapq.heappush(ready, dependent)
+
+    if failure is not None:
+        raise CrewRunError(failure, records)
+    return records
@@ -0,0 +1,149 @@
+"""
+Service for task operations.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.task import Task
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.orchestration.agents.agent_service import create_agent_instance
+
+
+def get_task(db: Session, task_id: int) -> Optional[Task]:
+    """Get a task by ID."""
+    return db.query(Task).filter(Task.id == task_id).first()
+
+
+def get_all_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[Task]:
+    """Get all tasks."""
+    return db.query(Task).offset(skip).limit(limit).all()
+
+
+def _new_task(task: TaskCreate) -> Task:
+    return Task(
+        description=task.description,
+        expected_output=task.expected_output,
+        agent_id=task.agent_id,
+        context=task.context,
+        async_execution=task.async_execution,
+        depends_on=task.depends_on,
+        config=task.config
+    )
+
+
+def create_task(db: Session, task: TaskCreate) -> Task:
+    """Create a new task."""
+    db_task = _new_task(task)
+    db.add(db_task)
+    db.commit()
+    db.refresh(db_task)
+    return db_task
+
+
+def update_task(db: Session, task_id: int, task_update: TaskUpdate) -> Task:
+    """Update a task."""
+    db_task = get_task(db, task_id=task_id)
+    
+    # Update fields
+    update_data = task_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_task, field, value)
+    
+    db.commit()
+    db.refresh(db_task)
+    return db_task
+
+
+def delete_task(db: Session, task_id: int) -> None:
+    """Delete a task."""
+    db_task = get_task(db, task_id=task_id)
+    db.delete(db_task)
+    db.commit()
+
+
+# Async versions for request handlers
+
+async def get_task_async(db: AsyncSession, task_id: int) -> Optional[Task]:
+    """Get a task by ID."""
+    return await db.get(Task, task_id)
+
+
+async def get_all_tasks_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Task]:
+    """Get all tasks."""
+    result = await db.execute(select(Task).order_by(Task.id).offset(skip).limit(limit))
+    return list(result.scalars())
+
+
+async def create_task_async(db: AsyncSession, task: TaskCreate) -> Task:
+    """Create a new task."""
+    db_task = _new_task(task)
+    db.add(db_task)
+    await db.commit()
+    await db.refresh(db_task)
+    return db_task
+
+
+async def update_task_async(db: AsyncSession, task_id: int, task_update: TaskUpdate) -> Optional[Task]:
+    """Update a task; returns None if it does not exist."""
+    db_task = await get_task_async(db, task_id=task_id)
+    if db_task is None:
+        return None
+    
+    # Update fields
+    update_data = task_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_task, field, value)
+    
+    await db.commit()
+    await db.refresh(db_task)
+    return db_task
+
+
+async def delete_task_async(db: AsyncSession, task_id: int) -> bool:
+    """Delete a task; returns whether it existed."""
+    db_task = await get_task_async(db, task_id=task_id)
+    if db_task is None:
+        return False
+    await db.delete(db_task)
+    await db.commit()
+    return True
+
+
+def get_tasks_by_ids(db: Session, task_ids: Iterable[int]) -> Dict[int, Task]:
+    """Get tasks by ID with a single query, keyed by ID; missing IDs are left out."""
+    ids = set(task_ids)
+    if not ids:
+        return {}
+    return {task.id: task for task in db.scalars(select(Task).where(Task.id.in_(ids)))}
+
+
+def create_task_instance(db: Session, task_id: int):
+    """Create a CrewAI task instance from database model."""
+    db_task = get_task(db, task_id=task_id)
+    
+    if not db_task:
+        raise ValueError(f"Task with ID {task_id} not found")
+    
+    return build_task_instance(db_task, create_agent_instance(db, db_task.agent_id))
+
+
+def build_task_instance(db_task: Task, agent: Any):
+    """Create a CrewAI task instance from a loaded task row and its CrewAI agent."""
+    from crewai import Task as CrewAITask
+    
+    description = db_task.description
+    if db_task.context:
+        description = f"{description}\n\nContext: {db_task.context}"
+    
+    # Create CrewAI task; async_execution is honoured by the crew scheduler, which
+    # runs the task in its own thread, so CrewAI itself runs it synchronously
+    task = CrewAITask(
+        description=description,
+        expected_output=db_task.expected_output,
+        agent=agent
+    )
+    
+    return task
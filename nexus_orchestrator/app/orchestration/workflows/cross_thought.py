@@ -1,13 +1,18 @@
 """
 Cross-thought workflow engine for complex agent communication patterns.
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional
+import asyncio
 import uuid
 import time
 import json
 from pydantic import BaseModel
 
 from app.services.blockchain import blockchain_service
+from app.utils.hashing import link_digest, sha256_hex
+from app.orchestration.workflows.thought_events import ThoughtEvent, thought_event_broker
+from app.orchestration.workflows.thought_search import thought_search_index
+from app.orchestration.workflows.thought_retrieval import thought_retriever
 
 
 class Thought(BaseModel):
@@ -18,6 +23,9 @@ class Thought(BaseModel):
     references: List[str] = []
     created_at: float
     context: Dict[str, Any] = {}
+    # Digest of the previous record in the chain, and of this thought
+    prev_hash: Optional[str] = None
+    digest: Optional[str] = None
 
 
 class ThoughtChain(BaseModel):
@@ -29,6 +37,44 @@ class ThoughtChain(BaseModel):
     created_at: float
     updated_at: float
     metadata: Dict[str, Any] = {}
+    # Digest of the latest record in the chain's hash-linked log
+    head_hash: Optional[str] = None
+
+
+def chain_genesis_hash(chain_id: str, task_id: str, created_at: float) -> str:
+    """Digest of the first record of a chain's hash-linked log."""
+    return link_digest(None, {"id": chain_id, "task_id": task_id, "created_at": created_at})
+
+
+def thought_digest(thought: Thought) -> str:
+    """Digest of a thought, committing to its prev_hash."""
+    return link_digest(thought.prev_hash, thought.dict(exclude={"digest", "prev_hash"}))
+
+
+def verify_hash_links(genesis_hash: str, thoughts: Iterable[Thought],
+                      head_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Check a chain's hash links in one streaming pass.
+    
+    Args:
+        genesis_hash: Digest of the chain header from chain_genesis_hash
+        thoughts: The chain's thoughts, oldest first
+        head_hash: Expected digest of the last record, if known
+        
+    Returns:
+        Dictionary with "valid", "thought_count", the computed "head_hash"
+        and the ID of the first thought that fails to link ("broken_at")
+    """
+    current = genesis_hash
+    count = 0
+    for thought in thoughts:
+        if thought.prev_hash != current or thought_digest(thought) != thought.digest:
+            return {"valid": False, "thought_count": count, "head_hash": current, "broken_at": thought.id}
+        current = thought.digest
+        count += 1
+    
+    valid = head_hash is None or head_hash == current
+    return {"valid": valid, "thought_count": count, "head_hash": current, "broken_at": None}
 
 
 class CrossThoughtEngine:
@@ -42,6 +88,9 @@ class CrossThoughtEngine:
     def __init__(self):
         """Initialize the cross-thought engine."""
         self._thought_chains: Dict[str, ThoughtChain] = {}
+        # Position of each thought within its chain, for cursor lookups; kept
+        # only while a chain is open, since closed chains are read far less
+        self._thought_positions: Dict[str, Dict[str, int]] = {}
     
     def create_thought_chain(self, task_id: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -62,15 +111,18 @@ class CrossThoughtEngine:
             task_id=task_id,
             created_at=now,
             updated_at=now,
-            metadata=metadata or {}
+            metadata=metadata or {},
+            head_hash=chain_genesis_hash(chain_id, task_id, now)
         )
         
         self._thought_chains[chain_id] = thought_chain
+        self._thought_positions[chain_id] = {}
         
-        # Log on blockchain
+        # Log the chain header on blockchain; thoughts are logged as they arrive
         blockchain_service.log_decision(
             f"thought_chain_{chain_id}",
-            thought_chain.dict()
+            thought_chain.dict(exclude={"thoughts"}),
+            batch_key=chain_id
         )
         
         return chain_id
@@ -101,18 +153,40 @@ class CrossThoughtEngine:
             content=content,
             references=references or [],
             created_at=time.time(),
-            context=context or {}
+            context=context or {},
+            prev_hash=self._thought_chains[chain_id].head_hash
         )
+        thought.digest = thought_digest(thought)
         
         # Add to chain
+        positions = self._thought_positions.get(chain_id)
+        if positions is not None:
+            positions[thought_id] = len(self._thought_chains[chain_id].thoughts)
         self._thought_chains[chain_id].thoughts.append(thought)
+        self._thought_chains[chain_id].head_hash = thought.digest
         self._thought_chains[chain_id].updated_at = time.time()
         
-        # Log on blockchain
+        # Log on blockchain; the record commits to every earlier thought
         blockchain_service.log_decision(
             f"thought_{thought_id}",
-            thought.dict()
+            thought.dict(),
+            batch_key=chain_id
+        )
+        
+        # Make the thought searchable
+        thought_search_index.add_thought(
+            chain_id, thought_id, agent_id, content, thought.created_at,
+            role=thought.context.get("role")
         )
+        thought_retriever.add_thought(chain_id, thought_id, content)
+        
+        # Notify live subscribers
+        thought_event_broker.publish(ThoughtEvent(
+            type="thought",
+            chain_id=chain_id,
+            thought_id=thought_id,
+            data=thought.dict()
+        ))
         
         return thought_id
     
@@ -131,6 +205,72 @@ class CrossThoughtEngine:
         
         return self._thought_chains[chain_id]
     
+    def _position(self, chain_id: str, thought_id: str) -> Optional[int]:
+        """Position of a thought within its chain, or None if it is not there."""
+        thoughts = self._thought_chains[chain_id].thoughts
+        positions = self._thought_positions.get(chain_id)
+        if positions is not None:
+            position = positions.get(thought_id)
+        else:
+            # A closed chain no longer has a position map
+            position = next((i for i, thought in enumerate(thoughts) if thought.id == thought_id), None)
+        if position is None or position >= len(thoughts) or thoughts[position].id != thought_id:
+            return None
+        return position
+    
+    def get_thought(self, chain_id: str, thought_id: str) -> Thought:
+        """
+        Get a single thought from a chain.
+        
+        Args:
+            chain_id: The ID of the thought chain
+            thought_id: The ID of the thought
+            
+        Returns:
+            The thought
+        """
+        if chain_id not in self._thought_chains:
+            raise ValueError(f"Thought chain {chain_id} not found")
+        
+        position = self._position(chain_id, thought_id)
+        if position is None:
+            raise ValueError(f"Thought {thought_id} not found")
+        
+        return self._thought_chains[chain_id].thoughts[position]
+    
+    def retrieve(self, chain_id: Optional[str], query: str, k: int = 5) -> List[Thought]:
+        """
+        Get the thoughts most relevant to a query.
+        
+        Args:
+            chain_id: The ID of the thought chain to search, or None for all chains
+            query: The query text
+            k: Maximum number of thoughts to return
+            
+        Returns:
+            List of thoughts, most relevant first
+        """
+        if chain_id is not None and chain_id not in self._thought_chains:
+            raise ValueError(f"Thought chain {chain_id} not found")
+        
+        thoughts = []
+        for hit_chain_id, thought_id, _ in thought_retriever.retrieve(chain_id, query, k):
+            try:
+                thoughts.append(self.get_thought(hit_chain_id, thought_id))
+            except ValueError:
+                # Indexed in Qdrant by another worker
+                continue
+        return thoughts
+    
+    def list_thought_chains(self) -> List[ThoughtChain]:
+        """
+        Get all thought chains.
+        
+        Returns:
+            List of thought chains, oldest first
+        """
+        return list(self._thought_chains.values())
+    
     def get_agent_thoughts(self, chain_id: str, agent_id: int) -> List[Thought]:
         """
         Get all thoughts from a specific agent in a chain.
@@ -164,13 +304,33 @@ class CrossThoughtEngine:
         if chain_id not in self._thought_chains:
             raise ValueError(f"Thought chain {chain_id} not found")
         
-        sorted_thoughts = sorted(
-            self._thought_chains[chain_id].thoughts,
-            key=lambda t: t.created_at,
-            reverse=True
-        )
+        # Thoughts are appended in creation order, so no sort is needed
+        thoughts = self._thought_chains[chain_id].thoughts
+        if limit <= 0:
+            return []
+        return thoughts[-limit:][::-1]
+    
+    def get_thoughts_since(self, chain_id: str, cursor: Optional[str] = None) -> List[Thought]:
+        """
+        Get the thoughts added to a chain after a given thought.
+        
+        Args:
+            chain_id: The ID of the thought chain
+            cursor: ID of the last thought the caller has seen; if it is
+                missing or unknown, the whole chain is returned
+            
+        Returns:
+            Thoughts after the cursor, oldest first
+        """
+        if chain_id not in self._thought_chains:
+            raise ValueError(f"Thought chain {chain_id} not found")
+        
+        thoughts = self._thought_chains[chain_id].thoughts
+        position = self._position(chain_id, cursor) if cursor else None
+        if position is None:
+            return list(thoughts)
         
-        return sorted_thoughts[:limit]
+        return thoughts[position + 1:]
     
     def close_thought_chain(self, chain_id: str, summary: Optional[str] = None) -> None:
         """
@@ -189,11 +349,34 @@ class CrossThoughtEngine:
         if summary:
             self._thought_chains[chain_id].metadata["summary"] = summary
         
-        # Log on blockchain
+        # No more thoughts are expected, so release the chain's lookup structures
+        self._thought_positions.pop(chain_id, None)
+        thought_retriever.release_chain(chain_id)
+        
+        # Log only the head hash, which commits to every thought in the chain
+        thought_chain = self._thought_chains[chain_id]
         blockchain_service.log_decision(
             f"thought_chain_close_{chain_id}",
-            self._thought_chains[chain_id].dict()
+            {
+                "chain_id": chain_id,
+                "task_id": thought_chain.task_id,
+                "status": thought_chain.status,
+                "head_hash": thought_chain.head_hash,
+                "thought_count": len(thought_chain.thoughts),
+                "summary_hash": sha256_hex(summary) if summary else None,
+                "closed_at": thought_chain.updated_at,
+            },
+            batch_key=chain_id
         )
+        # Anchor the whole chain under one Merkle root
+        blockchain_service.seal_batch(chain_id)
+        
+        # Notify live subscribers
+        thought_event_broker.publish(ThoughtEvent(
+            type="chain_closed",
+            chain_id=chain_id,
+            data={"summary": summary, "updated_at": self._thought_chains[chain_id].updated_at}
+        ))
     
     def export_thought_chain(self, chain_id: str) -> Dict[str, Any]:
         """
@@ -210,6 +393,41 @@ class CrossThoughtEngine:
         
         return self._thought_chains[chain_id].dict()
     
+    def verify_thought_chain(self, chain_id: str) -> Dict[str, Any]:
+        """
+        Verify a chain's hash-linked log.
+        
+        Args:
+            chain_id: The ID of the thought chain
+            
+        Returns:
+            Result of verify_hash_links for the chain
+        """
+        if chain_id not in self._thought_chains:
+            raise ValueError(f"Thought chain {chain_id} not found")
+        
+        thought_chain = self._thought_chains[chain_id]
+        genesis = chain_genesis_hash(thought_chain.id, thought_chain.task_id, thought_chain.created_at)
+        head_hash = thought_chain.head_hash
+        # Verify a snapshot; a thought added during the pass must link to its end
+        thoughts = list(thought_chain.thoughts)
+        later = thought_chain.thoughts[len(thoughts):len(thoughts) + 1]
+        if later:
+            head_hash = later[0].prev_hash
+        return verify_hash_links(genesis, thoughts, head_hash)
+    
+    async def verify_thought_chain_async(self, chain_id: str) -> Dict[str, Any]:
+        """Verify a chain's hash-linked log in a worker thread."""
+        return await asyncio.to_thread(self.verify_thought_chain, chain_id)
+    
+    def _link_thoughts(self, thought_chain: ThoughtChain) -> None:
+        """Compute hash links for a chain imported without them."""
+        current = chain_genesis_hash(thought_chain.id, thought_chain.task_id, thought_chain.created_at)
+        for thought in thought_chain.thoughts:
+            thought.prev_hash = current
+            thought.digest = current = thought_digest(thought)
+        thought_chain.head_hash = current
+    
     def import_thought_chain(self, data: Dict[str, Any]) -> str:
         """
         Import a thought chain from a dictionary.
@@ -221,7 +439,23 @@ class CrossThoughtEngine:
             Chain ID
         """
         thought_chain = ThoughtChain(**data)
+        thought_chain.thoughts.sort(key=lambda t: t.created_at)
+        if thought_chain.head_hash is None:
+            # Exported before chains were hash-linked
+            self._link_thoughts(thought_chain)
         self._thought_chains[thought_chain.id] = thought_chain
+        if thought_chain.status != "closed":
+            self._thought_positions[thought_chain.id] = {
+                thought.id: position for position, thought in enumerate(thought_chain.thoughts)
+            }
+        for thought in thought_chain.thoughts:
+            thought_search_index.add_thought(
+                thought_chain.id, thought.id, thought.agent_id, thought.content,
+                thought.created_at, role=thought.context.get("role")
+            )
+            thought_retriever.add_thought(thought_chain.id, thought.id, thought.content)
+        if thought_chain.status == "closed":
+            thought_retriever.release_chain(thought_chain.id)
         return thought_chain.id
 
 
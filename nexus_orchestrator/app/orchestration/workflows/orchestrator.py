@@ -2,6 +2,7 @@
 AI Orchestrator - Coordinates multiple AI agents to solve complex tasks.
 """
 import asyncio
+import time
 import uuid
 from typing import Dict, List, Any, Optional, Tuple
 import json
@@ -11,8 +12,13 @@ from pydantic import BaseModel
 
 from app.core.config import settings
 from app.orchestration.agents.agent_service import get_agent
+from app.orchestration.agents.memory import agent_memory_store
+from app.orchestration.agents.skill_index import skill_index
 from app.orchestration.workflows.cross_thought import cross_thought_engine
 from app.services.blockchain import blockchain_service
+from app.services.entity_cache import agent_cache
+from app.services.run_store import new_run_id, run_store, task_hash
+from app.utils.serialization import dumps_str
 
 
 class AgentRole(BaseModel):
@@ -24,6 +30,7 @@ class AgentRole(BaseModel):
     response_format: Optional[str] = None
     model_name: Optional[str] = None
     provider: Optional[str] = None
+    skills: List[str] = []  # With no agent_id, the role goes to an agent with these skills
     
 
 class OrchestrationTask(BaseModel):
@@ -34,6 +41,7 @@ class OrchestrationTask(BaseModel):
     workflow_type: str = "parallel"  # "parallel", "sequential", or "consensus"
     max_iterations: int = 3
     consensus_threshold: float = 0.7  # For consensus workflows
+    context_top_k: Optional[int] = None  # Inject only the top-k relevant prior thoughts
     metadata: Dict[str, Any] = {}
 
 
@@ -48,6 +56,8 @@ class AIOrchestrator:
     def __init__(self):
         """Initialize the AI orchestrator."""
         self.session = httpx.AsyncClient(timeout=60.0)
+        # Agent calls of each orchestration in progress, by thought chain ID
+        self._steps: Dict[str, List[Dict[str, Any]]] = {}
     
     async def __aenter__(self):
         return self
@@ -65,11 +75,19 @@ class AIOrchestrator:
         Returns:
             Results from the orchestration
         """
+        run_id = new_run_id()
+        started_at = time.time()
+        fingerprint = task_hash(task.dict(exclude={"task_id", "metadata"}))
+        
+        # Assign agents to roles that ask for skills rather than an agent
+        task = await self._resolve_roles(task)
+        
         # Create a thought chain for this task
         thought_chain_id = cross_thought_engine.create_thought_chain(
             task.task_id,
             metadata={"prompt": task.prompt, "workflow_type": task.workflow_type}
         )
+        self._steps[thought_chain_id] = []
         
         # Create a contract for this task
         contract_id = blockchain_service.create_contract(
@@ -78,20 +96,31 @@ class AIOrchestrator:
             terms={"prompt": task.prompt, "workflow_type": task.workflow_type}
         )
         
-        # Execute the appropriate workflow
-        if task.workflow_type == "parallel":
-            results = await self._execute_parallel_workflow(task, thought_chain_id)
-        elif task.workflow_type == "sequential":
-            results = await self._execute_sequential_workflow(task, thought_chain_id)
-        elif task.workflow_type == "consensus":
-            results = await self._execute_consensus_workflow(task, thought_chain_id)
-        else:
-            raise ValueError(f"Unknown workflow type: {task.workflow_type}")
+        run = {
+            "id": run_id, "started_at": started_at, "task_id": task.task_id, "task_hash": fingerprint,
+            "workflow_type": task.workflow_type, "prompt": task.prompt,
+            "agent_ids": [role.agent_id for role in task.roles], "thought_chain_id": thought_chain_id,
+            "contract_id": contract_id, "metadata": task.metadata,
+        }
+        
+        try:
+            # Execute the appropriate workflow
+            if task.workflow_type == "parallel":
+                results = await self._execute_parallel_workflow(task, thought_chain_id)
+            elif task.workflow_type == "sequential":
+                results = await self._execute_sequential_workflow(task, thought_chain_id)
+            elif task.workflow_type == "consensus":
+                results = await self._execute_consensus_workflow(task, thought_chain_id)
+            else:
+                raise ValueError(f"Unknown workflow type: {task.workflow_type}")
+        except Exception as e:
+            self._record_run(run, "failed", None, f"{type(e).__name__}: {e}")
+            raise
         
         # Close the thought chain
         cross_thought_engine.close_thought_chain(
             thought_chain_id,
-            summary=json.dumps(results)
+            summary=dumps_str(results)
         )
         
         # Add blockchain verification
@@ -101,8 +130,64 @@ class AIOrchestrator:
             "verification": "Complete"
         }
         
+        # Look the run up later under /workflows/runs
+        results["run"] = {"id": run_id, "task_hash": fingerprint}
+        self._record_run(run, "succeeded", results, None)
+        
         return results
     
+    def _record_run(self, run: Dict[str, Any], status: str, results: Optional[Dict[str, Any]],
+                    error: Optional[str]) -> None:
+        """Queue a finished run and its agent calls for the run store."""
+        finished_at = time.time()
+        steps = self._steps.pop(run["thought_chain_id"], [])
+        try:
+            run_store.record({
+                **run, "status": status, "finished_at": finished_at,
+                "duration_ms": (finished_at - run["started_at"]) * 1000, "result": results, "error": error,
+            }, steps)
+        except Exception as e:
+            print(f"Error recording orchestration run: {e}")
+    
+    def _record_step(self, thought_chain_id: str, role: AgentRole, started_at: float,
+                     duration_ms: float, output: Optional[str], error: Optional[str]) -> None:
+        steps = self._steps.get(thought_chain_id)
+        if steps is not None:
+            steps.append({
+                "role_name": role.role_name, "agent_id": role.agent_id, "started_at": started_at,
+                "duration_ms": duration_ms, "output": output, "error": error,
+            })
+    
+    @staticmethod
+    async def _resolve_roles(task: OrchestrationTask) -> OrchestrationTask:
+        """
+        Fill in agent_id for roles that only name the skills they need.
+        
+        Args:
+            task: The orchestration task
+            
+        Returns:
+            The task, with resolved roles replaced
+        """
+        if not any(not role.agent_id and role.skills for role in task.roles):
+            return task
+        
+        if not skill_index.loaded:
+            try:
+                await asyncio.to_thread(skill_index.ensure_loaded)
+            except Exception as e:
+                print(f"Error loading skill index: {e}")
+                return task
+        
+        roles = []
+        for role in task.roles:
+            if not role.agent_id and role.skills:
+                agent_id = skill_index.resolve(role.skills)
+                if agent_id is not None:
+                    role = role.copy(update={"agent_id": agent_id})
+            roles.append(role)
+        return task.copy(update={"roles": roles})
+    
     async def _execute_parallel_workflow(
         self, task: OrchestrationTask, thought_chain_id: str
     ) -> Dict[str, Any]:
@@ -175,7 +260,10 @@ class AIOrchestrator:
                 iteration_results[role.role_name] = response
                 
                 # Update current prompt with this agent's response
-                current_prompt = f"""
+                if task.context_top_k:
+                    current_prompt = self._build_context_prompt(task, thought_chain_id, response)
+                else:
+                    current_prompt = f"""
 Previous prompt: {current_prompt}
 
 {role.role_name.capitalize()}'s response:
@@ -230,9 +318,12 @@ Continue building on this work.
                 response = await self._call_agent(role, current_prompt, thought_chain_id)
                 iteration_results[role.role_name] = response
             
+            # Encoded once for both the consensus check and the retry prompt
+            responses_json = dumps_str(iteration_results, indent=True)
+            
             # Check for consensus
             consensus_score, consensus_output = await self._evaluate_consensus(
-                iteration_results, task.prompt
+                iteration_results, task.prompt, responses_json
             )
             
             # Store iteration results
@@ -250,13 +341,19 @@ Continue building on this work.
                 break
             
             # Otherwise, update prompt and try again
-            current_prompt = f"""
+            if task.context_top_k:
+                current_prompt = self._build_context_prompt(
+                    task, thought_chain_id, task.prompt,
+                    instruction="Please reconsider and try to find common ground."
+                )
+            else:
+                current_prompt = f"""
 Previous prompt: {current_prompt}
 
 All agents have provided their perspectives but haven't reached consensus.
 Here are their responses:
 
-{json.dumps(iteration_results, indent=2)}
+{responses_json}
 
 Please reconsider and try to find common ground.
 """
@@ -270,6 +367,38 @@ Please reconsider and try to find common ground.
         
         return results
     
+    def _build_context_prompt(
+        self, task: OrchestrationTask, thought_chain_id: str, query: str,
+        instruction: str = "Continue building on this work."
+    ) -> str:
+        """
+        Build a prompt from the task and the prior thoughts most relevant to a query.
+        
+        Args:
+            task: The orchestration task
+            thought_chain_id: ID of the thought chain
+            query: Text to rank prior thoughts against
+            instruction: Closing instruction for the agent
+            
+        Returns:
+            The prompt
+        """
+        thoughts = cross_thought_engine.retrieve(thought_chain_id, query, task.context_top_k)
+        context = "\n\n".join(
+            f"[{thought.context.get('role', thought.agent_id)}]\n{thought.content}"
+            for thought in thoughts
+        )
+        
+        return f"""
+Original prompt: {task.prompt}
+
+Most relevant prior thoughts from the agents:
+
+{context}
+
+{instruction}
+"""
+    
     async def _call_agent(
         self, role: AgentRole, prompt: str, thought_chain_id: str
     ) -> str:
@@ -286,16 +415,25 @@ Please reconsider and try to find common ground.
         """
         # Format the prompt according to the role's template
         formatted_prompt = role.prompt_template.format(prompt=prompt)
+        call_started_at = time.time()
         
         # Get agent details
         try:
-            db_agent = None  # We'd normally get this from the database
+            db_agent = await self._get_agent_config(role.agent_id)
             
             # Determine which provider to use
             provider = role.provider or (db_agent.provider if db_agent else "openai")
             model_name = role.model_name or (db_agent.model_name if db_agent else "gpt-3.5-turbo")
             
+            # Prepend what this agent remembers from earlier tasks
+            use_memory = self._memory_enabled(role, db_agent)
+            if use_memory:
+                memory_block = await agent_memory_store.recall_block(role.agent_id, formatted_prompt)
+                if memory_block:
+                    formatted_prompt = f"{memory_block}\n\n{formatted_prompt}"
+            
             # Call the appropriate API
+            started = time.perf_counter()
             if provider == "openai":
                 response = await self._call_openai(formatted_prompt, model_name)
             elif provider == "anthropic":
@@ -304,15 +442,25 @@ Please reconsider and try to find common ground.
                 response = await self._call_google(formatted_prompt, model_name)
             else:
                 raise ValueError(f"Unknown provider: {provider}")
+            latency_ms = (time.perf_counter() - started) * 1000
             
             # Add thought to the thought chain
             thought_id = cross_thought_engine.add_thought(
                 thought_chain_id,
                 role.agent_id,
                 response,
-                context={"prompt": formatted_prompt, "role": role.role_name}
+                context={"prompt": formatted_prompt, "role": role.role_name, "latency_ms": latency_ms}
             )
             
+            # Remember the outcome without holding up the workflow
+            if use_memory and not response.startswith("Error calling"):
+                asyncio.get_running_loop().run_in_executor(
+                    None, agent_memory_store.record_interaction, role.agent_id, response
+                )
+            
+            self._record_step(
+                thought_chain_id, role, call_started_at, (time.time() - call_started_at) * 1000, response, None
+            )
             return response
         except Exception as e:
             # In case of error, return error message
@@ -323,8 +471,29 @@ Please reconsider and try to find common ground.
                 error_msg,
                 context={"prompt": formatted_prompt, "role": role.role_name, "error": True}
             )
+            self._record_step(
+                thought_chain_id, role, call_started_at, (time.time() - call_started_at) * 1000, None, error_msg
+            )
             return error_msg
     
+    @staticmethod
+    async def _get_agent_config(agent_id: int):
+        """The agent's stored configuration, or None if it has none or the database is unavailable."""
+        if not agent_id:
+            return None
+        try:
+            return await agent_cache.get_async(agent_id)
+        except Exception as e:
+            print(f"Error loading agent {agent_id}: {e}")
+            return None
+    
+    @staticmethod
+    def _memory_enabled(role: AgentRole, db_agent) -> bool:
+        """Whether long-term memory applies to an agent call."""
+        if not settings.AGENT_MEMORY_ENABLED or not role.agent_id:
+            return False
+        return db_agent.memory_enabled if db_agent else True
+    
     async def _call_openai(self, prompt: str, model: str = "gpt-3.5-turbo") -> str:
         """Call OpenAI API."""
         try:
@@ -390,7 +559,8 @@ Please reconsider and try to find common ground.
             return f"Error calling Google: {str(e)}"
     
     async def _evaluate_consensus(
-        self, agent_results: Dict[str, str], original_prompt: str
+        self, agent_results: Dict[str, str], original_prompt: str,
+        agent_results_json: Optional[str] = None
     ) -> Tuple[float, str]:
         """
         Evaluate consensus among agent results.
@@ -398,6 +568,7 @@ Please reconsider and try to find common ground.
         Args:
             agent_results: Results from different agents
             original_prompt: The original prompt
+            agent_results_json: agent_results already encoded as indented JSON
             
         Returns:
             Tuple of (consensus score, consensus output)
@@ -409,7 +580,7 @@ The following agents have provided responses to this prompt:
 Original prompt: {original_prompt}
 
 Agent responses:
-{json.dumps(agent_results, indent=2)}
+{agent_results_json or dumps_str(agent_results, indent=True)}
 
 Your task is to:
 1. Evaluate how much consensus exists between the agents (0.0 to 1.0)
@@ -0,0 +1,219 @@
+"""
+Pub/sub broker for live thought-chain events.
+
+The cross-thought engine publishes an event whenever a thought is added or a
+chain is closed. Subscribers (SSE and WebSocket clients) each get a bounded
+queue; a subscriber that falls too far behind is dropped and is expected to
+reconnect with its last-seen thought ID as a cursor.
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+
+class ThoughtEvent(BaseModel):
+    """An event emitted by a thought chain."""
+    type: str  # "thought" or "chain_closed"
+    chain_id: str
+    thought_id: Optional[str] = None
+    data: Dict[str, Any] = {}
+    origin: Optional[str] = None  # Worker that produced the event
+
+
+class ThoughtSubscription:
+    """A single subscriber's view of one thought chain."""
+
+    def __init__(self, chain_id: str, max_queue_size: int):
+        """
+        Initialize the subscription.
+
+        Args:
+            chain_id: The ID of the thought chain to watch
+            max_queue_size: Number of undelivered events before the subscriber is dropped
+        """
+        self.id = uuid.uuid4().hex
+        self.chain_id = chain_id
+        self.dropped = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._loop = asyncio.get_running_loop()
+
+    def _deliver(self, event: Optional[ThoughtEvent]) -> None:
+        """Deliver an event; must run on the subscriber's loop."""
+        if self.dropped:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: discard its backlog and signal end of stream
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[ThoughtEvent]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout: Seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            The next event, or None if the subscription was dropped or closed
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class ThoughtEventBroker:
+    """
+    In-process broker for thought-chain events with optional Redis fan-out.
+
+    Publishing never blocks: events are delivered to local subscribers
+    immediately and, when fan-out is enabled, relayed to other workers by a
+    background task.
+    """
+
+    def __init__(self, max_queue_size: int = 256):
+        """Initialize the broker."""
+        self.max_queue_size = max_queue_size
+        self.node_id = uuid.uuid4().hex
+        self._subscriptions: Dict[str, Set[ThoughtSubscription]] = {}
+        self._redis = None
+        self._outbound: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, chain_id: str) -> ThoughtSubscription:
+        """
+        Subscribe to events from a thought chain.
+
+        Args:
+            chain_id: The ID of the thought chain
+
+        Returns:
+            The new subscription
+        """
+        subscription = ThoughtSubscription(chain_id, self.max_queue_size)
+        self._subscriptions.setdefault(chain_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ThoughtSubscription) -> None:
+        """Remove a subscription."""
+        subscribers = self._subscriptions.get(subscription.chain_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscriptions[subscription.chain_id]
+
+    def subscriber_count(self, chain_id: str) -> int:
+        """Get the number of live subscribers for a chain."""
+        return len(self._subscriptions.get(chain_id, ()))
+
+    def publish(self, event: ThoughtEvent) -> None:
+        """
+        Publish an event to local subscribers and, if enabled, other workers.
+
+        Safe to call from any thread.
+
+        Args:
+            event: The event to publish
+        """
+        if event.origin is None:
+            event.origin = self.node_id
+        self._deliver_local(event)
+
+        if self._outbound is not None and self._loop is not None:
+            self._call_on_loop(self._loop, self._enqueue_outbound, event)
+
+    def _deliver_local(self, event: ThoughtEvent) -> None:
+        """Deliver an event to the subscribers of its chain."""
+        for subscription in list(self._subscriptions.get(event.chain_id, ())):
+            self._call_on_loop(subscription._loop, subscription._deliver, event)
+            if event.type == "chain_closed":
+                self._call_on_loop(subscription._loop, subscription._deliver, None)
+
+    @staticmethod
+    def _call_on_loop(loop: asyncio.AbstractEventLoop, callback, *args) -> None:
+        """Run a callback on a loop, directly if we're already on it."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            callback(*args)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(callback, *args)
+
+    def _enqueue_outbound(self, event: ThoughtEvent) -> None:
+        """Queue an event for Redis fan-out, dropping it if Redis is backed up."""
+        try:
+            self._outbound.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def start(self) -> None:
+        """Start Redis fan-out if configured."""
+        if not settings.THOUGHT_EVENTS_REDIS_ENABLED or self._redis is not None:
+            return
+
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            print("redis package not installed; thought events stay in-process")
+            return
+
+        self._redis = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self._loop = asyncio.get_running_loop()
+        self._outbound = asyncio.Queue(maxsize=self.max_queue_size * 16)
+        self._tasks = [
+            asyncio.create_task(self._relay_outbound()),
+            asyncio.create_task(self._listen_remote()),
+        ]
+
+    async def stop(self) -> None:
+        """Stop Redis fan-out."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._outbound = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _relay_outbound(self) -> None:
+        """Forward locally published events to the Redis channel."""
+        channel = settings.THOUGHT_EVENTS_REDIS_CHANNEL
+        while True:
+            event = await self._outbound.get()
+            try:
+                await self._redis.publish(channel, event.json())
+            except Exception as e:
+                print(f"Failed to fan out thought event: {e}")
+
+    async def _listen_remote(self) -> None:
+        """Deliver events published by other workers to local subscribers."""
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(settings.THOUGHT_EVENTS_REDIS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = ThoughtEvent(**json.loads(message["data"]))
+                except (ValueError, TypeError):
+                    continue
+                if event.origin != self.node_id:
+                    self._deliver_local(event)
+        finally:
+            await pubsub.close()
+
+
+# Create singleton instance
+thought_event_broker = ThoughtEventBroker(max_queue_size=settings.THOUGHT_EVENTS_QUEUE_SIZE)
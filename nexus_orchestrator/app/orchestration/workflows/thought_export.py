@@ -0,0 +1,281 @@
+"""
+Columnar bulk export and import of thought chains for analytics.
+
+Closed chains are flattened to one row per thought, with the chain's
+metadata repeated as columns, and written in fixed-size batches. Arrow IPC
+and Parquet are used when pyarrow is installed; chunked NDJSON with a
+schema header is always available. Imports memory-map the file.
+"""
+import io
+import mmap
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from app.utils.serialization import dumps, loads
+
+NDJSON_FORMAT = "nexus-thoughts-ndjson"
+NDJSON_VERSION = 1
+
+# Column name -> logical type, in output order
+THOUGHT_ROW_SCHEMA: Dict[str, str] = {
+    "chain_id": "string",
+    "task_id": "string",
+    "workflow_type": "string",
+    "chain_status": "string",
+    "chain_created_at": "float64",
+    "chain_updated_at": "float64",
+    "thought_id": "string",
+    "agent_id": "int64",
+    "role": "string",
+    "created_at": "float64",
+    "content": "string",
+    "content_length": "int64",
+    "latency_ms": "float64",
+    "error": "bool",
+}
+
+
+def arrow_schema():
+    """Get the Arrow schema for thought rows."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Arrow and Parquet exports")
+    types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "bool": pa.bool_()}
+    return pa.schema([(name, types[dtype]) for name, dtype in THOUGHT_ROW_SCHEMA.items()])
+
+
+def iter_thought_batches(chains: Iterable, since: Optional[float] = None, until: Optional[float] = None,
+                         workflow_type: Optional[str] = None, batch_size: int = 5000) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Flatten closed thought chains into column batches.
+
+    Args:
+        chains: Iterable of ThoughtChain objects
+        since: Only include chains created at or after this timestamp
+        until: Only include chains created before this timestamp
+        workflow_type: Only include chains run with this workflow type
+        batch_size: Maximum rows per batch
+
+    Yields:
+        Mapping of column name to a list of values, all the same length
+    """
+    batch: Dict[str, List[Any]] = {name: [] for name in THOUGHT_ROW_SCHEMA}
+    rows = 0
+    for chain in chains:
+        if chain.status != "closed":
+            continue
+        if since is not None and chain.created_at < since:
+            continue
+        if until is not None and chain.created_at >= until:
+            continue
+        chain_workflow = chain.metadata.get("workflow_type")
+        if workflow_type is not None and chain_workflow != workflow_type:
+            continue
+
+        for thought in chain.thoughts:
+            batch["chain_id"].append(chain.id)
+            batch["task_id"].append(chain.task_id)
+            batch["workflow_type"].append(chain_workflow)
+            batch["chain_status"].append(chain.status)
+            batch["chain_created_at"].append(chain.created_at)
+            batch["chain_updated_at"].append(chain.updated_at)
+            batch["thought_id"].append(thought.id)
+            batch["agent_id"].append(thought.agent_id)
+            batch["role"].append(thought.context.get("role"))
+            batch["created_at"].append(thought.created_at)
+            batch["content"].append(thought.content)
+            batch["content_length"].append(len(thought.content))
+            batch["latency_ms"].append(thought.context.get("latency_ms"))
+            batch["error"].append(bool(thought.context.get("error", False)))
+            rows += 1
+
+            if rows >= batch_size:
+                yield batch
+                batch = {name: [] for name in THOUGHT_ROW_SCHEMA}
+                rows = 0
+
+    if rows:
+        yield batch
+
+
+def iter_ndjson_chunks(batches: Iterable[Dict[str, List[Any]]]) -> Iterator[bytes]:
+    """
+    Encode column batches as NDJSON, one chunk per batch.
+
+    The first line is a header carrying the format name, version and schema.
+
+    Args:
+        batches: Column batches from iter_thought_batches
+
+    Yields:
+        Encoded chunks
+    """
+    header = {"format": NDJSON_FORMAT, "version": NDJSON_VERSION, "schema": THOUGHT_ROW_SCHEMA}
+    yield dumps(header) + b"\n"
+
+    columns = list(THOUGHT_ROW_SCHEMA)
+    for batch in batches:
+        lines = [dumps(dict(zip(columns, values))) for values in zip(*(batch[c] for c in columns))]
+        yield b"\n".join(lines) + b"\n"
+
+
+def iter_arrow_stream(batches: Iterable[Dict[str, List[Any]]]) -> Iterator[bytes]:
+    """
+    Encode column batches in the Arrow IPC streaming format.
+
+    Args:
+        batches: Column batches from iter_thought_batches
+
+    Yields:
+        Encoded chunks
+    """
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in batches:
+            writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back in chunks."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """Return and forget everything written so far."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_thought_chains(chains: Iterable, path: str, format: str = "ndjson", **filters) -> int:
+    """
+    Write closed thought chains to a file, one row per thought.
+
+    Args:
+        chains: Iterable of ThoughtChain objects
+        path: Output file path
+        format: "arrow" (IPC file), "parquet" or "ndjson"
+        **filters: since, until, workflow_type and batch_size, as for iter_thought_batches
+
+    Returns:
+        Number of rows written
+    """
+    rows = 0
+    batches = iter_thought_batches(chains, **filters)
+
+    if format == "ndjson":
+        with open(path, "wb") as f:
+            for i, chunk in enumerate(iter_ndjson_chunks(batches)):
+                f.write(chunk)
+                if i:
+                    rows += chunk.count(b"\n")
+        return rows
+
+    schema = arrow_schema()
+    if format == "arrow":
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+                rows += len(batch["thought_id"])
+    elif format == "parquet":
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+                rows += len(batch["thought_id"])
+    else:
+        raise ValueError(f"Unknown export format: {format}")
+    return rows
+
+
+def read_thought_export(path: str, format: str = "ndjson"):
+    """
+    Read an export written by export_thought_chains.
+
+    Arrow and Parquet files are memory-mapped and returned as a pyarrow
+    Table without copying. NDJSON files are memory-mapped and decoded
+    into a column mapping.
+
+    Args:
+        path: Export file path
+        format: "arrow", "parquet" or "ndjson"
+
+    Returns:
+        A pyarrow Table, or a mapping of column name to values for NDJSON
+    """
+    if format == "arrow":
+        arrow_schema()
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+    if format == "parquet":
+        arrow_schema()
+        return pq.read_table(path, memory_map=True)
+    if format != "ndjson":
+        raise ValueError(f"Unknown export format: {format}")
+
+    columns: Dict[str, List[Any]] = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header = loads(data.readline())
+        if header.get("format") != NDJSON_FORMAT:
+            raise ValueError(f"{path} is not a thought export")
+        columns = {name: [] for name in header["schema"]}
+        for line in iter(data.readline, b""):
+            row = loads(line)
+            for name, values in columns.items():
+                values.append(row.get(name))
+    return columns
+
+
+def rows_to_thought_chains(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Regroup exported rows into thought chain dictionaries.
+
+    Args:
+        columns: Mapping of column name to values (e.g. Table.to_pydict())
+
+    Returns:
+        Thought chain dictionaries suitable for CrossThoughtEngine.import_thought_chain
+    """
+    chains: Dict[str, Dict[str, Any]] = {}
+    for i, chain_id in enumerate(columns["chain_id"]):
+        chain = chains.get(chain_id)
+        if chain is None:
+            chain = chains[chain_id] = {
+                "id": chain_id,
+                "task_id": columns["task_id"][i],
+                "status": columns["chain_status"][i],
+                "created_at": columns["chain_created_at"][i],
+                "updated_at": columns["chain_updated_at"][i],
+                "metadata": {"workflow_type": columns["workflow_type"][i]},
+                "thoughts": [],
+            }
+
+        context = {"role": columns["role"][i]}
+        if columns["latency_ms"][i] is not None:
+            context["latency_ms"] = columns["latency_ms"][i]
+        if columns["error"][i]:
+            context["error"] = True
+        chain["thoughts"].append({
+            "id": columns["thought_id"][i],
+            "agent_id": columns["agent_id"][i],
+            "content": columns["content"][i],
+            "created_at": columns["created_at"][i],
+            "context": context,
+        })
+    return list(chains.values())
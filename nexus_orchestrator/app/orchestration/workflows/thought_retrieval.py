@@ -0,0 +1,319 @@
+"""
+Vector retrieval of prior thoughts.
+
+Each thought is embedded as it is added to a chain and stored in a per-chain
+matrix index as well as a global one. Retrieval is a single matrix-vector
+product followed by a partial sort, so top-k lookups stay fast with tens of
+thousands of thoughts. The global index can optionally live in Qdrant.
+
+A chain's own index is released when the chain is closed, after which its
+thoughts are found by filtering the global index. The local global index is
+bounded, and the oldest chains are evicted once it holds too many thoughts.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.text import tokenize
+
+
+class HashingEmbedder:
+    """
+    Local embedder based on signed feature hashing of unigrams and bigrams.
+
+    It needs no model download and produces L2-normalised vectors, so cosine
+    similarity is a plain dot product.
+    """
+
+    def __init__(self, dim: int = 384):
+        """
+        Initialize the embedder.
+
+        Args:
+            dim: Dimensionality of the embedding vectors
+        """
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        """Get the hashed features for a text."""
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a text.
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            A float32 unit vector (all zeros for empty text)
+        """
+        features = self._features(text)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        digests = [hashlib.blake2b(f.encode(), digest_size=8).digest() for f in features]
+        hashes = np.frombuffer(b"".join(digests), dtype=np.uint64)
+        indices = (hashes % self.dim).astype(np.intp)
+        signs = np.where((hashes >> np.uint64(63)) == 1, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, indices, signs)
+
+        # Sublinear term frequency, then normalise
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class MatrixIndex:
+    """An append-only matrix of unit vectors searched by dot product."""
+
+    def __init__(self, dim: int, initial_capacity: int = 64):
+        """
+        Initialize the index.
+
+        Args:
+            dim: Dimensionality of the vectors
+            initial_capacity: Number of rows to allocate up front
+        """
+        self.dim = dim
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._keys: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        """
+        Add a vector.
+
+        Args:
+            key: (chain ID, thought ID) the vector belongs to
+            vector: A unit vector
+        """
+        n = len(self._keys)
+        if n == self._matrix.shape[0]:
+            # Grow geometrically so appends stay amortised O(1)
+            grown = np.zeros((n * 2, self.dim), dtype=np.float32)
+            grown[:n] = self._matrix
+            self._matrix = grown
+        self._matrix[n] = vector
+        self._keys.append(key)
+
+    def remove(self, keys: List[Tuple[str, str]]) -> None:
+        """
+        Remove vectors, compacting the matrix.
+
+        Args:
+            keys: Keys of the vectors to remove
+        """
+        doomed = set(keys)
+        keep = [i for i, key in enumerate(self._keys) if key not in doomed]
+        n = len(keep)
+        self._matrix[:n] = self._matrix[keep]
+        self._matrix[n:] = 0
+        self._keys = [self._keys[i] for i in keep]
+
+    def search(self, query: np.ndarray, k: int, group: Optional[str] = None) -> List[Tuple[Tuple[str, str], float]]:
+        """
+        Find the vectors most similar to a query.
+
+        Args:
+            query: A unit query vector
+            k: Number of results
+            group: If set, only consider keys whose first element is this
+
+        Returns:
+            List of (key, cosine similarity), best first
+        """
+        n = len(self._keys)
+        if group is None:
+            rows = None
+            scores = self._matrix[:n] @ query
+        else:
+            rows = np.flatnonzero(np.fromiter((key[0] == group for key in self._keys), dtype=bool, count=n))
+            scores = self._matrix[rows] @ query
+        n = len(scores)
+        k = min(k, n)
+        if k <= 0:
+            return []
+
+        if k < n:
+            top = np.argpartition(scores, n - k)[n - k:]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        if rows is not None:
+            return [(self._keys[rows[i]], float(scores[i])) for i in top]
+        return [(self._keys[i], float(scores[i])) for i in top]
+
+
+class QdrantIndex:
+    """Vector index stored in a Qdrant collection."""
+
+    def __init__(self, url: str, dim: int, collection: str = "thoughts", group_field: str = "chain_id"):
+        """
+        Initialize the Qdrant index, creating the collection if needed.
+
+        Args:
+            url: Qdrant URL
+            dim: Dimensionality of the vectors
+            collection: Name of the collection
+            group_field: Payload field holding the first element of each key
+        """
+        from qdrant_client import QdrantClient
+        from qdrant_client.http import models
+
+        self._models = models
+        self.collection = collection
+        self.group_field = group_field
+        self.client = QdrantClient(url=url)
+        # Upserts are fire-and-forget so they never block add_thought
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-writer")
+        try:
+            self.client.get_collection(collection)
+        except Exception:
+            self.client.recreate_collection(
+                collection,
+                vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+            )
+
+    def add(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        """Queue a vector for upsert."""
+        group, point_id = key
+        point = self._models.PointStruct(
+            id=point_id,
+            vector=vector.tolist(),
+            payload={self.group_field: group},
+        )
+        self._writer.submit(self.client.upsert, self.collection, [point])
+
+    def remove(self, keys: List[Tuple[str, str]]) -> None:
+        """Queue vectors for deletion."""
+        selector = self._models.PointIdsList(points=[point_id for _, point_id in keys])
+        self._writer.submit(self.client.delete, self.collection, selector)
+
+    def search(self, query: np.ndarray, k: int, group: Optional[str] = None) -> List[Tuple[Tuple[str, str], float]]:
+        """Find the vectors most similar to a query, optionally within one group."""
+        query_filter = None
+        if group is not None:
+            query_filter = self._models.Filter(must=[
+                self._models.FieldCondition(key=self.group_field, match=self._models.MatchValue(value=group))
+            ])
+        hits = self.client.search(
+            self.collection, query_vector=query.tolist(), query_filter=query_filter, limit=k
+        )
+        return [((hit.payload[self.group_field], str(hit.id)), hit.score) for hit in hits]
+
+
+class ThoughtRetriever:
+    """Embeds thoughts and retrieves the most relevant ones for a query."""
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None, qdrant_url: Optional[str] = None,
+                 max_thoughts: int = 200_000):
+        """
+        Initialize the retriever.
+
+        Args:
+            embedder: Embedder to use (defaults to a local HashingEmbedder)
+            qdrant_url: If set, keep the global index in Qdrant at this URL
+            max_thoughts: Thoughts kept before the oldest chains are evicted
+        """
+        self.embedder = embedder or HashingEmbedder(dim=settings.THOUGHT_EMBEDDING_DIM)
+        self.max_thoughts = max_thoughts
+        self._lock = threading.Lock()
+        # Indexes of open chains; closed chains are searched in the global index
+        self._chain_indexes: Dict[str, MatrixIndex] = {}
+        # Thoughts indexed per chain, oldest chain first
+        self._chain_counts: "OrderedDict[str, int]" = OrderedDict()
+        self._thought_count = 0
+        self._global_index = None
+        if qdrant_url:
+            try:
+                self._global_index = QdrantIndex(qdrant_url, self.embedder.dim)
+            except Exception as e:
+                print(f"Failed to connect to Qdrant: {e}")
+                print("Falling back to local global index")
+        if self._global_index is None:
+            self._global_index = MatrixIndex(self.embedder.dim, initial_capacity=1024)
+
+    def add_thought(self, chain_id: str, thought_id: str, content: str) -> None:
+        """
+        Embed and index a thought.
+
+        Args:
+            chain_id: The ID of the thought chain
+            thought_id: The ID of the thought
+            content: The content of the thought
+        """
+        vector = self.embedder.embed(content)
+        key = (chain_id, thought_id)
+        with self._lock:
+            if chain_id not in self._chain_counts:
+                self._chain_indexes[chain_id] = MatrixIndex(self.embedder.dim)
+            index = self._chain_indexes.get(chain_id)
+            if index is not None:
+                index.add(key, vector)
+            self._global_index.add(key, vector)
+            self._chain_counts[chain_id] = self._chain_counts.get(chain_id, 0) + 1
+            self._thought_count += 1
+            if self._thought_count > self.max_thoughts:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop the oldest chains until the retriever is back under 90% of max_thoughts."""
+        target = int(self.max_thoughts * 0.9)
+        evicted = set()
+        while self._chain_counts and self._thought_count > target:
+            chain_id, count = self._chain_counts.popitem(last=False)
+            self._chain_indexes.pop(chain_id, None)
+            self._thought_count -= count
+            evicted.add(chain_id)
+        # Qdrant keeps every thought, so its chains stay searchable by filter
+        if isinstance(self._global_index, MatrixIndex):
+            self._global_index.remove([key for key in self._global_index._keys if key[0] in evicted])
+
+    def release_chain(self, chain_id: str) -> None:
+        """
+        Drop a chain's own index once no more thoughts are expected.
+
+        Args:
+            chain_id: The ID of the thought chain
+        """
+        with self._lock:
+            self._chain_indexes.pop(chain_id, None)
+
+    def retrieve(self, chain_id: Optional[str], query: str, k: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Find the thoughts most relevant to a query.
+
+        Args:
+            chain_id: Search this chain only, or all chains if None
+            query: The query text
+            k: Number of results
+
+        Returns:
+            List of (chain ID, thought ID, similarity), best first
+        """
+        query_vector = self.embedder.embed(query)
+        with self._lock:
+            if chain_id is None:
+                results = self._global_index.search(query_vector, k)
+            elif chain_id in self._chain_indexes:
+                results = self._chain_indexes[chain_id].search(query_vector, k)
+            else:
+                results = self._global_index.search(query_vector, k, group=chain_id)
+        return [(key[0], key[1], score) for key, score in results]
+
+
+# Create singleton instance
+thought_retriever = ThoughtRetriever(
+    qdrant_url=settings.QDRANT_URL if settings.THOUGHT_RETRIEVAL_BACKEND == "qdrant" else None,
+    max_thoughts=settings.THOUGHT_RETRIEVAL_MAX_THOUGHTS,
+)
@@ -0,0 +1,382 @@
+"""
+Full-text search index over thought chains.
+
+Thoughts are indexed as they are added. New documents go into a mutable
+buffer that is sealed into an immutable segment once it fills up; small
+segments are merged as writes come in so the segment count stays
+bounded, and the oldest documents are evicted once the index holds more than
+its configured number of documents. Results are ranked with BM25.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import uuid
+from collections import Counter
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.utils.text import tokenize
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class SearchHit(BaseModel):
+    """A single search result."""
+    thought_id: str
+    chain_id: str
+    agent_id: int
+    role: Optional[str] = None
+    created_at: float
+    score: float
+
+
+class SearchPage(BaseModel):
+    """A page of search results."""
+    query: str
+    total: int
+    offset: int
+    limit: int
+    hits: List[SearchHit] = []
+
+
+class _Segment:
+    """
+    A set of indexed thoughts.
+
+    Documents are addressed by their ordinal within the segment. Postings map
+    each term to (ordinal, term frequency) pairs in ordinal order, and the
+    chain/agent/role maps hold the ordinals for each filter value.
+    """
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.by_chain: Dict[str, Set[int]] = {}
+        self.by_agent: Dict[int, Set[int]] = {}
+        self.by_role: Dict[str, Set[int]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc: Dict[str, Any], term_counts: Counter) -> None:
+        """Append a document with its term frequencies."""
+        ordinal = len(self.docs)
+        self.docs.append(doc)
+        self.total_length += doc["length"]
+        for term, count in term_counts.items():
+            self.postings.setdefault(term, []).append((ordinal, count))
+        self.add_filters(doc, ordinal)
+
+    def allowed(self, chain_id: Optional[str], agent_id: Optional[int],
+                role: Optional[str]) -> Optional[Set[int]]:
+        """Get the ordinals matching the filters, or None if unfiltered."""
+        allowed = None
+        for index, value in ((self.by_chain, chain_id), (self.by_agent, agent_id), (self.by_role, role)):
+            if value is None:
+                continue
+            ordinals = index.get(value, set())
+            allowed = ordinals if allowed is None else allowed & ordinals
+        return allowed
+
+    @classmethod
+    def merge(cls, segments: List["_Segment"]) -> "_Segment":
+        """Merge segments into one, preserving document order."""
+        merged = cls()
+        for segment in segments:
+            base = len(merged.docs)
+            for ordinal, doc in enumerate(segment.docs):
+                merged.docs.append(doc)
+                merged.add_filters(doc, base + ordinal)
+            merged.total_length += segment.total_length
+            for term, postings in segment.postings.items():
+                merged.postings.setdefault(term, []).extend(
+                    (base + ordinal, count) for ordinal, count in postings
+                )
+        return merged
+
+    def tail(self, start: int) -> "_Segment":
+        """A new segment holding the documents from an ordinal on, renumbered from zero."""
+        kept = _Segment()
+        kept.docs = self.docs[start:]
+        for term, postings in self.postings.items():
+            rebased = [(ordinal - start, count) for ordinal, count in postings if ordinal >= start]
+            if rebased:
+                kept.postings[term] = rebased
+        for ordinal, doc in enumerate(kept.docs):
+            kept.total_length += doc["length"]
+            kept.add_filters(doc, ordinal)
+        return kept
+
+    def add_filters(self, doc: Dict[str, Any], ordinal: int) -> None:
+        """Register a document's filter values."""
+        self.by_chain.setdefault(doc["chain_id"], set()).add(ordinal)
+        self.by_agent.setdefault(doc["agent_id"], set()).add(ordinal)
+        if doc.get("role"):
+            self.by_role.setdefault(doc["role"], set()).add(ordinal)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the segment."""
+        return {"docs": self.docs, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_Segment":
+        """Deserialize a segment."""
+        segment = cls()
+        segment.docs = data["docs"]
+        segment.postings = {
+            term: [tuple(posting) for posting in postings]
+            for term, postings in data["postings"].items()
+        }
+        for ordinal, doc in enumerate(segment.docs):
+            segment.total_length += doc["length"]
+            segment.add_filters(doc, ordinal)
+        return segment
+
+
+class ThoughtSearchIndex:
+    """
+    Inverted index over thought content with BM25 ranking.
+
+    The index is safe to update from multiple threads.
+    """
+
+    def __init__(self, max_buffer_docs: int = 1000, max_segments: int = 8,
+                 max_documents: int = 200_000):
+        """
+        Initialize the search index.
+
+        Args:
+            max_buffer_docs: Documents held in the mutable buffer before it is sealed
+            max_segments: Sealed segments kept before the smallest are merged
+            max_documents: Documents kept before the oldest segments are evicted
+        """
+        self.max_buffer_docs = max_buffer_docs
+        self.max_segments = max_segments
+        self.max_documents = max_documents
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []
+        self._buffer = _Segment()
+
+    def add_thought(self, chain_id: str, thought_id: str, agent_id: int, content: str,
+                    created_at: float, role: Optional[str] = None) -> None:
+        """
+        Index a thought.
+
+        Args:
+            chain_id: The ID of the thought chain
+            thought_id: The ID of the thought
+            agent_id: The ID of the agent that produced the thought
+            content: The content of the thought
+            created_at: When the thought was created
+            role: Optional role name the agent was acting in
+        """
+        terms = tokenize(content)
+        doc = {
+            "thought_id": thought_id,
+            "chain_id": chain_id,
+            "agent_id": agent_id,
+            "role": role,
+            "created_at": created_at,
+            "length": len(terms),
+        }
+        with self._lock:
+            self._buffer.add(doc, Counter(terms))
+            if len(self._buffer) >= self.max_buffer_docs:
+                self._seal_buffer()
+
+    def _seal_buffer(self) -> None:
+        """Turn the buffer into a segment and enforce segment and size limits."""
+        if not len(self._buffer):
+            return
+        self._segments.append(self._buffer)
+        self._buffer = _Segment()
+
+        # Merge the smallest adjacent pair until we're within the segment budget
+        while len(self._segments) > self.max_segments:
+            sizes = [len(a) + len(b) for a, b in zip(self._segments, self._segments[1:])]
+            i = sizes.index(min(sizes))
+            self._segments[i:i + 2] = [_Segment.merge(self._segments[i:i + 2])]
+
+        # Once over the document budget, evict the oldest documents down to 90% of it,
+        # so the oldest segment, usually the largest after merges, is split rather than
+        # dropped whole, and not rebuilt on every seal
+        if self.document_count > self.max_documents:
+            excess = self.document_count - int(self.max_documents * 0.9)
+            while excess > 0 and self._segments:
+                oldest = self._segments[0]
+                if len(oldest) <= excess:
+                    self._segments.pop(0)
+                    excess -= len(oldest)
+                else:
+                    self._segments[0] = oldest.tail(excess)
+                    excess = 0
+
+    @property
+    def document_count(self) -> int:
+        """Number of indexed thoughts."""
+        return sum(len(segment) for segment in self._segments) + len(self._buffer)
+
+    def search(self, query: str, chain_id: Optional[str] = None, agent_id: Optional[int] = None,
+               role: Optional[str] = None, offset: int = 0, limit: int = 10) -> SearchPage:
+        """
+        Search indexed thoughts.
+
+        Args:
+            query: Free-text query
+            chain_id: Only match thoughts from this chain
+            agent_id: Only match thoughts from this agent
+            role: Only match thoughts produced in this role
+            offset: Number of ranked hits to skip
+            limit: Maximum number of hits to return
+
+        Returns:
+            A page of hits, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            segments = self._segments + [self._buffer]
+            total_docs = sum(len(segment) for segment in segments)
+            if not terms or not total_docs:
+                return SearchPage(query=query, total=0, offset=offset, limit=limit)
+
+            avg_length = (sum(segment.total_length for segment in segments) / total_docs) or 1.0
+            doc_freq = {
+                term: sum(len(segment.postings.get(term, ())) for segment in segments)
+                for term in terms
+            }
+
+            scored: List[Tuple[float, float, Dict[str, Any]]] = []
+            for segment in segments:
+                allowed = segment.allowed(chain_id, agent_id, role)
+                if allowed is not None and not allowed:
+                    continue
+                scores: Dict[int, float] = {}
+                for term in terms:
+                    postings = segment.postings.get(term)
+                    if not postings:
+                        continue
+                    df = doc_freq[term]
+                    idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                    for ordinal, tf in postings:
+                        if allowed is not None and ordinal not in allowed:
+                            continue
+                        length = segment.docs[ordinal]["length"]
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                        scores[ordinal] = scores.get(ordinal, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                for ordinal, score in scores.items():
+                    doc = segment.docs[ordinal]
+                    scored.append((score, doc["created_at"], doc))
+
+        top = heapq.nlargest(offset + limit, scored, key=lambda hit: (hit[0], hit[1]))
+        hits = [SearchHit(score=score, **{k: v for k, v in doc.items() if k != "length"})
+                for score, _, doc in top[offset:]]
+        return SearchPage(query=query, total=len(scored), offset=offset, limit=limit, hits=hits)
+
+    def clear(self) -> None:
+        """Remove all documents from the index."""
+        with self._lock:
+            self._segments = []
+            self._buffer = _Segment()
+
+    def rebuild(self, thought_chains) -> int:
+        """
+        Rebuild the index from stored thought chains.
+
+        Args:
+            thought_chains: Iterable of ThoughtChain objects
+
+        Returns:
+            Number of thoughts indexed
+        """
+        with self._lock:
+            self.clear()
+            for chain in thought_chains:
+                for thought in chain.thoughts:
+                    self.add_thought(
+                        chain.id, thought.id, thought.agent_id, thought.content,
+                        thought.created_at, role=thought.context.get("role")
+                    )
+            self._seal_buffer()
+            return self.document_count
+
+    def save(self, directory: str) -> None:
+        """
+        Persist the index to a directory.
+
+        Segments are written under new names and the manifest is swapped
+        in only once they are on disk, so a crash mid-save leaves the
+        previous save intact. Files no longer in the manifest are removed.
+
+        Args:
+            directory: Directory to write segment files and the manifest to
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._seal_buffer()
+            names = []
+            for i, segment in enumerate(self._segments):
+                name = f"segment_{generation}_{i:04d}.json"
+                with open(os.path.join(directory, name), "w") as f:
+                    json.dump(segment.to_dict(), f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                names.append(name)
+
+        manifest_path = os.path.join(directory, "manifest.json")
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump({"segments": names}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        # Segments of earlier saves, and of saves that crashed before their manifest
+        current = set(names)
+        for name in os.listdir(directory):
+            if name.startswith("segment_") and name.endswith(".json") and name not in current:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def load(self, directory: str) -> bool:
+        """
+        Load a persisted index, replacing the current contents.
+
+        Args:
+            directory: Directory previously passed to save()
+
+        Returns:
+            Whether an index was found and loaded
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        segments = []
+        for name in manifest["segments"]:
+            with open(os.path.join(directory, name)) as f:
+                segments.append(_Segment.from_dict(json.load(f)))
+
+        with self._lock:
+            self._segments = segments
+            self._buffer = _Segment()
+        return True
+
+
+# Create singleton instance
+thought_search_index = ThoughtSearchIndex(
+    max_buffer_docs=settings.THOUGHT_SEARCH_MAX_BUFFER_DOCS,
+    max_segments=settings.THOUGHT_SEARCH_MAX_SEGMENTS,
+    max_documents=settings.THOUGHT_SEARCH_MAX_DOCUMENTS,
+)
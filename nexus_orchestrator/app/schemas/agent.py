@@ -44,10 +44,18 @@ class AgentUpdate(BaseModel):
     skills: Optional[List[str]] = None
 
 
+class AgentBulkUpdate(AgentUpdate):
+    """Schema for one agent in a bulk update."""
+    
+    id: int = Field(..., description="Agent ID")
+    version: Optional[int] = Field(None, description="Only update if the agent is still at this version")
+
+
 class AgentInDB(AgentBase):
     """Schema for agents in the database."""
     
     id: int
+    version: int = 1
     skills: List[str] = []
     
     class Config:
@@ -59,3 +67,10 @@ class AgentResponse(AgentInDB):
     """Schema for agent responses."""
     
     pass
+
+
+class AgentPage(BaseModel):
+    """Schema for a page of agents."""
+    
+    items: List[AgentResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; absent on the last page")
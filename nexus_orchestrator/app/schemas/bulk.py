@@ -0,0 +1,28 @@
+"""
+Schema definitions for bulk writes.
+"""
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class BulkItemResult(BaseModel):
+    """Schema for an item written by a bulk request."""
+    
+    index: int = Field(..., description="Position of the item in the request")
+    id: int
+    version: Optional[int] = Field(None, description="Row version after the write; absent for deletes")
+
+
+class BulkItemError(BaseModel):
+    """Schema for an item a bulk request could not write."""
+    
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[int] = None
+    error: str
+
+
+class BulkResult(BaseModel):
+    """Schema for the outcome of a bulk request."""
+    
+    succeeded: List[BulkItemResult]
+    failed: List[BulkItemError]
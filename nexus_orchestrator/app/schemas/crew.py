@@ -1,7 +1,7 @@
 """
 Schema definitions for crews.
 """
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -36,10 +36,18 @@ class CrewUpdate(BaseModel):
     task_ids: Optional[List[int]] = None
 
 
+class CrewBulkUpdate(CrewUpdate):
+    """Schema for one crew in a bulk update."""
+    
+    id: int = Field(..., description="Crew ID")
+    version: Optional[int] = Field(None, description="Only update if the crew is still at this version")
+
+
 class CrewInDB(CrewBase):
     """Schema for crews in the database."""
     
     id: int
+    version: int = 1
     agent_ids: List[int]
     task_ids: List[int] = []
     
@@ -52,3 +60,28 @@ class CrewResponse(CrewInDB):
     """Schema for crew responses."""
     
     pass
+
+
+class CrewPage(BaseModel):
+    """Schema for a page of crews."""
+    
+    items: List[CrewResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; absent on the last page")
+
+
+class CrewJobStatus(BaseModel):
+    """Schema for the status of a crew run."""
+    
+    job_id: str
+    crew_id: int
+    status: str = Field(..., description="queued, running, cancelling, succeeded, failed or cancelled")
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CrewJobResult(CrewJobStatus):
+    """Schema for a finished crew run."""
+    
+    result: Optional[Any] = None
@@ -0,0 +1,59 @@
+"""
+Schema definitions for orchestration runs.
+"""
+from typing import Any, Dict, List, Optional
+from pydantic import AliasChoices, BaseModel, Field
+
+
+class RunStepResponse(BaseModel):
+    """Schema for one agent call of a run."""
+    
+    step_index: int
+    role_name: str
+    agent_id: Optional[int] = None
+    started_at: float
+    duration_ms: float
+    output: Optional[str] = None
+    error: Optional[str] = None
+    
+    class Config:
+        """Pydantic config."""
+        orm_mode = True
+
+
+class RunSummary(BaseModel):
+    """Schema for a run in listings."""
+    
+    id: str
+    task_id: str
+    task_hash: str = Field(..., description="Shared by runs of the same prompt, roles and workflow settings")
+    workflow_type: str
+    status: str = Field(..., description="succeeded or failed")
+    prompt: str
+    agent_ids: List[int] = []
+    thought_chain_id: Optional[str] = None
+    contract_id: Optional[str] = None
+    started_at: float
+    finished_at: float
+    duration_ms: float
+    error: Optional[str] = None
+    # Stored as run_metadata, since metadata is reserved on ORM models
+    metadata: Dict[str, Any] = Field({}, validation_alias=AliasChoices("run_metadata", "metadata"))
+    
+    class Config:
+        """Pydantic config."""
+        orm_mode = True
+
+
+class RunDetail(RunSummary):
+    """Schema for a run with its result and steps."""
+    
+    result: Optional[Dict[str, Any]] = None
+    steps: List[RunStepResponse] = []
+
+
+class RunPage(BaseModel):
+    """Schema for a page of runs, newest first."""
+    
+    items: List[RunSummary]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; absent on the last page")
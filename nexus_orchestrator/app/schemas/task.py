@@ -1,7 +1,7 @@
 """
 Schema definitions for tasks.
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -13,6 +13,7 @@ class TaskBase(BaseModel):
     agent_id: int = Field(..., description="ID of the agent assigned to this task")
     context: Optional[str] = Field(None, description="Additional context for the task")
     async_execution: bool = Field(False, description="Whether the task should be executed asynchronously")
+    depends_on: Optional[List[int]] = Field([], description="IDs of tasks in the same crew that must finish first")
     config: Optional[Dict] = Field({}, description="Additional configuration parameters")
 
 
@@ -30,6 +31,7 @@ class TaskUpdate(BaseModel):
     agent_id: Optional[int] = None
     context: Optional[str] = None
     async_execution: Optional[bool] = None
+    depends_on: Optional[List[int]] = None
     config: Optional[Dict] = None
 
 
@@ -37,6 +39,7 @@ class TaskInDB(TaskBase):
     """Schema for tasks in the database."""
     
     id: int
+    version: int = 1
     
     class Config:
         """Pydantic config."""
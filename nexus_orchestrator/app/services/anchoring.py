@@ -0,0 +1,414 @@
+"""
+Merkle-batched anchoring of decision records.
+
+Record hashes accumulate in open batches, either per time window or per
+caller-supplied key (such as a thought chain ID). When a batch is sealed
+its Merkle root is anchored once, so anchoring cost grows with the number
+of batches rather than the number of records. Each record can later be
+proven against its batch root with a compact inclusion proof.
+
+Only open batches and those not yet anchored and persisted are held in
+memory; anchored batches are read back from storage when a proof needs
+them, with the most recent kept in a bounded cache. A batch whose anchor
+or persist fails is retried with backoff.
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.merkle import MerkleTree, leaf_hash, verify_proof
+
+# Journal task ID prefix under which anchored batches are persisted
+ANCHOR_RECORD_PREFIX = "anchor_"
+
+
+class AnchorBatch:
+    """A batch of record hashes anchored under one Merkle root."""
+
+    def __init__(self, key: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.created_at = time.time()
+        self.task_ids: List[str] = []
+        self.data_hashes: List[str] = []
+        self.tree: Optional[MerkleTree] = None
+        self.tx_hash: Optional[str] = None
+        self.anchored_at: Optional[float] = None
+        # Failed anchor or persist attempts, and when to try again
+        self.attempts = 0
+        self.retry_at = 0.0
+        self.persisted = False
+
+    @property
+    def sealed(self) -> bool:
+        return self.tree is not None
+
+    def leaf_index(self, task_id: str) -> Optional[int]:
+        """Position of a task ID's latest record in the batch, or None."""
+        for index in range(len(self.task_ids) - 1, -1, -1):
+            if self.task_ids[index] == task_id:
+                return index
+        return None
+
+    def seal(self) -> None:
+        """Build the Merkle tree; no more records can be added."""
+        self.tree = MerkleTree([leaf_hash(h) for h in self.data_hashes])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the batch for persistence."""
+        return {
+            "batch_id": self.id,
+            "key": self.key,
+            "created_at": self.created_at,
+            "root": self.tree.root if self.tree else None,
+            "task_ids": self.task_ids,
+            "data_hashes": self.data_hashes,
+            "tx_hash": self.tx_hash,
+            "anchored_at": self.anchored_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnchorBatch":
+        """Deserialize a persisted batch."""
+        batch = cls(data["key"])
+        batch.id = data["batch_id"]
+        batch.created_at = data["created_at"]
+        batch.task_ids = data["task_ids"]
+        batch.data_hashes = data["data_hashes"]
+        batch.tx_hash = data["tx_hash"]
+        batch.anchored_at = data["anchored_at"]
+        batch.seal()
+        return batch
+
+
+def anchor_journal_record(batch: AnchorBatch) -> Tuple[str, Dict[str, Any]]:
+    """
+    Journal entry for a sealed batch, so its proofs survive restarts.
+
+    Args:
+        batch: A sealed batch; one that could not be anchored has no tx_hash
+
+    Returns:
+        (task ID, record) to append to a DecisionJournal
+    """
+    data = batch.to_dict()
+    task_id = f"{ANCHOR_RECORD_PREFIX}{batch.id}"
+    return task_id, {
+        "task_id": task_id,
+        "timestamp": batch.anchored_at or batch.created_at,
+        "data_hash": data["root"],
+        "data": data,
+        "tx_hash": batch.tx_hash,
+    }
+
+
+class MerkleAnchorer:
+    """
+    Accumulates record hashes into batches and anchors their Merkle roots.
+
+    Sealing is cheap and may happen on any thread; the anchor call itself
+    runs on a dedicated worker so a slow chain never blocks callers.
+    """
+
+    def __init__(self, anchor: Callable[[str, AnchorBatch], str],
+                 persist: Optional[Callable[[AnchorBatch], None]] = None,
+                 load: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+                 locate: Optional[Callable[[str], Optional[str]]] = None,
+                 window_seconds: float = 5.0, keyed_max_age_seconds: float = 300.0,
+                 max_batch_size: int = 4096, max_cached_batches: int = 256,
+                 retry_base_seconds: float = 1.0, retry_max_seconds: float = 300.0):
+        """
+        Initialize the anchorer.
+
+        Args:
+            anchor: Called with (root, batch) to anchor a root; returns a tx hash
+            persist: Called with each anchored batch so proofs survive restarts;
+                without it, anchored batches live only in the bounded cache
+            load: Returns a persisted batch, as a dictionary, by batch ID
+            locate: Returns the ID of the batch holding a task ID's record
+            window_seconds: Lifetime of the shared time-window batch
+            keyed_max_age_seconds: Lifetime of a keyed batch that is never sealed explicitly
+            max_batch_size: Records per batch before it is sealed early
+            max_cached_batches: Anchored batches kept in memory for proofs
+            retry_base_seconds: Delay before retrying a failed batch, doubled per attempt
+            retry_max_seconds: Longest delay between retries
+        """
+        self._anchor = anchor
+        self._persist = persist
+        self._load = load
+        self._locate = locate
+        self.window_seconds = window_seconds
+        self.keyed_max_age_seconds = keyed_max_age_seconds
+        self.max_batch_size = max_batch_size
+        self.max_cached_batches = max_cached_batches
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+
+        self._lock = threading.Lock()
+        self._open: Dict[Optional[str], AnchorBatch] = {}
+        # Open batches and sealed ones not yet anchored and persisted
+        self._batches: Dict[str, AnchorBatch] = {}
+        self._locations: Dict[str, Tuple[str, int]] = {}  # task_id -> (batch_id, leaf index)
+        # Failed batches waiting for their next attempt
+        self._retrying: Dict[str, AnchorBatch] = {}
+        self._cached: "OrderedDict[str, AnchorBatch]" = OrderedDict()
+        self._sealed: "queue.Queue[AnchorBatch]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+
+        self.records_added = 0
+        self.batches_anchored = 0
+        self.anchor_failures = 0
+
+    def add(self, task_id: str, data_hash: str, batch_key: Optional[str] = None) -> str:
+        """
+        Add a record hash to the open batch for a key.
+
+        Args:
+            task_id: The task ID of the record
+            data_hash: Hex SHA-256 of the record data
+            batch_key: Group records by this key (e.g. a chain ID) instead of time window
+
+        Returns:
+            ID of the batch the record joined
+        """
+        with self._lock:
+            self._ensure_started()
+            batch = self._open.get(batch_key)
+            if batch is None:
+                batch = self._open[batch_key] = AnchorBatch(batch_key)
+                self._batches[batch.id] = batch
+            self._locations[task_id] = (batch.id, len(batch.data_hashes))
+            batch.task_ids.append(task_id)
+            batch.data_hashes.append(data_hash)
+            self.records_added += 1
+
+            if len(batch.data_hashes) >= self.max_batch_size:
+                self._seal_locked(batch_key)
+            return batch.id
+
+    def seal(self, batch_key: Optional[str] = None) -> Optional[str]:
+        """
+        Seal the open batch for a key and queue its root for anchoring.
+
+        Args:
+            batch_key: The batch key, or None for the time-window batch
+
+        Returns:
+            The batch ID, or None if no batch was open
+        """
+        with self._lock:
+            return self._seal_locked(batch_key)
+
+    def _seal_locked(self, batch_key: Optional[str]) -> Optional[str]:
+        batch = self._open.pop(batch_key, None)
+        if batch is None:
+            return None
+        batch.seal()
+        self._sealed.put(batch)
+        return batch.id
+
+    def _run_anchorer(self) -> None:
+        """Anchor sealed batches one at a time."""
+        while True:
+            batch = self._sealed.get()
+            try:
+                self._anchor_batch(batch)
+            except Exception as e:
+                print(f"Failed to anchor batch {batch.id}, attempt {batch.attempts + 1}: {e}")
+                self._schedule_retry(batch)
+            else:
+                with self._lock:
+                    self._release_locked(batch)
+            finally:
+                self._sealed.task_done()
+
+    def _anchor_batch(self, batch: AnchorBatch) -> None:
+        # A batch anchored before its persist failed is not anchored twice
+        if batch.tx_hash is None:
+            batch.tx_hash = self._anchor(batch.tree.root, batch)
+            batch.anchored_at = time.time()
+            self.batches_anchored += 1
+        if self._persist is not None:
+            self._persist(batch)
+        batch.persisted = True
+
+    def _schedule_retry(self, batch: AnchorBatch) -> None:
+        """Keep a failed batch, and its records' locations, until a retry succeeds."""
+        delay = min(self.retry_base_seconds * 2 ** batch.attempts, self.retry_max_seconds)
+        batch.attempts += 1
+        batch.retry_at = time.time() + delay
+        self.anchor_failures += 1
+        with self._lock:
+            self._retrying[batch.id] = batch
+
+    def _release_locked(self, batch: AnchorBatch) -> None:
+        """Move an anchored, persisted batch from the working set to the cache."""
+        self._retrying.pop(batch.id, None)
+        self._batches.pop(batch.id, None)
+        for task_id in batch.task_ids:
+            location = self._locations.get(task_id)
+            if location is not None and location[0] == batch.id:
+                del self._locations[task_id]
+        self._cache_locked(batch)
+
+    def _cache_locked(self, batch: AnchorBatch) -> None:
+        self._cached[batch.id] = batch
+        self._cached.move_to_end(batch.id)
+        while len(self._cached) > self.max_cached_batches:
+            self._cached.popitem(last=False)
+
+    def _requeue_locked(self, now: Optional[float] = None) -> int:
+        """Queue failed batches whose retry is due (all of them if now is None)."""
+        due = [batch for batch in self._retrying.values() if now is None or batch.retry_at <= now]
+        for batch in due:
+            del self._retrying[batch.id]
+            self._sealed.put(batch)
+        return len(due)
+
+    def seal_due(self) -> int:
+        """
+        Seal every open batch that has outlived its window, and queue failed
+        batches whose retry is due.
+
+        Returns:
+            Number of batches sealed
+        """
+        now = time.time()
+        with self._lock:
+            due = [
+                key for key, batch in self._open.items()
+                if now - batch.created_at >= (self.window_seconds if key is None else self.keyed_max_age_seconds)
+            ]
+            for key in due:
+                self._seal_locked(key)
+            self._requeue_locked(now)
+        return len(due)
+
+    def flush(self) -> None:
+        """
+        Seal all open batches and wait for their anchors.
+
+        Failed batches get one more attempt. Those still unanchored are
+        persisted without a tx hash, so their records keep an inclusion
+        proof across a restart, and stay queued for retry.
+        """
+        with self._lock:
+            for key in list(self._open):
+                self._seal_locked(key)
+            self._requeue_locked()
+        if not self._threads:
+            return
+        self._sealed.join()
+        with self._lock:
+            unpersisted = [batch for batch in self._retrying.values() if not batch.persisted]
+        for batch in unpersisted:
+            if self._persist is None:
+                break
+            try:
+                self._persist(batch)
+                batch.persisted = True
+            except Exception as e:
+                print(f"Failed to persist unanchored batch {batch.id}: {e}")
+
+    def _ensure_started(self) -> None:
+        """Start the sealing and anchoring threads; caller holds the lock."""
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._tick, name="merkle-anchor-ticker", daemon=True),
+                threading.Thread(target=self._run_anchorer, name="merkle-anchor", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _tick(self) -> None:
+        interval = max(min(self.window_seconds / 2, 1.0), 0.05)
+        while True:
+            time.sleep(interval)
+            self.seal_due()
+
+    def _stored_batch(self, task_id: str, batch_id: Optional[str]) -> Optional[AnchorBatch]:
+        """Find the anchored batch holding a record: cached, or read back from storage."""
+        if batch_id is None and self._locate is not None:
+            batch_id = self._locate(task_id)
+        if batch_id is None:
+            return None
+        with self._lock:
+            batch = self._batches.get(batch_id) or self._cached.get(batch_id)
+            if batch is not None:
+                if batch.id in self._cached:
+                    self._cached.move_to_end(batch.id)
+                return batch
+        data = self._load(batch_id) if self._load is not None else None
+        if data is None:
+            return None
+        batch = AnchorBatch.from_dict(data)
+        with self._lock:
+            self._cache_locked(batch)
+        return batch
+
+    def prove(self, task_id: str, batch_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the inclusion proof for a record.
+
+        Args:
+            task_id: The task ID of the record
+            batch_id: The batch the record joined, if the caller kept it;
+                otherwise found with locate once the batch is anchored
+
+        Returns:
+            Proof with batch_id, root, anchor tx and Merkle path; None if the
+            record is unknown. Records in a still-open batch have no path yet.
+        """
+        with self._lock:
+            location = self._locations.get(task_id)
+            if location is not None:
+                batch = self._batches[location[0]]
+                index = location[1]
+                if not batch.sealed:
+                    return {"batch_id": batch.id, "anchored": False, "data_hash": batch.data_hashes[index]}
+        if location is None:
+            batch = self._stored_batch(task_id, batch_id)
+            index = batch.leaf_index(task_id) if batch is not None else None
+            if index is None:
+                return None
+
+        proof = batch.tree.proof(index)
+        proof.update({
+            "batch_id": batch.id,
+            "root": batch.tree.root,
+            "data_hash": batch.data_hashes[index],
+            "anchor_tx": batch.tx_hash,
+            "anchored": batch.tx_hash is not None,
+        })
+        return proof
+
+    @staticmethod
+    def check(data_hash: str, proof: Dict[str, Any]) -> bool:
+        """
+        Check that a data hash is included under a proof's root.
+
+        Args:
+            data_hash: Hex SHA-256 of the record data
+            proof: Proof from prove()
+
+        Returns:
+            Whether the proof is valid for the hash
+        """
+        if "siblings" not in proof:
+            return False
+        return verify_proof(leaf_hash(data_hash), proof, proof["root"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Anchoring counters."""
+        return {
+            "records": self.records_added,
+            "batches_anchored": self.batches_anchored,
+            "open_batches": len(self._open),
+            "batches_in_memory": len(self._batches),
+            "cached_batches": len(self._cached),
+            "retrying_batches": len(self._retrying),
+            "anchor_failures": self.anchor_failures,
+        }
@@ -1,81 +1,261 @@
 """
 Blockchain service for decision tracking and smart contract interaction.
 """
+import atexit
 import json
-import hashlib
+import threading
 import time
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from web3 import Web3
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 
 from app.core.config import settings
+from app.services.anchoring import ANCHOR_RECORD_PREFIX, AnchorBatch, MerkleAnchorer, anchor_journal_record
+from app.services.chain_anchor import ChainAnchor
+from app.services.decision_journal import DecisionJournal, PendingTx
+from app.services.retention import RetentionManager, RetentionPolicy
+from app.services.verification import HASH_ALG, RecordVerifier
+from app.utils.hashing import encode_and_hash, sha256_hex
 
 class BlockchainService:
     """Service for blockchain interactions."""
     
     def __init__(self):
-        """Initialize blockchain service."""
+        """
+        Initialize blockchain service.
+        
+        Does no I/O: storage is created on first write, and the Web3
+        provider is probed in the background once start() is called.
+        Until a probe succeeds the service runs in simulation mode.
+        """
         self.simulation_mode = True
         self.storage_dir = os.path.join(os.getcwd(), "blockchain_sim")
-        os.makedirs(self.storage_dir, exist_ok=True)
+        self.journal = DecisionJournal(
+            os.path.join(self.storage_dir, "journal"),
+            segment_max_bytes=settings.DECISION_JOURNAL_SEGMENT_BYTES,
+            batch_size=settings.DECISION_JOURNAL_BATCH_SIZE,
+            flush_interval=settings.DECISION_JOURNAL_FLUSH_INTERVAL_MS / 1000,
+            fsync=settings.DECISION_JOURNAL_FSYNC,
+            fsync_interval=settings.DECISION_JOURNAL_FSYNC_INTERVAL_SECONDS,
+            compact_interval=settings.DECISION_JOURNAL_COMPACT_INTERVAL_SECONDS,
+            bucket_seconds=settings.RETENTION_BUCKET_SECONDS,
+        )
+        # Anchored batches prove records in every tier, so they never expire
+        ttl_seconds = {ANCHOR_RECORD_PREFIX: None, **settings.RETENTION_TTL_SECONDS}
+        self.retention = RetentionManager(
+            self.journal,
+            RetentionPolicy(ttl_seconds, settings.RETENTION_DEFAULT_TTL_SECONDS),
+            hot_seconds=settings.RETENTION_HOT_SECONDS,
+            archive_after_seconds=settings.RETENTION_ARCHIVE_AFTER_SECONDS,
+            archive_dir=settings.RETENTION_ARCHIVE_DIR,
+            max_io_bytes_per_second=settings.RETENTION_MAX_IO_BYTES_PER_SECOND,
+            interval=settings.RETENTION_INTERVAL_SECONDS,
+            legacy_dir=self.storage_dir,
+        )
+        self.anchorer = MerkleAnchorer(
+            anchor=self._anchor_root,
+            persist=self._persist_batch,
+            load=self._load_batch,
+            locate=self._locate_batch,
+            window_seconds=settings.ANCHOR_BATCH_WINDOW_SECONDS,
+            keyed_max_age_seconds=settings.ANCHOR_CHAIN_MAX_AGE_SECONDS,
+            max_batch_size=settings.ANCHOR_MAX_BATCH_SIZE,
+            max_cached_batches=settings.ANCHOR_CACHED_BATCHES,
+            retry_base_seconds=settings.ANCHOR_RETRY_BASE_SECONDS,
+            retry_max_seconds=settings.ANCHOR_RETRY_MAX_SECONDS,
+        )
+        self.verifier = RecordVerifier(self._stored_hash, max_workers=settings.VERIFICATION_MAX_WORKERS)
+        
+        self.w3: Optional[Web3] = None
+        self.chain_anchor: Optional[ChainAnchor] = None
+        
+        # Background provider probing
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stop_probing = threading.Event()
+        self.last_probe_at: Optional[float] = None
+        self.last_probe_error: Optional[str] = None
+        self.mode_changed_at: Optional[float] = None
+    
+    def start(self) -> None:
+        """Start probing the Web3 provider and decision log retention in the background."""
+        if settings.RETENTION_ENABLED:
+            self.retention.start()
+        if not settings.WEB3_PROVIDER_URI or self._probe_thread is not None:
+            return
+        self._stop_probing.clear()
+        self._probe_thread = threading.Thread(target=self._run_probe, name="web3-probe", daemon=True)
+        self._probe_thread.start()
+    
+    def stop(self) -> None:
+        """Stop probing the Web3 provider and decision log retention."""
+        self.retention.stop()
+        self._stop_probing.set()
+        self._probe_thread = None
+    
+    def _run_probe(self) -> None:
+        """Probe the provider now and then periodically until stopped."""
+        while not self._stop_probing.is_set():
+            self.probe()
+            self._stop_probing.wait(settings.WEB3_PROBE_INTERVAL_SECONDS)
+    
+    def probe(self) -> bool:
+        """
+        Check the Web3 provider and switch between chain and simulation mode.
+        
+        Returns:
+            Whether the provider is reachable
+        """
+        connected = False
+        error = None
+        try:
+            if self.w3 is None:
+                self.w3 = Web3(Web3.HTTPProvider(
+                    settings.WEB3_PROVIDER_URI,
+                    request_kwargs={"timeout": settings.WEB3_PROBE_TIMEOUT_SECONDS},
+                ))
+            connected = self.w3.is_connected()
+        except Exception as e:
+            error = str(e)
+        
+        self.last_probe_at = time.time()
+        self.last_probe_error = error
+        if connected and self.chain_anchor is None:
+            self.chain_anchor = ChainAnchor(
+                settings.WEB3_PROVIDER_URI,
+                private_key=settings.ANCHOR_PRIVATE_KEY,
+                max_in_flight=settings.ANCHOR_MAX_IN_FLIGHT,
+                receipt_poll_interval=settings.ANCHOR_RECEIPT_POLL_SECONDS,
+                receipt_batch_size=settings.ANCHOR_RECEIPT_BATCH_SIZE,
+                price_multiplier=settings.ANCHOR_GAS_PRICE_MULTIPLIER,
+                max_priority_fee_wei=int(settings.ANCHOR_MAX_PRIORITY_FEE_GWEI * 10 ** 9),
+            )
         
-        # Try to connect to Web3 provider if configured
-        if settings.WEB3_PROVIDER_URI:
-            try:
-                self.w3 = Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URI))
-                if self.w3.is_connected():
-                    self.simulation_mode = False
-            except Exception as e:
-                print(f"Failed to connect to Web3 provider: {e}")
-                print("Falling back to simulation mode")
+        if connected == self.simulation_mode:
+            self.simulation_mode = not connected
+            self.mode_changed_at = self.last_probe_at
+            if connected:
+                print(f"Connected to Web3 provider at {settings.WEB3_PROVIDER_URI}")
+            else:
+                print(f"Web3 provider unavailable ({error or 'not connected'}); using simulation mode")
+        return connected
     
-    def log_decision(self, task_id: str, data: Dict[str, Any]) -> str:
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the current mode and provider probe state.
+        
+        Returns:
+            Dictionary with mode, provider URI, probe timestamps and last error
+        """
+        return {
+            "mode": "simulation" if self.simulation_mode else "chain",
+            "provider_uri": settings.WEB3_PROVIDER_URI,
+            "probing": self._probe_thread is not None,
+            "last_probe_at": self.last_probe_at,
+            "last_probe_error": self.last_probe_error,
+            "mode_changed_at": self.mode_changed_at,
+        }
+    
+    def log_decision(self, task_id: str, data: Dict[str, Any], batch_key: Optional[str] = None,
+                     encoded: Optional[Tuple[bytes, str]] = None) -> str:
         """
         Log a decision to blockchain or simulation.
         
+        The record's hash joins a Merkle batch; only the batch root is
+        anchored, once the batch is sealed.
+        
         Args:
             task_id: The ID of the task
             data: The data to log
+            batch_key: Batch with other records under this key (e.g. a
+                thought chain ID) instead of by time window
+            encoded: Result of encode_and_hash(data), if the caller has it
             
         Returns:
-            Transaction hash
+            Transaction hash; in simulation mode a PendingTx that can be
+            waited on until the record is in the journal
         """
         if self.simulation_mode:
-            return self._simulate_log_decision(task_id, data)
+            return self._simulate_log_decision(task_id, data, batch_key, encoded)
         else:
-            return self._blockchain_log_decision(task_id, data)
+            return self._blockchain_log_decision(task_id, data, batch_key, encoded)
     
-    def _simulate_log_decision(self, task_id: str, data: Dict[str, Any]) -> str:
+    def _simulate_log_decision(self, task_id: str, data: Dict[str, Any], batch_key: Optional[str] = None,
+                               encoded: Optional[Tuple[bytes, str]] = None) -> PendingTx:
         """Simulate logging a decision to blockchain."""
-        # Convert data to JSON
-        data_json = json.dumps(data, default=str)
-        
-        # Create a hash
-        data_hash = hashlib.sha256(data_json.encode()).hexdigest()
+        # Hash the canonical JSON encoding, independent of key order; the
+        # journal writes the same encoding rather than producing another
+        data_json, data_hash = encoded or encode_and_hash(data)
+        batch_id = self.anchorer.add(task_id, data_hash, batch_key)
         
         # Create record with metadata
         record = {
             "task_id": task_id,
             "timestamp": time.time(),
             "data_hash": data_hash,
+            "hash_alg": HASH_ALG,
             "data": data,
-            "tx_hash": f"sim_{data_hash[:16]}"  # Simulated transaction hash
+            "tx_hash": f"sim_{data_hash[:16]}",  # Simulated transaction hash
+            "batch_id": batch_id  # Where its proof is found once the batch is anchored
         }
         
-        # Save to file
-        filename = os.path.join(self.storage_dir, f"{task_id}.json")
-        with open(filename, 'w') as f:
-            json.dump(record, f, default=str, indent=2)
-            
-        return record["tx_hash"]
+        # Hand off to the journal's background writer
+        seq = self.journal.append(task_id, record, encoded={"data": data_json})
+        
+        return PendingTx(record["tx_hash"], self.journal, seq)
     
-    def _blockchain_log_decision(self, task_id: str, data: Dict[str, Any]) -> str:
+    def _blockchain_log_decision(self, task_id: str, data: Dict[str, Any], batch_key: Optional[str] = None,
+                                 encoded: Optional[Tuple[bytes, str]] = None) -> str:
         """Log a decision to actual blockchain."""
-        # This would be implemented with actual blockchain contract calls
-        # For now, we'll just simulate
-        return self._simulate_log_decision(task_id, data)
+        # Records stay in the journal; only batch roots go on chain
+        return self._simulate_log_decision(task_id, data, batch_key, encoded)
+    
+    def seal_batch(self, batch_key: str) -> Optional[str]:
+        """
+        Seal the batch for a key now and anchor its root.
+        
+        Args:
+            batch_key: The batch key passed to log_decision
+            
+        Returns:
+            The batch ID, or None if no batch was open
+        """
+        return self.anchorer.seal(batch_key)
+    
+    def _anchor_root(self, root: str, batch: AnchorBatch) -> str:
+        """Anchor a Merkle root to blockchain or simulation."""
+        if self.simulation_mode:
+            return f"sim_{root[:16]}"
+        # Returns once sent; the receipt is polled in the background
+        return self.chain_anchor.anchor_sync(root, len(batch.data_hashes))
+    
+    def anchoring_stats(self) -> Dict[str, Any]:
+        """
+        Get Merkle batching and on-chain anchoring counters.
+        
+        Returns:
+            Dictionary with batch counters and, in chain mode, transaction
+            counters and anchored records per second
+        """
+        stats = {"mode": "simulation" if self.simulation_mode else "chain", "batches": self.anchorer.stats()}
+        if self.chain_anchor is not None:
+            stats["chain"] = self.chain_anchor.stats()
+        return stats
+    
+    def _persist_batch(self, batch: AnchorBatch) -> None:
+        """Store an anchored batch in the journal so proofs survive restarts."""
+        self.journal.append(*anchor_journal_record(batch))
+    
+    def _load_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Read a persisted batch back from the journal or its colder tiers."""
+        record = self.journal.read(f"{ANCHOR_RECORD_PREFIX}{batch_id}")
+        return record["data"] if record is not None else None
+    
+    def _locate_batch(self, task_id: str) -> Optional[str]:
+        """Get the batch a logged record joined, from the record itself."""
+        record = self.journal.read(task_id)
+        return record.get("batch_id") if record is not None else None
     
     def verify_record(self, task_id: str, data: Dict[str, Any]) -> bool:
         """
@@ -88,28 +268,81 @@ class BlockchainService:
         Returns:
             Whether the record is valid
         """
-        if self.simulation_mode:
-            return self._simulate_verify_record(task_id, data)
-        else:
-            return self._blockchain_verify_record(task_id, data)
+        return self.verify_record_proof(task_id, data)["verified"]
     
-    def _simulate_verify_record(self, task_id: str, data: Dict[str, Any]) -> bool:
-        """Simulate verification of blockchain record."""
-        filename = os.path.join(self.storage_dir, f"{task_id}.json")
+    def verify_record_proof(self, task_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Verify a record and check its inclusion in an anchored Merkle root.
         
-        if not os.path.exists(filename):
-            return False
+        Args:
+            task_id: The ID of the task
+            data: The data to verify
             
-        # Load stored record
-        with open(filename, 'r') as f:
-            record = json.load(f)
+        Returns:
+            Dictionary with "verified", the record's "data_hash", "anchored",
+            and the compact inclusion "proof" (batch_id, root, anchor_tx,
+            leaf_index, tree_size, siblings) or None if the record is not in
+            a sealed batch yet
+        """
+        data_hash = self.verifier.match(task_id, data)
+        matches = data_hash is not None
+        if data_hash is None:
+            data_hash = sha256_hex(data)
+        
+        proof = self.anchorer.prove(task_id)
+        if proof is not None and proof["data_hash"] != data_hash:
+            # The batched hash is from an older version of the record
+            proof = None
+        if proof is None or "siblings" not in proof:
+            return {"verified": matches, "data_hash": data_hash, "anchored": False, "proof": None}
+        
+        included = self.anchorer.check(data_hash, proof)
+        return {
+            "verified": matches and included,
+            "data_hash": data_hash,
+            "anchored": proof["anchored"],
+            "proof": {
+                "batch_id": proof["batch_id"],
+                "root": proof["root"],
+                "anchor_tx": proof["anchor_tx"],
+                "leaf_index": proof["leaf_index"],
+                "tree_size": proof["tree_size"],
+                "siblings": proof["siblings"],
+            },
+        }
+    
+    def verify_records(self, records: List[Tuple[str, Dict[str, Any]]], executor: str = "thread") -> Dict[str, Any]:
+        """
+        Verify many records in one call.
+        
+        Args:
+            records: (task_id, data) pairs
+            executor: "thread" or "process" pool for hashing
             
-        # Convert current data to JSON and hash
-        data_json = json.dumps(data, default=str)
-        current_hash = hashlib.sha256(data_json.encode()).hexdigest()
+        Returns:
+            Per-record results, counts and throughput (see RecordVerifier.verify_many)
+        """
+        return self.verifier.verify_many(records, executor)
+    
+    def _stored_hash(self, task_id: str) -> Optional[str]:
+        """Get the stored data hash for a task ID from the journal or its colder tiers."""
+        stored_hash = self.journal.lookup(task_id)
+        if stored_hash is not None:
+            return stored_hash
         
-        # Compare with stored hash
-        return record["data_hash"] == current_hash
+        # Records written before the journal live in one file each until
+        # retention folds them in
+        filename = os.path.join(self.storage_dir, f"{task_id}.json")
+        try:
+            with open(filename, 'r') as f:
+                return json.load(f)["data_hash"]
+        except FileNotFoundError:
+            # Folded in since the journal lookup, or never written
+            return self.journal.lookup(task_id)
+    
+    def _simulate_verify_record(self, task_id: str, data: Dict[str, Any]) -> bool:
+        """Simulate verification of blockchain record."""
+        return self.verifier.verify(task_id, data)
     
     def _blockchain_verify_record(self, task_id: str, data: Dict[str, Any]) -> bool:
         """Verify a record against actual blockchain."""
@@ -137,8 +370,8 @@ class BlockchainService:
             "created_at": time.time()
         }
         
-        # In simulation mode, just log the contract
-        contract_id = f"contract_{hashlib.sha256(json.dumps(contract_data, default=str).encode()).hexdigest()[:16]}"
+        # The ID hashes the terms; the logged record carries it as well
+        contract_id = f"contract_{sha256_hex(contract_data)[:16]}"
         contract_data["contract_id"] = contract_id
         
         # Log contract creation
@@ -148,3 +381,5 @@ class BlockchainService:
 
 # Create singleton instance
 blockchain_service = BlockchainService()
+atexit.register(blockchain_service.journal.close)
+atexit.register(blockchain_service.anchorer.flush)
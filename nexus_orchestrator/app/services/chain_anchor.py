@@ -0,0 +1,300 @@
+"""
+Asynchronous anchoring of Merkle roots on an Ethereum-compatible chain.
+
+Roots are sent as calldata of zero-value transactions. Nonces are assigned
+locally, so transactions are pipelined without waiting for each receipt;
+receipts are polled in the background in batches. Works against a local
+dev chain (anvil, hardhat, eth-tester) with unlocked accounts, or with a
+private key for signing locally.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.exceptions import TransactionNotFound
+from web3.providers.async_rpc import AsyncHTTPProvider
+
+
+def calldata_gas(data: bytes) -> int:
+    """Intrinsic gas of a plain transaction carrying calldata."""
+    return 21000 + sum(16 if byte else 4 for byte in data)
+
+
+class NonceManager:
+    """Hands out consecutive nonces for one account without chain round trips."""
+
+    def __init__(self, w3: AsyncWeb3, address: str):
+        self.w3 = w3
+        self.address = address
+        self._next: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def next(self) -> int:
+        """Reserve the next nonce, seeding from the chain on first use."""
+        async with self._lock:
+            if self._next is None:
+                self._next = await self.w3.eth.get_transaction_count(self.address, "pending")
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    async def resync(self) -> None:
+        """Reseed from the chain, e.g. after a rejected transaction left a gap."""
+        async with self._lock:
+            self._next = await self.w3.eth.get_transaction_count(self.address, "pending")
+
+
+class GasStrategy:
+    """
+    Fee parameters for anchoring transactions.
+
+    Uses EIP-1559 fees when the chain reports a base fee, and a multiplied
+    legacy gas price otherwise. Quotes are cached briefly so pipelined sends
+    don't each pay for fee lookups.
+    """
+
+    def __init__(self, w3: AsyncWeb3, price_multiplier: float = 1.25,
+                 max_priority_fee_wei: int = 2 * 10 ** 9, refresh_seconds: float = 2.0):
+        self.w3 = w3
+        self.price_multiplier = price_multiplier
+        self.max_priority_fee_wei = max_priority_fee_wei
+        self.refresh_seconds = refresh_seconds
+        self._quote: Optional[Dict[str, int]] = None
+        self._quoted_at = 0.0
+
+    async def fees(self) -> Dict[str, int]:
+        """Get fee fields to merge into a transaction."""
+        if self._quote is not None and time.monotonic() - self._quoted_at < self.refresh_seconds:
+            return self._quote
+
+        block = await self.w3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is not None:
+            try:
+                tip = await self.w3.eth.max_priority_fee
+            except Exception:
+                tip = self.max_priority_fee_wei
+            tip = min(tip, self.max_priority_fee_wei)
+            # Room for the base fee to double before the transaction is priced out
+            quote = {"maxPriorityFeePerGas": tip, "maxFeePerGas": 2 * base_fee + tip}
+        else:
+            quote = {"gasPrice": int(await self.w3.eth.gas_price * self.price_multiplier)}
+
+        self._quote = quote
+        self._quoted_at = time.monotonic()
+        return quote
+
+
+class ChainAnchor:
+    """
+    Pipelined root anchoring with background receipt polling.
+
+    Runs its own event loop on a daemon thread, so it can be called from the
+    synchronous Merkle anchoring worker as well as from async code.
+    """
+
+    def __init__(self, provider_uri: str, private_key: Optional[str] = None,
+                 max_in_flight: int = 64, receipt_poll_interval: float = 0.5,
+                 receipt_batch_size: int = 32, receipt_timeout: float = 120.0,
+                 price_multiplier: float = 1.25, max_priority_fee_wei: int = 2 * 10 ** 9):
+        """
+        Initialize the anchor. No connection is made until the first send.
+
+        Args:
+            provider_uri: HTTP JSON-RPC endpoint
+            private_key: Sign locally with this key; otherwise the node's first
+                unlocked account sends
+            max_in_flight: Unconfirmed transactions before sends wait
+            receipt_poll_interval: Seconds between receipt polls
+            receipt_batch_size: Receipts requested concurrently per poll
+            receipt_timeout: Seconds before an unconfirmed transaction is dropped
+            price_multiplier: Multiplier on the legacy gas price
+            max_priority_fee_wei: Cap on the EIP-1559 priority fee
+        """
+        self.provider_uri = provider_uri
+        self.private_key = private_key
+        self.max_in_flight = max_in_flight
+        self.receipt_poll_interval = receipt_poll_interval
+        self.receipt_batch_size = receipt_batch_size
+        self.receipt_timeout = receipt_timeout
+        self.price_multiplier = price_multiplier
+        self.max_priority_fee_wei = max_priority_fee_wei
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self.w3: Optional[AsyncWeb3] = None
+        self.address: Optional[str] = None
+        self._chain_id: Optional[int] = None
+        self._nonces: Optional[NonceManager] = None
+        self._gas: Optional[GasStrategy] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        # tx hash -> (records in the batch, sent at)
+        self._in_flight: Dict[str, tuple] = {}
+
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.records_anchored = 0
+        self._first_sent_at: Optional[float] = None
+        self._last_confirmed_at: Optional[float] = None
+
+    # Event loop thread
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_loop, name="chain-anchor", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        return self._loop
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._connect_lock = asyncio.Lock()
+        self._loop.create_task(self._poll_receipts())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, root: str, records: int = 1) -> Future:
+        """
+        Send a root from any thread.
+
+        Returns:
+            Future resolving to the transaction hash once it is sent
+        """
+        return asyncio.run_coroutine_threadsafe(self._send(root, records), self._ensure_loop())
+
+    def anchor_sync(self, root: str, records: int = 1) -> str:
+        """Send a root and wait for the transaction hash, not the receipt."""
+        return self.submit(root, records).result()
+
+    async def anchor(self, root: str, records: int = 1) -> str:
+        """Send a root from async code and await the transaction hash."""
+        return await asyncio.wrap_future(self.submit(root, records))
+
+    # Sending
+
+    async def _connect(self) -> None:
+        async with self._connect_lock:
+            if self.w3 is not None:
+                return
+            w3 = AsyncWeb3(AsyncHTTPProvider(self.provider_uri))
+            if self.private_key:
+                address = Account.from_key(self.private_key).address
+            else:
+                accounts = await w3.eth.accounts
+                if not accounts:
+                    raise RuntimeError("No unlocked account to anchor from; set a private key")
+                address = accounts[0]
+            self._chain_id = await w3.eth.chain_id
+            self._nonces = NonceManager(w3, address)
+            self._gas = GasStrategy(w3, self.price_multiplier, self.max_priority_fee_wei)
+            self.address = address
+            self.w3 = w3
+
+    async def _send(self, root: str, records: int) -> str:
+        await self._connect()
+        await self._slots.acquire()
+        try:
+            tx_hash = await self._send_once(root)
+        except Exception:
+            # The nonce may not have been consumed; reseed and retry once
+            await self._nonces.resync()
+            try:
+                tx_hash = await self._send_once(root)
+            except Exception:
+                self._slots.release()
+                self.failed += 1
+                raise
+
+        now = time.monotonic()
+        self._in_flight[tx_hash] = (records, now)
+        self.sent += 1
+        if self._first_sent_at is None:
+            self._first_sent_at = now
+        return tx_hash
+
+    async def _send_once(self, root: str) -> str:
+        data = bytes.fromhex(root)
+        tx: Dict[str, Any] = {
+            "from": self.address,
+            "to": self.address,
+            "value": 0,
+            "data": "0x" + root,
+            "gas": calldata_gas(data),
+            "nonce": await self._nonces.next(),
+            "chainId": self._chain_id,
+        }
+        tx.update(await self._gas.fees())
+
+        if self.private_key:
+            signed = Account.sign_transaction(tx, self.private_key)
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            tx_hash = await self.w3.eth.send_raw_transaction(raw)
+        else:
+            tx_hash = await self.w3.eth.send_transaction(tx)
+        return AsyncWeb3.to_hex(tx_hash)
+
+    # Receipts
+
+    async def _poll_receipts(self) -> None:
+        while True:
+            await asyncio.sleep(self.receipt_poll_interval)
+            if not self._in_flight or self.w3 is None:
+                continue
+            hashes = list(self._in_flight)[:self.receipt_batch_size]
+            receipts = await asyncio.gather(
+                *(self.w3.eth.get_transaction_receipt(tx_hash) for tx_hash in hashes),
+                return_exceptions=True,
+            )
+            now = time.monotonic()
+            for tx_hash, receipt in zip(hashes, receipts):
+                records, sent_at = self._in_flight[tx_hash]
+                if isinstance(receipt, TransactionNotFound):
+                    if now - sent_at < self.receipt_timeout:
+                        continue
+                    print(f"Anchor transaction {tx_hash} not mined after {self.receipt_timeout}s")
+                    self.failed += 1
+                elif isinstance(receipt, Exception):
+                    print(f"Failed to get receipt for {tx_hash}: {receipt}")
+                    continue
+                elif receipt["status"] == 1:
+                    self.confirmed += 1
+                    self.records_anchored += records
+                    self._last_confirmed_at = now
+                else:
+                    print(f"Anchor transaction {tx_hash} reverted")
+                    self.failed += 1
+                del self._in_flight[tx_hash]
+                self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Anchoring throughput.
+
+        Returns:
+            Transactions sent, confirmed, failed and in flight, records
+            anchored, and confirmed records per second since the first send
+        """
+        elapsed = 0.0
+        if self._first_sent_at is not None and self._last_confirmed_at is not None:
+            elapsed = self._last_confirmed_at - self._first_sent_at
+        return {
+            "address": self.address,
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+            "records_anchored": self.records_anchored,
+            "records_per_second": self.records_anchored / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,569 @@
+"""
+Append-only, segmented journal for decision records.
+
+Records are queued by the caller and written in batches by a background
+writer thread, so logging a decision never blocks on disk. Each record is
+one JSON line in the current segment file; segments rotate at a size
+threshold and closed segments are periodically compacted down to the
+latest record per task ID. An in-memory offset index maps each task ID to
+its record for verification. With time buckets, segments also rotate when
+the bucket changes, so retention can roll whole buckets into colder tiers;
+lookups fall through to those tiers when a record is no longer hot.
+
+Callers may enqueue out of sequence order, so durability is tracked as the
+highest sequence number below which every record has been resolved. A batch
+that cannot be written is retried a few times; after that its records are
+failed, and waiting on them raises JournalWriteError instead of hanging.
+"""
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.serialization import dumps, loads
+
+SEGMENT_SUFFIX = ".journal"
+
+FSYNC_POLICIES = ("always", "batch", "interval", "never")
+
+# Failed sequence numbers remembered for their waiters
+MAX_FAILED_RECORDS = 100_000
+
+
+class JournalWriteError(RuntimeError):
+    """Raised when waiting on a record that could not be written."""
+
+
+def segment_number(name: str) -> int:
+    """Sequence number of a segment from its file name."""
+    return int(name.split(".", 1)[0])
+
+
+class PendingTx(str):
+    """
+    Transaction hash for a record that may not be on disk yet.
+
+    Behaves as the plain hash string, and can be waited on for durability.
+    """
+
+    def __new__(cls, tx_hash: str, journal: "DecisionJournal", seq: int):
+        handle = super().__new__(cls, tx_hash)
+        handle._journal = journal
+        handle._seq = seq
+        return handle
+
+    def done(self) -> bool:
+        """Whether the record has been written to the journal."""
+        return self._journal.durable_seq >= self._seq and self._journal.write_error(self._seq) is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the record has been written to the journal.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Whether the record was written in time
+
+        Raises:
+            JournalWriteError: If the record could not be written
+        """
+        return self._journal.wait_for(self._seq, timeout)
+
+
+class DecisionJournal:
+    """Write-behind journal of decision records keyed by task ID."""
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 batch_size: int = 256, flush_interval: float = 0.05, fsync: str = "batch",
+                 fsync_interval: float = 1.0, compact_interval: float = 300.0,
+                 max_queue_size: int = 100_000, bucket_seconds: Optional[float] = None,
+                 write_retries: int = 3):
+        """
+        Initialize the journal. No I/O happens until the first record.
+
+        Args:
+            directory: Directory holding the segment files
+            segment_max_bytes: Size at which the current segment is rotated
+            batch_size: Maximum records written per batch
+            flush_interval: Seconds the writer waits to fill a batch
+            fsync: "always" (each record), "batch", "interval" or "never"
+            fsync_interval: Seconds between fsyncs under the "interval" policy
+            compact_interval: Seconds between compactions of closed segments
+            max_queue_size: Queued records before callers block
+            bucket_seconds: Also rotate segments when this time bucket changes
+            write_retries: Retries of a failed batch before its records are failed
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_interval = compact_interval
+        self.bucket_seconds = bucket_seconds
+        self.write_retries = write_retries
+        # Colder tiers holding records rolled out of closed segments (see retention)
+        self.archive = None
+        # Held while closed segments are rewritten or rolled out
+        self.maintenance_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[int, str, Dict[str, Any], Optional[Dict[str, bytes]]]]]" = queue.Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self._index: Dict[str, Tuple[str, int, int, str]] = {}  # task_id -> (segment, offset, length, data_hash)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._next_seq = 0
+        # Every record up to durable_seq is written or failed; _resolved holds those above it
+        self.durable_seq = 0
+        self._resolved: Set[int] = set()
+        self._failed: "OrderedDict[int, str]" = OrderedDict()
+        self._loaded = False
+        self._writer: Optional[threading.Thread] = None
+        self._segment_name: Optional[str] = None
+        self._segment_file = None
+        self._segment_bucket: Optional[int] = None
+        self._last_fsync = 0.0
+        self._last_compaction = time.monotonic()
+
+    # Writing
+
+    def append(self, task_id: str, record: Dict[str, Any],
+               encoded: Optional[Dict[str, bytes]] = None) -> int:
+        """
+        Queue a record for writing.
+
+        Args:
+            task_id: The task ID the record is stored under
+            record: The record; must contain "data_hash"
+            encoded: JSON encodings the caller already has for some of the
+                record's fields (e.g. from hashing), written as-is
+
+        Returns:
+            Sequence number to wait on with wait_for()
+        """
+        with self._lock:
+            self._ensure_started()
+            self._next_seq += 1
+            seq = self._next_seq
+            self._pending[task_id] = record
+        self._queue.put((seq, task_id, record, encoded))
+        return seq
+
+    def wait_for(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the record with a sequence number has been written.
+
+        Raises:
+            JournalWriteError: If the record could not be written
+        """
+        with self._durable:
+            if not self._durable.wait_for(lambda: self.durable_seq >= seq, timeout):
+                return False
+            error = self._failed.get(seq)
+        if error is not None:
+            raise JournalWriteError(f"Decision record {seq} was not written: {error}")
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything queued so far has been written or has failed.
+
+        Records that failed are reported to their own waiters; check them
+        with write_error() if the caller needs every record on disk.
+        """
+        with self._lock:
+            seq = self._next_seq
+        with self._durable:
+            return self._durable.wait_for(lambda: self.durable_seq >= seq, timeout)
+
+    def write_error(self, seq: int) -> Optional[str]:
+        """Why the record with a sequence number could not be written, or None."""
+        with self._lock:
+            return self._failed.get(seq)
+
+    def close(self) -> None:
+        """Write everything queued and stop the writer."""
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join()
+
+    def _ensure_started(self) -> None:
+        """Load the index and start the writer; caller holds the lock."""
+        if not self._loaded:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_index()
+            self._loaded = True
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run_writer, name="decision-journal", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self) -> None:
+        """Drain the queue in batches until closed."""
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_compact()
+                continue
+
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if item is None:
+                stopping = True
+
+            if batch:
+                self._write_with_retries(batch)
+            self._maybe_compact()
+
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+
+    def _write_with_retries(self, batch: List[Tuple[int, str, Dict[str, Any], Optional[Dict[str, bytes]]]]) -> None:
+        """Write a batch, retrying with backoff, and fail its records if it never succeeds."""
+        error = None
+        for attempt in range(self.write_retries + 1):
+            if attempt:
+                time.sleep(min(0.1 * 2 ** (attempt - 1), 2.0))
+            try:
+                self._write_batch(batch)
+                return
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Failed to write decision journal batch (attempt {attempt + 1}): {e}")
+
+        with self._durable:
+            for seq, task_id, record, _ in batch:
+                if self._pending.get(task_id) is record:
+                    del self._pending[task_id]
+                self._failed[seq] = error
+            while len(self._failed) > MAX_FAILED_RECORDS:
+                self._failed.popitem(last=False)
+            self._resolve(seq for seq, _, _, _ in batch)
+
+    def _resolve(self, seqs: Iterable[int]) -> None:
+        """Advance durable_seq over written or failed records; caller holds the lock."""
+        self._resolved.update(seqs)
+        while self.durable_seq + 1 in self._resolved:
+            self.durable_seq += 1
+            self._resolved.remove(self.durable_seq)
+        self._durable.notify_all()
+
+    def _abort_batch(self, start: int) -> None:
+        """Cut a failed batch's partial lines off the segment, so a retry starts clean."""
+        try:
+            self._segment_file.close()
+        except OSError:
+            pass
+        self._segment_file = None
+        try:
+            os.truncate(self._segment_path(self._segment_name), start)
+        except OSError:
+            pass
+
+    def _bucket(self, timestamp: float) -> Optional[int]:
+        return int(timestamp // self.bucket_seconds) if self.bucket_seconds else None
+
+    @staticmethod
+    def _encode(record: Dict[str, Any], encoded: Optional[Dict[str, bytes]]) -> bytes:
+        """Encode a record as one line, splicing in pre-encoded fields."""
+        if not encoded:
+            return dumps(record) + b"\n"
+        line = dumps({key: value for key, value in record.items() if key not in encoded})
+        fields = b",".join(dumps(key) + b":" + value for key, value in encoded.items())
+        return line[:-1] + (b"," if len(line) > 2 else b"") + fields + b"}\n"
+
+    def _write_batch(self, batch: List[Tuple[int, str, Dict[str, Any], Optional[Dict[str, bytes]]]]) -> None:
+        """Append a batch of records to the current segment."""
+        if self._segment_file is not None and self._bucket(time.time()) != self._segment_bucket:
+            self._segment_file.close()
+            self._segment_file = None
+        self._open_segment()
+        start = self._segment_file.tell()
+        entries = []
+        try:
+            for _, task_id, record, encoded in batch:
+                line = self._encode(record, encoded)
+                offset = self._segment_file.tell()
+                self._segment_file.write(line)
+                entries.append((task_id, record, (self._segment_name, offset, len(line), record["data_hash"])))
+                if self.fsync == "always":
+                    self._sync()
+
+            self._segment_file.flush()
+            now = time.monotonic()
+            if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                self._sync()
+        except Exception:
+            self._abort_batch(start)
+            raise
+
+        with self._durable:
+            for task_id, record, entry in entries:
+                self._index[task_id] = entry
+                if self._pending.get(task_id) is record:
+                    del self._pending[task_id]
+            self._resolve(seq for seq, _, _, _ in batch)
+
+        if self._segment_file.tell() >= self.segment_max_bytes:
+            self._segment_file.close()
+            self._segment_file = None
+
+    def _sync(self) -> None:
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _open_segment(self) -> None:
+        """Open the current segment, starting a new one after rotation."""
+        if self._segment_file is not None:
+            return
+        segments = self._segment_names()
+        bucket = self._bucket(time.time())
+        if (segments and os.path.getsize(self._segment_path(segments[-1])) < self.segment_max_bytes
+                and self._bucket(os.path.getmtime(self._segment_path(segments[-1]))) == bucket):
+            name = segments[-1]
+        else:
+            numbers = [segment_number(name) for name in segments]
+            if self.archive is not None:
+                numbers.extend(self.archive.segment_numbers())
+            name = f"{max(numbers, default=0) + 1:08d}{SEGMENT_SUFFIX}"
+        self._segment_name = name
+        self._segment_bucket = bucket
+        self._segment_file = open(self._segment_path(name), "ab")
+
+    # Reading
+
+    def _segment_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_index(self) -> None:
+        """Rebuild the offset index by scanning every segment."""
+        for name in self._segment_names():
+            with open(self._segment_path(name), "rb") as f:
+                offset = 0
+                for line in f:
+                    try:
+                        record = loads(line)
+                        self._index[record["task_id"]] = (name, offset, len(line), record["data_hash"])
+                    except (ValueError, KeyError):
+                        # Torn write at the end of a segment
+                        pass
+                    offset += len(line)
+
+    def lookup(self, task_id: str) -> Optional[str]:
+        """
+        Get the data hash recorded for a task ID.
+
+        Args:
+            task_id: The task ID
+
+        Returns:
+            The data hash, or None if no record exists
+        """
+        with self._lock:
+            if not self._loaded and os.path.isdir(self.directory):
+                self._load_index()
+                self._loaded = True
+            record = self._pending.get(task_id)
+            if record is not None:
+                return record["data_hash"]
+            entry = self._index.get(task_id)
+        if entry:
+            return entry[3]
+        return self.archive.lookup(task_id) if self.archive is not None else None
+
+    def read(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the full record for a task ID.
+
+        Args:
+            task_id: The task ID
+
+        Returns:
+            The record, or None if no record exists
+        """
+        if self.lookup(task_id) is None:
+            return None
+        with self._lock:
+            record = self._pending.get(task_id)
+            if record is not None:
+                return record
+            entry = self._index.get(task_id)
+        while entry is not None:
+            segment, offset, length, _ = entry
+            try:
+                f = open(self._segment_path(segment), "rb")
+            except FileNotFoundError:
+                # Rolled out to a colder tier since the lookup
+                break
+            with f:
+                # Compaction replaces a segment and moves its entries under the lock, so
+                # if the entry is unchanged now, the file just opened is the one it points into
+                with self._lock:
+                    current = self._index.get(task_id)
+                if current == entry:
+                    f.seek(offset)
+                    return loads(f.read(length))
+            entry = current
+        return self.archive.read(task_id) if self.archive is not None else None
+
+    def scan(self, prefix: str) -> List[Dict[str, Any]]:
+        """
+        Read the latest record of every task ID starting with a prefix.
+
+        Args:
+            prefix: Task ID prefix
+
+        Returns:
+            List of records
+        """
+        self.lookup(prefix)
+        with self._lock:
+            task_ids = set(task_id for task_id in self._index if task_id.startswith(prefix))
+            task_ids.update(task_id for task_id in self._pending if task_id.startswith(prefix))
+        if self.archive is not None:
+            task_ids.update(self.archive.task_ids(prefix))
+        return [record for record in (self.read(task_id) for task_id in task_ids) if record is not None]
+
+    # Retention support
+
+    def closed_segments(self) -> List[Tuple[str, float]]:
+        """
+        Get segments that will no longer be appended to.
+
+        The newest segment is never included, even if closed, because the
+        writer may reopen it.
+
+        Returns:
+            List of (segment name, last modified time), oldest first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return [(name, os.path.getmtime(self._segment_path(name))) for name in self._segment_names()[:-1]]
+
+    def live_entries(self, name: str) -> List[Tuple[int, int, str]]:
+        """
+        Get the records in a segment that are still the latest for their task ID.
+
+        Returns:
+            List of (offset, length, task_id), in file order
+        """
+        with self._lock:
+            return sorted(
+                (offset, length, task_id)
+                for task_id, (segment, offset, length, _) in self._index.items()
+                if segment == name
+            )
+
+    def read_segment_entries(self, name: str, entries: List[Tuple[int, int, str]]) -> List[Dict[str, Any]]:
+        """Read records at the given (offset, length, task_id) entries of a segment."""
+        records = []
+        with open(self._segment_path(name), "rb") as f:
+            for offset, length, _ in entries:
+                f.seek(offset)
+                records.append(loads(f.read(length)))
+        return records
+
+    def detach_segment(self, name: str) -> None:
+        """
+        Drop a closed segment from the hot tier once its records are elsewhere.
+
+        Caller holds maintenance_lock.
+        """
+        with self._lock:
+            for task_id in [task_id for task_id, entry in self._index.items() if entry[0] == name]:
+                del self._index[task_id]
+        os.remove(self._segment_path(name))
+
+    def segment_size(self, name: str) -> int:
+        return os.path.getsize(self._segment_path(name))
+
+    # Compaction
+
+    def _maybe_compact(self) -> None:
+        if time.monotonic() - self._last_compaction >= self.compact_interval:
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Rewrite closed segments to hold only the latest record per task ID.
+
+        Runs on the writer thread, so it never races with appends. If
+        retention holds maintenance_lock, this round is skipped rather than
+        stalling writes behind it; the next interval tries again.
+
+        Returns:
+            Number of bytes reclaimed
+        """
+        self._last_compaction = time.monotonic()
+        if not os.path.isdir(self.directory):
+            return 0
+        if not self.maintenance_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._compact_segments()
+        finally:
+            self.maintenance_lock.release()
+
+    def _compact_segments(self) -> int:
+        reclaimed = 0
+        for name in self._segment_names():
+            if name == self._segment_name and self._segment_file is not None:
+                continue
+            path = self._segment_path(name)
+            if not os.path.exists(path):
+                continue
+            live = self.live_entries(name)
+            size = os.path.getsize(path)
+            if sum(length for _, length, _ in live) == size:
+                continue
+
+            if not live:
+                os.remove(path)
+                reclaimed += size
+                continue
+
+            moved = {}
+            with open(path, "rb") as src, open(path + ".compact", "wb") as dst:
+                for offset, length, task_id in live:
+                    src.seek(offset)
+                    moved[task_id] = (dst.tell(), length)
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+            stat = os.stat(path)
+            # Swap the file and its entries together; read() relies on it
+            with self._lock:
+                os.replace(path + ".compact", path)
+                for task_id, (offset, length) in moved.items():
+                    entry = self._index.get(task_id)
+                    if entry and entry[0] == name:
+                        self._index[task_id] = (name, offset, length, entry[3])
+            # Keep the segment's age, which retention tiers it by
+            os.utime(path, (stat.st_atime, stat.st_mtime))
+            reclaimed += size - os.path.getsize(path)
+        return reclaimed
@@ -0,0 +1,319 @@
+"""
+Read-through cache for agent and crew rows.
+
+Agent calls look up their agent's configuration on every call, so rows are
+cached in process as detached snapshots keyed by id and carrying the row's
+version. Writes invalidate the entry here and, through an invalidation bus,
+in every other worker. Ids that do not exist are cached too, for a shorter
+time, and concurrent misses for the same id share a single database load.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.db.models.agent import Agent
+from app.db.models.crew import Crew
+from app.db.session import SessionLocal
+from app.schemas.agent import AgentInDB
+from app.schemas.crew import CrewInDB
+from app.utils.serialization import dumps, loads
+
+T = TypeVar("T")
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class LocalInvalidationBus:
+    """
+    Delivers invalidations to the caches of this process.
+
+    Also stands in for Redis in tests: caches sharing one bus behave like
+    caches in separate workers.
+    """
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self._handlers: List[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        """Call handler with every invalidation message."""
+        self._handlers.append(handler)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver an invalidation message to every subscriber."""
+        self._deliver(message)
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        for handler in list(self._handlers):
+            handler(message)
+
+    def start(self) -> None:
+        """Start delivering messages from other workers, if the bus has any."""
+
+    def stop(self) -> None:
+        """Stop delivering messages from other workers."""
+
+
+class RedisInvalidationBus(LocalInvalidationBus):
+    """Relays invalidations to other workers over a Redis pub/sub channel."""
+
+    def __init__(self, channel: str):
+        super().__init__()
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Connect to Redis and listen for other workers' invalidations."""
+        if self._redis is not None:
+            return
+
+        try:
+            import redis
+        except ImportError:
+            print("redis package not installed; cache invalidations stay in-process")
+            return
+
+        self._redis = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        self._thread = threading.Thread(target=self._listen, name="entity-cache-invalidations", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Disconnect from Redis."""
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            pubsub.close()
+        if self._redis is not None:
+            self._redis.close()
+            self._redis = None
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver an invalidation locally and to the other workers."""
+        self._deliver(message)
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.channel, dumps({**message, "origin": self.node_id}))
+            except Exception as e:
+                print(f"Failed to publish cache invalidation: {e}")
+
+    def _listen(self) -> None:
+        pubsub = self._pubsub
+        try:
+            for message in pubsub.listen():
+                try:
+                    payload = loads(message["data"])
+                except (ValueError, TypeError):
+                    continue
+                if isinstance(payload, dict) and payload.pop("origin", None) != self.node_id:
+                    self._deliver(payload)
+        except Exception as e:
+            if self._pubsub is not None:
+                print(f"Cache invalidation listener stopped: {e}")
+
+
+class ReadThroughCache(Generic[T]):
+    """
+    Cache of rows by id, loaded on miss and invalidated on write.
+
+    Values carry a version attribute; an invalidation for a version the
+    cache already holds keeps the entry, and a load that raced with an
+    invalidation is returned but not cached.
+    """
+
+    def __init__(self, name: str, loader: Callable[[int], Optional[T]], bus: LocalInvalidationBus,
+                 ttl_seconds: float = 300.0, negative_ttl_seconds: float = 30.0,
+                 max_entries: int = 10_000, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Entity name; invalidation messages are addressed by it
+            loader: Loads the row for an id, or returns None if there is none
+            bus: Invalidation bus shared with the caches of other workers
+            ttl_seconds: Lifetime of a cached row
+            negative_ttl_seconds: Lifetime of a cached miss
+            max_entries: Entries kept before the least recently used is evicted
+            enabled: If False, every get goes to the loader
+        """
+        self.name = name
+        self.loader = loader
+        self.bus = bus
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[Optional[T], float]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._inflight: Dict[int, Future] = {}
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "loads": 0, "coalesced": 0,
+                       "invalidations": 0}
+        bus.subscribe(self._on_message)
+
+    def _lookup(self, key: int) -> Tuple[bool, Optional[T]]:
+        """Return (hit, value) for a fresh entry; caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        self._stats["hits" if value is not None else "negative_hits"] += 1
+        return True, value
+
+    def _claim(self, key: int) -> Tuple[Optional[T], Optional[Future], bool, int]:
+        """
+        Find a cached value, join a load in progress, or start one.
+
+        Returns:
+            (value, future, is_owner, generation); value is meaningful only
+            when future is None
+        """
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value, None, False, 0
+            self._stats["misses"] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return None, future, False, 0
+            future = Future()
+            self._inflight[key] = future
+            self._stats["loads"] += 1
+            return None, future, True, self._generations.get(key, 0)
+
+    def _complete(self, key: int, future: Future, generation: int, value: Optional[T],
+                  error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and self._generations.pop(key, 0) == generation:
+                ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+                self._entries[key] = (value, time.monotonic() + ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def get(self, key: int) -> Optional[T]:
+        """
+        Get a row by id, loading it on a miss.
+
+        Args:
+            key: Row id
+
+        Returns:
+            The row snapshot, or None if no row has that id
+        """
+        if not self.enabled:
+            return self.loader(key)
+        value, future, is_owner, generation = self._claim(key)
+        if future is None:
+            return value
+        if not is_owner:
+            return future.result()
+        try:
+            value = self.loader(key)
+        except BaseException as e:
+            self._complete(key, future, generation, None, e)
+            raise
+        self._complete(key, future, generation, value, None)
+        return value
+
+    async def get_async(self, key: int) -> Optional[T]:
+        """Like get(), loading off the event loop."""
+        if not self.enabled:
+            return await asyncio.to_thread(self.loader, key)
+        value, future, is_owner, generation = self._claim(key)
+        if future is None:
+            return value
+        if not is_owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await asyncio.to_thread(self.loader, key)
+        except BaseException as e:
+            self._complete(key, future, generation, None, e)
+            raise
+        self._complete(key, future, generation, value, None)
+        return value
+
+    def invalidate(self, key: int, version: Optional[int] = None) -> None:
+        """
+        Drop a row here and in every other worker after it changes.
+
+        Args:
+            key: Row id
+            version: The row's version after the write; None if it was deleted
+        """
+        self.bus.publish({"cache": self.name, "key": key, "version": version})
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        if message.get("cache") != self.name:
+            return
+        key, version = message.get("key"), message.get("version")
+        with self._lock:
+            self._stats["invalidations"] += 1
+            # A load in progress may have read the row before the write
+            if key in self._inflight:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            entry = self._entries.get(key)
+            if version is not None and entry is not None and entry[0] is not None \
+                    and getattr(entry[0], "version", 0) >= version:
+                return
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry in this process."""
+        with self._lock:
+            self._entries.clear()
+            for key in self._inflight:
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and load counters and the current size."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+def _load_agent(agent_id: int):
+    with SessionLocal() as db:
+        agent = db.get(Agent, agent_id)
+        return AgentInDB.model_validate(agent, from_attributes=True) if agent is not None else None
+
+
+def _load_crew(crew_id: int):
+    with SessionLocal() as db:
+        crew = db.get(Crew, crew_id)
+        return CrewInDB.model_validate(crew, from_attributes=True) if crew is not None else None
+
+
+def _cache(name: str, loader: Callable[[int], Any]) -> ReadThroughCache:
+    return ReadThroughCache(
+        name, loader, invalidation_bus,
+        ttl_seconds=settings.ENTITY_CACHE_TTL_SECONDS,
+        negative_ttl_seconds=settings.ENTITY_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries=settings.ENTITY_CACHE_MAX_ENTRIES,
+        enabled=settings.ENTITY_CACHE_ENABLED,
+    )
+
+
+# Shared invalidation bus and caches
+invalidation_bus = (
+    RedisInvalidationBus(settings.ENTITY_CACHE_REDIS_CHANNEL)
+    if settings.ENTITY_CACHE_REDIS_ENABLED else LocalInvalidationBus()
+)
+agent_cache = _cache("agent", _load_agent)
+crew_cache = _cache("crew", _load_crew)
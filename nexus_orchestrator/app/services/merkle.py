@@ -0,0 +1,107 @@
+"""
+Merkle trees with compact inclusion proofs.
+
+Trees follow the RFC 6962 / RFC 9162 construction: leaves and interior
+nodes are hashed with distinct prefixes, and a lone node at the end of a
+level is promoted unchanged. Proofs are the list of sibling hashes from
+leaf to root plus the leaf index and tree size.
+"""
+import hashlib
+from typing import Any, Dict, List
+
+
+def leaf_hash(data_hash: str) -> bytes:
+    """Hash a record's hex data hash into a Merkle leaf."""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(data_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash two child nodes into their parent."""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+class MerkleTree:
+    """A Merkle tree over a fixed list of leaves."""
+
+    def __init__(self, leaves: List[bytes]):
+        """
+        Build the tree.
+
+        Args:
+            leaves: Leaf hashes, e.g. from leaf_hash()
+        """
+        if not leaves:
+            raise ValueError("A Merkle tree needs at least one leaf")
+
+        self.levels: List[List[bytes]] = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    @property
+    def size(self) -> int:
+        """Number of leaves."""
+        return len(self.levels[0])
+
+    @property
+    def root(self) -> str:
+        """Hex-encoded root hash."""
+        return self.levels[-1][0].hex()
+
+    def proof(self, index: int) -> Dict[str, Any]:
+        """
+        Get the inclusion proof for a leaf.
+
+        Args:
+            index: Position of the leaf
+
+        Returns:
+            Dictionary with leaf_index, tree_size and hex sibling hashes
+        """
+        siblings = []
+        position = index
+        for level in self.levels[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                siblings.append(level[sibling].hex())
+            position //= 2
+        return {"leaf_index": index, "tree_size": self.size, "siblings": siblings}
+
+
+def verify_proof(leaf: bytes, proof: Dict[str, Any], root: str) -> bool:
+    """
+    Check an inclusion proof (RFC 9162, section 2.1.3.2).
+
+    Args:
+        leaf: The leaf hash being proven
+        proof: Proof from MerkleTree.proof()
+        root: Expected hex root hash
+
+    Returns:
+        Whether the leaf is included in the tree with that root
+    """
+    index, last = proof["leaf_index"], proof["tree_size"] - 1
+    if index > last:
+        return False
+
+    current = leaf
+    for sibling_hex in proof["siblings"]:
+        if last == 0:
+            return False
+        sibling = bytes.fromhex(sibling_hex)
+        if index % 2 == 1 or index == last:
+            current = node_hash(sibling, current)
+            if index % 2 == 0:
+                # Skip levels where this node was promoted without a sibling
+                while index % 2 == 0 and index != 0:
+                    index >>= 1
+                    last >>= 1
+        else:
+            current = node_hash(current, sibling)
+        index >>= 1
+        last >>= 1
+
+    return last == 0 and current.hex() == root
@@ -0,0 +1,662 @@
+"""
+Retention, tiering and compaction of decision records.
+
+Records move through three tiers:
+
+- hot: the decision journal's plain JSON segments, one per time bucket
+- segmented: closed buckets rolled into compressed segment files, each with
+  a sidecar index mapping task IDs to their compressed block
+- archived: compressed segments past a configurable age, moved to an
+  archive directory (which can live on cheaper storage)
+
+Expired records are dropped whenever a segment is rolled or rewritten, per
+a TTL policy keyed by task ID prefix. Lookups fall through from hot to
+segmented to archived, so verification works the same in every tier. A
+background manager does the rolling under an I/O budget, and folds the
+one-file-per-record layout written by older versions into the journal.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.decision_journal import DecisionJournal, segment_number
+from app.utils.serialization import dumps, loads
+
+SEGMENT_SUFFIX = ".zseg"
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+
+def record_timestamp(record: Dict[str, Any], default: float) -> float:
+    """Get a record's timestamp as epoch seconds, from a number or an ISO string."""
+    value = record.get("timestamp")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+class RetentionPolicy:
+    """Time-to-live of records by task ID prefix."""
+
+    def __init__(self, ttl_seconds: Optional[Dict[str, Optional[float]]] = None,
+                 default_ttl_seconds: Optional[float] = None):
+        """
+        Initialize the policy.
+
+        Args:
+            ttl_seconds: TTL per task ID prefix; the longest matching prefix
+                wins, and None keeps matching records forever
+            default_ttl_seconds: TTL of records matching no prefix (None: forever)
+        """
+        self.ttl_seconds = dict(ttl_seconds or {})
+        self.default_ttl_seconds = default_ttl_seconds
+        self._prefixes = sorted(self.ttl_seconds, key=len, reverse=True)
+
+    def ttl(self, task_id: str) -> Optional[float]:
+        """Get the TTL for a task ID, or None to keep it forever."""
+        for prefix in self._prefixes:
+            if task_id.startswith(prefix):
+                return self.ttl_seconds[prefix]
+        return self.default_ttl_seconds
+
+    def expires_at(self, task_id: str, timestamp: float) -> Optional[float]:
+        """Get when a record written at a timestamp expires, or None if never."""
+        ttl = self.ttl(task_id)
+        return None if ttl is None else timestamp + ttl
+
+
+class RateLimiter:
+    """Token bucket limiting background I/O to a number of bytes per second."""
+
+    def __init__(self, bytes_per_second: Optional[float], burst_seconds: float = 1.0):
+        self.bytes_per_second = bytes_per_second
+        self.capacity = (bytes_per_second or 0) * burst_seconds
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def consume(self, nbytes: int) -> None:
+        """Account for bytes of I/O, sleeping once the budget is spent."""
+        if not self.bytes_per_second:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.bytes_per_second)
+        self._updated = now
+        self._tokens -= nbytes
+        if self._tokens < 0:
+            time.sleep(-self._tokens / self.bytes_per_second)
+
+
+class TieredStore:
+    """
+    Compressed segment files in a segmented and an archived directory.
+
+    Each "<name>.zseg" file is a sequence of zlib-compressed blocks of JSON
+    lines. Its "<name>.idx" sidecar records, per task ID, the block offset
+    and length, the line offset and length within the block, the data hash
+    and the expiry time, so a lookup touches the sidecars only and a read
+    decompresses one block. Segments keep the name of the journal segment
+    they were rolled from, so later segments win when a task ID recurs.
+    """
+
+    def __init__(self, segment_dir: str, archive_dir: str, block_bytes: int = 256 * 1024,
+                 compression_level: int = 6, cached_blocks: int = 16):
+        """
+        Initialize the store. Sidecars are loaded on first lookup.
+
+        Args:
+            segment_dir: Directory of segments not yet archived
+            archive_dir: Directory of archived segments
+            block_bytes: Uncompressed bytes per compressed block
+            compression_level: zlib compression level
+            cached_blocks: Decompressed blocks kept for repeated reads
+        """
+        self.segment_dir = segment_dir
+        self.archive_dir = archive_dir
+        self.block_bytes = block_bytes
+        self.compression_level = compression_level
+        self.cached_blocks = cached_blocks
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        # task_id -> (segment path, block offset, block length, line offset, line length, data hash, expires at)
+        self._index: Dict[str, Tuple[str, int, int, int, int, str, Optional[float]]] = {}
+        self._blocks: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+
+    # Layout
+
+    def _segment_files(self, directory: str) -> List[str]:
+        if not os.path.isdir(directory):
+            return []
+        return [name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)]
+
+    def segments(self, archived: bool = False) -> List[str]:
+        """Paths of the segments in one tier, oldest first."""
+        directory = self.archive_dir if archived else self.segment_dir
+        return [
+            os.path.join(directory, name)
+            for name in sorted(self._segment_files(directory), key=segment_number)
+            if os.path.exists(os.path.join(directory, name[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX))
+        ]
+
+    def segment_numbers(self) -> List[int]:
+        """Sequence numbers of all compressed segments, so the journal never reuses one."""
+        return [
+            segment_number(name)
+            for directory in (self.segment_dir, self.archive_dir)
+            for name in self._segment_files(directory)
+        ]
+
+    @staticmethod
+    def sidecar_path(path: str) -> str:
+        return path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+    @classmethod
+    def read_sidecar(cls, path: str) -> Dict[str, Any]:
+        with open(cls.sidecar_path(path), "r") as f:
+            return json.load(f)
+
+    def _load(self) -> None:
+        """Build the index from every sidecar; caller holds the lock."""
+        paths = self.segments(archived=True) + self.segments()
+        for path in sorted(paths, key=lambda p: segment_number(os.path.basename(p))):
+            self._add_entries(path, self.read_sidecar(path)["records"])
+        self._loaded = True
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+    def _add_entries(self, path: str, records: Dict[str, List[Any]]) -> None:
+        number = segment_number(os.path.basename(path))
+        for task_id, entry in records.items():
+            current = self._index.get(task_id)
+            if current is None or segment_number(os.path.basename(current[0])) <= number:
+                self._index[task_id] = (path, *entry)
+
+    # Reading
+
+    def lookup(self, task_id: str) -> Optional[str]:
+        """
+        Get the data hash stored for a task ID.
+
+        Args:
+            task_id: The task ID
+
+        Returns:
+            The data hash, or None if no unexpired record exists
+        """
+        self._ensure_loaded()
+        entry = self._index.get(task_id)
+        if entry is None or (entry[6] is not None and entry[6] <= time.time()):
+            return None
+        return entry[5]
+
+    def read(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the full record for a task ID.
+
+        Args:
+            task_id: The task ID
+
+        Returns:
+            The record, or None if no unexpired record exists
+        """
+        if self.lookup(task_id) is None:
+            return None
+        path, block_offset, block_length, line_offset, line_length = self._index[task_id][:5]
+        try:
+            block = self._read_block(path, block_offset, block_length)
+        except FileNotFoundError:
+            # Moved to the archive since the lookup
+            if self._index.get(task_id, (path,))[0] == path:
+                return None
+            return self.read(task_id)
+        return loads(block[line_offset:line_offset + line_length])
+
+    def task_ids(self, prefix: str) -> List[str]:
+        """Task IDs starting with a prefix that have an unexpired record."""
+        self._ensure_loaded()
+        now = time.time()
+        with self._lock:
+            return [
+                task_id for task_id, entry in self._index.items()
+                if task_id.startswith(prefix) and (entry[6] is None or entry[6] > now)
+            ]
+
+    def _read_block(self, path: str, offset: int, length: int) -> bytes:
+        key = (path, offset)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                return block
+        with open(path, "rb") as f:
+            f.seek(offset)
+            block = zlib.decompress(f.read(length))
+        with self._lock:
+            self._blocks[key] = block
+            if len(self._blocks) > self.cached_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def iter_records(self, path: str, limiter: Optional[RateLimiter] = None
+                     ) -> Iterator[Tuple[str, Dict[str, Any], Optional[float]]]:
+        """
+        Read every record in a segment, block by block.
+
+        Yields:
+            (task_id, record, expires_at) for each record, in write order
+        """
+        sidecar = self.read_sidecar(path)
+        by_block: Dict[int, List[Tuple[int, int, str, Optional[float]]]] = {}
+        for task_id, (block_offset, block_length, line_offset, line_length, _, expires_at) in sidecar["records"].items():
+            by_block.setdefault(block_offset, []).append((line_offset, line_length, task_id, expires_at))
+        with open(path, "rb") as f:
+            for block_offset in sorted(by_block):
+                entries = sorted(by_block[block_offset])
+                f.seek(block_offset)
+                block_length = sidecar["records"][entries[0][2]][1]
+                compressed = f.read(block_length)
+                if limiter is not None:
+                    limiter.consume(len(compressed))
+                block = zlib.decompress(compressed)
+                for line_offset, line_length, task_id, expires_at in entries:
+                    yield task_id, loads(block[line_offset:line_offset + line_length]), expires_at
+
+    # Writing
+
+    def write_segment(self, name: str, records: List[Tuple[str, Dict[str, Any], Optional[float]]],
+                      limiter: Optional[RateLimiter] = None, directory: Optional[str] = None) -> Optional[str]:
+        """
+        Write records to a compressed segment and install it in the index.
+
+        The data file is written and renamed into place before its sidecar,
+        so a crash never leaves a sidecar pointing at a partial file.
+
+        Args:
+            name: Segment name; its sequence number orders it against others
+            records: (task_id, record, expires_at) tuples; each record needs "data_hash"
+            limiter: Budget for the bytes written
+            directory: Tier to write to (default: the segmented tier)
+
+        Returns:
+            Path of the segment, or None if there were no records
+        """
+        directory = directory or self.segment_dir
+        base = name.split(".", 1)[0]
+        path = os.path.join(directory, base + SEGMENT_SUFFIX)
+        if not records:
+            self.remove(path)
+            return None
+        os.makedirs(directory, exist_ok=True)
+
+        entries: Dict[str, List[Any]] = {}
+        timestamps: List[float] = []
+        expiries = [expires_at for _, _, expires_at in records if expires_at is not None]
+        with open(path + ".tmp", "wb") as f:
+            block: List[bytes] = []
+            block_entries: List[Tuple[str, int, int, str, Optional[float]]] = []
+            block_size = 0
+
+            def write_block() -> None:
+                compressed = zlib.compress(b"".join(block), self.compression_level)
+                offset = f.tell()
+                f.write(compressed)
+                if limiter is not None:
+                    limiter.consume(len(compressed))
+                for task_id, line_offset, line_length, data_hash, expires_at in block_entries:
+                    entries[task_id] = [offset, len(compressed), line_offset, line_length, data_hash, expires_at]
+
+            for task_id, record, expires_at in records:
+                line = dumps(record) + b"\n"
+                block_entries.append((task_id, block_size, len(line), record["data_hash"], expires_at))
+                block.append(line)
+                block_size += len(line)
+                timestamps.append(record_timestamp(record, time.time()))
+                if block_size >= self.block_bytes:
+                    write_block()
+                    block, block_entries, block_size = [], [], 0
+            if block:
+                write_block()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        sidecar = {
+            "version": INDEX_VERSION,
+            "created_at": time.time(),
+            "min_timestamp": min(timestamps),
+            "max_timestamp": max(timestamps),
+            "next_expiry": min(expiries) if expiries else None,
+            "records": entries,
+        }
+        sidecar_path = self.sidecar_path(path)
+        with open(sidecar_path + ".tmp", "w") as f:
+            json.dump(sidecar, f, separators=(",", ":"))
+        os.replace(sidecar_path + ".tmp", sidecar_path)
+
+        with self._lock:
+            if self._loaded:
+                self._drop_entries(path)
+                self._add_entries(path, entries)
+            self._drop_blocks(path)
+        return path
+
+    def move(self, path: str, directory: str, limiter: Optional[RateLimiter] = None) -> str:
+        """
+        Move a segment and its sidecar to another tier.
+
+        Renames when both tiers share a filesystem and copies under the I/O
+        budget otherwise.
+
+        Returns:
+            The segment's new path
+        """
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, os.path.basename(path))
+        # The sidecar goes last so the segment is never indexed without its data
+        self._move_file(path, target, limiter)
+        with self._lock:
+            for task_id, entry in list(self._index.items()):
+                if entry[0] == path:
+                    self._index[task_id] = (target, *entry[1:])
+            self._drop_blocks(path)
+        self._move_file(self.sidecar_path(path), self.sidecar_path(target), limiter)
+        return target
+
+    def _move_file(self, src: str, dst: str, limiter: Optional[RateLimiter]) -> None:
+        try:
+            os.replace(src, dst)
+        except OSError:
+            self._copy(src, dst, limiter)
+            os.remove(src)
+
+    def _copy(self, src: str, dst: str, limiter: Optional[RateLimiter]) -> None:
+        with open(src, "rb") as fsrc, open(dst + ".tmp", "wb") as fdst:
+            while True:
+                chunk = fsrc.read(1024 * 1024)
+                if not chunk:
+                    break
+                if limiter is not None:
+                    limiter.consume(len(chunk))
+                fdst.write(chunk)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        shutil.copystat(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+
+    def remove(self, path: str) -> None:
+        """Delete a segment and its sidecar."""
+        for file_path in (self.sidecar_path(path), path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        with self._lock:
+            self._drop_entries(path)
+            self._drop_blocks(path)
+
+    def live_count(self, path: str) -> int:
+        """Number of task IDs whose latest record is in a segment."""
+        self._ensure_loaded()
+        with self._lock:
+            return sum(1 for entry in self._index.values() if entry[0] == path)
+
+    def is_live(self, task_id: str, path: str) -> bool:
+        """Whether a segment holds the latest record for a task ID."""
+        entry = self._index.get(task_id)
+        return entry is not None and entry[0] == path
+
+    def _drop_entries(self, path: str) -> None:
+        for task_id in [task_id for task_id, entry in self._index.items() if entry[0] == path]:
+            del self._index[task_id]
+
+    def _drop_blocks(self, path: str) -> None:
+        for key in [key for key in self._blocks if key[0] == path]:
+            del self._blocks[key]
+
+
+class RetentionManager:
+    """
+    Background roller, archiver and compactor for a decision journal.
+
+    Attaches a TieredStore to the journal, so journal lookups fall through
+    to the compressed tiers.
+    """
+
+    def __init__(self, journal: DecisionJournal, policy: RetentionPolicy,
+                 hot_seconds: float = 86400.0, archive_after_seconds: Optional[float] = 30 * 86400.0,
+                 archive_dir: Optional[str] = None, max_io_bytes_per_second: Optional[float] = 8 * 1024 * 1024,
+                 interval: float = 60.0, legacy_dir: Optional[str] = None,
+                 legacy_key_field: str = "task_id", legacy_hash_field: str = "data_hash"):
+        """
+        Initialize the manager. Nothing runs until start() or run_once().
+
+        Args:
+            journal: The journal whose closed segments are tiered
+            policy: TTLs of records
+            hot_seconds: Age after which closed journal segments are compressed
+            archive_after_seconds: Age after which compressed segments are
+                archived (None: never)
+            archive_dir: Archive tier directory (default: next to the journal)
+            max_io_bytes_per_second: Budget for background reads and writes
+                (None: unlimited)
+            interval: Seconds between background runs
+            legacy_dir: Directory of one-file-per-record JSON files to fold
+                into the journal
+            legacy_key_field: Field of legacy records holding the task ID
+            legacy_hash_field: Field of legacy records holding the data hash
+        """
+        self.journal = journal
+        self.policy = policy
+        self.hot_seconds = hot_seconds
+        self.archive_after_seconds = archive_after_seconds
+        self.interval = interval
+        self.legacy_dir = legacy_dir
+        self.legacy_key_field = legacy_key_field
+        self.legacy_hash_field = legacy_hash_field
+        self.limiter = RateLimiter(max_io_bytes_per_second)
+
+        parent = os.path.dirname(journal.directory.rstrip(os.sep))
+        self.store = TieredStore(
+            os.path.join(parent, "segments"),
+            archive_dir or os.path.join(parent, "archive"),
+        )
+        journal.archive = self.store
+
+        self._legacy_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        """Run retention in the background every interval."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="decision-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background runs after the current one."""
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Decision log retention failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run one retention pass.
+
+        Folds legacy files into the journal, compresses closed hot segments
+        past hot_seconds, rewrites compressed segments holding expired or
+        superseded records, and archives compressed segments past
+        archive_after_seconds.
+
+        Args:
+            now: Current time as epoch seconds (default: time.time())
+
+        Returns:
+            Counts of files and records handled in this pass
+        """
+        now = time.time() if now is None else now
+        started = time.monotonic()
+        stats = {"legacy_imported": 0, "rolled": 0, "rewritten": 0, "archived": 0, "expired": 0, "removed": 0}
+
+        if self.legacy_dir:
+            stats["legacy_imported"] = self.import_legacy(now)
+
+        for name, mtime in self.journal.closed_segments():
+            if now - mtime < self.hot_seconds:
+                continue
+            with self.journal.maintenance_lock:
+                stats["expired"] += self._roll(name, mtime, now)
+            stats["rolled"] += 1
+
+        for archived in (False, True):
+            for path in self.store.segments(archived):
+                stats["expired"] += self._maybe_rewrite(path, now, stats)
+
+        if self.archive_after_seconds is not None:
+            for path in self.store.segments():
+                if not os.path.exists(path):
+                    continue
+                if now - self.store.read_sidecar(path)["max_timestamp"] >= self.archive_after_seconds:
+                    self.store.move(path, self.store.archive_dir, self.limiter)
+                    stats["archived"] += 1
+
+        stats["elapsed_ms"] = (time.monotonic() - started) * 1000
+        self.last_run = {"finished_at": time.time(), **stats}
+        return stats
+
+    def _roll(self, name: str, mtime: float, now: float) -> int:
+        """Compress a closed journal segment's live, unexpired records."""
+        entries = self.journal.live_entries(name)
+        self.limiter.consume(self.journal.segment_size(name))
+        records = []
+        expired = 0
+        for (_, _, task_id), record in zip(entries, self.journal.read_segment_entries(name, entries)):
+            expires_at = self.policy.expires_at(task_id, record_timestamp(record, mtime))
+            if expires_at is not None and expires_at <= now:
+                expired += 1
+                continue
+            records.append((task_id, record, expires_at))
+        self.store.write_segment(name, records, self.limiter)
+        self.journal.detach_segment(name)
+        return expired
+
+    def _maybe_rewrite(self, path: str, now: float, stats: Dict[str, Any]) -> int:
+        """Rewrite a compressed segment without expired or superseded records."""
+        sidecar = self.store.read_sidecar(path)
+        total = len(sidecar["records"])
+        expiring = sidecar["next_expiry"] is not None and sidecar["next_expiry"] <= now
+        if not expiring and self.store.live_count(path) == total:
+            return 0
+
+        records = []
+        expired = 0
+        for task_id, record, expires_at in self.store.iter_records(path, self.limiter):
+            if not self.store.is_live(task_id, path):
+                continue
+            if expires_at is not None and expires_at <= now:
+                expired += 1
+                continue
+            records.append((task_id, record, expires_at))
+        if records:
+            self.store.write_segment(os.path.basename(path), records, self.limiter, os.path.dirname(path))
+            stats["rewritten"] += 1
+        else:
+            self.store.remove(path)
+            stats["removed"] += 1
+        return expired
+
+    def import_legacy(self, now: Optional[float] = None) -> int:
+        """
+        Fold one-file-per-record JSON files into the journal and delete them.
+
+        Reads "*.json" files holding one record and "*.jsonl" files holding
+        one record per line. Files without the configured key and hash
+        fields are left alone, so services sharing a directory don't take
+        each other's files. A record already in the journal wins over its
+        legacy file.
+
+        Returns:
+            Number of records imported
+        """
+        now = time.time() if now is None else now
+        if not os.path.isdir(self.legacy_dir):
+            return 0
+        with self._legacy_lock:
+            return self._import_legacy(now)
+
+    def _import_legacy(self, now: float) -> int:
+        imported = set()
+        seqs = []
+        done = []
+        for name in sorted(os.listdir(self.legacy_dir)):
+            path = os.path.join(self.legacy_dir, name)
+            if not name.endswith((".json", ".jsonl")) or not os.path.isfile(path):
+                continue
+            self.limiter.consume(os.path.getsize(path))
+            mtime = os.path.getmtime(path)
+            try:
+                with open(path, "r") as f:
+                    if name.endswith(".jsonl"):
+                        records = [json.loads(line) for line in f if line.strip()]
+                    else:
+                        records = [json.load(f)]
+                keyed = [(record[self.legacy_key_field], record[self.legacy_hash_field], record) for record in records]
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            done.append(path)
+            for task_id, data_hash, record in keyed:
+                expires_at = self.policy.expires_at(task_id, record_timestamp(record, mtime))
+                if expires_at is not None and expires_at <= now:
+                    continue
+                if task_id not in imported and self.journal.lookup(task_id) is not None:
+                    continue
+                record.setdefault("task_id", task_id)
+                record["data_hash"] = data_hash
+                record.setdefault("timestamp", mtime)
+                seqs.append(self.journal.append(task_id, record))
+                imported.add(task_id)
+
+        # Delete the files only once their records are durable
+        if done and self.journal.flush() and not any(self.journal.write_error(seq) for seq in seqs):
+            for path in done:
+                os.remove(path)
+        return len(imported)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size of each tier and the result of the last pass.
+
+        Returns:
+            Dictionary with segment counts and bytes of closed hot segments
+            and of each compressed tier, and "last_run"
+        """
+        closed = self.journal.closed_segments()
+        tiers = {"hot_closed": [self.journal.segment_size(name) for name, _ in closed]}
+        for tier, archived in (("segmented", False), ("archived", True)):
+            tiers[tier] = [os.path.getsize(path) for path in self.store.segments(archived)]
+        return {
+            **{tier: {"segments": len(sizes), "bytes": sum(sizes)} for tier, sizes in tiers.items()},
+            "last_run": self.last_run,
+        }
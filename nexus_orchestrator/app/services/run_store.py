@@ -0,0 +1,374 @@
+"""
+Durable store of orchestration runs and their steps.
+
+Finished runs are queued in memory and written by a background task in
+batches, one multi-row insert per table, so recording a run adds nothing to
+the request. On PostgreSQL both tables are range-partitioned by day of the
+run's start: partitions are created ahead of time, queries bounded by time
+only touch the partitions they need, and retention drops whole partitions
+instead of deleting rows. Other databases keep single tables and delete
+expired rows by the started_at index.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models.run import OrchestrationRun, RunStep
+from app.db.session import get_async_engine
+from app.utils.hashing import sha256_hex
+
+DAY_SECONDS = 86400
+
+_PARTITIONED = (
+    (OrchestrationRun.__tablename__, "started_at"),
+    (RunStep.__tablename__, "run_started_at"),
+)
+
+
+def new_run_id() -> str:
+    """A new run ID."""
+    return uuid.uuid4().hex
+
+
+def task_hash(task: Dict[str, Any]) -> str:
+    """
+    Fingerprint of what an orchestration was asked to do.
+
+    Runs of the same prompt, roles and workflow settings share it, so
+    earlier results for a task can be looked up.
+
+    Args:
+        task: The task's fields, without its ID and metadata
+    """
+    return sha256_hex(task)
+
+
+def _day_start(timestamp: float) -> float:
+    return timestamp - timestamp % DAY_SECONDS
+
+
+def _partition_name(table: str, day_start: float) -> str:
+    return f"{table}_p{datetime.fromtimestamp(day_start, timezone.utc):%Y%m%d}"
+
+
+def _partition_day(table: str, name: str) -> Optional[float]:
+    """Start of the day a partition holds, or None for tables not named by _partition_name()."""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        day = datetime.strptime(name[len(prefix):], "%Y%m%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return day.timestamp()
+
+
+class RunStore:
+    """Batched writer and partition maintenance for orchestration runs."""
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.5, queue_size: int = 10_000,
+                 retention_days: Optional[float] = 30, partitions_ahead: int = 3,
+                 maintenance_interval: float = 3600.0, enabled: bool = True):
+        """
+        Initialize the store.
+
+        Args:
+            batch_size: Runs written per batch
+            flush_interval: Longest a queued run waits for its batch to fill
+            queue_size: Runs queued before new ones are dropped
+            retention_days: Age after which runs are removed; None keeps them
+            partitions_ahead: Days of partitions created ahead of time
+            maintenance_interval: Seconds between partition creation and retention passes
+            enabled: If False, runs are not recorded
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.retention_days = retention_days
+        self.partitions_ahead = partitions_ahead
+        self.maintenance_interval = maintenance_interval
+        self.enabled = enabled
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._partitions: set = set()
+        self._next_maintenance = 0.0
+        self._stats = {"queued": 0, "dropped": 0, "written": 0, "steps_written": 0, "batches": 0,
+                       "retried": 0, "failed": 0, "partitions_dropped": 0, "rows_expired": 0}
+
+    def record(self, run: Dict[str, Any], steps: List[Dict[str, Any]]) -> bool:
+        """
+        Queue a finished run for writing; call from the event loop.
+
+        Args:
+            run: Column values for orchestration_runs
+            steps: Column values for run_steps, without the run columns
+
+        Returns:
+            Whether the run was queued; False if recording is off or the queue is full
+        """
+        if not self.enabled:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((run, steps))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            return False
+        self._stats["queued"] += 1
+        return True
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            # A queue belongs to the loop it was first used in
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._writer())
+
+    async def start(self) -> None:
+        """Start the background writer."""
+        if self.enabled:
+            self._ensure_started()
+
+    async def stop(self) -> None:
+        """Write what is queued and stop the writer."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(task, timeout=30)
+        except asyncio.TimeoutError:
+            task.cancel()
+        self._queue = None
+
+    async def flush(self) -> None:
+        """Wait until every run queued so far has been written."""
+        if self._queue is not None and self._task is not None:
+            await self._queue.join()
+
+    async def _writer(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            if time.time() >= self._next_maintenance:
+                await self._maintain()
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(self._next_maintenance - time.time(), 0.01))
+            except asyncio.TimeoutError:
+                continue
+            batch, stop = [], item is None
+            if item is not None:
+                batch.append(item)
+            deadline = loop.time() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = queue.get_nowait() if loop.time() >= deadline else \
+                        await asyncio.wait_for(queue.get(), timeout=deadline - loop.time())
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                await self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                queue.task_done()
+            if stop:
+                return
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]], retry: bool = True) -> None:
+        """
+        Write a batch of runs and their steps.
+
+        A failed batch is retried once, then written in halves, so a run that
+        can't be written (say, one whose partition can't be created) only
+        takes the runs sharing its half down with it. Failures to connect are
+        not split, since every half would fail the same way.
+        """
+        runs = [run for run, _ in batch]
+        steps = [
+            {**step, "run_id": run["id"], "run_started_at": run["started_at"], "step_index": index}
+            for run, run_steps in batch for index, step in enumerate(run_steps)
+        ]
+        connected, created = False, []
+        try:
+            async with get_async_engine().begin() as conn:
+                connected = True
+                if conn.dialect.name == "postgresql":
+                    created = await self._ensure_partitions(conn, (run["started_at"] for run in runs))
+                await conn.execute(insert(OrchestrationRun.__table__), runs)
+                if steps:
+                    await conn.execute(insert(RunStep.__table__), steps)
+        except Exception as e:
+            if retry:
+                self._stats["retried"] += 1
+                await self._write(batch, retry=False)
+            elif connected and len(batch) > 1:
+                middle = len(batch) // 2
+                await self._write(batch[:middle], retry=False)
+                await self._write(batch[middle:], retry=False)
+            else:
+                self._stats["failed"] += len(runs)
+                print(f"Failed to write {len(runs)} orchestration runs: {e}")
+            return
+        self._partitions.update(created)
+        self._stats["batches"] += 1
+        self._stats["written"] += len(runs)
+        self._stats["steps_written"] += len(steps)
+
+    async def _ensure_partitions(self, conn, timestamps: Iterable[float]) -> List[str]:
+        """
+        Create the daily partitions the timestamps fall in; PostgreSQL only.
+
+        Returns the partitions it created, for the caller to remember once
+        the transaction commits: a rolled back CREATE TABLE leaves none.
+        """
+        created = []
+        for day_start in sorted({_day_start(timestamp) for timestamp in timestamps}):
+            for table, _ in _PARTITIONED:
+                name = _partition_name(table, day_start)
+                if name in self._partitions:
+                    continue
+                await conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ({day_start!r}) TO ({day_start + DAY_SECONDS!r})"
+                ))
+                created.append(name)
+        return created
+
+    async def _maintain(self) -> None:
+        """Create upcoming partitions and apply retention, logging rather than raising."""
+        self._next_maintenance = time.time() + self.maintenance_interval
+        try:
+            engine = get_async_engine()
+            if engine.dialect.name == "postgresql":
+                now = time.time()
+                async with engine.begin() as conn:
+                    created = await self._ensure_partitions(
+                        conn, (now + day * DAY_SECONDS for day in range(self.partitions_ahead + 1))
+                    )
+                self._partitions.update(created)
+            await self.apply_retention()
+        except Exception as e:
+            print(f"Run store maintenance failed: {e}")
+
+    async def apply_retention(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Remove runs older than the retention period.
+
+        On PostgreSQL, partitions whose whole day is past the cutoff are
+        dropped; elsewhere expired rows are deleted.
+
+        Args:
+            now: Current time (default: time.time())
+
+        Returns:
+            The dropped partitions, or the number of rows deleted
+        """
+        if self.retention_days is None:
+            return {}
+        cutoff = (now or time.time()) - self.retention_days * DAY_SECONDS
+        engine = get_async_engine()
+        async with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                dropped = []
+                for table, _ in _PARTITIONED:
+                    names = await conn.scalars(text(
+                        "SELECT child.relname FROM pg_inherits "
+                        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                        "WHERE parent.relname = :table"
+                    ), {"table": table})
+                    for name in names.all():
+                        day_start = _partition_day(table, name)
+                        if day_start is not None and day_start + DAY_SECONDS <= cutoff:
+                            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                            self._partitions.discard(name)
+                            dropped.append(name)
+                self._stats["partitions_dropped"] += len(dropped)
+                return {"dropped_partitions": dropped}
+            deleted = 0
+            for table, column in _PARTITIONED:
+                result = await conn.execute(text(f"DELETE FROM {table} WHERE {column} < :cutoff"), {"cutoff": cutoff})
+                deleted += result.rowcount or 0
+            self._stats["rows_expired"] += deleted
+            return {"deleted_rows": deleted}
+
+    def stats(self) -> Dict[str, Any]:
+        """Write counters and the number of runs waiting to be written."""
+        return {**self._stats, "pending": self._queue.qsize() if self._queue is not None else 0}
+
+
+def _runs_query(limit: int, before: Optional[Tuple[float, str]], task_hash: Optional[str],
+                workflow_type: Optional[str], status: Optional[str], since: Optional[float],
+                until: Optional[float]):
+    query = select(OrchestrationRun)
+    if task_hash is not None:
+        query = query.where(OrchestrationRun.task_hash == task_hash)
+    if workflow_type is not None:
+        query = query.where(OrchestrationRun.workflow_type == workflow_type)
+    if status is not None:
+        query = query.where(OrchestrationRun.status == status)
+    # Bounds on started_at let PostgreSQL skip partitions outside them
+    if since is not None:
+        query = query.where(OrchestrationRun.started_at >= since)
+    if until is not None:
+        query = query.where(OrchestrationRun.started_at < until)
+    if before is not None:
+        query = query.where(tuple_(OrchestrationRun.started_at, OrchestrationRun.id) < before)
+    return query.order_by(OrchestrationRun.started_at.desc(), OrchestrationRun.id.desc()).limit(limit)
+
+
+async def list_runs_async(db: AsyncSession, limit: int = 50, before: Optional[Tuple[float, str]] = None,
+                          task_hash: Optional[str] = None, workflow_type: Optional[str] = None,
+                          status: Optional[str] = None, since: Optional[float] = None,
+                          until: Optional[float] = None) -> List[OrchestrationRun]:
+    """
+    Get runs newest first, matching optional filters.
+
+    Args:
+        db: Async session
+        limit: Maximum number of runs
+        before: Only runs older than this (started_at, id) position
+        task_hash: Only runs of this task
+        workflow_type: Only runs of this workflow type
+        status: Only runs with this status
+        since: Only runs started at or after this time
+        until: Only runs started before this time
+
+    Returns:
+        Matching runs, newest first
+    """
+    result = await db.execute(_runs_query(limit, before, task_hash, workflow_type, status, since, until))
+    return list(result.scalars())
+
+
+async def get_run_async(db: AsyncSession, run_id: str) -> Optional[Tuple[OrchestrationRun, List[RunStep]]]:
+    """Get a run and its steps in order, or None if there is no such run."""
+    run = (await db.execute(select(OrchestrationRun).where(OrchestrationRun.id == run_id))).scalars().first()
+    if run is None:
+        return None
+    steps = await db.execute(
+        select(RunStep)
+        .where(RunStep.run_id == run_id, RunStep.run_started_at == run.started_at)
+        .order_by(RunStep.step_index)
+    )
+    return run, list(steps.scalars())
+
+
+# Global run store
+run_store = RunStore(
+    batch_size=settings.RUN_STORE_BATCH_SIZE,
+    flush_interval=settings.RUN_STORE_FLUSH_INTERVAL_SECONDS,
+    queue_size=settings.RUN_STORE_QUEUE_SIZE,
+    retention_days=settings.RUN_STORE_RETENTION_DAYS,
+    partitions_ahead=settings.RUN_STORE_PARTITIONS_AHEAD_DAYS,
+    maintenance_interval=settings.RUN_STORE_MAINTENANCE_INTERVAL_SECONDS,
+    enabled=settings.RUN_STORE_ENABLED,
+)
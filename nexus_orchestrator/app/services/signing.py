@@ -0,0 +1,255 @@
+"""
+HMAC signing of payloads with cached, rotatable keys.
+
+Signing keys are derived once from their secrets and cached by key ID.
+Signatures carry the key ID, so keys can be rotated while signatures made
+with older keys still verify. Batches are signed and verified in chunks,
+spread across a worker pool once they are large enough to benefit.
+Signatures made before key IDs existed are verified with the legacy
+scheme (raw secret, stdlib sorted-key JSON).
+"""
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.hashing import canonical_json
+
+LEGACY_DEFAULT_SECRET = "nexus-ai-orchestrator-secret-key"
+
+
+def derive_key(secret: str, key_id: str) -> bytes:
+    """Derive a signing key bound to its key ID from a secret."""
+    return hmac.new(secret.encode(), b"nexus-signing-v1|" + key_id.encode(), hashlib.sha256).digest()
+
+
+def _message(data: Any, timestamp: str, nonce: str) -> bytes:
+    return canonical_json(data) + f"|{timestamp}|{nonce}".encode()
+
+
+def _sign_chunk(key: bytes, items: Sequence[Any], timestamp: str, nonces: Sequence[str],
+                base: Optional[Any] = None) -> List[str]:
+    """Sign a chunk of payloads with one key; runs in a pool worker."""
+    # Copying a keyed HMAC skips re-processing the key for every payload
+    base = base or hmac.new(key, digestmod=hashlib.sha256)
+    signatures = []
+    for data, nonce in zip(items, nonces):
+        mac = base.copy()
+        mac.update(_message(data, timestamp, nonce))
+        signatures.append(mac.hexdigest())
+    return signatures
+
+
+def _verify_chunk(keys: Dict[str, bytes], legacy_secret: Optional[str],
+                  signed_items: Sequence[Any]) -> List[bool]:
+    """Verify a chunk of signed payloads; runs in a pool worker."""
+    results = []
+    for signed in signed_items:
+        try:
+            data = signed["data"]
+            metadata = signed["metadata"]
+            timestamp, nonce, signature = metadata["timestamp"], metadata["nonce"], metadata["signature"]
+            key_id = metadata.get("key_id")
+            if key_id is None:
+                if legacy_secret is None:
+                    results.append(False)
+                    continue
+                message = f"{json.dumps(data, sort_keys=True, default=str)}|{timestamp}|{nonce}".encode()
+                expected = hmac.new(legacy_secret.encode(), message, hashlib.sha256).hexdigest()
+            else:
+                key = keys.get(key_id)
+                if key is None:
+                    results.append(False)
+                    continue
+                expected = hmac.new(key, _message(data, timestamp, nonce), hashlib.sha256).hexdigest()
+            results.append(hmac.compare_digest(signature, expected))
+        except (KeyError, TypeError):
+            results.append(False)
+    return results
+
+
+class SigningService:
+    """Signs and verifies payloads, singly or in batches."""
+
+    def __init__(self, secrets: Dict[str, str], active_key_id: str,
+                 legacy_secret: Optional[str] = None, max_workers: Optional[int] = None,
+                 parallel_threshold: int = 2048, chunk_size: int = 512):
+        """
+        Initialize the service, deriving every key once.
+
+        Args:
+            secrets: Mapping of key ID to secret
+            active_key_id: Key ID used for new signatures
+            legacy_secret: Secret for verifying signatures without a key ID
+            max_workers: Pool size for large batches (default: CPU count)
+            parallel_threshold: Batch size from which the pool is used
+            chunk_size: Payloads per pool task
+        """
+        if active_key_id not in secrets:
+            raise ValueError(f"Unknown signing key: {active_key_id}")
+        self._keys: Dict[str, bytes] = {key_id: derive_key(secret, key_id) for key_id, secret in secrets.items()}
+        # (key ID, key, keyed HMAC), replaced as a whole so a signer never mixes two keys
+        self._active: Tuple[str, bytes, Any] = self._signing_state(active_key_id, self._keys[active_key_id])
+        self.legacy_secret = legacy_secret
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self._pools: Dict[str, Executor] = {}
+
+    @classmethod
+    def from_env(cls) -> "SigningService":
+        """
+        Build the service from environment variables, read once.
+
+        SIGNING_KEYS holds comma-separated "key_id:secret" pairs and
+        SIGNING_ACTIVE_KEY_ID selects the key for new signatures. Without
+        them, SECRET_KEY is used under the key ID "default".
+        """
+        secret_key = os.getenv("SECRET_KEY", LEGACY_DEFAULT_SECRET)
+        secrets = {"default": secret_key}
+        for pair in filter(None, os.getenv("SIGNING_KEYS", "").split(",")):
+            key_id, _, secret = pair.strip().partition(":")
+            secrets[key_id] = secret
+        active_key_id = os.getenv("SIGNING_ACTIVE_KEY_ID") or list(secrets)[-1]
+        return cls(secrets, active_key_id, legacy_secret=secret_key)
+
+    @staticmethod
+    def _signing_state(key_id: str, key: bytes) -> Tuple[str, bytes, Any]:
+        return key_id, key, hmac.new(key, digestmod=hashlib.sha256)
+
+    @property
+    def active_key_id(self) -> str:
+        """ID of the key used for new signatures."""
+        return self._active[0]
+
+    @property
+    def key_ids(self) -> List[str]:
+        """IDs of all keys that can verify signatures."""
+        return list(self._keys)
+
+    def rotate(self, key_id: str, secret: str) -> None:
+        """
+        Add a key and make it the active signing key.
+
+        Older keys stay available for verification until retired.
+
+        Args:
+            key_id: ID of the new key
+            secret: Secret to derive the key from
+        """
+        key = derive_key(secret, key_id)
+        self._keys[key_id] = key
+        self._active = self._signing_state(key_id, key)
+
+    def retire(self, key_id: str) -> None:
+        """Remove a key; signatures made with it no longer verify."""
+        if key_id == self.active_key_id:
+            raise ValueError("Cannot retire the active signing key")
+        self._keys.pop(key_id, None)
+
+    def _pool(self, executor: str) -> Executor:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        pool = self._pools.get(executor)
+        if pool is None:
+            if executor == "thread":
+                pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            else:
+                # Forking a multi-threaded server can copy held locks into the children
+                pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pools[executor] = pool
+        return pool
+
+    def sign(self, data: Any) -> Dict[str, Any]:
+        """
+        Sign a payload.
+
+        Args:
+            data: The data to sign
+
+        Returns:
+            Signed data with timestamp, nonce, key ID and signature metadata
+        """
+        return self.sign_many([data])[0]
+
+    def verify(self, signed_data: Dict[str, Any]) -> bool:
+        """
+        Verify a signed payload.
+
+        Args:
+            signed_data: Output of sign()
+
+        Returns:
+            Whether the signature is valid
+        """
+        return _verify_chunk(self._keys, self.legacy_secret, [signed_data])[0]
+
+    def sign_many(self, items: Sequence[Any], executor: str = "thread") -> List[Dict[str, Any]]:
+        """
+        Sign a batch of payloads with the active key.
+
+        Args:
+            items: The payloads to sign
+            executor: "thread" or "process" pool for batches over the threshold
+
+        Returns:
+            Signed payloads, in input order
+        """
+        timestamp = str(int(time.time()))
+        nonces = [uuid.uuid4().hex for _ in items]
+        key_id, key, base = self._active
+
+        if len(items) < self.parallel_threshold or self.max_workers == 1:
+            signatures = _sign_chunk(key, items, timestamp, nonces, base)
+        else:
+            starts = range(0, len(items), self.chunk_size)
+            chunks = self._pool(executor).map(
+                _sign_chunk,
+                [key] * len(starts),
+                [items[i:i + self.chunk_size] for i in starts],
+                [timestamp] * len(starts),
+                [nonces[i:i + self.chunk_size] for i in starts],
+            )
+            signatures = [signature for chunk in chunks for signature in chunk]
+
+        return [
+            {
+                "data": data,
+                "metadata": {"timestamp": timestamp, "nonce": nonce, "key_id": key_id, "signature": signature},
+            }
+            for data, nonce, signature in zip(items, nonces, signatures)
+        ]
+
+    def verify_many(self, signed_items: Sequence[Dict[str, Any]], executor: str = "thread") -> List[bool]:
+        """
+        Verify a batch of signed payloads.
+
+        Args:
+            signed_items: Outputs of sign() or sign_many()
+            executor: "thread" or "process" pool for batches over the threshold
+
+        Returns:
+            Whether each signature is valid, in input order
+        """
+        if len(signed_items) < self.parallel_threshold or self.max_workers == 1:
+            return _verify_chunk(self._keys, self.legacy_secret, signed_items)
+
+        starts = range(0, len(signed_items), self.chunk_size)
+        chunks = self._pool(executor).map(
+            _verify_chunk,
+            [self._keys] * len(starts),
+            [self.legacy_secret] * len(starts),
+            [signed_items[i:i + self.chunk_size] for i in starts],
+        )
+        return [result for chunk in chunks for result in chunk]
+
+    def shutdown(self) -> None:
+        """Shut down the worker pools."""
+        for pool in self._pools.values():
+            pool.shutdown()
+        self._pools.clear()
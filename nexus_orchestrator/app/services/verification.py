@@ -0,0 +1,137 @@
+"""
+Record verification against stored digests.
+
+Digests are canonical-JSON SHA-256 hashes, so verification no longer
+depends on dictionary key order. Records written before canonical hashing
+are still accepted under the legacy encoding. Bulk verification spreads
+the hashing across a thread or process pool and reports throughput.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.hashing import sha256_hex
+
+HASH_ALG = "sha256-canonical-json"
+
+
+def legacy_digest(data: Any) -> str:
+    """Digest of records logged before canonical hashing."""
+    return hashlib.sha256(json.dumps(data, default=str).encode()).hexdigest()
+
+
+def _digest_chunk(chunk: Sequence[Any]) -> List[str]:
+    """Canonical digests of a chunk of records; runs in a pool worker."""
+    return [sha256_hex(data) for data in chunk]
+
+
+class RecordVerifier:
+    """Verifies records against a digest index, one at a time or in bulk."""
+
+    def __init__(self, lookup: Callable[[str], Optional[str]], max_workers: Optional[int] = None,
+                 chunk_size: int = 512):
+        """
+        Initialize the verifier.
+
+        Args:
+            lookup: Returns the stored digest for a task ID, or None
+            max_workers: Pool size for bulk verification (default: CPU count)
+            chunk_size: Records hashed per pool task
+        """
+        self._lookup = lookup
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pools: Dict[str, Executor] = {}
+
+    def match(self, task_id: str, data: Any, digest: Optional[str] = None) -> Optional[str]:
+        """
+        Get the stored digest if a record's data matches it.
+
+        Args:
+            task_id: The ID of the task
+            data: The data to verify
+            digest: Precomputed canonical digest of data
+
+        Returns:
+            The stored digest, or None if the record is missing or differs
+        """
+        stored = self._lookup(task_id)
+        if stored is None or not self._matches(stored, data, digest or sha256_hex(data)):
+            return None
+        return stored
+
+    @staticmethod
+    def _matches(stored: str, data: Any, digest: str) -> bool:
+        # Older records were hashed without sorted keys
+        return stored == digest or stored == legacy_digest(data)
+
+    def verify(self, task_id: str, data: Any) -> bool:
+        """
+        Verify a single record.
+
+        Args:
+            task_id: The ID of the task
+            data: The data to verify
+
+        Returns:
+            Whether the record is valid
+        """
+        return self.match(task_id, data) is not None
+
+    def _pool(self, executor: str) -> Executor:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        pool = self._pools.get(executor)
+        if pool is None:
+            pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+            pool = self._pools[executor] = pool_class(max_workers=self.max_workers)
+        return pool
+
+    def verify_many(self, records: Sequence[Tuple[str, Any]], executor: str = "thread") -> Dict[str, Any]:
+        """
+        Verify many records in one call.
+
+        Args:
+            records: (task_id, data) pairs
+            executor: "thread" or "process"; processes pay off for large payloads
+
+        Returns:
+            Dictionary with per-record "results" (in input order), counts of
+            "verified", "failed" and "missing" records, "elapsed_ms" and
+            "records_per_second"
+        """
+        start = time.perf_counter()
+        pool = self._pool(executor)
+        chunks = [records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size)]
+        digest_chunks = pool.map(_digest_chunk, [[data for _, data in chunk] for chunk in chunks])
+
+        results = []
+        counts = {"verified": 0, "failed": 0, "missing": 0}
+        for chunk, digests in zip(chunks, digest_chunks):
+            for (task_id, data), digest in zip(chunk, digests):
+                stored = self._lookup(task_id)
+                if stored is None:
+                    status = "missing"
+                elif self._matches(stored, data, digest):
+                    status = "verified"
+                else:
+                    status = "failed"
+                counts[status] += 1
+                results.append({"task_id": task_id, "verified": status == "verified", "status": status})
+
+        elapsed = time.perf_counter() - start
+        return {
+            "results": results,
+            **counts,
+            "elapsed_ms": elapsed * 1000,
+            "records_per_second": len(records) / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Shut down the worker pools."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+        self._pools.clear()
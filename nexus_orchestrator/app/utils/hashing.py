@@ -0,0 +1,41 @@
+"""
+Hashing helpers over canonical JSON (see app.utils.serialization).
+"""
+import hashlib
+from typing import Any, Optional, Tuple
+
+from app.utils.serialization import canonical_json
+
+
+def sha256_hex(data: Any) -> str:
+    """Hex SHA-256 of the canonical JSON encoding of data."""
+    return hashlib.sha256(canonical_json(data)).hexdigest()
+
+
+def encode_and_hash(data: Any) -> Tuple[bytes, str]:
+    """
+    Encode data canonically and hash it in one pass.
+
+    For callers that also store the encoding, so it is not produced twice.
+
+    Returns:
+        Tuple of (canonical JSON, hex SHA-256 of it)
+    """
+    encoded = canonical_json(data)
+    return encoded, hashlib.sha256(encoded).hexdigest()
+
+
+def link_digest(prev_hash: Optional[str], data: Any) -> str:
+    """
+    Digest of a hash-chained record.
+
+    Args:
+        prev_hash: Digest of the previous record, or None for the first
+        data: The record data
+
+    Returns:
+        Hex SHA-256 committing to both the previous digest and the data
+    """
+    h = hashlib.sha256((prev_hash or "").encode())
+    h.update(canonical_json(data))
+    return h.hexdigest()
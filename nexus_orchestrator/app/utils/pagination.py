@@ -0,0 +1,85 @@
+"""
+Keyset pagination helpers.
+
+Listings page by primary key: each page selects rows with an id above the
+last one returned, so fetching a page costs the same however deep into
+the table it is. Clients get the position as an opaque cursor.
+"""
+import base64
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_CURSOR_PREFIX = b"id:"
+_TIME_CURSOR_PREFIX = b"at:"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last id of a page as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(_CURSOR_PREFIX + str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor from encode_cursor().
+
+    Args:
+        cursor: Cursor returned with a previous page
+
+    Returns:
+        The id to continue after
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not raw.startswith(_CURSOR_PREFIX) or not raw[len(_CURSOR_PREFIX):].isdigit():
+        raise ValueError("Invalid cursor")
+    return int(raw[len(_CURSOR_PREFIX):])
+
+
+def encode_time_cursor(timestamp: float, key: str) -> str:
+    """Encode the (timestamp, key) of the last row of a page ordered newest first."""
+    raw = _TIME_CURSOR_PREFIX + f"{timestamp!r}:{key}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_time_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Decode a cursor from encode_time_cursor().
+
+    Returns:
+        The (timestamp, key) to continue after
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        if not raw.startswith(_TIME_CURSOR_PREFIX):
+            raise ValueError("Invalid cursor")
+        timestamp, key = raw[len(_TIME_CURSOR_PREFIX):].decode().split(":", 1)
+        return float(timestamp), key
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_page(rows: Sequence[Any], limit: int) -> Dict[str, Any]:
+    """
+    Build a page from rows fetched with limit + 1.
+
+    The extra row only signals that another page exists and is not returned.
+
+    Args:
+        rows: Rows ordered by id, at most limit + 1 of them
+        limit: Page size
+
+    Returns:
+        Dict with the page's items and the cursor for the next page, or None
+    """
+    items: List[Any] = list(rows[:limit])
+    next_cursor: Optional[str] = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor(items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,195 @@
+"""
+Shared JSON serialization for hashing, logging and API responses.
+
+Uses orjson when it is installed and the standard library otherwise.
+Canonical encoding is byte-identical on both backends, so hashes do not
+depend on which one a host has: orjson's output is used only when it
+cannot differ from the standard library's, and numbers it formats
+differently fall back to the standard encoder. It matches json.dumps with
+sorted keys and default=str, except that Enum members encode as their
+value, as orjson always encodes them, and lone surrogates, which UTF-8
+cannot carry, are written as \\uXXXX escapes.
+"""
+import hashlib
+import json
+import math
+import re
+from enum import Enum
+from typing import Any, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+
+def _canonical_default(value: Any) -> Any:
+    """Encode values JSON has no type for: Enum members by value, anything else with str()."""
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def _orjson_default(value: Any) -> Any:
+    # orjson hands over float and tuple subclasses (e.g. named tuples), which
+    # the standard encoder writes as numbers and arrays; leave those to it
+    if isinstance(value, (float, tuple)):
+        raise TypeError(f"{type(value).__name__} is left to the standard encoder")
+    return _canonical_default(value)
+
+
+# Built once; json.dumps re-creates an encoder whenever options are passed
+_CANONICAL_ENCODER = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), ensure_ascii=False, allow_nan=False, default=_canonical_default,
+)
+
+if HAVE_ORJSON:
+    # Datetimes and dataclasses go through str(), as with the standard encoder
+    _CANONICAL_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    _FAST_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Surrogate code points left unpaired in a str; json writes them raw with ensure_ascii=False
+_SURROGATE = re.compile("[\ud800-\udfff]")
+
+
+def _escape_surrogate(match: re.Match) -> str:
+    return "\\u%04x" % ord(match.group())
+
+
+def _utf8(text: str) -> bytes:
+    """UTF-8 encode JSON text, escaping lone surrogates as json does with ensure_ascii=True."""
+    try:
+        return text.encode()
+    except UnicodeEncodeError:
+        return _SURROGATE.sub(_escape_surrogate, text).encode()
+
+
+# Numbers orjson writes differently from repr(): exponents and small fractions.
+# The exponent check is a cheap literal-led scan; only its hits run the full pattern.
+_EXPONENT = re.compile(rb"e[-0-9]")
+_DIVERGENT_NUMBER = re.compile(rb"(?:^|[:,\[])-?(?:\d+(?:\.\d+)?e|0\.0000)")
+
+
+def _finite(data: Any) -> Any:
+    """Replace non-finite floats, which JSON cannot represent, with None."""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: _finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_finite(value) for value in data]
+    return data
+
+
+def _canonical_stdlib(data: Any) -> bytes:
+    try:
+        text = _CANONICAL_ENCODER.encode(data)
+    except ValueError:
+        text = _CANONICAL_ENCODER.encode(_finite(data))
+    return _utf8(text)
+
+
+def canonical_json(data: Any) -> bytes:
+    """
+    Encode data as canonical JSON.
+
+    Keys are sorted and separators are compact, so equal data always
+    encodes to the same bytes regardless of dictionary insertion order.
+    Non-finite floats encode as null and lone surrogates as \\uXXXX escapes.
+
+    Args:
+        data: JSON-serializable data; Enum members are encoded as their
+            value and other values with str()
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if HAVE_ORJSON:
+        try:
+            encoded = orjson.dumps(data, default=_orjson_default, option=_CANONICAL_OPTIONS)
+        except TypeError:
+            # Non-string keys, integers beyond 64 bits, float and tuple subclasses, and lone
+            # surrogates, which orjson rejects and the standard path escapes
+            return _canonical_stdlib(data)
+        if (b"0.0000" not in encoded and _EXPONENT.search(encoded) is None) \
+                or _DIVERGENT_NUMBER.search(encoded) is None:
+            return encoded
+    return _canonical_stdlib(data)
+
+
+def dumps(data: Any, indent: bool = False) -> bytes:
+    """
+    Encode data as JSON as fast as possible, without canonical ordering.
+
+    For logs, prompts and responses; use canonical_json() for anything hashed.
+
+    Args:
+        data: JSON-serializable data; other values are encoded with str()
+        indent: Indent by two spaces for readability
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if HAVE_ORJSON:
+        option = _FAST_OPTIONS | orjson.OPT_INDENT_2 if indent else _FAST_OPTIONS
+        try:
+            return orjson.dumps(data, default=str, option=option)
+        except TypeError:
+            pass
+    return _utf8(json.dumps(data, default=str, ensure_ascii=False, indent=2 if indent else None))
+
+
+def dumps_str(data: Any, indent: bool = False) -> str:
+    """Like dumps(), returning a string."""
+    return dumps(data, indent).decode()
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or a string."""
+    if HAVE_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects escaped lone surrogates, which the encoders above write
+            pass
+    return json.loads(data)
+
+
+class StreamingDigest:
+    """
+    SHA-256 of the canonical JSON array of items, fed one item at a time.
+
+    Equal to sha256 of canonical_json(list(items)), without holding the
+    whole list or its encoding in memory.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256(b"[")
+        self._count = 0
+        self._digest: Optional[str] = None
+
+    def update(self, item: Any) -> None:
+        """Add the next item."""
+        if self._digest is not None:
+            raise ValueError("Digest already finalized")
+        if self._count:
+            self._hash.update(b",")
+        self._hash.update(canonical_json(item))
+        self._count += 1
+
+    def update_many(self, items: Iterable[Any]) -> None:
+        """Add several items in order."""
+        for item in items:
+            self.update(item)
+
+    @property
+    def count(self) -> int:
+        """Number of items added."""
+        return self._count
+
+    def hexdigest(self) -> str:
+        """Finish the array and return its hex digest."""
+        if self._digest is None:
+            self._hash.update(b"]")
+            self._digest = self._hash.hexdigest()
+        return self._digest
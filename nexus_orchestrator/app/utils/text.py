@@ -0,0 +1,32 @@
+"""
+Text processing helpers shared by search and retrieval.
+"""
+import re
+from typing import List
+
+# Keeps dotted, hyphenated and versioned names such as "scikit-learn" or "pydantic.v1" whole
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-+][a-z0-9]+)*")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has",
+    "have", "if", "in", "into", "is", "it", "its", "of", "on", "or", "so", "such",
+    "that", "the", "their", "then", "there", "these", "this", "to", "was", "we",
+    "were", "will", "with", "you", "your",
+})
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """
+    Split text into lowercase terms.
+    
+    Args:
+        text: The text to tokenize
+        drop_stopwords: Whether to drop common English stopwords
+        
+    Returns:
+        List of terms in order of appearance
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if drop_stopwords:
+        return [token for token in tokens if token not in STOPWORDS]
+    return tokens
@@ -0,0 +1,118 @@
+"""
+Load test: orchestration latency with and without CRUD traffic on the
+same event loop, for the previous blocking sessions vs async sessions.
+
+Usage (from the nexus_orchestrator directory):
+    python benchmarks/bench_crud_latency.py --orchestrations 50 --crud-workers 16 --seconds 5
+
+Orchestrations are simulated as a sequence of awaited model calls, so their
+latency only grows when something blocks the loop. CRUD workers mix
+creates, reads, listings and updates of agents against a SQLite file
+database (set SQLALCHEMY_DATABASE_URI to use another database).
+Reports p50/p95/max orchestration latency for each scenario.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.environ.get("SQLALCHEMY_DATABASE_URI"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="nexus-bench-"), "bench.db")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+
+from app.db.session import AsyncSessionLocal, SessionLocal, create_tables, dispose_async_engine
+from app.orchestration.agents import agent_service
+from app.schemas.agent import AgentCreate, AgentUpdate
+
+
+def make_agent(i: int) -> AgentCreate:
+    return AgentCreate(
+        name=f"agent-{i}", description="benchmark agent", model_name="gpt-4", provider="openai",
+        goal="answer", role="analyst", skills=["analysis", "summaries"],
+    )
+
+
+async def orchestration(steps: int, step_seconds: float) -> float:
+    """One simulated orchestration; returns its wall-clock latency."""
+    start = time.perf_counter()
+    for _ in range(steps):
+        await asyncio.sleep(step_seconds)
+    return time.perf_counter() - start
+
+
+async def sync_crud_worker(stop: float, counter: list) -> None:
+    """CRUD as the endpoints did before: blocking session calls inside a coroutine."""
+    while time.perf_counter() < stop:
+        db = SessionLocal()
+        try:
+            agent = agent_service.create_agent(db, make_agent(counter[0]))
+            agent_service.get_agent(db, agent.id)
+            agent_service.get_all_agents(db, limit=20, after_id=random.randint(0, 50))
+            agent_service.update_agent(db, agent.id, AgentUpdate(goal="updated"))
+        finally:
+            db.close()
+        counter[0] += 1
+        await asyncio.sleep(0)
+
+
+async def async_crud_worker(stop: float, counter: list) -> None:
+    """The same CRUD mix through async sessions."""
+    while time.perf_counter() < stop:
+        async with AsyncSessionLocal() as db:
+            agent = await agent_service.create_agent_async(db, make_agent(counter[0]))
+            await agent_service.get_agent_async(db, agent.id)
+            await agent_service.get_all_agents_async(db, limit=20, after_id=random.randint(0, 50))
+            await agent_service.update_agent_async(db, agent.id, AgentUpdate(goal="updated"))
+        counter[0] += 1
+
+
+async def scenario(label: str, args, worker=None) -> None:
+    stop = time.perf_counter() + args.seconds
+    counter = [0]
+    workers = [asyncio.create_task(worker(stop, counter)) for _ in range(args.crud_workers)] if worker else []
+
+    latencies = []
+
+    async def orchestrations() -> None:
+        while time.perf_counter() < stop:
+            latencies.append(await orchestration(args.steps, args.step_ms / 1000))
+
+    await asyncio.gather(*(orchestrations() for _ in range(args.orchestrations)), *workers)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<18} p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+          f"p95 {p95 * 1000:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms   "
+          f"CRUD ops/s {counter[0] * 4 / args.seconds:8.0f}")
+
+
+async def run(args) -> None:
+    ideal = args.steps * args.step_ms
+    print(f"{args.orchestrations} concurrent orchestrations of {args.steps} x {args.step_ms:g} ms "
+          f"(ideal {ideal:g} ms), {args.crud_workers} CRUD workers")
+    await scenario("orchestration only", args)
+    await scenario("+ blocking CRUD", args, sync_crud_worker)
+    await scenario("+ async CRUD", args, async_crud_worker)
+    await dispose_async_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orchestrations", type=int, default=50)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--step-ms", type=float, default=20.0)
+    parser.add_argument("--crud-workers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
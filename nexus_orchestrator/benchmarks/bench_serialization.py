@@ -0,0 +1,106 @@
+"""
+Benchmark JSON work per orchestration: the previous json.dumps calls vs the
+shared serialization layer.
+
+Usage (from the nexus_orchestrator directory):
+    python benchmarks/bench_serialization.py --orchestrations 200 --roles 4 --iterations 3
+
+Replays the encoding and hashing a consensus orchestration does, without
+calling any model: the contract, one journal record per thought, the
+consensus and retry prompts for each iteration, and the chain summary.
+Reports CPU time per orchestration for both paths.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.decision_journal import DecisionJournal
+from app.utils.hashing import encode_and_hash
+from app.utils.serialization import HAVE_ORJSON, canonical_json, dumps_str
+
+
+def make_response(i: int, response_bytes: int) -> str:
+    return f"Response {i}: " + ("considered analysis é " * (response_bytes // 22))
+
+
+def previous(roles: int, iterations: int, responses: list) -> int:
+    """The encoding done per orchestration before the serialization layer."""
+    encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    work = 0
+    contract = {"agents": list(range(roles)), "task_id": "t", "terms": {"prompt": "p"}, "status": "active",
+                "created_at": time.time()}
+    contract_id = hashlib.sha256(json.dumps(contract, default=str).encode()).hexdigest()[:16]
+    contract["contract_id"] = contract_id
+    data_hash = hashlib.sha256(encoder.encode(contract).encode()).hexdigest()
+    work += len(json.dumps({"data_hash": data_hash, "data": contract}, default=str, separators=(",", ":")))
+
+    iteration_log = []
+    for iteration in range(iterations):
+        results = {f"role_{r}": responses[(iteration * roles + r) % len(responses)] for r in range(roles)}
+        for role, response in results.items():
+            thought = {"agent": role, "content": response, "created_at": time.time()}
+            data_hash = hashlib.sha256(encoder.encode(thought).encode()).hexdigest()
+            work += len(json.dumps({"data_hash": data_hash, "data": thought}, default=str, separators=(",", ":")))
+        work += len(json.dumps(results, indent=2))  # consensus prompt
+        work += len(json.dumps(results, indent=2))  # retry prompt
+        iteration_log.append({"iteration": iteration + 1, "results": results})
+
+    summary = json.dumps({"iterations": iteration_log})
+    work += len(hashlib.sha256(encoder.encode(summary).encode()).hexdigest())
+    return work
+
+
+def current(roles: int, iterations: int, responses: list) -> int:
+    """The same orchestration through the shared serialization layer."""
+    work = 0
+    contract = {"agents": list(range(roles)), "task_id": "t", "terms": {"prompt": "p"}, "status": "active",
+                "created_at": time.time()}
+    encoded, data_hash = encode_and_hash(contract)
+    work += len(DecisionJournal._encode({"data_hash": data_hash, "data": contract}, {"data": encoded}))
+
+    iteration_log = []
+    for iteration in range(iterations):
+        results = {f"role_{r}": responses[(iteration * roles + r) % len(responses)] for r in range(roles)}
+        for role, response in results.items():
+            thought = {"agent": role, "content": response, "created_at": time.time()}
+            encoded, data_hash = encode_and_hash(thought)
+            work += len(DecisionJournal._encode({"data_hash": data_hash, "data": thought}, {"data": encoded}))
+        work += len(dumps_str(results, indent=True))  # shared by the consensus and retry prompts
+        iteration_log.append({"iteration": iteration + 1, "results": results})
+
+    summary = dumps_str({"iterations": iteration_log})
+    work += len(hashlib.sha256(canonical_json(summary)).hexdigest())
+    return work
+
+
+def run(label: str, fn, args, responses: list) -> float:
+    start = time.process_time()
+    for _ in range(args.orchestrations):
+        fn(args.roles, args.iterations, responses)
+    per = (time.process_time() - start) / args.orchestrations * 1000
+    print(f"{label:<10} {per:.3f} ms CPU per orchestration")
+    return per
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orchestrations", type=int, default=200)
+    parser.add_argument("--roles", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--response-bytes", type=int, default=4096)
+    args = parser.parse_args()
+
+    responses = [make_response(i, args.response_bytes) for i in range(16)]
+    print(f"orjson: {'yes' if HAVE_ORJSON else 'no (standard library fallback)'}")
+    before = run("previous", previous, args, responses)
+    after = run("current", current, args, responses)
+    print(f"saved      {before - after:.3f} ms CPU per orchestration ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark HMAC signing: the previous per-call path vs SigningService.
+
+Usage (from the nexus_orchestrator directory):
+    python benchmarks/bench_signing.py --payloads 20000 --payload-bytes 512
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.signing import SigningService
+
+
+def legacy_sign(data: dict) -> dict:
+    """The previous path: environment lookup and key setup on every call."""
+    data_str = json.dumps(data, sort_keys=True, default=str)
+    timestamp = str(int(time.time()))
+    nonce = uuid.uuid4().hex
+    key = os.getenv("SECRET_KEY", "nexus-ai-orchestrator-secret-key")
+    message = f"{data_str}|{timestamp}|{nonce}"
+    signature = hmac.new(key.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return {"data": data, "metadata": {"timestamp": timestamp, "nonce": nonce, "signature": signature}}
+
+
+def report(label: str, count: int, elapsed: float) -> None:
+    print(f"{label:<28} {count / elapsed:>12,.0f} payloads/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", type=int, default=20000)
+    parser.add_argument("--payload-bytes", type=int, default=512)
+    args = parser.parse_args()
+
+    payloads = [
+        {"agent": f"agent_{i % 5}", "input": {"prompt": "p" * 64}, "output": "x" * args.payload_bytes, "i": i}
+        for i in range(args.payloads)
+    ]
+    signer = SigningService.from_env()
+
+    start = time.perf_counter()
+    for data in payloads:
+        legacy_sign(data)
+    report("legacy sign (single)", len(payloads), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for data in payloads:
+        signer.sign(data)
+    report("service sign (single)", len(payloads), time.perf_counter() - start)
+
+    for executor in ("thread", "process"):
+        signer.sign_many(payloads[:signer.parallel_threshold], executor)  # Warm up the pool
+        start = time.perf_counter()
+        signed = signer.sign_many(payloads, executor)
+        report(f"service sign_many ({executor})", len(payloads), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = signer.verify_many(signed, executor)
+        report(f"service verify_many ({executor})", len(payloads), time.perf_counter() - start)
+        assert all(results)
+
+    start = time.perf_counter()
+    for item in signed:
+        signer.verify(item)
+    report("service verify (single)", len(payloads), time.perf_counter() - start)
+    signer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark resolving orchestration roles to agents by skill: a skill query
+against the database vs the in-process skill index.
+
+Usage (from the nexus_orchestrator directory):
+    python benchmarks/bench_skill_resolution.py --agents 20000 --skills 300 --lookups 5000
+
+Creates agents with random skill sets in a SQLite file database (set
+SQLALCHEMY_DATABASE_URI to use another database), then times role
+lookups with two or three required skills.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.environ.get("SQLALCHEMY_DATABASE_URI"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="nexus-bench-"), "bench.db")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_path}"
+
+from sqlalchemy import insert
+
+from app.db.models.agent import Agent
+from app.db.session import SessionLocal, create_tables, engine
+from app.orchestration.agents.agent_service import find_agents_by_skills
+from app.orchestration.agents.skill_index import SkillIndex
+
+
+def report(label: str, lookups: int, elapsed: float) -> None:
+    print(f"{label:<30} {elapsed / lookups * 1e6:>10.1f} us per lookup")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=20000)
+    parser.add_argument("--skills", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = [f"skill-{i}" for i in range(args.skills)]
+    create_tables()
+    with engine.begin() as conn:
+        conn.execute(insert(Agent), [
+            {"name": f"agent-{i}", "description": "", "model_name": "gpt-4", "provider": "openai",
+             "goal": "", "role": "", "config": {}, "skills": rng.sample(vocabulary, rng.randint(2, 8))}
+            for i in range(args.agents)
+        ])
+    roles = [rng.sample(vocabulary, rng.randint(2, 3)) for _ in range(200)]
+
+    db = SessionLocal()
+    db_lookups = max(args.lookups // 50, 20)
+    start = time.perf_counter()
+    for i in range(db_lookups):
+        find_agents_by_skills(db, roles[i % len(roles)], match="all", limit=1)
+    report("database query (match=all)", db_lookups, time.perf_counter() - start)
+
+    index = SkillIndex()
+    start = time.perf_counter()
+    index.load(db)
+    print(f"{'index load':<30} {(time.perf_counter() - start) * 1000:>10.1f} ms for {args.agents} agents")
+    db.close()
+
+    start = time.perf_counter()
+    for i in range(len(roles)):
+        index.resolve(roles[i])
+    report("index resolve (first time)", len(roles), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        index.resolve(roles[i % len(roles)])
+    report("index resolve (repeated)", args.lookups, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,34 @@ This module provides a hybrid approach to blockchain integration:
 2. Real blockchain interactions when needed
 3. API-based alternatives for features typically requiring blockchain
 """
+import asyncio
+import atexit
 import os
 import json
 import hashlib
+import threading
 import time
 import uuid
 import base64
-import hmac
+from concurrent.futures import Future
 from typing import Dict, Any, List, Optional, Tuple
 import httpx
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, select
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
 
 # Import models
 from setup_database import BlockchainRecord, DATABASE_URL
+from app.core.config import settings
+from app.db.batch_writer import BatchWriter
+from app.db.engine_registry import engine_registry
+from app.services.anchoring import ANCHOR_RECORD_PREFIX, AnchorBatch, MerkleAnchorer, anchor_journal_record
+from app.services.chain_anchor import ChainAnchor
+from app.services.decision_journal import DecisionJournal
+from app.services.retention import RetentionManager, RetentionPolicy
+from app.services.signing import SigningService
+from app.services.verification import HASH_ALG, RecordVerifier
+from app.utils.hashing import sha256_hex
 
 # Load environment variables
 load_dotenv()
@@ -28,33 +41,159 @@ load_dotenv()
 class BlockchainIntegration:
     """Smart blockchain integration with fallback mechanisms."""
     
-    def __init__(self, simulation_mode: bool = True):
+    def __init__(self, simulation_mode: bool = True, batch_size: int = 500,
+                 flush_interval: float = 0.05, max_queue_size: int = 10_000,
+                 database_url: Optional[str] = None):
         """Initialize blockchain integration.
         
+        Does no I/O: the database engine, record writer and HTTP client are
+        created on first use, and the journal on its first record.
+        Retention of the record journal runs once start() is called. Use
+        the module's blockchain_integration rather than another instance
+        for the same working directory, since each instance owns its
+        journal files.
+        
         Args:
             simulation_mode: Whether to use simulation mode (default: True)
+            batch_size: Maximum records per database insert
+            flush_interval: Seconds to wait for a batch of records to fill
+            max_queue_size: Queued records before logging blocks
+            database_url: Database to write to (default: DATABASE_URL)
         """
         self.simulation_mode = simulation_mode
         self.storage_dir = os.path.join(os.getcwd(), "blockchain_sim")
-        os.makedirs(self.storage_dir, exist_ok=True)
         
-        # Database connection
-        self.engine = create_engine(DATABASE_URL)
-        self.Session = sessionmaker(bind=self.engine)
+        # Database connection and record writer, created on first use
+        self.database_url = database_url or DATABASE_URL
+        self._writer_options = {"batch_size": batch_size, "flush_interval": flush_interval,
+                                "max_queue_size": max_queue_size}
+        self._lock = threading.Lock()
+        self._engine = None
+        self._Session: Optional[sessionmaker] = None
+        self._writer: Optional[BatchWriter] = None
+        
+        # API client for alternative verification, created on first use
+        self._http_client: Optional[httpx.AsyncClient] = None
+        
+        # Signing keys are read from the environment and derived once
+        self.signer = SigningService.from_env()
+        
+        # Simulated records are backed up to a journal tiered by retention;
+        # digests cover records queued but not yet committed
+        self._digests: Dict[str, str] = {}
+        self.journal = DecisionJournal(
+            os.path.join(self.storage_dir, "records", "journal"),
+            bucket_seconds=settings.RETENTION_BUCKET_SECONDS,
+        )
+        # Anchored batches prove records in every tier, so they never expire
+        ttl_seconds = {ANCHOR_RECORD_PREFIX: None, **settings.RETENTION_TTL_SECONDS}
+        self.retention = RetentionManager(
+            self.journal,
+            RetentionPolicy(ttl_seconds, settings.RETENTION_DEFAULT_TTL_SECONDS),
+            hot_seconds=settings.RETENTION_HOT_SECONDS,
+            archive_after_seconds=settings.RETENTION_ARCHIVE_AFTER_SECONDS,
+            archive_dir=settings.RETENTION_ARCHIVE_DIR and os.path.join(settings.RETENTION_ARCHIVE_DIR, "records"),
+            max_io_bytes_per_second=settings.RETENTION_MAX_IO_BYTES_PER_SECOND,
+            interval=settings.RETENTION_INTERVAL_SECONDS,
+            legacy_dir=self.storage_dir,
+            legacy_key_field="reference_id",
+            legacy_hash_field="hash_value",
+        )
+        
+        # Outside simulation, record hashes are anchored on chain in Merkle
+        # batches, which are kept in the journal so proofs survive restarts
+        self.chain_anchor: Optional[ChainAnchor] = None
+        self.anchorer: Optional[MerkleAnchorer] = None
+        if not simulation_mode:
+            self.chain_anchor = ChainAnchor(
+                os.getenv("WEB3_PROVIDER_URI", "http://localhost:8545"),
+                private_key=os.getenv("ANCHOR_PRIVATE_KEY"),
+            )
+            self.anchorer = MerkleAnchorer(
+                anchor=lambda root, batch: self.chain_anchor.anchor_sync(root, len(batch.data_hashes)),
+                persist=self._persist_batch,
+                load=self._load_batch,
+                max_cached_batches=settings.ANCHOR_CACHED_BATCHES,
+                retry_base_seconds=settings.ANCHOR_RETRY_BASE_SECONDS,
+                retry_max_seconds=settings.ANCHOR_RETRY_MAX_SECONDS,
+            )
         
-        # API clients for alternative verification
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.verifier = RecordVerifier(self._stored_hash)
     
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_client.aclose()
+        await asyncio.to_thread(self.close)
+        if self._http_client is not None:
+            await self._http_client.aclose()
+    
+    def _ensure_database(self) -> None:
+        """Create the engine, session factory and record writer on first use."""
+        with self._lock:
+            if self._writer is not None:
+                return
+            # Shared with every other user of this database
+            self._engine = engine_registry.engine(self.database_url)
+            self._Session = sessionmaker(bind=self._engine)
+            self._writer = BatchWriter(
+                self._engine, BlockchainRecord.__table__, on_batch=self._write_backup, **self._writer_options
+            )
+    
+    @property
+    def engine(self):
+        """The database engine."""
+        self._ensure_database()
+        return self._engine
+    
+    @property
+    def Session(self) -> sessionmaker:
+        """Session factory for the database."""
+        self._ensure_database()
+        return self._Session
+    
+    @property
+    def writer(self) -> BatchWriter:
+        """Batch writer for decision records."""
+        self._ensure_database()
+        return self._writer
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """HTTP client for external verification APIs."""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.AsyncClient(timeout=30.0)
+            return self._http_client
+    
+    def start(self) -> None:
+        """Start decision log retention in the background."""
+        if settings.RETENTION_ENABLED:
+            self.retention.start()
+    
+    def stop(self) -> None:
+        """Stop decision log retention."""
+        self.retention.stop()
+    
+    def close(self) -> None:
+        """Write all queued records, anchor open batches and stop background work."""
+        self.retention.stop()
+        if self._writer is not None:
+            self._writer.close()
+        # Anchoring persists the batches to the journal, so it goes first
+        if self.anchorer is not None:
+            self.anchorer.flush()
+        self.journal.close()
     
     def log_decision(self, record_type: str, reference_id: str, 
                     data: Dict[str, Any], task_id: Optional[str] = None) -> Tuple[str, str]:
         """
-        Log a decision to blockchain or simulation.
+        Log a decision to blockchain or simulation, waiting for it to be committed.
+        
+        The record is written with the batch writer's next batch, so a lone
+        call waits up to the writer's flush_interval plus one insert. Use
+        submit_decision, or submit_decision_async from async code, to avoid
+        waiting.
         
         Args:
             record_type: Type of record (e.g., "task", "agent_decision", "consensus")
@@ -65,60 +204,99 @@ class BlockchainIntegration:
         Returns:
             Tuple of (record ID, transaction hash)
         """
-        # Convert data to JSON string for hashing
-        data_json = json.dumps(data, default=str)
+        future, tx_hash = self.submit_decision(record_type, reference_id, data, task_id)
+        return str(future.result()), tx_hash
+    
+    def submit_decision(self, record_type: str, reference_id: str,
+                        data: Dict[str, Any], task_id: Optional[str] = None) -> Tuple[Future, str]:
+        """
+        Queue a decision for the batch writer without waiting for the database.
         
-        # Create a hash
-        data_hash = hashlib.sha256(data_json.encode()).hexdigest()
+        Blocks only while the writer's queue is full.
         
-        # Use database for storage
-        session = self.Session()
-        try:
-            # Create blockchain record
-            tx_hash = f"sim_{data_hash[:16]}" if self.simulation_mode else None
-            
-            # Determine actual blockchain action based on mode
-            if not self.simulation_mode:
-                tx_hash = self._blockchain_log_decision(record_type, reference_id, data_hash, data)
-            
-            # Create database record
-            record = BlockchainRecord(
-                record_type=record_type,
-                reference_id=reference_id,
-                hash_value=data_hash,
-                data=data,
-                tx_hash=tx_hash,
-                verified=self.simulation_mode  # Auto-verified in simulation mode
-            )
-            
-            session.add(record)
-            session.commit()
+        Args:
+            record_type: Type of record (e.g., "task", "agent_decision", "consensus")
+            reference_id: ID of the referenced item
+            data: Data to log
+            task_id: Optional task ID for reference
             
-            # Also save to local file as backup
-            if self.simulation_mode:
-                filename = os.path.join(self.storage_dir, f"{reference_id}.json")
-                with open(filename, 'w') as f:
-                    json.dump({
-                        "record_id": record.id,
-                        "record_type": record_type,
-                        "reference_id": reference_id,
-                        "hash_value": data_hash,
-                        "data": data,
-                        "tx_hash": tx_hash,
-                        "timestamp": time.time()
-                    }, f, default=str, indent=2)
+        Returns:
+            Tuple of (Future resolving to the record ID, transaction hash)
+        """
+        row = self._decision_row(record_type, reference_id, data)
+        return self.writer.submit(row), row["tx_hash"]
+    
+    async def submit_decision_async(self, record_type: str, reference_id: str,
+                                    data: Dict[str, Any], task_id: Optional[str] = None) -> Tuple[Future, str]:
+        """
+        Queue a decision for the batch writer from async code.
+        
+        Never blocks the event loop, even while the writer's queue is full.
+        
+        Args:
+            record_type: Type of record (e.g., "task", "agent_decision", "consensus")
+            reference_id: ID of the referenced item
+            data: Data to log
+            task_id: Optional task ID for reference
             
-            return str(record.id), tx_hash
+        Returns:
+            Tuple of (Future resolving to the record ID, transaction hash);
+            await the Future with asyncio.wrap_future
+        """
+        row = self._decision_row(record_type, reference_id, data)
+        return await self.writer.submit_async(row), row["tx_hash"]
+    
+    def _decision_row(self, record_type: str, reference_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Hash a decision and build its database row."""
+        # Hash the canonical JSON encoding, independent of key order
+        data_hash = sha256_hex(data)
         
-        finally:
-            session.close()
+        # Create blockchain record
+        tx_hash = f"sim_{data_hash[:16]}" if self.simulation_mode else None
+        
+        # Determine actual blockchain action based on mode
+        if not self.simulation_mode:
+            tx_hash = self._blockchain_log_decision(record_type, reference_id, data_hash, data)
+        
+        if self.simulation_mode:
+            self._digests[reference_id] = data_hash
+        
+        return {
+            "record_type": record_type,
+            "reference_id": reference_id,
+            "hash_value": data_hash,
+            "data": data,
+            "tx_hash": tx_hash,
+            "verified": self.simulation_mode  # Auto-verified in simulation mode
+        }
+    
+    def _write_backup(self, rows: List[Dict[str, Any]], record_ids: List[int]) -> None:
+        """Back up a committed batch of simulated records to the local journal."""
+        if not self.simulation_mode:
+            return
+        timestamp = time.time()
+        for row, record_id in zip(rows, record_ids):
+            self.journal.append(row["reference_id"], {
+                "task_id": row["reference_id"],
+                "record_id": record_id,
+                "record_type": row["record_type"],
+                "reference_id": row["reference_id"],
+                "data_hash": row["hash_value"],
+                "hash_alg": HASH_ALG,
+                "data": row["data"],
+                "tx_hash": row["tx_hash"],
+                "timestamp": timestamp
+            })
+            if self._digests.get(row["reference_id"]) == row["hash_value"]:
+                del self._digests[row["reference_id"]]
     
     def _blockchain_log_decision(self, record_type: str, reference_id: str, 
                                data_hash: str, data: Dict[str, Any]) -> str:
         """Log a decision to actual blockchain."""
-        # This would contain actual blockchain implementation
-        # For now, we'll just use the hash as a simulated transaction
-        return f"tx_{data_hash[:16]}"
+        # The hash joins a Merkle batch whose root is anchored in one
+        # transaction; the record keeps a reference to its batch
+        batch_id = self.anchorer.add(reference_id, data_hash)
+        return f"batch_{batch_id}"
     
     def verify_record(self, record_id: str) -> Dict[str, Any]:
         """
@@ -154,7 +332,7 @@ class BlockchainIntegration:
                 verified = self._simulate_verify_record(record.reference_id, record.data)
             else:
                 # In blockchain mode, verify against blockchain
-                verified = self._blockchain_verify_record(record.tx_hash, record.hash_value)
+                verified = self._blockchain_verify_record(record.reference_id, record.hash_value, record.tx_hash)
             
             # Update verification status
             if verified:
@@ -173,29 +351,94 @@ class BlockchainIntegration:
         finally:
             session.close()
     
-    def _simulate_verify_record(self, reference_id: str, data: Dict[str, Any]) -> bool:
-        """Simulate verification of blockchain record."""
-        filename = os.path.join(self.storage_dir, f"{reference_id}.json")
+    def verify_records(self, record_ids: List[str], executor: str = "thread") -> Dict[str, Any]:
+        """
+        Verify many records in one call.
         
-        if not os.path.exists(filename):
-            return False
+        Args:
+            record_ids: The IDs of the records to verify
+            executor: "thread" or "process" pool for hashing
             
-        # Load stored record
-        with open(filename, 'r') as f:
-            record = json.load(f)
+        Returns:
+            Per-record results in input order, each with its "record_id";
+            counts, including "invalid" IDs; and throughput (see
+            RecordVerifier.verify_many)
+        """
+        ids: List[Optional[int]] = []
+        for record_id in record_ids:
+            try:
+                ids.append(int(record_id))
+            except (TypeError, ValueError):
+                ids.append(None)
+        
+        session = self.Session()
+        try:
+            records = session.execute(
+                select(BlockchainRecord).where(BlockchainRecord.id.in_([i for i in ids if i is not None]))
+            ).scalars().all()
+        finally:
+            session.close()
+        
+        found = {record.id: record for record in records}
+        present = [position for position, i in enumerate(ids) if i in found]
+        result = self.verifier.verify_many(
+            [(found[ids[position]].reference_id, found[ids[position]].data) for position in present], executor
+        )
         
-        # Convert current data to JSON and hash
-        data_json = json.dumps(data, default=str)
-        current_hash = hashlib.sha256(data_json.encode()).hexdigest()
+        # Put the verified records back among the missing and invalid ones
+        results: List[Dict[str, Any]] = [
+            {"task_id": None, "verified": False, "status": "missing", "error": "Record not found"}
+            if i is not None else
+            {"task_id": None, "verified": False, "status": "invalid", "error": "Record ID must be an integer"}
+            for i in ids
+        ]
+        for position, item in zip(present, result["results"]):
+            results[position] = item
+        for record_id, item in zip(record_ids, results):
+            item["record_id"] = record_id
+        result["results"] = results
+        result["invalid"] = ids.count(None)
+        result["missing"] += len(ids) - len(present) - result["invalid"]
+        return result
+    
+    def _stored_hash(self, reference_id: str) -> Optional[str]:
+        """Get the stored hash of a simulated record from any retention tier."""
+        data_hash = self._digests.get(reference_id) or self.journal.lookup(reference_id)
+        if data_hash is not None:
+            return data_hash
         
-        # Compare with stored hash
-        return record["hash_value"] == current_hash
+        # Records logged before the journal live in one file each until the
+        # background retention job folds them in
+        filename = os.path.join(self.storage_dir, f"{reference_id}.json")
+        try:
+            with open(filename, 'r') as f:
+                return json.load(f)["hash_value"]
+        except FileNotFoundError:
+            return self.journal.lookup(reference_id)
+    
+    def _simulate_verify_record(self, reference_id: str, data: Dict[str, Any]) -> bool:
+        """Simulate verification of blockchain record."""
+        return self.verifier.verify(reference_id, data)
+    
+    def _persist_batch(self, batch: AnchorBatch) -> None:
+        """Store an anchored batch in the journal so proofs survive restarts."""
+        self.journal.append(*anchor_journal_record(batch))
     
-    def _blockchain_verify_record(self, tx_hash: str, expected_hash: str) -> bool:
+    def _load_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Read a persisted batch back from the journal or its colder tiers."""
+        record = self.journal.read(f"{ANCHOR_RECORD_PREFIX}{batch_id}")
+        return record["data"] if record is not None else None
+    
+    def _blockchain_verify_record(self, reference_id: str, expected_hash: str,
+                                  tx_hash: Optional[str] = None) -> bool:
         """Verify a record against actual blockchain."""
-        # This would contain actual blockchain implementation
-        # For now, we'll just return True for simulated hashes
-        return tx_hash.startswith("tx_") or tx_hash.startswith("sim_")
+        # The record must be included in a batch whose root has been anchored;
+        # its tx_hash names the batch it joined
+        batch_id = tx_hash[len("batch_"):] if tx_hash and tx_hash.startswith("batch_") else None
+        proof = self.anchorer.prove(reference_id, batch_id)
+        if proof is None or not proof["anchored"] or proof["data_hash"] != expected_hash:
+            return False
+        return self.anchorer.check(expected_hash, proof)
     
     def sign_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -209,33 +452,7 @@ class BlockchainIntegration:
         Returns:
             Signed data with verification information
         """
-        # Convert data to string
-        data_str = json.dumps(data, sort_keys=True, default=str)
-        
-        # Create a timestamp
-        timestamp = str(int(time.time()))
-        
-        # Create a nonce
-        nonce = uuid.uuid4().hex
-        
-        # Create a signature using HMAC-SHA256
-        key = os.getenv("SECRET_KEY", "nexus-ai-orchestrator-secret-key")
-        message = f"{data_str}|{timestamp}|{nonce}"
-        signature = hmac.new(
-            key.encode(), 
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Return signed data
-        return {
-            "data": data,
-            "metadata": {
-                "timestamp": timestamp,
-                "nonce": nonce,
-                "signature": signature
-            }
-        }
+        return self.signer.sign(data)
     
     def verify_signature(self, signed_data: Dict[str, Any]) -> bool:
         """
@@ -247,33 +464,31 @@ class BlockchainIntegration:
         Returns:
             Whether the signature is valid
         """
-        try:
-            # Extract components
-            data = signed_data["data"]
-            metadata = signed_data["metadata"]
-            timestamp = metadata["timestamp"]
-            nonce = metadata["nonce"]
-            signature = metadata["signature"]
-            
-            # Convert data to string (same way it was done during signing)
-            data_str = json.dumps(data, sort_keys=True, default=str)
-            
-            # Recreate the message
-            message = f"{data_str}|{timestamp}|{nonce}"
-            
-            # Recreate the signature
-            key = os.getenv("SECRET_KEY", "nexus-ai-orchestrator-secret-key")
-            expected_signature = hmac.new(
-                key.encode(),
-                message.encode(),
-                hashlib.sha256
-            ).hexdigest()
+        return self.signer.verify(signed_data)
+    
+    def sign_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign many payloads in one call.
+        
+        Args:
+            items: The data to sign
             
-            # Compare signatures
-            return hmac.compare_digest(signature, expected_signature)
+        Returns:
+            Signed data, in input order
+        """
+        return self.signer.sign_many(items)
+    
+    def verify_batch(self, signed_items: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Verify many signatures in one call.
         
-        except (KeyError, TypeError):
-            return False
+        Args:
+            signed_items: The signed data to verify
+            
+        Returns:
+            Whether each signature is valid, in input order
+        """
+        return self.signer.verify_many(signed_items)
     
     async def verify_via_external_api(self, data: Dict[str, Any], reference_id: str) -> Dict[str, Any]:
         """
@@ -342,6 +557,7 @@ class BlockchainIntegration:
 
 # Create singleton instance
 blockchain_integration = BlockchainIntegration(simulation_mode=True)
+atexit.register(blockchain_integration.close)
 
 
 # Example usage of the smart verification
@@ -372,48 +588,51 @@ async def verify_agent_output(agent_name: str, input_data: Dict[str, Any],
     # Generate a reference ID
     reference_id = f"verify_{uuid.uuid4().hex[:8]}"
     
-    # Try different verification approaches
-    async with BlockchainIntegration() as bi:
-        # 1. Attempt blockchain verification if available
-        if not bi.simulation_mode:
-            record_id, tx_hash = bi.log_decision(
-                "agent_verification", 
-                reference_id, 
-                verification_data
-            )
-            return {
-                "verified": True,
-                "method": "blockchain",
-                "record_id": record_id,
-                "tx_hash": tx_hash
-            }
-        
-        # 2. Cryptographic signature as an alternative
-        signed_data = bi.sign_data(verification_data)
-        if bi.verify_signature(signed_data):
-            # Store the signature in the blockchain simulation
-            record_id, tx_hash = bi.log_decision(
-                "signature_verification", 
-                reference_id,
-                {
-                    "data": verification_data,
-                    "signature": signed_data["metadata"]["signature"]
-                }
-            )
-            return {
-                "verified": True,
-                "method": "cryptographic",
-                "record_id": record_id,
+    # Try different verification approaches with the shared integration,
+    # whose journal and anchorer outlive this call
+    bi = blockchain_integration
+    # 1. Attempt blockchain verification if available
+    if not bi.simulation_mode:
+        record_future, tx_hash = await bi.submit_decision_async(
+            "agent_verification", 
+            reference_id, 
+            verification_data
+        )
+        record_id = await asyncio.wrap_future(record_future)
+        return {
+            "verified": True,
+            "method": "blockchain",
+            "record_id": str(record_id),
+            "tx_hash": tx_hash
+        }
+    
+    # 2. Cryptographic signature as an alternative
+    signed_data = bi.sign_data(verification_data)
+    if bi.verify_signature(signed_data):
+        # Store the signature in the blockchain simulation
+        record_future, tx_hash = await bi.submit_decision_async(
+            "signature_verification", 
+            reference_id,
+            {
+                "data": verification_data,
                 "signature": signed_data["metadata"]["signature"]
             }
-        
-        # 3. External API verification as a last resort
-        api_verification = await bi.verify_via_external_api(
-            verification_data, 
-            reference_id
         )
-        if api_verification.get("verified", False):
-            return api_verification
-        
-        # Unable to verify
-        return {"verified": False, "error": "All verification methods failed"}
+        record_id = await asyncio.wrap_future(record_future)
+        return {
+            "verified": True,
+            "method": "cryptographic",
+            "record_id": str(record_id),
+            "signature": signed_data["metadata"]["signature"]
+        }
+    
+    # 3. External API verification as a last resort
+    api_verification = await bi.verify_via_external_api(
+        verification_data, 
+        reference_id
+    )
+    if api_verification.get("verified", False):
+        return api_verification
+    
+    # Unable to verify
+    return {"verified": False, "error": "All verification methods failed"}
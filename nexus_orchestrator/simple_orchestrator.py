@@ -26,8 +26,8 @@ async def orchestrate(request: OrchestrationRequest):
     # Use blockchain tracking for verification if available
     try:
         from setup_database import BlockchainRecord
-        from sqlalchemy import create_engine
         from sqlalchemy.orm import sessionmaker
+        from app.db.engine_registry import engine_registry
         import hashlib
         import json
         
@@ -60,8 +60,8 @@ async def orchestrate(request: OrchestrationRequest):
             db_name = os.getenv("POSTGRES_DB")
             database_url = f"postgresql://{db_user}:{db_password}@{db_server}/{db_name}"
             
-            engine = create_engine(database_url)
-            Session = sessionmaker(bind=engine)
+            # Reuse the process-wide pool instead of building one per request
+            Session = sessionmaker(bind=engine_registry.engine(database_url))
             session = Session()
             
             # Import time module for timestamp
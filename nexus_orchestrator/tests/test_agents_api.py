@@ -0,0 +1,112 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api.endpoints import agents
+from app.db.models.agent import Agent
+from app.db.session import get_async_db
+
+
+def agent(name, **fields):
+    return {"name": name, "description": f"{name} agent", "model_name": "gpt-4", "provider": "openai",
+            "goal": "help", "role": "writer", **fields}
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "agents.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Agent.__table__.create(sync_engine)
+    sync_engine.dispose()
+    # Connections aren't pooled across the test client's event loops
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(agents.router, prefix="/agents")
+    app.dependency_overrides[get_async_db] = get_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_agent_crud_round_trip(client):
+    created = client.post("/agents/", json=agent("scribe", skills=["writing"])).json()
+    assert created["version"] == 1 and created["skills"] == ["writing"]
+
+    fetched = client.get(f"/agents/{created['id']}").json()
+    assert fetched == created
+
+    updated = client.put(f"/agents/{created['id']}", json={"goal": "edit"}).json()
+    assert updated["goal"] == "edit" and updated["version"] == 2 and updated["name"] == "scribe"
+
+    assert client.delete(f"/agents/{created['id']}").status_code == 200
+    assert client.get(f"/agents/{created['id']}").status_code == 404
+
+
+def test_missing_agents_are_404(client):
+    assert client.put("/agents/999", json={"goal": "edit"}).status_code == 404
+    assert client.delete("/agents/999").status_code == 404
+
+
+def test_listing_pages_by_cursor_within_filters(client):
+    for i in range(5):
+        client.post("/agents/", json=agent(f"agent-{i}", provider="openai" if i % 2 else "anthropic"))
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2, "provider": "anthropic", **({"cursor": cursor} if cursor else {})}
+        page = client.get("/agents/", params=params).json()
+        names.extend(item["name"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["agent-0", "agent-2", "agent-4"]
+    assert client.get("/agents/", params={"cursor": "bogus"}).status_code == 400
+
+
+def test_skill_search_matches_any_or_all(client):
+    for name, skills in (("a", ["python", "sql"]), ("b", ["python"]), ("c", ["writing"])):
+        client.post("/agents/", json=agent(name, skills=skills))
+
+    def search(*skills, match="any"):
+        page = client.get("/agents/skills/search", params={"skills": list(skills), "match": match}).json()
+        return [item["name"] for item in page["items"]]
+
+    assert search("python", "writing") == ["a", "b", "c"]
+    assert search("python", "sql", match="all") == ["a"]
+    assert search(" sql ", match="all") == ["a"]
+    assert client.get("/agents/skills/search").status_code == 422
+
+
+def test_bulk_create_reports_invalid_items_by_index(client):
+    body = [agent("a"), {"name": "missing fields"}, agent("b")]
+    result = client.post("/agents/bulk", json=body).json()
+    assert [item["index"] for item in result["succeeded"]] == [0, 2]
+    assert [item["index"] for item in result["failed"]] == [1]
+
+    # Atomic requests write nothing when an item fails
+    response = client.post("/agents/bulk", params={"atomic": "true"}, json=[agent("c"), {"name": "x"}])
+    assert response.status_code == 422 and response.json()["succeeded"] == []
+    assert [item["name"] for item in client.get("/agents/").json()["items"]] == ["a", "b"]
+
+
+def test_bulk_update_and_delete_from_ndjson(client):
+    ids = [item["id"] for item in client.post("/agents/bulk", json=[agent("a"), agent("b")]).json()["succeeded"]]
+    ndjson = {"Content-Type": "application/x-ndjson"}
+
+    body = f'{{"id": {ids[0]}, "version": 1, "goal": "edit"}}\nnot json\n{{"id": {ids[1]}, "version": 7}}\n'
+    result = client.patch("/agents/bulk", content=body, headers=ndjson).json()
+    assert result["succeeded"] == [{"index": 0, "id": ids[0], "version": 2}]
+    assert [(item["index"], item["id"]) for item in result["failed"]] == [(1, None), (2, ids[1])]
+
+    result = client.post("/agents/bulk/delete", content=f"{ids[1]}\n999\n", headers=ndjson).json()
+    assert [item["id"] for item in result["succeeded"]] == [ids[1]]
+    assert result["failed"] == [{"index": 1, "id": 999, "error": "Agent 999 not found"}]
+    assert client.get(f"/agents/{ids[0]}").json()["goal"] == "edit"
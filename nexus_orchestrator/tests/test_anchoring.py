@@ -0,0 +1,116 @@
+import threading
+import time
+
+from app.services.anchoring import MerkleAnchorer
+from app.utils.hashing import sha256_hex
+
+
+class Store:
+    """Persisted batches by id, standing in for the journal."""
+
+    def __init__(self):
+        self.batches = {}
+        self.locations = {}
+
+    def persist(self, batch):
+        self.batches[batch.id] = batch.to_dict()
+        for task_id in batch.task_ids:
+            self.locations[task_id] = batch.id
+
+    def load(self, batch_id):
+        return self.batches.get(batch_id)
+
+    def locate(self, task_id):
+        return self.locations.get(task_id)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def make_anchorer(store, anchor=lambda root, batch: f"tx_{root[:8]}", **kwargs):
+    return MerkleAnchorer(anchor, persist=store.persist, load=store.load, locate=store.locate,
+                          window_seconds=60, **kwargs)
+
+
+def test_proofs_round_trip_and_reject_other_hashes():
+    anchorer = make_anchorer(Store())
+    hashes = {f"task-{i}": sha256_hex({"i": i}) for i in range(7)}
+    for task_id, data_hash in hashes.items():
+        anchorer.add(task_id, data_hash)
+    assert anchorer.prove("task-3")["anchored"] is False
+    anchorer.flush()
+
+    for task_id, data_hash in hashes.items():
+        proof = anchorer.prove(task_id)
+        assert proof["anchored"] and proof["data_hash"] == data_hash
+        assert anchorer.check(data_hash, proof)
+    assert not anchorer.check(hashes["task-1"], anchorer.prove("task-2"))
+    assert anchorer.prove("unknown") is None
+
+
+def test_anchored_batches_leave_memory_and_are_read_back():
+    store = Store()
+    anchorer = make_anchorer(store, max_cached_batches=1)
+    for key in ("a", "b", "c"):
+        anchorer.add(f"{key}-1", sha256_hex(key), batch_key=key)
+    anchorer.flush()
+
+    assert anchorer._batches == {} and anchorer._locations == {}
+    assert len(anchorer._cached) == 1
+    for key in ("a", "b", "c"):
+        proof = anchorer.prove(f"{key}-1")
+        assert proof["anchored"] and anchorer.check(sha256_hex(key), proof)
+    assert len(anchorer._cached) == 1
+
+
+def test_failed_anchor_is_retried_with_backoff():
+    store = Store()
+    failures = []
+
+    def flaky_anchor(root, batch):
+        if len(failures) < 2:
+            failures.append(root)
+            raise ConnectionError("node unavailable")
+        return "tx_ok"
+
+    anchorer = make_anchorer(store, anchor=flaky_anchor, retry_base_seconds=0.01)
+    anchorer.add("task", sha256_hex("x"))
+    anchorer.seal()
+
+    # While it is retried the record keeps an unanchored proof
+    assert wait_until(lambda: anchorer.stats()["anchor_failures"] >= 1)
+    assert wait_until(lambda: store.batches)
+    proof = anchorer.prove("task")
+    assert proof["anchored"] and proof["anchor_tx"] == "tx_ok"
+    assert anchorer.stats()["anchor_failures"] == 2 and anchorer._retrying == {}
+
+
+def test_batch_still_failing_at_flush_is_persisted_unanchored():
+    store = Store()
+    fail = threading.Event()
+    fail.set()
+
+    def anchor(root, batch):
+        if fail.is_set():
+            raise ConnectionError("node unavailable")
+        return "tx_late"
+
+    anchorer = make_anchorer(store, anchor=anchor, retry_base_seconds=60)
+    anchorer.add("task", sha256_hex("x"))
+    anchorer.flush()
+
+    (persisted,) = store.batches.values()
+    assert persisted["tx_hash"] is None and persisted["task_ids"] == ["task"]
+    assert anchorer.prove("task")["anchored"] is False
+
+    # A later attempt anchors it and persists it again
+    fail.clear()
+    anchorer.flush()
+    assert store.batches[persisted["batch_id"]]["tx_hash"] == "tx_late"
+    assert anchorer.prove("task")["anchored"]
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.exc import IntegrityError
+
+from app.db.batch_writer import BatchWriter
+
+metadata = MetaData()
+records = Table(
+    "records", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, unique=True),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'records.db'}")
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(records.c.name).order_by(records.c.id)).scalars().all()
+
+
+def test_rows_are_written_in_batches_and_keys_match_rows(engine):
+    batches = []
+    writer = BatchWriter(engine, records, batch_size=3, flush_interval=0.5,
+                         on_batch=lambda rows, keys: batches.append(list(zip(keys, rows))))
+    futures = [writer.submit({"name": f"row-{i}"}) for i in range(7)]
+    writer.close()
+
+    keys = [future.result(timeout=2) for future in futures]
+    assert names(engine) == [f"row-{i}" for i in range(7)]
+    assert [len(batch) for batch in batches] == [3, 3, 1] and writer.batches_written == 3
+    assert [row["name"] for batch in batches for _, row in batch] == [f"row-{i}" for i in range(7)]
+    assert [key for batch in batches for key, _ in batch] == keys
+
+
+def test_failed_batch_fails_only_its_own_futures(engine):
+    writer = BatchWriter(engine, records, batch_size=2, flush_interval=0.5)
+    first = writer.submit({"name": "taken"})
+    writer.flush(timeout=2)
+    duplicate = [writer.submit({"name": "taken"}), writer.submit({"name": "lost"})]
+    later = writer.submit({"name": "later"})
+    writer.close()
+
+    assert first.result(timeout=2) == 1
+    for future in duplicate:
+        with pytest.raises(IntegrityError):
+            future.result(timeout=2)
+    assert later.result(timeout=2) is not None
+    assert names(engine) == ["taken", "later"]
+
+
+def test_async_submit_waits_off_the_event_loop_while_full(engine):
+    writer = BatchWriter(engine, records, batch_size=1, flush_interval=0, max_queue_size=1)
+    original_write = writer._write
+    gate = threading.Event()
+
+    def slow_write(batch):
+        gate.wait(2)
+        original_write(batch)
+
+    writer._write = slow_write
+
+    async def scenario():
+        futures = [await writer.submit_async({"name": "a"}), await writer.submit_async({"name": "b"})]
+        # The queue is full, so this submit waits in a worker thread
+        pending = asyncio.ensure_future(writer.submit_async({"name": "c"}))
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        gate.set()
+        futures.append(await pending)
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+    keys = asyncio.run(scenario())
+    writer.close()
+    assert len(set(keys)) == 3 and names(engine) == ["a", "b", "c"]
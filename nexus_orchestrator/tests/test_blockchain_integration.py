@@ -0,0 +1,48 @@
+import json
+
+import pytest
+import sqlalchemy as sa
+
+from blockchain_integration import BlockchainIntegration
+from setup_database import BlockchainRecord
+
+
+@pytest.fixture
+def integration(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bi = BlockchainIntegration(database_url=f"sqlite:///{tmp_path / 'records.db'}")
+    yield bi
+    bi.close()
+
+
+def create_records_table(bi):
+    BlockchainRecord.__table__.create(sa.create_engine(bi.database_url))
+
+
+def test_construction_does_no_io(integration, tmp_path):
+    assert list(tmp_path.iterdir()) == []
+    assert integration._engine is None and integration._writer is None and integration._http_client is None
+
+
+def test_legacy_records_are_read_directly_without_importing(integration, tmp_path):
+    legacy_dir = tmp_path / "blockchain_sim"
+    legacy_dir.mkdir()
+    (legacy_dir / "ref-1.json").write_text(json.dumps({"reference_id": "ref-1", "hash_value": "abc"}))
+
+    assert integration._stored_hash("ref-1") == "abc"
+    assert integration._stored_hash("ref-2") is None
+    # The legacy file is left for the background retention job
+    assert (legacy_dir / "ref-1.json").exists()
+    assert integration.journal.lookup("ref-1") is None
+
+
+def test_verify_records_reports_each_id_in_order(integration):
+    create_records_table(integration)
+    record_id = integration.submit_decision("test", "ref-1", {"value": 1})[0].result(timeout=5)
+
+    result = integration.verify_records([str(record_id), "999", "not-a-number"])
+
+    assert [item["record_id"] for item in result["results"]] == [str(record_id), "999", "not-a-number"]
+    assert [item.get("status") for item in result["results"][1:]] == ["missing", "invalid"]
+    assert result["results"][0]["verified"] is True
+    assert (result["missing"], result["invalid"]) == (1, 1)
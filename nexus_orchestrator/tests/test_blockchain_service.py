@@ -0,0 +1,59 @@
+import pytest
+
+from app.services.blockchain import BlockchainService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = BlockchainService()
+    yield service
+    service.anchorer.flush()
+    service.journal.close()
+
+
+def test_logged_contract_carries_its_id(service):
+    contract_id = service.create_contract([1, 2], "task-1", {"reward": 5})
+    record = service.journal.read(f"contract_{contract_id}")
+    assert record["data"]["contract_id"] == contract_id
+    assert service.verify_record(f"contract_{contract_id}", record["data"])
+
+
+
+def test_logged_decision_proves_against_its_batch_root(service):
+    service.log_decision("task-1", {"value": 1}).wait(2)
+    service.anchorer.flush()
+
+    result = service.verify_record_proof("task-1", {"value": 1})
+    assert result["verified"] and result["anchored"]
+    assert not service.verify_record_proof("task-1", {"value": 2})["verified"]
+
+
+class FakeWeb3:
+    def __init__(self, connected):
+        self.connected = connected
+
+    def is_connected(self):
+        if isinstance(self.connected, Exception):
+            raise self.connected
+        return self.connected
+
+
+def test_construction_does_no_io(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = BlockchainService()
+    assert list(tmp_path.iterdir()) == []
+    assert service.simulation_mode and service.w3 is None and service.status()["probing"] is False
+
+
+def test_probe_switches_modes_both_ways(service):
+    service.w3 = FakeWeb3(True)
+    assert service.probe()
+    assert service.status()["mode"] == "chain" and service.chain_anchor is not None
+    switched_at = service.mode_changed_at
+
+    service.w3 = FakeWeb3(ConnectionError("refused"))
+    assert not service.probe()
+    status = service.status()
+    assert status["mode"] == "simulation" and status["last_probe_error"] == "refused"
+    assert status["mode_changed_at"] >= switched_at
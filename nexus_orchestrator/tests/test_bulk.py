@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
+
+from app.db.bulk import bulk_delete_async, bulk_insert_async, bulk_update_async
+
+Base = declarative_base()
+
+
+class Widget(Base):
+    __tablename__ = "widgets"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+
+
+async def chunks(*items):
+    for chunk in items:
+        yield chunk
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = tmp_path / "widgets.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+    return create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+
+def write(engine, bulk_write, *args, **kwargs):
+    async def scenario():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            return await bulk_write(db, Widget, *args, **kwargs)
+    return asyncio.run(scenario())
+
+
+def names(engine):
+    async def scenario():
+        async with AsyncSession(engine) as db:
+            return list((await db.execute(select(Widget.name).order_by(Widget.id))).scalars())
+    return asyncio.run(scenario())
+
+
+def test_failing_chunk_is_retried_row_by_row(engine):
+    committed = []
+    result = write(engine, bulk_insert_async, chunks(
+        ([(0, {"name": "a"}), (1, {"name": "b"})], [(2, None, "name: field required")]),
+        ([(3, {"name": "a"}), (4, {"name": "c"})], []),
+    ), after_commit=committed.extend)
+
+    assert [item["index"] for item in result["succeeded"]] == [0, 1, 4]
+    assert all(item["version"] == 1 for item in result["succeeded"])
+    assert [(item["index"], item["error"].split(":")[0]) for item in result["failed"]] == [
+        (2, "name"), (3, "UNIQUE constraint failed"),
+    ]
+    assert names(engine) == ["a", "b", "c"]
+    assert [values["name"] for _, _, values in committed] == ["a", "b", "c"]
+
+
+def test_atomic_write_is_all_or_nothing(engine):
+    committed = []
+    result = write(engine, bulk_insert_async, chunks(
+        ([(0, {"name": "a"}), (1, {"name": "b"})], []),
+        ([(2, {"name": "a"})], []),
+    ), atomic=True, after_commit=committed.extend)
+
+    assert result["succeeded"] == [] and result["failed"][0]["index"] == 2
+    assert names(engine) == [] and committed == []
+
+
+def test_updates_check_versions_and_deletes_report_missing_ids(engine):
+    write(engine, bulk_insert_async, chunks(([(0, {"name": "a"}), (1, {"name": "b"})], [])))
+
+    result = write(engine, bulk_update_async, chunks(([
+        (0, (1, 1, {"name": "a2"})),
+        (1, (2, 5, {"name": "b2"})),
+        (2, (9, None, {"name": "z"})),
+    ], [])))
+    assert result["succeeded"] == [{"index": 0, "id": 1, "version": 2}]
+    assert [item["error"] for item in result["failed"]] == [
+        "Widget 2 not found or no longer at version 5", "Widget 9 not found",
+    ]
+
+    result = write(engine, bulk_delete_async, chunks(([(0, 2), (1, 9)], [])))
+    assert result["succeeded"] == [{"index": 0, "id": 2, "version": None}]
+    assert result["failed"] == [{"index": 1, "id": 9, "error": "Widget 9 not found"}]
+    assert names(engine) == ["a2"]
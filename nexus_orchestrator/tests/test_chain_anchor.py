@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+from web3.exceptions import TransactionNotFound
+
+from app.services.chain_anchor import ChainAnchor, GasStrategy, NonceManager, calldata_gas
+
+ADDRESS = "0x" + "11" * 20
+
+
+class FakeEth:
+    """Just enough of w3.eth for anchoring: mines every transaction it accepts."""
+
+    def __init__(self, base_fee=None):
+        self.base_fee = base_fee
+        self.nonce = 0
+        self.sent = []
+        self.reject_next = 0
+        self.block_calls = 0
+
+    async def get_transaction_count(self, address, block):
+        return self.nonce
+
+    async def get_block(self, block):
+        self.block_calls += 1
+        return {"baseFeePerGas": self.base_fee} if self.base_fee is not None else {}
+
+    @property
+    async def max_priority_fee(self):
+        return 5 * 10 ** 9
+
+    @property
+    async def gas_price(self):
+        return 100
+
+    async def send_transaction(self, tx):
+        if self.reject_next:
+            self.reject_next -= 1
+            self.nonce += 1  # Another sender took the nonce
+            raise ValueError("nonce too low")
+        assert tx["nonce"] == self.nonce
+        self.nonce += 1
+        self.sent.append(tx)
+        return len(self.sent).to_bytes(32, "big")
+
+    async def get_transaction_receipt(self, tx_hash):
+        if int(tx_hash, 16) > len(self.sent):
+            raise TransactionNotFound(tx_hash)
+        return {"status": 1}
+
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+
+def test_calldata_gas_prices_zero_bytes_lower():
+    assert calldata_gas(bytes([0, 1, 2])) == 21000 + 4 + 16 + 16
+
+
+def test_nonces_are_consecutive_and_resync_from_the_chain():
+    async def scenario():
+        eth = FakeEth()
+        eth.nonce = 7
+        nonces = NonceManager(FakeWeb3(eth), ADDRESS)
+        first = await asyncio.gather(*(nonces.next() for _ in range(5)))
+        eth.nonce = 20
+        await nonces.resync()
+        return first, await nonces.next()
+
+    first, after_resync = asyncio.run(scenario())
+    assert sorted(first) == [7, 8, 9, 10, 11] and after_resync == 20
+
+
+def test_gas_strategy_caps_the_tip_and_caches_quotes():
+    async def scenario():
+        eth = FakeEth(base_fee=10 ** 9)
+        gas = GasStrategy(FakeWeb3(eth), max_priority_fee_wei=2 * 10 ** 9)
+        quotes = [await gas.fees(), await gas.fees()]
+        legacy = await GasStrategy(FakeWeb3(FakeEth()), price_multiplier=1.5).fees()
+        return quotes, eth.block_calls, legacy
+
+    (quote, cached), block_calls, legacy = asyncio.run(scenario())
+    assert quote == {"maxPriorityFeePerGas": 2 * 10 ** 9, "maxFeePerGas": 4 * 10 ** 9}
+    assert cached is quote and block_calls == 1
+    assert legacy == {"gasPrice": 150}
+
+
+def make_anchor(eth):
+    anchor = ChainAnchor("http://127.0.0.1:0", receipt_poll_interval=0.01)
+    anchor.w3 = FakeWeb3(eth)
+    anchor.address = ADDRESS
+    anchor._chain_id = 1337
+    anchor._nonces = NonceManager(anchor.w3, ADDRESS)
+    anchor._gas = GasStrategy(anchor.w3)
+    return anchor
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_sends_are_pipelined_and_confirmed_in_the_background():
+    eth = FakeEth()
+    anchor = make_anchor(eth)
+    futures = [anchor.submit(f"{i:064x}", records=10) for i in range(5)]
+    hashes = [future.result(timeout=2) for future in futures]
+
+    assert len(set(hashes)) == 5
+    assert sorted(tx["nonce"] for tx in eth.sent) == [0, 1, 2, 3, 4]
+    assert {tx["data"] for tx in eth.sent} == {"0x" + f"{i:064x}" for i in range(5)}
+    assert wait_until(lambda: anchor.stats()["confirmed"] == 5)
+    stats = anchor.stats()
+    assert stats["records_anchored"] == 50 and stats["in_flight"] == 0 and stats["failed"] == 0
+
+
+def test_rejected_send_resyncs_the_nonce_and_retries_once():
+    eth = FakeEth()
+    eth.reject_next = 1
+    anchor = make_anchor(eth)
+    anchor.anchor_sync("ab" * 32)
+
+    assert [tx["nonce"] for tx in eth.sent] == [1]
+    assert anchor.stats()["failed"] == 0
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from app.services.decision_journal import DecisionJournal, JournalWriteError
+
+
+def record(task_id):
+    return {"task_id": task_id, "data_hash": f"hash-{task_id}"}
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = DecisionJournal(str(tmp_path), flush_interval=0.01, write_retries=1)
+    yield journal
+    journal.close()
+
+
+def test_durable_seq_waits_for_records_enqueued_late(journal):
+    # The first appender is descheduled between taking its seq and enqueueing
+    release = threading.Event()
+    put = journal._queue.put
+
+    def delayed_put(item, *args, **kwargs):
+        if item is not None and item[0] == 1:
+            threading.Thread(target=lambda: (release.wait(), put(item))).start()
+        else:
+            put(item, *args, **kwargs)
+
+    journal._queue.put = delayed_put
+    first = journal.append("a", record("a"))
+    second = journal.append("b", record("b"))
+    assert (first, second) == (1, 2)
+
+    assert wait_until(lambda: "b" in journal._index)
+    assert journal.durable_seq == 0
+    assert journal.wait_for(first, timeout=0.05) is False
+    assert journal.flush(timeout=0.05) is False
+
+    release.set()
+    assert journal.wait_for(first, timeout=2)
+    assert journal.durable_seq == 2
+    assert journal.flush(timeout=2)
+    assert journal.lookup("a") == "hash-a"
+
+
+def test_concurrent_appends_are_all_durable_after_flush(journal):
+    def append_many(worker):
+        for i in range(200):
+            journal.append(f"{worker}-{i}", record(f"{worker}-{i}"))
+
+    threads = [threading.Thread(target=append_many, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert journal.flush(timeout=5)
+    assert journal.durable_seq == 800
+    assert all(journal.read(f"{worker}-{i}") == record(f"{worker}-{i}") for worker in range(4) for i in range(200))
+
+
+def test_failed_batch_fails_its_waiters(journal):
+    def broken_write(batch):
+        raise OSError("disk full")
+
+    journal._write_batch = broken_write
+    seq = journal.append("a", record("a"))
+
+    with pytest.raises(JournalWriteError, match="disk full"):
+        journal.wait_for(seq, timeout=2)
+    assert journal.flush(timeout=2)
+    assert journal.write_error(seq).startswith("OSError")
+    assert journal.lookup("a") is None
+
+
+def test_failed_batch_is_retried_without_duplicate_lines(journal, tmp_path):
+    encode = journal._encode
+    calls = []
+
+    def flaky_encode(data, encoded):
+        calls.append(data["task_id"])
+        # Fail partway through the first attempt, after one line is written
+        if len(calls) == 2:
+            raise OSError("transient")
+        return encode(data, encoded)
+
+    journal._encode = flaky_encode
+    journal._queue.put((1, "a", record("a"), None))
+    journal._queue.put((2, "b", record("b"), None))
+    journal._next_seq = 2
+    journal._ensure_started()
+
+    assert journal.flush(timeout=2)
+    assert journal.write_error(1) is None and journal.write_error(2) is None
+    lines = b"".join(path.read_bytes() for path in tmp_path.iterdir()).splitlines()
+    assert len(lines) == 2
+    assert journal.read("a") == record("a") and journal.read("b") == record("b")
+
+
+def test_index_is_rebuilt_on_restart(tmp_path):
+    journal = DecisionJournal(str(tmp_path), flush_interval=0.01)
+    journal.append("a", record("a"))
+    journal.append("a", {**record("a"), "data_hash": "newer"})
+    journal.close()
+
+    reopened = DecisionJournal(str(tmp_path))
+    assert reopened.lookup("a") == "newer"
+
+
+def test_read_racing_compaction_gets_the_moved_record(tmp_path):
+    journal = DecisionJournal(str(tmp_path), flush_interval=0.05, segment_max_bytes=1)
+    journal._ensure_started()
+    journal._queue.put((1, "a", record("a"), None))
+    journal._queue.put((2, "b", record("b"), None))
+    journal._next_seq = 2
+    assert journal.flush(timeout=2)
+    # A newer "a" in the next segment leaves the first one dead, ahead of "b"
+    journal.append("a", {**record("a"), "data_hash": "newer"})
+    assert journal.flush(timeout=2)
+    stale = journal._index["b"]
+    assert stale[1] > 0
+
+    # Compact between read() taking the entry and opening the segment
+    segment_path = journal._segment_path
+    reclaimed = []
+
+    def compact_then_path(name):
+        if journal._segment_path is compact_then_path:
+            journal._segment_path = segment_path
+            reclaimed.append(journal.compact())
+        return segment_path(name)
+
+    journal._segment_path = compact_then_path
+    assert journal.read("b") == record("b")
+    assert reclaimed[0] > 0 and journal._index["b"][1] == 0
+    journal.close()
+
+
+def test_compaction_is_skipped_while_retention_holds_the_lock(journal):
+    with journal.maintenance_lock:
+        started = time.monotonic()
+        assert journal.compact() == 0
+        assert time.monotonic() - started < 0.5
@@ -0,0 +1,105 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.entity_cache import LocalInvalidationBus, ReadThroughCache
+
+
+class Rows:
+    """A table of versioned rows that counts loads."""
+
+    def __init__(self):
+        self.rows = {1: SimpleNamespace(id=1, version=1)}
+        self.loads = 0
+
+    def load(self, key):
+        self.loads += 1
+        return self.rows.get(key)
+
+    def write(self, key, version):
+        self.rows[key] = SimpleNamespace(id=key, version=version)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_hits_and_misses_are_cached():
+    rows = Rows()
+    cache = ReadThroughCache("agent", rows.load, LocalInvalidationBus())
+    assert cache.get(1).version == 1 and cache.get(1).version == 1
+    assert cache.get(2) is None and cache.get(2) is None
+    assert rows.loads == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["negative_hits"], stats["entries"]) == (1, 1, 2)
+
+
+def test_writes_invalidate_every_worker_sharing_the_bus():
+    rows, bus = Rows(), LocalInvalidationBus()
+    worker_a = ReadThroughCache("agent", rows.load, bus)
+    worker_b = ReadThroughCache("agent", rows.load, bus)
+    crews = ReadThroughCache("crew", rows.load, bus)
+    for cache in (worker_a, worker_b, crews):
+        cache.get(1)
+
+    rows.write(1, 2)
+    worker_a.invalidate(1, 2)
+    assert worker_a.get(1).version == 2 and worker_b.get(1).version == 2
+    # Other entity types keep their entries
+    assert crews.get(1).version == 1
+
+    # A cache already holding the new version keeps it
+    loads = rows.loads
+    worker_b.invalidate(1, 2)
+    assert worker_a.get(1).version == 2 and rows.loads == loads
+
+
+def test_load_racing_a_write_is_returned_but_not_cached():
+    rows = Rows()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load(key):
+        row = rows.load(key)
+        started.set()
+        release.wait(2)
+        return row
+
+    cache = ReadThroughCache("agent", slow_load, LocalInvalidationBus())
+    results = []
+    reader = threading.Thread(target=lambda: results.append(cache.get(1)))
+    reader.start()
+    assert started.wait(2)
+    rows.write(1, 2)
+    cache.invalidate(1, 2)
+    release.set()
+    reader.join()
+
+    assert results[0].version == 1
+    assert cache.get(1).version == 2
+
+
+def test_concurrent_misses_share_one_load():
+    rows = Rows()
+    release = threading.Event()
+
+    def slow_load(key):
+        release.wait(2)
+        return rows.load(key)
+
+    cache = ReadThroughCache("agent", slow_load, LocalInvalidationBus())
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(cache.get(1))) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    assert wait_until(lambda: cache.stats()["misses"] == 4)
+    release.set()
+    for reader in readers:
+        reader.join()
+
+    assert rows.loads == 1 and len(results) == 4
+    assert cache.stats()["coalesced"] == 3
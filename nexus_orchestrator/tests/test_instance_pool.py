@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.db.models.agent import Agent
+from app.db.models.task import Task
+from app.orchestration.agents.agent_service import get_agents_by_ids
+from app.orchestration.crews.instance_pool import CrewInstancePool
+from app.orchestration.tasks.task_service import get_tasks_by_ids
+
+
+class Builder:
+    def __init__(self):
+        self.built = 0
+
+    def __call__(self):
+        self.built += 1
+        return f"crew-{self.built}"
+
+
+def test_idle_crews_are_reused_while_their_key_matches():
+    pool, build = CrewInstancePool(), Builder()
+    with pool.checkout(1, (1, 1), build) as crew:
+        assert crew == "crew-1"
+    with pool.checkout(1, (1, 1), build) as crew:
+        assert crew == "crew-1"
+
+    # A new version of the crew or a member retires the old instances
+    with pool.checkout(1, (1, 2), build) as crew:
+        assert crew == "crew-2"
+    assert pool.stats() == {"hits": 1, "builds": 2, "stale": 1, "idle": 1}
+
+
+def test_concurrent_runs_get_separate_instances():
+    pool, build = CrewInstancePool(max_idle_per_crew=2), Builder()
+    crews = [pool.acquire(1, "k", build) for _ in range(3)]
+    assert len(set(crews)) == 3
+    for crew in crews:
+        pool.release(1, "k", crew)
+    assert pool.stats()["idle"] == 2
+
+
+def test_failed_runs_do_not_return_their_crew():
+    pool, build = CrewInstancePool(), Builder()
+    with pytest.raises(RuntimeError):
+        with pool.checkout(1, "k", build):
+            raise RuntimeError("run failed")
+    assert pool.stats()["idle"] == 0
+
+
+def test_least_recently_used_crews_are_dropped():
+    pool, build = CrewInstancePool(max_crews=2), Builder()
+    for crew_id in (1, 2, 3):
+        with pool.checkout(crew_id, "k", build):
+            pass
+    with pool.checkout(1, "k", build) as crew:
+        assert crew == "crew-4"
+    assert pool.stats()["builds"] == 4
+
+
+def test_members_load_in_one_query_each(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'crews.db'}")
+    Agent.__table__.create(engine)
+    Task.__table__.create(engine)
+    with Session(engine) as db:
+        db.add_all([Agent(id=i, name=f"agent-{i}") for i in (1, 2, 3)])
+        db.add_all([Task(id=i, description=f"task-{i}", agent_id=i) for i in (1, 2, 3)])
+        db.commit()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        agents = get_agents_by_ids(db, [1, 3, 9, 3])
+        tasks = get_tasks_by_ids(db, [2, 3])
+        assert get_agents_by_ids(db, []) == {}
+
+    assert sorted(agents) == [1, 3] and sorted(tasks) == [2, 3]
+    assert len(statements) == 2
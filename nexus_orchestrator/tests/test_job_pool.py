@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from app.orchestration.crews.job_pool import (
+    CANCELLED, CANCELLING, FAILED, QUEUED, RUNNING, SUCCEEDED, CrewJobPool, QueueFullError,
+)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def pool():
+    pool = CrewJobPool(max_workers=1, max_queue_depth=1)
+    yield pool
+    pool.shutdown()
+
+
+def blocked_run(gate, ran):
+    def run(value):
+        ran.append(value)
+        gate.wait(2)
+        return value
+    return run
+
+
+def test_queue_depth_caps_waiting_jobs(pool):
+    gate, ran = threading.Event(), []
+    running = pool.submit(1, blocked_run(gate, ran), "a")
+    assert wait_until(lambda: pool.get(running.id).status == RUNNING)
+    waiting = pool.submit(1, blocked_run(gate, ran), "b")
+
+    with pytest.raises(QueueFullError):
+        pool.submit(1, blocked_run(gate, ran), "c")
+    stats = pool.stats()
+    assert (stats["running"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+    assert pool.get(waiting.id).status == QUEUED
+
+    gate.set()
+    assert wait_until(lambda: pool.get(waiting.id).status == SUCCEEDED)
+    assert pool.get(running.id).result == "a" and ran == ["a", "b"]
+    assert pool.stats()[SUCCEEDED] == 2
+
+
+def test_cancelled_waiting_job_never_runs(pool):
+    gate, ran = threading.Event(), []
+    running = pool.submit(1, blocked_run(gate, ran), "a")
+    waiting = pool.submit(1, blocked_run(gate, ran), "b")
+
+    assert pool.cancel(waiting.id).status == CANCELLED
+    assert pool.get(waiting.id).error == "Cancelled before it started"
+    gate.set()
+    assert wait_until(lambda: pool.get(running.id).status == SUCCEEDED)
+    assert ran == ["a"]
+
+
+def test_cancelled_running_job_drops_its_result(pool):
+    gate, ran = threading.Event(), []
+    job = pool.submit(1, blocked_run(gate, ran), "a")
+    assert wait_until(lambda: ran == ["a"])
+
+    assert pool.cancel(job.id).status == CANCELLING
+    gate.set()
+    assert wait_until(lambda: pool.get(job.id).status == CANCELLED)
+    assert job.result is None and job.error == "Cancelled while running"
+
+
+def test_failures_are_recorded_and_old_jobs_pruned():
+    pool = CrewJobPool(max_workers=2, max_retained=2)
+
+    def fail():
+        raise ValueError("no agents")
+
+    failed = pool.submit(1, fail)
+    assert wait_until(lambda: pool.get(failed.id).status == FAILED)
+    assert failed.error == "ValueError: no agents" and failed.to_dict()["status"] == FAILED
+
+    for i in range(3):
+        job = pool.submit(2, lambda: None)
+        assert wait_until(lambda: pool.get(job.id).status == SUCCEEDED)
+    pool.submit(3, lambda: None)
+    # Only the newest finished jobs are kept
+    assert pool.get(failed.id) is None and pool.cancel("unknown") is None
+    pool.shutdown()
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        CrewJobPool(executor="fiber")
@@ -0,0 +1,53 @@
+from app.orchestration.agents.memory import AgentMemoryStore, distill_facts, estimate_tokens
+
+
+def test_distill_facts_keeps_list_items_and_decisions():
+    text = (
+        "Here is the plan.\n"
+        "- Use a read replica for reporting queries\n"
+        "- ok\n"
+        "We decided to keep the nightly export. Nothing else changed.\n"
+    )
+    assert distill_facts(text) == [
+        "Use a read replica for reporting queries",
+        "We decided to keep the nightly export.",
+    ]
+
+
+def test_recall_ranks_by_similarity_and_survives_restart(tmp_path):
+    store = AgentMemoryStore(str(tmp_path))
+    store.remember(1, "the billing service uses postgres replicas", importance=0.9)
+    store.remember(1, "customers prefer short greetings", importance=0.9)
+    store.remember(2, "the billing service is written in go")
+
+    ((item, score),) = store.recall(1, "which database does billing use", k=1)
+    assert item.content == "the billing service uses postgres replicas" and score > 0
+    assert item.access_count == 1
+
+    reopened = AgentMemoryStore(str(tmp_path))
+    ((again, _),) = reopened.recall(1, "which database does billing use", k=1)
+    assert again.id == item.id and again.access_count == 2
+    assert all(found.agent_id == 2 for found, _ in reopened.recall(2, "billing service"))
+
+
+def test_eviction_keeps_the_most_important_memories(tmp_path):
+    store = AgentMemoryStore(str(tmp_path), capacity=10)
+    for i in range(10):
+        store.remember(1, f"routine note {i}", importance=0.1)
+    store.remember(1, "critical: never drop the audit table", importance=1.0)
+
+    items = store._load(1)
+    assert len(items) == 9
+    assert "critical: never drop the audit table" in {item.content for item in items.values()}
+    assert len((tmp_path / "agent_1.jsonl").read_text().splitlines()) == 9
+
+
+def test_memory_block_stays_within_budget(tmp_path):
+    store = AgentMemoryStore(str(tmp_path))
+    store.record_interaction(1, "- Cache agent configs for five minutes\n- Retry failed anchors with backoff\n")
+
+    block = store.build_memory_block(1, "cache agent configs", token_budget=30)
+    header, *lines = block.splitlines()
+    assert header == "Relevant memories from your previous work:" and lines
+    assert sum(estimate_tokens(line) for line in block.splitlines()) <= 30
+    assert store.build_memory_block(1, "cache agent configs", token_budget=5) == ""
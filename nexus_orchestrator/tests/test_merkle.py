@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.merkle import MerkleTree, leaf_hash, node_hash, verify_proof
+from app.utils.hashing import sha256_hex
+
+
+def leaves(count):
+    return [leaf_hash(sha256_hex({"i": i})) for i in range(count)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13])
+def test_every_leaf_proves_against_the_root(size):
+    tree = MerkleTree(leaves(size))
+    for index, leaf in enumerate(tree.levels[0]):
+        proof = tree.proof(index)
+        assert proof["tree_size"] == size
+        assert verify_proof(leaf, proof, tree.root)
+
+
+def test_promoted_node_matches_rfc_9162_shape():
+    a, b, c = leaves(3)
+    assert MerkleTree([a, b, c]).root == node_hash(node_hash(a, b), c).hex()
+
+
+def test_proofs_reject_other_leaves_positions_and_roots():
+    tree = MerkleTree(leaves(6))
+    proof = tree.proof(4)
+    leaf = tree.levels[0][4]
+
+    assert not verify_proof(tree.levels[0][3], proof, tree.root)
+    assert not verify_proof(leaf, {**proof, "leaf_index": 5}, tree.root)
+    assert not verify_proof(leaf, {**proof, "leaf_index": 6}, tree.root)
+    assert not verify_proof(leaf, {**proof, "siblings": proof["siblings"][:-1]}, tree.root)
+    assert not verify_proof(leaf, proof, MerkleTree(leaves(7)).root)
+
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        MerkleTree([])
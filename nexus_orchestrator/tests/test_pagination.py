@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.pagination import decode_cursor, decode_time_cursor, encode_cursor, encode_time_cursor, keyset_page
+
+
+def test_cursors_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_time_cursor(encode_time_cursor(1700000000.25, "run:1")) == (1700000000.25, "run:1")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_time_cursor(1.0, "a"), "aWQ6LTE"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_time_cursor_rejects_id_cursors():
+    with pytest.raises(ValueError):
+        decode_time_cursor(encode_cursor(1))
+
+
+def test_page_drops_the_lookahead_row():
+    rows = [SimpleNamespace(id=i) for i in (3, 5, 8)]
+    page = keyset_page(rows, 2)
+    assert page["items"] == rows[:2] and decode_cursor(page["next_cursor"]) == 5
+    assert keyset_page(rows, 3)["next_cursor"] is None
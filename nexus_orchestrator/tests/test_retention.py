@@ -0,0 +1,160 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.services.decision_journal import DecisionJournal
+from app.services.retention import RetentionManager, RetentionPolicy
+
+
+@pytest.fixture
+def now():
+    return time.time()
+
+
+def open_journal(tmp_path, **kwargs):
+    # Every batch gets its own segment, so each write below closes the one before
+    return DecisionJournal(str(tmp_path / "records" / "journal"), segment_max_bytes=1,
+                           flush_interval=0.01, **kwargs)
+
+
+def open_manager(journal, policy=None, **kwargs):
+    kwargs.setdefault("archive_after_seconds", None)
+    return RetentionManager(journal, policy or RetentionPolicy(), hot_seconds=60,
+                            max_io_bytes_per_second=None, **kwargs)
+
+
+def write(journal, task_id, timestamp, version=1):
+    journal.append(task_id, {"task_id": task_id, "data_hash": f"{task_id}-v{version}", "timestamp": timestamp})
+    assert journal.flush(timeout=2)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = open_journal(tmp_path)
+    yield journal
+    journal.close()
+
+
+def test_policy_uses_longest_matching_prefix():
+    policy = RetentionPolicy({"thought_": 10, "thought_chain_": None}, default_ttl_seconds=100)
+    assert policy.expires_at("thought_1", 5) == 15
+    assert policy.expires_at("thought_chain_1", 5) is None
+    assert policy.expires_at("task_1", 5) == 105
+
+
+def test_closed_segments_roll_into_compressed_tier(journal, now):
+    manager = open_manager(journal)
+    write(journal, "a", now)
+    write(journal, "b", now)
+    write(journal, "tail", now)
+
+    assert manager.run_once(now=now + 30)["rolled"] == 0
+    stats = manager.run_once(now=now + 120)
+
+    assert stats["rolled"] == 2
+    assert len(manager.store.segments()) == 2
+    assert journal.closed_segments() == []
+    assert journal.lookup("a") == "a-v1"
+    assert journal.read("b")["task_id"] == "b"
+    assert journal.lookup("tail") == "tail-v1"
+
+
+def test_rolling_keeps_only_the_latest_record(journal, now):
+    manager = open_manager(journal)
+    write(journal, "x", now, version=1)
+    write(journal, "x", now, version=2)
+    write(journal, "tail", now)
+
+    manager.run_once(now=now + 120)
+
+    assert journal.lookup("x") == "x-v2"
+    # The segment holding only the superseded record is not kept
+    assert len(manager.store.segments()) == 1
+
+
+def test_expired_records_are_dropped_when_rolled(journal, now):
+    manager = open_manager(journal, RetentionPolicy({"tmp_": 10}))
+    write(journal, "tmp_1", now - 100)
+    write(journal, "keep", now - 100)
+    write(journal, "tail", now)
+
+    stats = manager.run_once(now=now + 120)
+
+    assert stats["expired"] == 1
+    assert journal.lookup("tmp_1") is None
+    assert journal.lookup("keep") == "keep-v1"
+
+
+def test_compressed_segments_are_removed_once_expired(journal, now):
+    manager = open_manager(journal, RetentionPolicy({"short_": 200}))
+    write(journal, "short_1", now)
+    write(journal, "tail", now)
+    manager.run_once(now=now + 120)
+    assert len(manager.store.segments()) == 1
+
+    stats = manager.run_once(now=now + 300)
+
+    assert stats["expired"] == 1 and stats["removed"] == 1
+    assert manager.store.segments() == []
+
+
+def test_old_segments_are_archived_and_still_readable(journal, now):
+    manager = open_manager(journal, archive_after_seconds=100)
+    write(journal, "a", now)
+    write(journal, "tail", now)
+
+    stats = manager.run_once(now=now + 120)
+
+    assert stats["archived"] == 1
+    assert manager.store.segments() == [] and len(manager.store.segments(archived=True)) == 1
+    assert journal.read("a")["data_hash"] == "a-v1"
+
+
+def test_compressed_records_are_found_after_restart(tmp_path, now):
+    journal = open_journal(tmp_path)
+    write(journal, "a", now)
+    write(journal, "tail", now)
+    open_manager(journal).run_once(now=now + 120)
+    journal.close()
+
+    reopened = open_journal(tmp_path)
+    open_manager(reopened)
+    assert reopened.lookup("a") == "a-v1"
+    reopened.close()
+
+
+def write_legacy(directory, name, record):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w") as f:
+        json.dump(record, f)
+
+
+def test_legacy_files_are_imported_and_deleted(journal, tmp_path, now):
+    legacy_dir = str(tmp_path / "legacy")
+    write_legacy(legacy_dir, "ref1.json", {"reference_id": "ref1", "hash_value": "h1", "timestamp": now})
+    write_legacy(legacy_dir, "other.json", {"task_id": "t1", "data_hash": "h2"})
+    manager = open_manager(journal, legacy_dir=legacy_dir,
+                           legacy_key_field="reference_id", legacy_hash_field="hash_value")
+
+    assert manager.import_legacy(now) == 1
+
+    assert journal.lookup("ref1") == "h1"
+    assert sorted(os.listdir(legacy_dir)) == ["other.json"]
+
+
+def test_legacy_files_are_kept_if_their_records_fail_to_write(tmp_path, now):
+    journal = open_journal(tmp_path, write_retries=0)
+
+    def broken_write(batch):
+        raise OSError("disk full")
+
+    journal._write_batch = broken_write
+    legacy_dir = str(tmp_path / "legacy")
+    write_legacy(legacy_dir, "t1.json", {"task_id": "t1", "data_hash": "h1", "timestamp": now})
+
+    open_manager(journal, legacy_dir=legacy_dir).import_legacy(now)
+
+    assert os.listdir(legacy_dir) == ["t1.json"]
+    journal.close()
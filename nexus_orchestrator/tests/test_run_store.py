@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.models.run import OrchestrationRun, RunStep
+from app.services import run_store as run_store_module
+from app.services.run_store import DAY_SECONDS, RunStore, _partition_day, _partition_name, list_runs_async
+
+
+def run(run_id, started_at):
+    return {"id": run_id, "started_at": started_at, "status": "completed", "workflow_type": "sequential"}
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "runs.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    for model in (OrchestrationRun, RunStep):
+        model.__table__.create(sync_engine)
+    sync_engine.dispose()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(run_store_module, "get_async_engine", lambda: engine)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+async def count(engine, model):
+    async with engine.connect() as conn:
+        return await conn.scalar(select(func.count()).select_from(model))
+
+
+def test_partition_names_round_trip():
+    day_start = datetime(2026, 3, 9, tzinfo=timezone.utc).timestamp()
+    name = _partition_name("orchestration_runs", day_start)
+    assert name == "orchestration_runs_p20260309"
+    assert _partition_day("orchestration_runs", name) == day_start
+
+    assert _partition_day("run_steps", name) is None
+    assert _partition_day("orchestration_runs", "orchestration_runs_pdefault") is None
+    assert _partition_day("orchestration_runs", "orchestration_runs") is None
+
+
+def test_keyset_pages_visit_every_run_once(database):
+    # Runs sharing a start time are ordered by ID, so pages don't skip or repeat them
+    runs = [run(f"run{i}", 1000.0 + i // 2) for i in range(7)]
+
+    async def scenario():
+        store = RunStore(batch_size=10, flush_interval=0.01, retention_days=None)
+        for item in runs:
+            store.record(item, [])
+        await store.stop()
+
+        pages, before = [], None
+        async with AsyncSession(database) as db:
+            while True:
+                page = await list_runs_async(db, limit=3, before=before)
+                if not page:
+                    return pages
+                pages.append([item.id for item in page])
+                before = (page[-1].started_at, page[-1].id)
+
+    pages = asyncio.run(scenario())
+    expected = [item["id"] for item in sorted(runs, key=lambda item: (item["started_at"], item["id"]), reverse=True)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == expected
+
+
+def test_retention_deletes_expired_rows_without_partitions(database):
+    now = 100 * DAY_SECONDS
+
+    async def scenario():
+        store = RunStore(flush_interval=0.01, retention_days=2)
+        store.record(run("old", now - 3 * DAY_SECONDS), [{"role_name": "writer"}])
+        store.record(run("new", now - DAY_SECONDS), [{"role_name": "writer"}])
+        await store.stop()
+        result = await store.apply_retention(now=now)
+        return store, result
+
+    store, result = asyncio.run(scenario())
+    assert result == {"deleted_rows": 2}
+    assert store.stats()["rows_expired"] == 2
+
+    async def remaining():
+        return await count(database, OrchestrationRun), await count(database, RunStep)
+
+    assert asyncio.run(remaining()) == (1, 1)
+
+
+def test_failing_batch_is_split_to_keep_the_other_runs(database):
+    async def scenario():
+        store = RunStore(batch_size=10, flush_interval=0.05, retention_days=None)
+        store.record(run("taken", 1.0), [])
+        await store.flush()
+        # A run that can't be inserted shares a batch with three that can
+        for item in (run("a", 2.0), run("taken", 1.0), run("b", 3.0), run("c", 4.0)):
+            store.record(item, [{"role_name": "writer"}])
+        await store.stop()
+        return store
+
+    store = asyncio.run(scenario())
+    stats = store.stats()
+    assert stats["written"] == 4 and stats["failed"] == 1
+    assert stats["retried"] == 1 and stats["steps_written"] == 3
+    assert asyncio.run(count(database, OrchestrationRun)) == 4
@@ -0,0 +1,79 @@
+import pickle
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.orchestration.crews.scheduler import CrewRunError, plan_crew_tasks, run_crew_tasks
+
+
+def task(depends_on=(), async_execution=False):
+    return SimpleNamespace(depends_on=list(depends_on), async_execution=async_execution)
+
+
+def test_sequential_plan_joins_async_tasks_at_the_next_sync_task():
+    tasks = {1: task(), 2: task(async_execution=True), 3: task(async_execution=True), 4: task(), 5: task()}
+    assert plan_crew_tasks([1, 2, 3, 4, 5], tasks, sequential=True) == [set(), {0}, {0}, {0, 1, 2}, {3}]
+
+
+def test_hierarchical_plan_follows_depends_on_only():
+    tasks = {1: task(), 2: task([1]), 3: task([1]), 4: task([3, 2])}
+    assert plan_crew_tasks([1, 2, 3, 4], tasks, sequential=False) == [set(), {0}, {0}, {1, 2}]
+
+
+@pytest.mark.parametrize("tasks, message", [
+    ({1: task([9])}, "not in the crew"),
+    ({1: task([2]), 2: task([1])}, "depend on each other"),
+])
+def test_invalid_dependencies_are_rejected(tasks, message):
+    with pytest.raises(ValueError, match=message):
+        plan_crew_tasks(list(tasks), tasks, sequential=False)
+
+
+def test_independent_tasks_overlap_and_joins_get_outputs_in_order():
+    deps = [set(), {0}, {0}, {1, 2}]
+    both_running = threading.Barrier(2, timeout=2)
+    contexts = {}
+
+    def run(position, context):
+        contexts[position] = context
+        if position in (1, 2):
+            # Fails with BrokenBarrierError unless 1 and 2 run at the same time
+            both_running.wait()
+        return f"out-{position}"
+
+    records = run_crew_tasks([10, 11, 12, 13], deps, run, max_concurrency=2)
+    assert [record["status"] for record in records] == ["succeeded"] * 4
+    assert contexts[3] == ["out-1", "out-2"] and contexts[1] == ["out-0"]
+    assert records[3]["output"] == "out-3" and records[3]["task_id"] == 13
+
+
+def test_concurrency_cap_is_honoured():
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def run(position, context):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        threading.Event().wait(0.02)
+        with lock:
+            active[0] -= 1
+
+    run_crew_tasks(list(range(6)), [set()] * 6, run, max_concurrency=2)
+    assert peak[0] == 2
+
+
+def test_failure_skips_dependent_tasks():
+    def run(position, context):
+        if position == 1:
+            raise RuntimeError("model timeout")
+        return position
+
+    with pytest.raises(CrewRunError) as info:
+        run_crew_tasks([10, 11, 12], [set(), {0}, {1}], run, max_concurrency=1)
+    assert [record["status"] for record in info.value.tasks] == ["succeeded", "failed", "skipped"]
+    assert str(info.value) == "Task 11 failed: RuntimeError: model timeout"
+
+    # The records survive the trip back from a process pool worker
+    copy = pickle.loads(pickle.dumps(info.value))
+    assert copy.tasks == info.value.tasks and str(copy) == str(info.value)
@@ -0,0 +1,24 @@
+import sqlalchemy as sa
+
+import app.db.models.agent  # noqa: F401 - registers the models
+import app.db.models.crew  # noqa: F401
+from app.db.session import upgrade_schema
+
+
+def test_existing_tables_gain_new_columns_and_indexes():
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE agents (id INTEGER PRIMARY KEY, name VARCHAR, provider VARCHAR, "
+                             "model_name VARCHAR, role VARCHAR)")
+        conn.exec_driver_sql("INSERT INTO agents (name) VALUES ('existing')")
+
+    statements = upgrade_schema(engine)
+
+    assert any("ADD COLUMN version INTEGER DEFAULT 1 NOT NULL" in statement for statement in statements)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT version FROM agents").scalar() == 1
+    indexes = {index["name"] for index in sa.inspect(engine).get_indexes("agents")}
+    assert {"ix_agents_provider_id", "ix_agents_role_id"} <= indexes
+    # PostgreSQL-only GIN indexes are left out elsewhere
+    assert "ix_agents_skills" not in indexes
+    assert upgrade_schema(engine) == []
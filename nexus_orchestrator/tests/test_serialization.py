@@ -0,0 +1,64 @@
+import collections
+import datetime
+import enum
+import uuid
+
+import pytest
+
+from app.utils import serialization
+from app.utils.hashing import sha256_hex
+from app.utils.serialization import canonical_json, dumps, loads
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+class Level(enum.IntEnum):
+    HIGH = 3
+
+
+class Ratio(float):
+    pass
+
+
+Point = collections.namedtuple("Point", "x y")
+
+
+VALUES = [
+    {"b": 1, "a": [1.5, 1e-7, 1e22, -0.0, 2 ** 70]},
+    {"v": Color.RED, "level": Level.HIGH},
+    {"ratio": Ratio(1.5), "point": Point(1, 2)},
+    {"at": datetime.datetime(2024, 1, 2, 3, 4, 5), "id": uuid.UUID(int=5)},
+    {"nan": float("nan"), "text": "café"},
+    {1: "non-string key"},
+    {"text": "bad \ud800 text", "\udfff": "😀"},
+]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_backends_encode_identically(value, monkeypatch):
+    encoded = canonical_json(value)
+    monkeypatch.setattr(serialization, "HAVE_ORJSON", False)
+    assert canonical_json(value) == encoded
+
+
+def test_subclasses_encode_as_their_base_type():
+    assert canonical_json({"ratio": Ratio(1.5), "point": Point(1, 2)}) == b'{"point":[1,2],"ratio":1.5}'
+
+
+def test_enum_members_encode_as_their_value():
+    assert canonical_json({"v": Color.RED, "level": Level.HIGH}) == b'{"level":3,"v":"red"}'
+
+
+def test_lone_surrogates_encode_as_escapes():
+    encoded = canonical_json({"a": "bad \ud800 text"})
+    assert encoded == b'{"a":"bad \\ud800 text"}'
+    assert loads(encoded) == {"a": "bad \ud800 text"}
+    assert len(sha256_hex({"a": "\ud800"})) == 64
+
+
+@pytest.mark.parametrize("have_orjson", [True, False])
+def test_dumps_escapes_lone_surrogates(have_orjson, monkeypatch):
+    monkeypatch.setattr(serialization, "HAVE_ORJSON", have_orjson and serialization.orjson is not None)
+    assert loads(dumps({"a": "\ud800", "b": "café"})) == {"a": "\ud800", "b": "café"}
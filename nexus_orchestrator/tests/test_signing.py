@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import json
+import threading
+
+from app.services.signing import SigningService
+
+
+def make_service(**kwargs):
+    return SigningService({"k1": "secret-1"}, "k1", legacy_secret="legacy", **kwargs)
+
+
+def test_signatures_verify_across_rotation_until_retired():
+    service = make_service()
+    old = service.sign({"a": 1})
+    service.rotate("k2", "secret-2")
+    new = service.sign({"a": 1})
+
+    assert new["metadata"]["key_id"] == "k2"
+    assert service.verify(old) and service.verify(new)
+    service.retire("k1")
+    assert not service.verify(old) and service.verify(new)
+
+
+def test_tampered_payload_fails():
+    service = make_service()
+    signed = service.sign({"a": 1})
+    assert not service.verify({**signed, "data": {"a": 2}})
+
+
+def test_batches_default_to_threads():
+    service = make_service(parallel_threshold=4, chunk_size=3, max_workers=2)
+    signed = service.sign_many([{"i": i} for i in range(10)])
+    assert all(service.verify_many(signed))
+    assert list(service._pools) == ["thread"]
+    service.shutdown()
+
+
+def test_concurrent_rotation_never_mixes_keys():
+    service = make_service()
+    stop = threading.Event()
+
+    def rotate():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            service.rotate(f"r{i}", f"secret-{i}")
+
+    rotator = threading.Thread(target=rotate)
+    rotator.start()
+    try:
+        signed = [item for _ in range(200) for item in service.sign_many([{"n": 1}, {"n": 2}])]
+    finally:
+        stop.set()
+        rotator.join()
+    assert all(service.verify_many(signed))
+
+
+def test_legacy_signatures_still_verify():
+    service = make_service()
+    message = f"{json.dumps({'a': 1}, sort_keys=True)}|123|n1".encode()
+    signature = hmac.new(b"legacy", message, hashlib.sha256).hexdigest()
+    legacy = {"data": {"a": 1}, "metadata": {"timestamp": "123", "nonce": "n1", "signature": signature}}
+
+    assert service.verify(legacy)
+    assert not SigningService({"k1": "secret-1"}, "k1").verify(legacy)
+
+
+def test_process_pool_results_match_inputs():
+    service = make_service(parallel_threshold=4, chunk_size=3, max_workers=2)
+    try:
+        signed = service.sign_many([{"i": i} for i in range(10)], executor="process")
+        signed[4] = {**signed[4], "data": {"i": -1}}
+        signed[7] = {**signed[7], "metadata": {**signed[7]["metadata"], "key_id": "unknown"}}
+        signed[8] = {"data": {"i": 8}}
+        assert [item["data"] for item in signed[:4]] == [{"i": i} for i in range(4)]
+        assert service.verify_many(signed, executor="process") == \
+            [True] * 4 + [False] + [True] * 2 + [False, False, True]
+    finally:
+        service.shutdown()
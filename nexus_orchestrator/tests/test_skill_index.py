@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.models.agent import Agent
+from app.orchestration.agents.skill_index import SkillIndex, normalize_skills
+from app.services.entity_cache import LocalInvalidationBus
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'agents.db'}")
+    Agent.__table__.create(engine)
+    with Session(engine) as db:
+        db.add_all([
+            Agent(id=1, name="a", skills=["python", "sql"]),
+            Agent(id=2, name="b", skills=["python"]),
+            Agent(id=3, name="c", skills=[" sql ", "writing", "sql"]),
+        ])
+        db.commit()
+        yield db
+
+
+def test_normalize_skills_trims_and_deduplicates():
+    assert normalize_skills([" sql ", "python", "", "sql"]) == ["sql", "python"]
+    assert normalize_skills(None) == []
+
+
+def test_lookups_match_all_or_any(db):
+    index = SkillIndex()
+    index.load(db)
+    assert index.agents_with(["python", "sql"]) == {1}
+    assert index.agents_with(["python", "writing"], match="any") == {1, 2, 3}
+    assert index.agents_with(["rust"]) == set() and index.agents_with([]) == set()
+
+
+def test_resolve_prefers_full_matches_then_most_skills(db):
+    index = SkillIndex()
+    index.load(db)
+    assert index.resolve(["sql", "writing"]) == 3
+    assert index.resolve(["python", "sql", "writing"]) == 1
+    assert index.resolve(["rust"]) is None
+
+    # Cached resolutions are dropped when an agent changes
+    index.put(4, ["sql", "writing", "python"], version=1)
+    assert index.resolve(["python", "sql", "writing"]) == 4
+    index.remove(4)
+    assert index.resolve(["python", "sql", "writing"]) == 1
+
+
+def test_invalidations_drop_deleted_agents_and_skip_known_versions(db):
+    bus = LocalInvalidationBus()
+    index = SkillIndex(bus)
+    index.load(db)
+    refreshed = []
+    index.refresh = refreshed.append
+
+    bus.publish({"cache": "agent", "key": 2, "version": 1})
+    assert refreshed == []
+    bus.publish({"cache": "agent", "key": 2, "version": 2})
+    assert refreshed == [2]
+    bus.publish({"cache": "agent", "key": 1, "version": None})
+    assert index.agents_with(["python"]) == {2}
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+from app.orchestration.workflows.thought_events import ThoughtEvent, ThoughtEventBroker
+
+
+def thought(chain_id, thought_id):
+    return ThoughtEvent(type="thought", chain_id=chain_id, thought_id=thought_id)
+
+
+def test_slow_subscriber_is_dropped_when_its_queue_fills():
+    async def scenario():
+        broker = ThoughtEventBroker(max_queue_size=2)
+        slow = broker.subscribe("chain")
+        other = broker.subscribe("other")
+        for i in range(3):
+            broker.publish(thought("chain", f"t{i}"))
+
+        # The backlog is discarded and the stream ends
+        assert slow.dropped
+        assert await slow.get(timeout=1) is None
+        assert not other.dropped and other._queue.empty()
+
+        # Later events don't reach a dropped subscriber
+        broker.publish(thought("chain", "t3"))
+        assert slow._queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_events_published_from_other_threads_arrive_in_order():
+    async def scenario():
+        broker = ThoughtEventBroker()
+        subscription = broker.subscribe("chain")
+
+        def publish():
+            for i in range(3):
+                broker.publish(thought("chain", f"t{i}"))
+            broker.publish(ThoughtEvent(type="chain_closed", chain_id="chain"))
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        events = []
+        while (event := await subscription.get(timeout=2)) is not None:
+            events.append(event)
+        thread.join()
+
+        assert [event.thought_id for event in events] == ["t0", "t1", "t2", None]
+        assert events[-1].type == "chain_closed"
+        assert all(event.origin == broker.node_id for event in events)
+        broker.unsubscribe(subscription)
+        assert broker.subscriber_count("chain") == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+import pytest
+
+from app.orchestration.workflows.cross_thought import Thought, ThoughtChain
+from app.orchestration.workflows.thought_export import (
+    THOUGHT_ROW_SCHEMA, export_thought_chains, iter_thought_batches, read_thought_export, rows_to_thought_chains,
+)
+
+
+def make_chain(chain_id, created_at, workflow_type="sequential", status="closed", thoughts=2):
+    return ThoughtChain(
+        id=chain_id, task_id=f"task-{chain_id}", status=status, created_at=created_at,
+        updated_at=created_at + 5, metadata={"workflow_type": workflow_type},
+        thoughts=[
+            Thought(id=f"{chain_id}-{i}", agent_id=i, content=f"thought {i} of {chain_id}", created_at=created_at + i,
+                    context={"role": "writer", "latency_ms": 12.5} if i else {"role": "critic", "error": True})
+            for i in range(thoughts)
+        ],
+    )
+
+
+CHAINS = [
+    make_chain("a", 100.0),
+    make_chain("b", 200.0, workflow_type="parallel"),
+    make_chain("c", 300.0, status="active"),
+    make_chain("d", 400.0, thoughts=3),
+]
+
+
+def test_batches_filter_chains_and_split_rows():
+    batches = list(iter_thought_batches(CHAINS, batch_size=3))
+    assert [len(batch["thought_id"]) for batch in batches] == [3, 3, 1]
+    assert all(list(batch) == list(THOUGHT_ROW_SCHEMA) for batch in batches)
+    # Open chains are never exported
+    assert "c" not in {chain_id for batch in batches for chain_id in batch["chain_id"]}
+
+    (batch,) = iter_thought_batches(CHAINS, since=150.0, until=400.0)
+    assert set(batch["chain_id"]) == {"b"}
+    (batch,) = iter_thought_batches(CHAINS, workflow_type="sequential", until=150.0)
+    assert batch["role"] == ["critic", "writer"] and batch["error"] == [True, False]
+    assert batch["latency_ms"] == [None, 12.5] and batch["content_length"] == [len("thought 0 of a")] * 2
+
+
+@pytest.mark.parametrize("format", ["ndjson", "arrow", "parquet"])
+def test_export_round_trips_to_chains(tmp_path, format):
+    if format != "ndjson":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"thoughts.{format}")
+    assert export_thought_chains(CHAINS, path, format=format, batch_size=2) == 7
+
+    columns = read_thought_export(path, format=format)
+    if format != "ndjson":
+        columns = columns.to_pydict()
+    chains = rows_to_thought_chains(columns)
+
+    assert [chain["id"] for chain in chains] == ["a", "b", "d"]
+    expected = {chain.id: chain for chain in CHAINS}
+    for chain in chains:
+        original = expected[chain["id"]]
+        assert chain["metadata"] == original.metadata and chain["created_at"] == original.created_at
+        assert [(t["id"], t["content"], t["context"]) for t in chain["thoughts"]] == \
+            [(t.id, t.content, t.context) for t in original.thoughts]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export_thought_chains(CHAINS, str(tmp_path / "thoughts.csv"), format="csv")
+    (tmp_path / "other.ndjson").write_bytes(b'{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        read_thought_export(str(tmp_path / "other.ndjson"))
@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.orchestration.workflows.thought_retrieval import HashingEmbedder, MatrixIndex, ThoughtRetriever
+
+THOUGHTS = {
+    "t1": "the database migration failed on the orders table",
+    "t2": "draft a friendly greeting for new customers",
+    "t3": "rollback plan for the failed orders migration",
+}
+
+
+def make_retriever(**kwargs):
+    retriever = ThoughtRetriever(embedder=HashingEmbedder(dim=256), **kwargs)
+    for thought_id, content in THOUGHTS.items():
+        retriever.add_thought("chain", thought_id, content)
+    return retriever
+
+
+def test_embeddings_are_unit_vectors():
+    embedder = HashingEmbedder(dim=64)
+    vector = embedder.embed("orders migration failed")
+    assert vector.dtype == np.float32 and np.isclose(np.linalg.norm(vector), 1.0)
+    assert not embedder.embed("").any()
+
+
+def test_most_similar_thoughts_come_first():
+    retriever = make_retriever()
+    results = retriever.retrieve("chain", "orders migration failed", k=2)
+    assert {thought_id for _, thought_id, _ in results} == {"t1", "t3"}
+    assert results[0][2] >= results[1][2]
+
+    # Closed chains are found in the global index
+    retriever.release_chain("chain")
+    assert [thought_id for _, thought_id, _ in retriever.retrieve("chain", "orders migration failed", k=2)] == \
+        [thought_id for _, thought_id, _ in results]
+    assert retriever.retrieve("other", "orders migration failed") == []
+
+
+def test_matrix_index_grows_and_removes():
+    index = MatrixIndex(dim=4, initial_capacity=1)
+    for i in range(5):
+        vector = np.zeros(4, dtype=np.float32)
+        vector[i % 4] = 1.0
+        index.add(("chain" if i < 3 else "other", f"t{i}"), vector)
+    index.remove([("chain", "t0")])
+
+    assert len(index) == 4
+    query = np.array([1.0, 0, 0, 0], dtype=np.float32)
+    assert index.search(query, 1)[0] == (("other", "t4"), 1.0)
+    # t4 points the same way as t0 did, but is outside the group
+    assert [key for key, _ in index.search(np.array([1.0, 1.0, 0, 0], dtype=np.float32), 5, group="chain")] == \
+        [("chain", "t1"), ("chain", "t2")]
+
+
+def test_oldest_chains_are_evicted_over_the_limit():
+    retriever = ThoughtRetriever(embedder=HashingEmbedder(dim=64), max_thoughts=4)
+    for chain_id in ("old", "mid", "new"):
+        retriever.add_thought(chain_id, f"{chain_id}-1", "orders migration")
+        retriever.add_thought(chain_id, f"{chain_id}-2", "customer greeting")
+
+    assert list(retriever._chain_counts) == ["mid", "new"] and retriever._thought_count == 4
+    assert {chain_id for chain_id, _, _ in retriever.retrieve(None, "orders migration", k=10)} == {"mid", "new"}
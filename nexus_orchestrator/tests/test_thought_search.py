@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from app.orchestration.workflows import thought_search
+from app.orchestration.workflows.thought_search import ThoughtSearchIndex
+
+
+def fill(index, count, start=0):
+    for i in range(start, start + count):
+        index.add_thought("chain", f"t{i}", 1, f"doc{i} common words", created_at=float(i))
+
+
+def test_bm25_ranks_rarer_and_more_frequent_terms_first():
+    index = ThoughtSearchIndex()
+    index.add_thought("c1", "a", 1, "cache cache cache invalidation", 1.0, role="writer")
+    index.add_thought("c1", "b", 2, "cache warming strategy for the index", 2.0)
+    index.add_thought("c2", "c", 1, "unrelated text", 3.0)
+
+    page = index.search("cache invalidation")
+    assert [hit.thought_id for hit in page.hits] == ["a", "b"]
+    assert page.hits[0].score > page.hits[1].score
+    assert [hit.thought_id for hit in index.search("cache", agent_id=2).hits] == ["b"]
+    assert [hit.thought_id for hit in index.search("cache", role="writer").hits] == ["a"]
+
+
+def test_eviction_drops_only_the_oldest_documents():
+    index = ThoughtSearchIndex(max_buffer_docs=10, max_segments=2, max_documents=50)
+    fill(index, 100)
+
+    assert 45 <= index.document_count <= 50
+    assert index.search("doc99").total == 1
+    assert index.search("doc40").total == 0
+    # Rebased postings of a split segment still point at the right documents
+    oldest = int(index._segments[0].docs[0]["thought_id"][1:])
+    assert [hit.thought_id for hit in index.search(f"doc{oldest}").hits] == [f"t{oldest}"]
+
+
+def test_failed_save_keeps_the_previous_one(tmp_path, monkeypatch):
+    index = ThoughtSearchIndex(max_buffer_docs=5, max_segments=4)
+    fill(index, 10)
+    index.save(str(tmp_path))
+    first = set(os.listdir(tmp_path))
+
+    fill(index, 10, start=10)
+    dump = json.dump
+    calls = []
+
+    def failing_dump(data, f):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        dump(data, f)
+
+    monkeypatch.setattr(thought_search.json, "dump", failing_dump)
+    with pytest.raises(OSError):
+        index.save(str(tmp_path))
+    monkeypatch.setattr(thought_search.json, "dump", dump)
+
+    reloaded = ThoughtSearchIndex()
+    assert reloaded.load(str(tmp_path)) and reloaded.document_count == 10
+
+    index.save(str(tmp_path))
+    files = set(os.listdir(tmp_path))
+    assert not files & (first - {"manifest.json"})
+    assert len(files) == len(index._segments) + 1
+    assert reloaded.load(str(tmp_path)) and reloaded.document_count == 20
@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.verification import RecordVerifier, legacy_digest
+from app.utils.hashing import sha256_hex
+
+STORED = {
+    "canonical": sha256_hex({"b": 2, "a": 1}),
+    "legacy": legacy_digest({"b": 2, "a": 1}),
+}
+
+
+@pytest.fixture
+def verifier():
+    verifier = RecordVerifier(STORED.get, max_workers=2, chunk_size=2)
+    yield verifier
+    verifier.shutdown()
+
+
+def test_single_records_match_canonical_and_legacy_digests(verifier):
+    # Canonical digests don't depend on key order
+    assert verifier.match("canonical", {"a": 1, "b": 2}) == STORED["canonical"]
+    assert verifier.verify("legacy", {"b": 2, "a": 1})
+    assert not verifier.verify("canonical", {"a": 1, "b": 3})
+    assert verifier.match("unknown", {"a": 1}) is None
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_bulk_results_keep_input_order_and_count_each_status(verifier, executor):
+    records = [
+        ("canonical", {"a": 1, "b": 2}),
+        ("missing", {"a": 1}),
+        ("legacy", {"b": 2, "a": 1}),
+        ("canonical", {"a": 2}),
+        ("legacy", {"a": 1, "b": 2}),
+    ]
+    result = verifier.verify_many(records, executor=executor)
+
+    assert [(item["task_id"], item["status"]) for item in result["results"]] == [
+        ("canonical", "verified"), ("missing", "missing"), ("legacy", "verified"),
+        ("canonical", "failed"), ("legacy", "failed"),
+    ]
+    assert (result["verified"], result["failed"], result["missing"]) == (2, 2, 1)
+    assert result["records_per_second"] > 0
+
+
+def test_unknown_executor_is_rejected(verifier):
+    with pytest.raises(ValueError):
+        verifier.verify_many([], executor="fiber")